@@ -29,6 +29,8 @@ aws cloudformation deploy \
     PrivateChainAwsSecretAccessKey=${SSM_PARAMS_PREFIX}PrivateChainAwsSecretAccessKey \
     PrivateChainExecuteApiHost=${SSM_PARAMS_PREFIX}PrivateChainExecuteApiHost \
     BetaModeFlag=${SSM_PARAMS_PREFIX}BetaModeFlag \
+    TipQueuedModeFlag=${SSM_PARAMS_PREFIX}TipQueuedModeFlag \
+    ImageAsyncProcessingFlag=${SSM_PARAMS_PREFIX}ImageAsyncProcessingFlag \
     SaltForArticleId=${SSM_PARAMS_PREFIX}SaltForArticleId \
     CognitoUserPoolArn=${SSM_PARAMS_PREFIX}CognitoUserPoolArn \
     ArticleInfoTableName=${SSM_PARAMS_PREFIX}ArticleInfoTableName \
@@ -52,7 +54,13 @@ aws cloudformation deploy \
     CommentTableName=${SSM_PARAMS_PREFIX}CommentTableName \
     CommentLikedUserTableName=${SSM_PARAMS_PREFIX}CommentLikedUserTableName \
     DeletedCommentTableName=${SSM_PARAMS_PREFIX}DeletedCommentTableName \
+    TagCountEventTableName=${SSM_PARAMS_PREFIX}TagCountEventTableName \
+    WalletBalanceCacheTableName=${SSM_PARAMS_PREFIX}WalletBalanceCacheTableName \
+    UserPrivateEthAddressTableName=${SSM_PARAMS_PREFIX}UserPrivateEthAddressTableName \
+    VerifiedContactTableName=${SSM_PARAMS_PREFIX}VerifiedContactTableName \
+    ProcessedImageTableName=${SSM_PARAMS_PREFIX}ProcessedImageTableName \
     DistS3BucketName=${SSM_PARAMS_PREFIX}DistS3BucketName \
+    ImageUploadS3BucketName=${SSM_PARAMS_PREFIX}ImageUploadS3BucketName \
     ApiLambdaRole=${SSM_PARAMS_PREFIX}ApiLambdaRole \
     ElasticSearchEndpoint=${SSM_PARAMS_PREFIX}ElasticSearchEndpoint \
     CognitoUserPoolId=${SSM_PARAMS_PREFIX}CognitoUserPoolId \
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 import boto3
+import copy
 import json
 import os
 import urllib
@@ -14,7 +15,7 @@ class ESconfig:
         response = ssm.get_parameter(Name=f'{os.environ["ALIS_APP_ID"]}ssmElasticSearchEndpoint')
         endpoint = response["Parameter"]["Value"]
         m = re.match(r'search\-([\w\-]+)\-', endpoint)
-        return(m.group(1))
+        return m.group(1)
 
     def __init__(self):
         self.domain = self.__getdomain()
@@ -69,9 +70,9 @@ class ESconfig:
             )
         try:
             urllib.request.urlopen(request)
-            return(True)
+            return True
         except urllib.error.HTTPError:
-            return(False)
+            return False
 
     def delete_index(self, index):
         url = f"https://{self.endpoint}/{index}"
@@ -92,11 +93,214 @@ class ESconfig:
                 )
         urllib.request.urlopen(request)
 
+    def request(self, method, path, body=None):
+        url = f"https://{self.endpoint}/{path}"
+        request = urllib.request.Request(
+                url,
+                method=method,
+                data=json.dumps(body).encode("utf-8") if body is not None else None,
+                headers={"Content-Type": "application/json"}
+                )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    # エイリアスが参照しているインデックス名の一覧を取得する
+    def get_alias_indices(self, alias):
+        try:
+            return list(self.request("GET", f"_alias/{alias}").keys())
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return []
+            raise e
+
+    def update_index_setting(self, index, setting):
+        self.request("PUT", f"{index}/_settings", setting)
+
+    # 複数のエイリアス操作はまとめて実行されるため、検索が途切れることなく参照先を切り替えられる
+    def update_aliases(self, actions):
+        self.request("POST", "_aliases", {"actions": actions})
+
+    # index.blocks.write を有効にすると書き込みは拒否される(検索は継続できる)
+    def set_write_block(self, index, blocked):
+        self.update_index_setting(index, {"index": {"blocks": {"write": blocked}}})
+
+    def get_document_ids(self, index):
+        response = self.request(
+            "POST",
+            f"{index}/_search?scroll={REINDEX_SCROLL_KEEP_ALIVE}",
+            {"size": REINDEX_SCROLL_SIZE, "_source": False, "sort": ["_doc"]}
+        )
+        ids = set()
+        while response["hits"]["hits"]:
+            ids.update((hit["_type"], hit["_id"]) for hit in response["hits"]["hits"])
+            response = self.request(
+                "POST",
+                "_search/scroll",
+                {"scroll": REINDEX_SCROLL_KEEP_ALIVE, "scroll_id": response["_scroll_id"]}
+            )
+        self.request("DELETE", "_search/scroll", {"scroll_id": response["_scroll_id"]})
+        return ids
+
+    # _reindex はコピー元で削除されたドキュメントを反映しないため、コピー先にのみ存在するドキュメントを削除する
+    def delete_missing_documents(self, source, dest):
+        ids = sorted(self.get_document_ids(dest) - self.get_document_ids(source))
+        for i in range(0, len(ids), REINDEX_SCROLL_SIZE):
+            body = "".join(
+                json.dumps({"delete": {"_index": dest, "_type": doc_type, "_id": doc_id}}) + "\n"
+                for doc_type, doc_id in ids[i:i + REINDEX_SCROLL_SIZE]
+            )
+            request = urllib.request.Request(
+                    f"https://{self.endpoint}/_bulk",
+                    method="POST",
+                    data=body.encode("utf-8"),
+                    headers={"Content-Type": "application/x-ndjson"}
+                    )
+            with urllib.request.urlopen(request) as response:
+                result = json.loads(response.read().decode("utf-8"))
+            if result["errors"]:
+                raise Exception(f"delete failed: {result['items']}")
+        return len(ids)
+
+    def refresh_index(self, index):
+        self.request("POST", f"{index}/_refresh")
+
+    def wait_for_status(self, index, status, timeout):
+        response = self.request(
+            "GET",
+            f"_cluster/health/{index}?wait_for_status={status}&timeout={timeout}s"
+        )
+        return not response["timed_out"]
+
+    # バージョンを外部バージョンとして引き継ぐため、再実行時は更新されたドキュメントのみ上書きされる
+    def reindex(self, source, dest, slices):
+        body = {
+            "conflicts": "proceed",
+            "source": {"index": source},
+            "dest": {"index": dest, "version_type": "external"}
+        }
+        response = self.request("POST", f"_reindex?slices={slices}&wait_for_completion=false", body)
+        task_id = response["task"]
+
+        while True:
+            time.sleep(REINDEX_POLLING_INTERVAL)
+            task = self.request("GET", f"_tasks/{task_id}")
+            status = task["task"]["status"]
+            print(f"{source} -> {dest}: {status['created'] + status['updated']}/{status['total']}件")
+            if task["completed"]:
+                break
+
+        if task.get("error") or task.get("response", {}).get("failures"):
+            raise Exception(f"reindex failed: {task.get('error') or task['response']['failures']}")
+
+
+def get_versioned_index_name(alias):
+    return f"{alias}_{time.strftime('%Y%m%d%H%M%S')}"
+
+
+# データ投入中はレプリカとリフレッシュを無効にした設定でインデックスを作成する
+def get_bulk_load_setting(setting):
+    bulk_load_setting = copy.deepcopy(setting)
+    index_setting = bulk_load_setting.setdefault("settings", {}).setdefault("index", {})
+    index_setting["number_of_replicas"] = "0"
+    index_setting["refresh_interval"] = "-1"
+    return bulk_load_setting
+
+
+def get_restore_setting(setting):
+    index_setting = setting.get("settings", {}).get("index", {})
+    return {
+        "index": {
+            "number_of_replicas": index_setting.get("number_of_replicas", "1"),
+            "refresh_interval": index_setting.get("refresh_interval")
+        }
+    }
+
+
+def create(esconfig, alias, setting):
+    if esconfig.check_index_exists(alias):
+        print(f"既に{alias}が存在するためスキップします。作り直す場合は reindex を実行してください")
+        return
+
+    new_index = get_versioned_index_name(alias)
+    print(f"{new_index}インデックス作成")
+    esconfig.create_index(new_index, setting)
+    esconfig.update_aliases([{"add": {"index": new_index, "alias": alias}}])
+    print(f"{alias} -> {new_index}エイリアス作成完了")
+
+
+def reindex(esconfig, alias, setting):
+    old_indices = esconfig.get_alias_indices(alias)
+    # エイリアス導入前に作成された実インデックスからの移行
+    is_concrete_index = not old_indices and esconfig.check_index_exists(alias)
+    if is_concrete_index:
+        old_indices = [alias]
+    if not old_indices:
+        print(f"{alias}が存在しないため新規作成します")
+        create(esconfig, alias, setting)
+        return
+
+    new_index = get_versioned_index_name(alias)
+    print(f"{new_index}インデックス作成")
+    esconfig.create_index(new_index, get_bulk_load_setting(setting))
+
+    print(f"{alias}のデータを{new_index}へコピー")
+    esconfig.reindex(alias, new_index, REINDEX_SLICES)
+
+    esconfig.update_index_setting(new_index, get_restore_setting(setting))
+    print(f"{new_index}のレプリカ作成待ち")
+    if not esconfig.wait_for_status(new_index, "green", REINDEX_WAIT_FOR_STATUS_TIMEOUT):
+        print(f"{new_index}がgreenになりませんでした。エイリアスを切り替えますか？ (y/n)")
+        if input("input> ") != "y":
+            print(f"キャンセル({new_index}は削除されません)")
+            return
+
+    # 切り替えまでの更新・削除を取りこぼさないよう、コピー元への書き込みを停止してから差分を反映する
+    # 停止中の書き込みはエラーとなり、反映されないまま失われることはない
+    print(f"{alias}への書き込みを停止します")
+    for index in old_indices:
+        esconfig.set_write_block(index, True)
+    try:
+        print(f"{alias}のコピー中に更新されたデータを{new_index}へ反映")
+        esconfig.reindex(alias, new_index, REINDEX_SLICES)
+        esconfig.refresh_index(new_index)
+        print(f"{alias}で削除されたデータを{new_index}から削除: {esconfig.delete_missing_documents(alias, new_index)}件")
+        esconfig.refresh_index(new_index)
+
+        if is_concrete_index:
+            actions = [
+                {"add": {"index": new_index, "alias": alias}},
+                {"remove_index": {"index": alias}}
+            ]
+        else:
+            actions = [{"remove": {"index": index, "alias": alias}} for index in old_indices]
+            actions.append({"add": {"index": new_index, "alias": alias}})
+        esconfig.update_aliases(actions)
+    except Exception as e:
+        print(f"切り替えに失敗したため{alias}への書き込みを再開します")
+        for index in old_indices:
+            esconfig.set_write_block(index, False)
+        raise e
+    print(f"{alias}の参照先を{new_index}に切り替えました")
+
+    if not is_concrete_index:
+        print(f"切り戻し用に{', '.join(old_indices)}を書き込み停止の状態で残しています。不要になったら削除してください")
+
+
+REINDEX_SLICES = "auto"
+REINDEX_POLLING_INTERVAL = 10
+REINDEX_WAIT_FOR_STATUS_TIMEOUT = 600
+REINDEX_SCROLL_SIZE = 1000
+REINDEX_SCROLL_KEEP_ALIVE = "1m"
 
+# usage:
+#   python elasticsearch-setup.py <ip>                          インデックスとエイリアスを作成
+#   python elasticsearch-setup.py <ip> reindex [index ...]      無停止で再作成(index省略時は全て)
 esconfig = ESconfig()
 
 # 自分のIPを許可
 myip = sys.argv[1]
+command = sys.argv[2] if len(sys.argv) > 2 else "create"
+targets = sys.argv[3:]
 print(f"{myip}のIPを許可リストに追加します")
 esconfig.set_access_policy_allow_ip(myip)
 print("アクセスポリシー反映中 60秒待機")
@@ -145,7 +349,7 @@ articles_setting = {
 }
 create_index_list.append({"name": "articles", "setting": articles_setting})
 
-# users インデックス設定(逐次検索なのでトークナイズしない)
+# users インデックス設定(部分一致検索用に n-gram で索引する)
 users_setting = {
     "settings": {
         "index": {
@@ -155,6 +359,30 @@ users_setting = {
             "analyzer": {
                 "default": {
                     "tokenizer": "keyword"
+                },
+                "ngram": {
+                    "type": "custom",
+                    "tokenizer": "ngram_tokenizer",
+                    "filter": ["lowercase"]
+                },
+                "trigram": {
+                    "type": "custom",
+                    "tokenizer": "trigram_tokenizer",
+                    "filter": ["lowercase"]
+                }
+            },
+            "tokenizer": {
+                "ngram_tokenizer": {
+                    "type": "ngram",
+                    "min_gram": 1,
+                    "max_gram": 3,
+                    "token_chars": []
+                },
+                "trigram_tokenizer": {
+                    "type": "ngram",
+                    "min_gram": 3,
+                    "max_gram": 3,
+                    "token_chars": []
                 }
             },
             "normalizer": {
@@ -171,15 +399,23 @@ users_setting = {
             "properties": {
                 "user_id": {
                     "type": "keyword",
-                    "copy_to": "search_name"
+                    "copy_to": ["search_name", "search_name_ngram", "search_name_trigram"]
                 },
                 "user_display_name": {
                     "type": "keyword",
-                    "copy_to": "search_name"
+                    "copy_to": ["search_name", "search_name_ngram", "search_name_trigram"]
                 },
                 "search_name": {
                     "type": "keyword",
                     "normalizer": "lowcase"
+                },
+                "search_name_ngram": {
+                    "type": "text",
+                    "analyzer": "ngram"
+                },
+                "search_name_trigram": {
+                    "type": "text",
+                    "analyzer": "trigram"
                 }
             }
         }
@@ -229,6 +465,9 @@ tag_settings = {
                 },
                 'created_at': {
                     'type': 'integer'
+                },
+                'updated_at': {
+                    'type': 'integer'
                 }
             }
         }
@@ -238,18 +477,12 @@ create_index_list.append({"name": "tags", "setting": tag_settings})
 
 for index in create_index_list:
     name = index["name"]
-    if esconfig.check_index_exists(name):
-        print(f"既に{name}が存在します削除して作り直しますか？ (y/n)")
-        choice = input("input> ")
-        if choice == "y":
-            esconfig.delete_index(name)
-            print(f"{name}を削除")
-        else:
-            print("キャンセル")
-            continue
-    print(f"{name}インデックス作成")
-    esconfig.create_index(name, index["setting"])
-    print(f"{name}インデックス作成完了")
+    if targets and name not in targets:
+        continue
+    if command == "reindex":
+        reindex(esconfig, name, index["setting"])
+    else:
+        create(esconfig, name, index["setting"])
 
 print("アクセスポリシーを元の状態に戻します")
 esconfig.rollback_access_policy()
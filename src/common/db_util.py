@@ -1,4 +1,6 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import settings
 from boto3.dynamodb.conditions import Key
@@ -79,14 +81,104 @@ class DBUtil:
 
     @staticmethod
     def query_all_items(dynamodb_table, query_params):
+        return list(DBUtil.query_items(dynamodb_table, query_params))
 
-        response = dynamodb_table.query(**query_params)
-        items = response['Items']
+    """
+    Query の結果をページ単位で取得しながら1件ずつ返却するジェネレータ
+    prefetch を指定すると返却中のページを処理している間に次のページを先読みする
+    max_items、max_capacity_units を指定した場合は返却件数、消費キャパシティユニットが上限に達した時点で取得を打ち切る
+    """
+    @staticmethod
+    def query_items(dynamodb_table, query_params, prefetch=False, max_items=None, max_capacity_units=None,
+                    projection_expression=None, expression_attribute_names=None):
+        # 呼び出し元の query_params を書き換えないようコピーして利用する
+        query_params = dict(query_params, TableName=dynamodb_table.name)
+        if projection_expression:
+            query_params['ProjectionExpression'] = projection_expression
+        if expression_attribute_names:
+            query_params['ExpressionAttributeNames'] = dict(
+                query_params.get('ExpressionAttributeNames', {}), **expression_attribute_names
+            )
+        if max_capacity_units is not None:
+            query_params['ReturnConsumedCapacity'] = 'TOTAL'
+
+        # boto3 の resource はスレッドセーフではないため、先読みのスレッドからは client を利用する
+        client = dynamodb_table.meta.client
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+
+        def query(exclusive_start_key, yielded_count):
+            params = dict(query_params)
+            if exclusive_start_key:
+                params['ExclusiveStartKey'] = exclusive_start_key
+            if max_items is not None:
+                params['Limit'] = min(params.get('Limit', max_items), max_items - yielded_count)
+            return client.query(**params)
+
+        try:
+            future = None
+            response = query(None, 0)
+            yielded_count = 0
+            consumed_capacity_units = 0
+
+            while True:
+                if max_capacity_units is not None:
+                    consumed_capacity_units += response['ConsumedCapacity']['CapacityUnits']
+
+                items = response['Items']
+                if max_items is not None:
+                    items = items[:max_items - yielded_count]
+
+                has_next = 'LastEvaluatedKey' in response and \
+                    (max_items is None or yielded_count + len(items) < max_items) and \
+                    (max_capacity_units is None or consumed_capacity_units < max_capacity_units)
+
+                if has_next and executor:
+                    future = executor.submit(query, response['LastEvaluatedKey'], yielded_count + len(items))
+
+                for item in items:
+                    yield item
+                yielded_count += len(items)
+
+                if not has_next:
+                    return
+
+                response = future.result() if future else query(response['LastEvaluatedKey'], yielded_count)
+                future = None
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+
+    @staticmethod
+    def get_article_id_user_id(article_id, user_id):
+        return article_id + settings.ARTICLE_ID_USER_ID_SEPARATOR + user_id
 
-        while 'LastEvaluatedKey' in response:
-            query_params.update({'ExclusiveStartKey': response['LastEvaluatedKey']})
-            response = dynamodb_table.query(**query_params)
-            items.extend(response['Items'])
+    @staticmethod
+    def batch_get_items(dynamodb, table_name, keys, projection_expression=None, expression_attribute_names=None):
+        items = []
+        # BatchGetItem は1リクエストあたり最大100件のため分割して取得する
+        for i in range(0, len(keys), settings.DYNAMODB_BATCH_GET_ITEM_MAX_KEYS):
+            request_items = {
+                table_name: {
+                    'Keys': keys[i:i + settings.DYNAMODB_BATCH_GET_ITEM_MAX_KEYS]
+                }
+            }
+            if projection_expression:
+                request_items[table_name]['ProjectionExpression'] = projection_expression
+            if expression_attribute_names:
+                request_items[table_name]['ExpressionAttributeNames'] = expression_attribute_names
+
+            retry_count = 0
+            while request_items:
+                response = dynamodb.batch_get_item(RequestItems=request_items)
+                items.extend(response['Responses'].get(table_name, []))
+
+                # スループット超過等で未処理となったキーはバックオフしつつ再取得する
+                request_items = response.get('UnprocessedKeys')
+                if request_items:
+                    if retry_count >= settings.DYNAMODB_BATCH_GET_ITEM_MAX_RETRY_COUNT:
+                        raise Exception('Failed to get items: UnprocessedKeys remain')
+                    time.sleep(settings.DYNAMODB_BATCH_GET_ITEM_RETRY_BASE_SECONDS * (2 ** retry_count))
+                    retry_count += 1
 
         return items
 
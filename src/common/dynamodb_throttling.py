@@ -0,0 +1,166 @@
+import logging
+import random
+import threading
+import time
+
+import settings
+from rate_limiter import RateLimiter
+from service_unavailable_error import ServiceUnavailableError
+
+
+class DynamoDBThrottling:
+    """
+    DynamoDB のスループット超過に対応するため、boto3 の client のイベントフックでテーブルごとに以下を行う
+    ・スループット超過時のリトライを jitter 付きの指数バックオフで行う(botocore 標準のリトライより優先する)
+    ・スループット超過を検知したテーブルはトークンバケットでリクエストレートを絞り、成功に応じて徐々に戻す(AIMD)
+    ・リトライしても失敗する状態が続いたテーブルは一定時間リクエストせずに ServiceUnavailableError とする(サーキットブレーカー)
+    ・テーブルごとのリクエスト数、スループット超過数等をメトリクスとして保持する
+    """
+    # テーブル名をキーとした状態の dict
+    tables = {}
+    lock = threading.Lock()
+
+    @classmethod
+    def install(cls, dynamodb):
+        events = dynamodb.meta.client.meta.events
+        # unique_id を指定しているため、同一の client に複数回登録されることはない
+        events.register('before-parameter-build.dynamodb', cls.__before_parameter_build,
+                        unique_id='dynamodb-throttling-before-parameter-build')
+        events.register_first('needs-retry.dynamodb', cls.__needs_retry, unique_id='dynamodb-throttling-needs-retry')
+        events.register('after-call.dynamodb', cls.__after_call, unique_id='dynamodb-throttling-after-call')
+
+    @classmethod
+    def get_metrics(cls):
+        with cls.lock:
+            return {table_name: dict(table['metrics']) for table_name, table in cls.tables.items()}
+
+    @classmethod
+    def clear(cls):
+        with cls.lock:
+            cls.tables = {}
+
+    @staticmethod
+    def is_throttling_error(error_code):
+        return error_code in settings.DYNAMODB_THROTTLING_ERROR_CODES
+
+    @classmethod
+    def __before_parameter_build(cls, params, context, **kwargs):
+        table_names = cls.__get_table_names(params)
+        context['dynamodb_throttling_table_names'] = table_names
+        now = time.time()
+
+        for table_name in table_names:
+            with cls.lock:
+                table = cls.__get_table(table_name)
+                table['metrics']['requests'] += 1
+
+                if table['opened_at'] is not None and now - table['opened_at'] < settings.DYNAMODB_CIRCUIT_BREAKER_OPEN_SECONDS:
+                    table['metrics']['rejected'] += 1
+                    raise ServiceUnavailableError(
+                        '{0} is temporarily unavailable'.format(table_name),
+                        kwargs['model'].name if 'model' in kwargs else None
+                    )
+
+                rate_limiter = table['rate_limiter']
+
+            if rate_limiter:
+                rate_limiter.acquire()
+                rate_limiter.consume(1)
+
+    """
+    スループット超過の場合のみ待機秒数(リトライしない場合は False)を返却し、それ以外は botocore 標準のリトライに委ねる
+    """
+    @classmethod
+    def __needs_retry(cls, response, attempts, request_dict, **kwargs):
+        if response is None or not cls.is_throttling_error(response[1].get('Error', {}).get('Code')):
+            return None
+
+        table_names = request_dict.get('context', {}).get('dynamodb_throttling_table_names', [])
+
+        with cls.lock:
+            for table_name in table_names:
+                table = cls.__get_table(table_name)
+                table['metrics']['throttles'] += 1
+                cls.__decrease_rate(table)
+
+        if attempts >= settings.DYNAMODB_THROTTLING_MAX_ATTEMPTS:
+            logging.warning('dynamodb throttling: %s', cls.get_metrics())
+            return False
+
+        with cls.lock:
+            for table_name in table_names:
+                cls.__get_table(table_name)['metrics']['retries'] += 1
+
+        # full jitter
+        return random.uniform(0, min(
+            settings.DYNAMODB_THROTTLING_MAX_BACKOFF_SECONDS,
+            settings.DYNAMODB_THROTTLING_BASE_BACKOFF_SECONDS * (2 ** (attempts - 1))
+        ))
+
+    @classmethod
+    def __after_call(cls, parsed, context, **kwargs):
+        throttled = cls.is_throttling_error(parsed.get('Error', {}).get('Code'))
+        now = time.time()
+
+        with cls.lock:
+            for table_name in context.get('dynamodb_throttling_table_names', []):
+                table = cls.__get_table(table_name)
+
+                if throttled:
+                    table['metrics']['failures'] += 1
+                    table['consecutive_failures'] += 1
+                    if table['consecutive_failures'] >= settings.DYNAMODB_CIRCUIT_BREAKER_THRESHOLD:
+                        # 待機後の最初のリクエストが失敗した場合も再度開く
+                        table['opened_at'] = now
+                else:
+                    table['consecutive_failures'] = 0
+                    table['opened_at'] = None
+                    cls.__increase_rate(table)
+
+    @staticmethod
+    def __get_table_names(params):
+        if 'TableName' in params:
+            return [params['TableName']]
+        if 'RequestItems' in params:
+            return sorted(params['RequestItems'].keys())
+        if 'TransactItems' in params:
+            return sorted(set([
+                action['TableName'] for item in params['TransactItems'] for action in item.values()
+                if 'TableName' in action
+            ]))
+        return []
+
+    @classmethod
+    def __get_table(cls, table_name):
+        if table_name not in cls.tables:
+            cls.tables[table_name] = {
+                'rate_limiter': None,
+                'consecutive_failures': 0,
+                'opened_at': None,
+                'metrics': {'requests': 0, 'throttles': 0, 'retries': 0, 'failures': 0, 'rejected': 0}
+            }
+        return cls.tables[table_name]
+
+    @staticmethod
+    def __decrease_rate(table):
+        if table['rate_limiter'] is None:
+            table['rate_limiter'] = RateLimiter(settings.DYNAMODB_THROTTLING_MAX_RATE)
+
+        rate_limiter = table['rate_limiter']
+        rate_limiter.rate = max(
+            settings.DYNAMODB_THROTTLING_MIN_RATE,
+            rate_limiter.rate * settings.DYNAMODB_THROTTLING_DECREASE_FACTOR
+        )
+        rate_limiter.burst = rate_limiter.rate
+
+    @staticmethod
+    def __increase_rate(table):
+        rate_limiter = table['rate_limiter']
+        if rate_limiter is None:
+            return
+
+        rate_limiter.rate += settings.DYNAMODB_THROTTLING_INCREASE_RATE
+        rate_limiter.burst = rate_limiter.rate
+        # 上限まで戻った場合はレート制限を解除する
+        if rate_limiter.rate >= settings.DYNAMODB_THROTTLING_MAX_RATE:
+            table['rate_limiter'] = None
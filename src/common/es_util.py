@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+import settings
+
+
 class ESUtil:
 
     @staticmethod
@@ -26,7 +29,7 @@ class ESUtil:
         }
 
         response = elasticsearch.search(
-            index='tags',
+            index=settings.TAG_INDEX_NAME,
             body=body
         )
 
@@ -80,33 +83,107 @@ class ESUtil:
             body['query']['bool']['must'].append({'term': {'tags.keyword': tag}})
 
         res = elasticsearch.search(
-                index="articles",
+                index=settings.ARTICLE_INDEX_NAME,
                 body=body
         )
         return res
 
     @staticmethod
     def search_user(elasticsearch, word, limit, page):
+        word = word.lower()
+        # 3文字以上は3-gram のみで索引した search_name_trigram のフレーズ一致で部分一致検索を行い、
+        # それ未満は1〜3文字の n-gram で索引した search_name_ngram と直接比較する
+        # フレーズ一致は3-gram が連続して出現することを求めるため、文字列中に離れて出現する場合や
+        # user_id と user_display_name (copy_to による別の値) にまたがって出現する場合には一致しない
+        if len(word) >= settings.USER_SEARCH_NGRAM_MAX_GRAM:
+            ngram_query = {
+                "match_phrase": {
+                    "search_name_trigram": word
+                }
+            }
+        else:
+            ngram_query = {
+                "term": {
+                    "search_name_ngram": word
+                }
+            }
+
         body = {
             "query": {
-                "wildcard": {
-                    "search_name": f"*{word}*"
+                "bool": {
+                    "filter": [ngram_query],
+                    # 完全一致、前方一致、部分一致の順に表示し、同順位内は user_id 順とする
+                    "should": [
+                        {"constant_score": {"filter": {"term": {"search_name": word}}, "boost": 10}},
+                        {"constant_score": {"filter": {"prefix": {"search_name": word}}, "boost": 5}}
+                    ]
                 }
             },
+            "sort": [
+                {"_score": "desc"},
+                {"user_id": "asc"}
+            ],
             "from": limit*(page-1),
             "size": limit
         }
         res = elasticsearch.search(
-                index="users",
+                index=settings.USER_INDEX_NAME,
                 body=body
         )
         return res
 
     @staticmethod
     def search_popular_articles(elasticsearch, params, limit, page):
-        if not elasticsearch.indices.exists(index='article_scores'):
+        if not elasticsearch.indices.exists(index=settings.ARTICLE_SCORE_INDEX_NAME):
             return []
 
+        response = elasticsearch.search(
+            index=settings.ARTICLE_SCORE_INDEX_NAME,
+            body=ESUtil.__get_popular_articles_body(params, limit, page)
+        )
+
+        articles = [item['_source'] for item in response['hits']['hits']]
+
+        return articles
+
+    @staticmethod
+    def search_recent_articles(elasticsearch, params, limit, page):
+        res = elasticsearch.search(
+            index=settings.ARTICLE_INDEX_NAME,
+            doc_type='article',
+            body=ESUtil.__get_recent_articles_body(params, limit, page)
+        )
+        articles = [item['_source'] for item in res['hits']['hits']]
+
+        return articles
+
+    """
+    最新記事と人気記事を msearch でまとめて取得する。
+    人気記事のインデックスが未作成の場合は ignore_unavailable により空の結果となる。
+    """
+    @staticmethod
+    def search_recent_and_popular_articles(elasticsearch, params, recent_limit, popular_limit):
+        body = [
+            {'index': settings.ARTICLE_INDEX_NAME, 'type': 'article'},
+            ESUtil.__get_recent_articles_body(params, recent_limit, 1),
+            {'index': settings.ARTICLE_SCORE_INDEX_NAME, 'ignore_unavailable': True},
+            ESUtil.__get_popular_articles_body(params, popular_limit, 1)
+        ]
+
+        responses = elasticsearch.msearch(body=body)['responses']
+
+        for response in responses:
+            if 'error' in response:
+                raise Exception('Failed to search articles: {0}'.format(response['error']))
+
+        recent_articles, popular_articles = [
+            [item['_source'] for item in response['hits']['hits']] for response in responses
+        ]
+
+        return recent_articles, popular_articles
+
+    @staticmethod
+    def __get_popular_articles_body(params, limit, page):
         body = {
             'query': {
                 'bool': {
@@ -124,17 +201,10 @@ class ESUtil:
         if params.get('topic'):
             body['query']['bool']['must'].append({'match': {'topic': params.get('topic')}})
 
-        response = elasticsearch.search(
-            index='article_scores',
-            body=body
-        )
-
-        articles = [item['_source'] for item in response['hits']['hits']]
-
-        return articles
+        return body
 
     @staticmethod
-    def search_recent_articles(elasticsearch, params, limit, page):
+    def __get_recent_articles_body(params, limit, page):
         body = {
             'query': {
                 'bool': {
@@ -151,11 +221,4 @@ class ESUtil:
         if params.get('topic'):
             body['query']['bool']['must'].append({'match': {'topic': params.get('topic')}})
 
-        res = elasticsearch.search(
-            index='articles',
-            doc_type='article',
-            body=body
-        )
-        articles = [item['_source'] for item in res['hits']['hits']]
-
-        return articles
+        return body
@@ -0,0 +1,259 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import settings
+from image_util import ImageUtil
+
+
+class ImageUploadUtil:
+    """
+    アップロードされた画像を縮小・変換して DIST_S3_BUCKET に保存する
+    API で受け取った base64 の画像と、署名付き URL で IMAGE_UPLOAD_S3_BUCKET にアップロードされた画像(ImageUpload)の処理で共通に用いる
+    処理した画像は元の画像データのハッシュ値と共に PROCESSED_IMAGE_TABLE に記録し、
+    API で同じユーザーが同じ画像をアップロードした場合は処理・保存せずに記録した画像を返却する
+    boto3 の resource はスレッドセーフではないため、S3 へのアクセスには client を用いる
+    """
+
+    @staticmethod
+    def get_image_url(key):
+        return 'https://' + os.environ['DOMAIN'] + '/' + key
+
+    """
+    IMAGE_UPLOAD_S3_BUCKET の key にアップロードするための署名付き URL(POST)を返却する
+    アップロードされた画像は DIST_S3_BUCKET の同じ key に保存されるため、保存後の URL もあわせて返却する
+    """
+    @classmethod
+    def create_presigned_post(cls, s3, key, content_type):
+        presigned_post = s3.meta.client.generate_presigned_post(
+            Bucket=os.environ['IMAGE_UPLOAD_S3_BUCKET_NAME'],
+            Key=key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, settings.IMAGE_UPLOAD_MAX_BYTES]
+            ],
+            ExpiresIn=settings.IMAGE_UPLOAD_URL_EXPIRES_IN
+        )
+
+        return {
+            'upload_url': presigned_post['url'],
+            'upload_fields': presigned_post['fields'],
+            'image_url': cls.get_image_url(key)
+        }
+
+    """
+    API で受け取った記事の画像を保存し、image_url と srcset の dict を返却する
+    キーには画像データのハッシュ値を用い、同じユーザーが同じ画像を保存済みの場合はその画像の dict を返却する
+    IMAGE_ASYNC_PROCESSING_FLAG が有効な場合は元の画像を IMAGE_UPLOAD_S3_BUCKET に保存して返却し、縮小・変換は ImageUpload で行う
+    """
+    @classmethod
+    def upload_article_image(cls, s3, dynamodb, user_id, article_id, ext, image_data, image):
+        image_hash = ImageUtil.get_hash(image_data)
+        processed_image = cls.get_processed_image(dynamodb, user_id, 'article', image_hash, ext)
+        if processed_image is not None:
+            return processed_image
+
+        key_prefix = settings.S3_ARTICLES_IMAGES_PATH + user_id + '/' + article_id + '/' + image_hash
+        if cls.__is_async_processing():
+            cls.__put_upload_object(s3, key_prefix + '.' + ext, image_data, 'image/' + ext)
+            return cls.get_article_image_manifest(key_prefix, ext, image)
+
+        return cls.save_article_image(s3, dynamodb, user_id, key_prefix, ext, image_data, image)
+
+    """
+    API で受け取ったアイコンの画像を保存してユーザーの icon_image_url を更新し、icon_image_url を返却する
+    キーには画像データのハッシュ値を用い、同じユーザーが同じ画像を保存済みの場合はその画像の URL で更新する
+    IMAGE_ASYNC_PROCESSING_FLAG が有効な場合は元の画像を IMAGE_UPLOAD_S3_BUCKET に保存して返却し、
+    縮小・切り抜きと icon_image_url の更新は ImageUpload で行う
+    """
+    @classmethod
+    def upload_icon_image(cls, s3, dynamodb, user_id, ext, image_data, image):
+        image_hash = ImageUtil.get_hash(image_data)
+        processed_image = cls.get_processed_image(dynamodb, user_id, 'icon', image_hash, ext)
+        if processed_image is not None:
+            cls.__update_icon_image_url(dynamodb, user_id, processed_image['image_url'])
+            return processed_image['image_url']
+
+        key = settings.S3_INFO_ICON_PATH + user_id + '/icon/' + image_hash + '.' + ext
+        if cls.__is_async_processing():
+            cls.__put_upload_object(s3, key, image_data, 'image/' + ext)
+            return cls.get_image_url(key)
+
+        return cls.save_icon_image(s3, dynamodb, user_id, key, ext, image_data, image)
+
+    """
+    記事の画像を ARTICLE_IMAGE_MAX_WIDTH, ARTICLE_IMAGE_MAX_HEIGHT 以内に縮小して key_prefix + '.' + ext に保存し、
+    srcset 用に横幅ごとに縮小した画像・WebP に変換した画像を key_prefix + '_<横幅>w.<画像形式>' に保存する
+    image_url と Content-Type をキーとした srcset 形式の文字列の dict を返却する
+    """
+    @classmethod
+    def save_article_image(cls, s3, dynamodb, user_id, key_prefix, ext, image_data, image):
+        image_hash = ImageUtil.get_hash(image_data)
+        key = key_prefix + '.' + ext
+        width = cls.__get_article_image_width(image)
+        variants = cls.__get_variants(image, key_prefix, ext, width)
+        resized_image_data = ImageUtil.resize_to_fit(
+            image_data,
+            image,
+            ext,
+            settings.ARTICLE_IMAGE_MAX_WIDTH,
+            settings.ARTICLE_IMAGE_MAX_HEIGHT
+        )
+
+        # 縮小・エンコードは Pillow が GIL を解放するため、S3 へのアップロードとあわせてスレッドで並列に行う
+        # 画素のデコードは1度のみ行い、横幅ごとに縮小した画像から各画像形式の画像を生成する
+        widths = sorted({variant_width for _, _, variant_width in variants})
+        with ThreadPoolExecutor(max_workers=min(settings.ARTICLE_IMAGE_VARIANT_THREAD_COUNT, len(widths) + 1)) as executor:
+            futures = [executor.submit(cls.__put_object, s3, key, resized_image_data, 'image/' + ext)]
+            if variants:
+                decoded_image = ImageUtil.decode(resized_image_data)
+                futures += [
+                    executor.submit(cls.__put_variants, s3, decoded_image, w, [v for v in variants if v[2] == w])
+                    for w in widths
+                ]
+            for future in futures:
+                future.result()
+
+        manifest = {
+            'image_url': cls.get_image_url(key),
+            'srcset': cls.__get_srcset([(key, ext, width)] + variants)
+        }
+        cls.__put_processed_image(dynamodb, user_id, 'article', image_hash, ext, manifest)
+        return manifest
+
+    """
+    save_article_image で保存される画像の image_url と srcset の dict を、画像を処理せずに返却する
+    """
+    @classmethod
+    def get_article_image_manifest(cls, key_prefix, ext, image):
+        key = key_prefix + '.' + ext
+        width = cls.__get_article_image_width(image)
+
+        return {
+            'image_url': cls.get_image_url(key),
+            'srcset': cls.__get_srcset([(key, ext, width)] + cls.__get_variants(image, key_prefix, ext, width))
+        }
+
+    """
+    アイコンの画像を USER_ICON_WIDTH, USER_ICON_HEIGHT に縮小・切り抜きして key に保存し、ユーザーの icon_image_url を更新する
+    icon_image_url を返却する
+    """
+    @classmethod
+    def save_icon_image(cls, s3, dynamodb, user_id, key, ext, image_data, image):
+        image_hash = ImageUtil.get_hash(image_data)
+        resized_image_data = ImageUtil.resize_and_crop_center(
+            image_data,
+            image,
+            ext,
+            settings.USER_ICON_WIDTH,
+            settings.USER_ICON_HEIGHT
+        )
+        cls.__put_object(s3, key, resized_image_data, 'image/' + ext)
+
+        icon_image_url = cls.get_image_url(key)
+        cls.__update_icon_image_url(dynamodb, user_id, icon_image_url)
+        cls.__put_processed_image(dynamodb, user_id, 'icon', image_hash, ext, {'image_url': icon_image_url})
+        return icon_image_url
+
+    """
+    ユーザーが保存済みの同じ画像(画像の種類, 画像データのハッシュ値, 拡張子が同じもの)の dict を返却する。存在しない場合は None を返却する
+    """
+    @classmethod
+    def get_processed_image(cls, dynamodb, user_id, image_type, image_hash, ext):
+        processed_image_table = dynamodb.Table(os.environ['PROCESSED_IMAGE_TABLE_NAME'])
+        item = processed_image_table.get_item(Key={
+            'user_id': user_id,
+            'image_key': cls.__get_processed_image_key(image_type, image_hash, ext)
+        }).get('Item')
+
+        if item is None:
+            return None
+        return {k: v for k, v in item.items() if k not in ['user_id', 'image_key', 'created_at']}
+
+    @classmethod
+    def __put_processed_image(cls, dynamodb, user_id, image_type, image_hash, ext, processed_image):
+        processed_image_table = dynamodb.Table(os.environ['PROCESSED_IMAGE_TABLE_NAME'])
+        processed_image_table.put_item(Item=dict(
+            processed_image,
+            user_id=user_id,
+            image_key=cls.__get_processed_image_key(image_type, image_hash, ext),
+            created_at=int(time.time())
+        ))
+
+    @staticmethod
+    def __get_processed_image_key(image_type, image_hash, ext):
+        return image_type + settings.PROCESSED_IMAGE_KEY_SEPARATOR + image_hash + '.' + ext
+
+    @staticmethod
+    def __update_icon_image_url(dynamodb, user_id, icon_image_url):
+        users_table = dynamodb.Table(os.environ['USERS_TABLE_NAME'])
+        users_table.update_item(
+            Key={
+                'user_id': user_id,
+            },
+            UpdateExpression='set icon_image_url=:icon_image_url',
+            ExpressionAttributeValues={
+                ':icon_image_url': icon_image_url,
+            }
+        )
+
+    @staticmethod
+    def __is_async_processing():
+        return os.environ.get('IMAGE_ASYNC_PROCESSING_FLAG') == '1'
+
+    @staticmethod
+    def __get_article_image_width(image):
+        return ImageUtil.get_fit_size(image.size, settings.ARTICLE_IMAGE_MAX_WIDTH, settings.ARTICLE_IMAGE_MAX_HEIGHT)[0]
+
+    """
+    srcset 用に生成する画像の (S3 のキー, 画像形式, 横幅) のリストを返却する
+    アニメーション画像は縮小・変換するとアニメーションが失われるため生成しない
+    """
+    @staticmethod
+    def __get_variants(image, key_prefix, ext, width):
+        if getattr(image, 'is_animated', False):
+            return []
+
+        widths = [w for w in settings.ARTICLE_IMAGE_VARIANT_WIDTHS if w < width]
+        variants = [(key_prefix + '_' + str(w) + 'w.' + ext, ext, w) for w in widths]
+        for image_format in settings.ARTICLE_IMAGE_VARIANT_FORMATS:
+            variants += [
+                (key_prefix + '_' + str(w) + 'w.' + image_format, image_format, w) for w in widths + [width]
+            ]
+        return variants
+
+    """
+    デコード済みの image を width に縮小し、同じ横幅の variants(S3 のキー, 画像形式, 横幅)をそれぞれ保存する
+    """
+    @classmethod
+    def __put_variants(cls, s3, image, width, variants):
+        image_formats = [image_format for _, image_format, _ in variants]
+        for (key, image_format, _), body in zip(variants, ImageUtil.create_variants(image, width, image_formats)):
+            cls.__put_object(s3, key, body, 'image/' + image_format)
+
+    @staticmethod
+    def __put_object(s3, key, body, content_type):
+        s3.meta.client.put_object(
+            Bucket=os.environ['DIST_S3_BUCKET_NAME'],
+            Body=body,
+            Key=key,
+            ContentType=content_type
+        )
+
+    @staticmethod
+    def __put_upload_object(s3, key, body, content_type):
+        s3.meta.client.put_object(
+            Bucket=os.environ['IMAGE_UPLOAD_S3_BUCKET_NAME'],
+            Body=body,
+            Key=key,
+            ContentType=content_type
+        )
+
+    @classmethod
+    def __get_srcset(cls, variants):
+        srcset = {}
+        for key, image_format, width in sorted(variants, key=lambda variant: variant[2]):
+            srcset.setdefault('image/' + image_format, []).append(cls.get_image_url(key) + ' ' + str(width) + 'w')
+
+        return {content_type: ', '.join(candidates) for content_type, candidates in srcset.items()}
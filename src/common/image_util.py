@@ -0,0 +1,179 @@
+import base64
+import binascii
+import hashlib
+import math
+from io import BytesIO
+
+import settings
+from jsonschema import ValidationError
+from PIL import Image
+
+
+class ImageUtil:
+    """
+    アップロードされた画像の検証・リサイズ・エンコードを行う
+    base64 のデコードは1度のみ行い、デコード結果の bytes をコピーせずに形式の判定(memoryview)と Pillow での読み込み(BytesIO)で共有する
+    Image.open はヘッダのみを読み込むため、画素のデコードはリサイズが必要な場合にのみ行う
+    JPEG は Image.draft によりデコード時に縮小し、全画素をデコードせずにリサイズする
+    """
+
+    """
+    base64 の画像データをデコードし、(画像データ, Image) を返却する
+    サポート外の画像形式の場合は ValidationError を送出する
+    """
+    @classmethod
+    def open(cls, base64_image_data):
+        try:
+            image_data = base64.b64decode(base64_image_data)
+        except (binascii.Error, TypeError, ValueError):
+            raise ValidationError('Bad Request: No supported image format')
+
+        return image_data, cls.load(image_data)
+
+    """
+    画像データから Image を返却する(ヘッダのみを読み込む)
+    サポート外の画像形式の場合は ValidationError を送出する
+    """
+    @classmethod
+    def load(cls, image_data):
+        if cls.get_format(image_data) is None:
+            raise ValidationError('Bad Request: No supported image format')
+
+        try:
+            return Image.open(BytesIO(image_data))
+        except Exception:
+            raise ValidationError('Bad Request: No supported image format')
+
+    """
+    画像データの先頭バイトから画像形式(jpeg, png, gif)を返却する。判定できない場合は None を返却する
+    """
+    @staticmethod
+    def get_format(image_data):
+        header = memoryview(image_data)
+        for signature, image_format in settings.IMAGE_FORMAT_SIGNATURES:
+            if header[:len(signature)] == signature:
+                return image_format
+        return None
+
+    """
+    画像データの内容から算出したハッシュ値(sha256)を返却する
+    """
+    @staticmethod
+    def get_hash(image_data):
+        return hashlib.sha256(image_data).hexdigest()
+
+    """
+    縦横比を維持して max_width, max_height 以内に縮小した場合のサイズを返却する
+    画素をデコードせずに縮小後のサイズを求められるよう、resize_to_fit でもこのサイズに縮小する
+    """
+    @staticmethod
+    def get_fit_size(size, max_width, max_height):
+        w, h = size
+        if w <= max_width and h <= max_height:
+            return size
+
+        if w * max_height >= h * max_width:
+            return max_width, max(1, round(h * max_width / w))
+        return max(1, round(w * max_height / h)), max_height
+
+    """
+    縦横比を維持して max_width, max_height 以内に縮小した画像データを返却する
+    縮小が不要な場合は再エンコードせずに元の画像データを返却する
+    """
+    @classmethod
+    def resize_to_fit(cls, image_data, image, ext, max_width, max_height):
+        size = cls.get_fit_size(image.size, max_width, max_height)
+        if size == image.size:
+            return image_data
+
+        cls.__draft(image, size)
+        return cls.__encode(image.resize(size, Image.LANCZOS), ext)
+
+    """
+    短辺が width, height となるように縮小した後、中央を width, height で切り抜いた画像データを返却する
+    縮小が不要な場合は再エンコードせずに元の画像データを返却する
+    """
+    @classmethod
+    def resize_and_crop_center(cls, image_data, image, ext, width, height):
+        w, h = image.size
+        if w <= width and h <= height:
+            return image_data
+
+        # resize to short side
+        size = None
+        if w >= h and (h > height):
+            size = (w / (h / height), height)
+        elif (h > w) and (w > width):
+            size = (width, h / (w / width))
+
+        if size is not None:
+            cls.__draft(image, size)
+            image.thumbnail(size, Image.LANCZOS)
+
+        # crop image to center
+        w, h = image.size
+        crop_width = min(w, width)
+        crop_height = min(h, height)
+        crop_image = image.crop((
+            (w - crop_width) // 2,
+            (h - crop_height) // 2,
+            (w + crop_width) // 2,
+            (h + crop_height) // 2
+        ))
+        return cls.__encode(crop_image, ext)
+
+    """
+    画像データの画素をデコードした Image を返却する
+    create_variants で複数のスレッドから共有できるよう、デコードを完了させてから返却する
+    """
+    @staticmethod
+    def decode(image_data):
+        image = Image.open(BytesIO(image_data))
+        image.load()
+        return image
+
+    """
+    デコード済みの image の横幅を width に縮小し、image_formats(jpeg, png, gif, webp)それぞれでエンコードした画像データのリストを返却する
+    縮小は画像形式によらず1度のみ行う。image は変更しないため、複数のスレッドで同じ image を共有できる
+    """
+    @classmethod
+    def create_variants(cls, image, width, image_formats):
+        w, h = image.size
+        if w > width:
+            image = image.resize((width, max(1, round(h * width / w))), Image.LANCZOS)
+
+        return [cls.__encode(image, image_format) for image_format in image_formats]
+
+    @staticmethod
+    def __draft(image, size):
+        # JPEG は size 以上となる範囲で 1/2, 1/4, 1/8 に縮小してデコードする
+        if image.format == 'JPEG':
+            image.draft(image.mode, (math.ceil(size[0]), math.ceil(size[1])))
+
+    @classmethod
+    def __encode(cls, image, ext):
+        buf = BytesIO()
+        cls.__convert_mode(image, ext).save(buf, format=ext, **settings.IMAGE_ENCODE_OPTIONS.get(ext, {}))
+        return buf.getvalue()
+
+    """
+    image を image_format でエンコードできるモードに変換した Image を返却する。変換が不要な場合は image をそのまま返却する
+    ext は Content-Type から決まるため、画像データの形式(get_format)と異なる場合(透過 PNG を image/jpeg で送信した場合等)も保存できるようにする
+    """
+    @staticmethod
+    def __convert_mode(image, image_format):
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+
+        if image_format == 'jpeg' and image.mode not in ('RGB', 'L', 'CMYK'):
+            if not has_alpha:
+                return image.convert('RGB')
+            # JPEG は透過できないため、透過部分を白で塗りつぶす
+            rgba_image = image.convert('RGBA')
+            rgb_image = Image.new('RGB', image.size, 'white')
+            rgb_image.paste(rgba_image, mask=rgba_image.split()[3])
+            return rgb_image
+
+        if image_format == 'webp' and image.mode not in ('RGB', 'RGBA'):
+            return image.convert('RGBA' if has_alpha else 'RGB')
+
+        return image
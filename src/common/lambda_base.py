@@ -2,10 +2,15 @@ from abc import ABCMeta, abstractmethod
 import json
 import logging
 import traceback
+
+import settings
+from botocore.exceptions import ClientError
+from dynamodb_throttling import DynamoDBThrottling
 from jsonschema import ValidationError
 from record_not_found_error import RecordNotFoundError
 from not_authorized_error import NotAuthorizedError
 from not_verified_user_error import NotVerifiedUserError
+from service_unavailable_error import ServiceUnavailableError
 
 
 class LambdaBase(metaclass=ABCMeta):
@@ -19,6 +24,9 @@ class LambdaBase(metaclass=ABCMeta):
         self.params = None
         self.headers = None
 
+        if dynamodb is not None:
+            DynamoDBThrottling.install(dynamodb)
+
     @abstractmethod
     def get_schema(self):
         pass
@@ -77,6 +85,25 @@ class LambdaBase(metaclass=ABCMeta):
                 'statusCode': 404,
                 'body': json.dumps({'message': str(err)})
             }
+        except ServiceUnavailableError as err:
+            logger.fatal(err)
+            logger.info(self.event)
+
+            return self.__get_service_unavailable_response()
+        except ClientError as err:
+            logger.fatal(err)
+            logger.info(self.event)
+
+            # スループット超過によりリトライしても失敗した場合は、一時的な障害として再試行を促す
+            if DynamoDBThrottling.is_throttling_error(err.response['Error']['Code']):
+                return self.__get_service_unavailable_response()
+
+            traceback.print_exc()
+
+            return {
+                'statusCode': 500,
+                'body': json.dumps({'message': 'Internal server error'})
+            }
 
         except Exception as err:
             logger.fatal(err)
@@ -88,6 +115,14 @@ class LambdaBase(metaclass=ABCMeta):
                 'body': json.dumps({'message': 'Internal server error'})
             }
 
+    @staticmethod
+    def __get_service_unavailable_response():
+        return {
+            'statusCode': 503,
+            'headers': {'Retry-After': str(settings.DYNAMODB_CIRCUIT_BREAKER_OPEN_SECONDS)},
+            'body': json.dumps({'message': 'Service temporarily unavailable'})
+        }
+
     def __get_params(self):
         target_params = [
             {
@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import settings
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from rate_limiter import RateLimiter
+
+
+class ParallelScanUtil:
+    """
+    Segment/TotalSegments を指定した Scan をセグメントごとのスレッドで並列に実行し、取得した項目を1件ずつ返却する
+    checkpoint には各セグメントの ExclusiveStartKey と完了状態を保持し、返却済みのページのみを反映する
+    中断した場合は checkpoint を次回の実行に引き渡すことで未処理のページから再開できる(ページ単位で at-least-once)
+    数値のキーは Decimal となり json.dumps できないため、ExclusiveStartKey は低レベル API の型付きの形式で保持する
+    """
+
+    @staticmethod
+    def create_checkpoint(total_segments=settings.PARALLEL_SCAN_TOTAL_SEGMENTS):
+        return {
+            'total_segments': total_segments,
+            'segments': [{'exclusive_start_key': None, 'completed': False} for _ in range(total_segments)]
+        }
+
+    @staticmethod
+    def is_completed(checkpoint):
+        return all(segment['completed'] for segment in checkpoint['segments'])
+
+    """
+    checkpoint を省略した場合は新規に全件を Scan する
+    max_capacity_units_per_second を指定した場合は全セグメントの消費キャパシティユニットの合計が上限を超えないよう待機する
+    max_seconds を経過した場合は新たなページの取得を打ち切る(取得済みのページは返却する)
+    on_checkpoint はページの項目を全て返却した後に更新された checkpoint を引数に呼び出される
+    """
+    @classmethod
+    def scan_items(cls, dynamodb, table_name, scan_params=None, checkpoint=None, max_capacity_units_per_second=None,
+                   max_seconds=None, on_checkpoint=None):
+        checkpoint = checkpoint if checkpoint is not None else cls.create_checkpoint()
+        pending_segments = [i for i, segment in enumerate(checkpoint['segments']) if not segment['completed']]
+        if not pending_segments:
+            return
+
+        rate_limiter = RateLimiter(max_capacity_units_per_second) if max_capacity_units_per_second else None
+        deadline = time.time() + max_seconds if max_seconds is not None else None
+        pages = queue.Queue(maxsize=settings.PARALLEL_SCAN_QUEUE_SIZE)
+        stopped = threading.Event()
+
+        # boto3 の resource はスレッドセーフではないため、スレッド間では client を共有する
+        client = dynamodb.meta.client
+        executor = ThreadPoolExecutor(max_workers=min(len(pending_segments), settings.PARALLEL_SCAN_MAX_WORKERS))
+
+        try:
+            for segment in pending_segments:
+                executor.submit(
+                    cls.__scan_segment, client, table_name, scan_params or {}, segment, checkpoint, rate_limiter,
+                    deadline, pages, stopped
+                )
+
+            running_count = len(pending_segments)
+            while running_count > 0:
+                segment, page = pages.get()
+
+                if page is None:
+                    running_count -= 1
+                    continue
+                if isinstance(page, Exception):
+                    raise page
+
+                items, last_evaluated_key = page
+                for item in items:
+                    yield item
+
+                checkpoint['segments'][segment] = {
+                    'exclusive_start_key': cls.__serialize_key(last_evaluated_key),
+                    'completed': last_evaluated_key is None
+                }
+                if on_checkpoint:
+                    on_checkpoint(checkpoint)
+        finally:
+            stopped.set()
+            executor.shutdown(wait=True)
+
+    @classmethod
+    def __scan_segment(cls, client, table_name, scan_params, segment, checkpoint, rate_limiter, deadline, pages,
+                       stopped):
+        try:
+            exclusive_start_key = cls.__deserialize_key(checkpoint['segments'][segment]['exclusive_start_key'])
+
+            while not stopped.is_set():
+                if deadline is not None and time.time() > deadline:
+                    break
+
+                params = dict(scan_params, TableName=table_name, Segment=segment,
+                              TotalSegments=checkpoint['total_segments'])
+                if exclusive_start_key:
+                    params['ExclusiveStartKey'] = exclusive_start_key
+                if rate_limiter:
+                    params['ReturnConsumedCapacity'] = 'TOTAL'
+                    rate_limiter.acquire()
+
+                response = client.scan(**params)
+
+                if rate_limiter:
+                    rate_limiter.consume(response['ConsumedCapacity']['CapacityUnits'])
+
+                exclusive_start_key = response.get('LastEvaluatedKey')
+                cls.__put(pages, (segment, (response['Items'], exclusive_start_key)), stopped)
+
+                if exclusive_start_key is None:
+                    break
+        except Exception as e:
+            cls.__put(pages, (segment, e), stopped)
+        finally:
+            cls.__put(pages, (segment, None), stopped)
+
+    @staticmethod
+    def __serialize_key(key):
+        if key is None:
+            return None
+        serializer = TypeSerializer()
+        return {name: serializer.serialize(value) for name, value in key.items()}
+
+    @staticmethod
+    def __deserialize_key(key):
+        if key is None:
+            return None
+        deserializer = TypeDeserializer()
+        return {name: deserializer.deserialize(value) for name, value in key.items()}
+
+    @staticmethod
+    def __put(pages, page, stopped):
+        # 呼び出し元が返却を打ち切った場合にスレッドが待機し続けないよう、停止を確認しながら追加する
+        while not stopped.is_set():
+            try:
+                pages.put(page, timeout=settings.PARALLEL_SCAN_QUEUE_TIMEOUT)
+                return
+            except queue.Full:
+                pass
@@ -0,0 +1,102 @@
+import os
+
+import requests
+import settings
+from aws_requests_auth.aws_auth import AWSRequestsAuth
+from exceptions import PrivateChainApiError, SendTransactionError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class PrivateChainClient:
+    """
+    プライベートチェーンの API を呼び出すクライアント
+    署名情報と requests.Session をウォームなコンテナのメモリ上に保持し、keep-alive により TLS ハンドシェイクを呼び出しごとに行わない
+    リトライはリクエストが送信されていないことが確実な接続エラーのみを対象とする(送金が二重に行われないようにするため)
+    """
+    session = None
+    auth = None
+
+    @classmethod
+    def get_balance(cls, eth_address):
+        return cls.__post('/production/wallet/balance', {'private_eth_address': eth_address[2:]})['result']
+
+    """
+    送金のトランザクションハッシュを返却する
+    """
+    @classmethod
+    def send_tip(cls, from_user_eth_address, to_user_eth_address, tip_value):
+        result = cls.__post(
+            '/production/wallet/tip',
+            {
+                'from_user_eth_address': from_user_eth_address,
+                'to_user_eth_address': to_user_eth_address[2:],
+                'tip_value': format(tip_value, '064x')
+            }
+        )
+
+        if result.get('error'):
+            raise SendTransactionError(result.get('error'))
+
+        return result.get('result')
+
+    """
+    トランザクションのレシートを返却する。ブロックに取り込まれていない場合は None を返却する
+    """
+    @classmethod
+    def get_transaction_receipt(cls, transaction_hash):
+        return cls.__post('/production/transaction/receipt', {'transaction_hash': transaction_hash}).get('result')
+
+    """
+    新規に作成したアカウントのアドレスを返却する
+    """
+    @classmethod
+    def create_account(cls):
+        return cls.__post('/production/accounts/new')['result']
+
+    @classmethod
+    def clear(cls):
+        if cls.session is not None:
+            cls.session.close()
+        cls.session = None
+        cls.auth = None
+
+    @classmethod
+    def __post(cls, path, payload=None):
+        session = cls.__get_session()
+
+        response = session.post(
+            'https://' + os.environ['PRIVATE_CHAIN_EXECUTE_API_HOST'] + path,
+            auth=cls.auth,
+            json=payload,
+            timeout=(settings.PRIVATE_CHAIN_CONNECT_TIMEOUT, settings.PRIVATE_CHAIN_READ_TIMEOUT)
+        )
+
+        if response.status_code != 200:
+            raise PrivateChainApiError(response.text)
+
+        return response.json()
+
+    @classmethod
+    def __get_session(cls):
+        if cls.session is None:
+            cls.auth = AWSRequestsAuth(
+                aws_access_key=os.environ['PRIVATE_CHAIN_AWS_ACCESS_KEY'],
+                aws_secret_access_key=os.environ['PRIVATE_CHAIN_AWS_SECRET_ACCESS_KEY'],
+                aws_host=os.environ['PRIVATE_CHAIN_EXECUTE_API_HOST'],
+                aws_region=settings.PRIVATE_CHAIN_AWS_REGION,
+                aws_service='execute-api'
+            )
+
+            retry = Retry(
+                total=settings.PRIVATE_CHAIN_MAX_RETRY_COUNT,
+                connect=settings.PRIVATE_CHAIN_MAX_RETRY_COUNT,
+                read=0,
+                status=0,
+                backoff_factor=settings.PRIVATE_CHAIN_RETRY_BACKOFF_FACTOR
+            )
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_maxsize=settings.PRIVATE_CHAIN_POOL_MAXSIZE, max_retries=retry))
+            cls.session = session
+
+        return cls.session
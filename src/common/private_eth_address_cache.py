@@ -0,0 +1,53 @@
+import os
+import threading
+from collections import OrderedDict
+
+import settings
+
+
+class PrivateEthAddressCache:
+    """
+    user_id に紐づく private_eth_address を Cognito に問い合わせずに取得する
+    アドレスはウォレットの初期化時に put で DynamoDB に保存し、参照したものはウォームなコンテナのメモリ上に LRU で保持する
+    アドレスは一度発行されると変更されないため、キャッシュの無効化は行わない
+    DynamoDB に存在しない場合(テーブル作成前に登録されたユーザー)は None を返却するため、呼び出し元で Cognito から取得して put する
+    """
+    # user_id をキーとした LRU。末尾が最近参照したもの
+    addresses = OrderedDict()
+    lock = threading.Lock()
+
+    @classmethod
+    def get(cls, dynamodb, user_id):
+        with cls.lock:
+            if user_id in cls.addresses:
+                cls.addresses.move_to_end(user_id)
+                return cls.addresses[user_id]
+
+        table = dynamodb.Table(os.environ['USER_PRIVATE_ETH_ADDRESS_TABLE_NAME'])
+        item = table.get_item(Key={'user_id': user_id}).get('Item')
+
+        if item is None:
+            return None
+
+        cls.__set(user_id, item['private_eth_address'])
+
+        return item['private_eth_address']
+
+    @classmethod
+    def put(cls, dynamodb, user_id, private_eth_address):
+        table = dynamodb.Table(os.environ['USER_PRIVATE_ETH_ADDRESS_TABLE_NAME'])
+        table.put_item(Item={'user_id': user_id, 'private_eth_address': private_eth_address})
+        cls.__set(user_id, private_eth_address)
+
+    @classmethod
+    def clear(cls):
+        with cls.lock:
+            cls.addresses.clear()
+
+    @classmethod
+    def __set(cls, user_id, private_eth_address):
+        with cls.lock:
+            cls.addresses[user_id] = private_eth_address
+            cls.addresses.move_to_end(user_id)
+            while len(cls.addresses) > settings.PRIVATE_ETH_ADDRESS_CACHE_MAX_SIZE:
+                cls.addresses.popitem(last=False)
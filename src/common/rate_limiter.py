@@ -0,0 +1,35 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    スレッド間で共有するトークンバケット
+    DynamoDB の消費キャパシティユニットのようにリクエスト後に消費量が確定するものを扱うため、
+    acquire はトークンが負でない間は待たずに通過し、consume で実際の消費量を差し引く(一時的に負になることを許容する)
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else rate)
+        self.tokens = self.burst
+        self.updated_at = time.time()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self.__refill()
+                if self.tokens >= 0:
+                    return
+                wait_seconds = -self.tokens / self.rate
+            time.sleep(wait_seconds)
+
+    def consume(self, amount):
+        with self.lock:
+            self.__refill()
+            self.tokens -= amount
+
+    def __refill(self):
+        now = time.time()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
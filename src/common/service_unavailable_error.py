@@ -0,0 +1,13 @@
+from botocore.exceptions import ClientError
+
+
+class ServiceUnavailableError(ClientError):
+    """
+    一時的に利用できない状態(DynamoDB のサーキットブレーカーが開いている場合等)を表す
+    ClientError を捕捉して処理を継続する箇所でも AWS のエラーと同様に扱われるよう、ClientError を継承する
+    """
+    def __init__(self, message, operation_name=None):
+        super().__init__(
+            {'Error': {'Code': 'ServiceUnavailable', 'Message': message}},
+            operation_name or 'ServiceUnavailable'
+        )
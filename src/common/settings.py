@@ -55,6 +55,14 @@ parameters = {
         'type': 'string',
         'maxLength': 8388608
     },
+    'image_content_type': {
+        'type': 'string',
+        'enum': [
+            'image/gif',
+            'image/jpeg',
+            'image/png'
+        ]
+    },
     'eye_catch_url': {
         'type': 'string',
         'format': 'uri',
@@ -87,6 +95,10 @@ parameters = {
             'type': 'string',
             'minLength': 12,
             'maxLength': 12
+        },
+        'include': {
+            'type': 'string',
+            'pattern': '^(user|like_count)(,(user|like_count))?$'
         }
     },
     'page': {
@@ -128,6 +140,10 @@ parameters = {
     },
     'oauth_verifier': {
         'type': 'string'
+    },
+    'include': {
+        'type': 'string',
+        'enum': ['user']
     }
 }
 
@@ -140,12 +156,28 @@ NOTIFICATION_INDEX_DEFAULT_LIMIT = 10
 COMMENT_INDEX_DEFAULT_LIMIT = 10
 TAG_SEARCH_DEFAULT_LIMIT = 100
 
+HOME_INDEX_THREAD_COUNT = 3
+
+USER_PROFILE_ATTRIBUTES = ['user_id', 'user_display_name', 'self_introduction', 'icon_image_url']
+USER_PROFILE_CACHE_TTL = 60
+USER_PROFILE_CACHE_MAX_SIZE = 10000
+
+COMMENT_LIKE_COUNT_THREAD_COUNT = 10
+
+COMMENT_LIKED_USER_MIGRATION_MAX_SECONDS = 240
+
 article_id_length = 12
 COMMENT_ID_LENGTH = 12
+ARTICLE_ID_USER_ID_SEPARATOR = '#'
 
 html_allowed_tags = ['a', 'b', 'blockquote', 'br', 'h2', 'h3', 'i', 'p', 'u', 'img', 'hr',
                      'div', 'figure', 'figcaption']
 
+TEXT_SANITIZER_MEMO_MAX_LENGTH = 1024
+TEXT_SANITIZER_MEMO_MAX_SIZE = 1000
+ARTICLE_BODY_BLOCK_CACHE_MAX_SIZE = 10000
+ARTICLE_BODY_BLOCK_GROUP_SIZE = 8
+
 ng_user_name = [
     'about', 'account', 'activity', 'add', 'admin', 'all', 'alpha', 'analysis',
     'api', 'app', 'archive', 'article', 'asct', 'asset', 'atom', 'auth',
@@ -185,21 +217,119 @@ LIKED_RETRY_COUNT = 3
 
 ARTICLE_IMAGE_MAX_WIDTH = 3840
 ARTICLE_IMAGE_MAX_HEIGHT = 2160
+# srcset 用に生成する横幅(元画像より小さいもののみ生成する)
+ARTICLE_IMAGE_VARIANT_WIDTHS = [640, 1280, 1920]
+ARTICLE_IMAGE_VARIANT_FORMATS = ['webp']
+# 縮小・エンコードは CPU 処理のため、Lambda の vCPU 数を大きく超えないよう並列数を抑える
+ARTICLE_IMAGE_VARIANT_THREAD_COUNT = 4
 
 USER_ICON_WIDTH = 240
 USER_ICON_HEIGHT = 240
 
+# 画像形式の判定に用いる先頭バイト(マジックナンバー)
+IMAGE_FORMAT_SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif')
+]
+
+# 画像形式ごとのエンコード時のオプション
+IMAGE_ENCODE_OPTIONS = {
+    'webp': {'quality': 80}
+}
+
 S3_ARTICLES_IMAGES_PATH = 'd/api/articles_images/'
 S3_INFO_ICON_PATH = 'd/api/info_icon/'
 
+# 署名付き URL でアップロードする画像(base64 の article_image, icon_image の上限と同程度のサイズ)
+IMAGE_UPLOAD_MAX_BYTES = 6291456
+IMAGE_UPLOAD_URL_EXPIRES_IN = 300
+PROCESSED_IMAGE_KEY_SEPARATOR = '#'
+
 LIKE_NOTIFICATION_TYPE = 'like'
 COMMENT_NOTIFICATION_TYPE = 'comment'
 
+# ES のインデックスはバージョン付きの実インデックスを参照するエイリアス名で扱う(elasticsearch-setup.py 参照)
+ARTICLE_INDEX_NAME = 'articles'
+USER_INDEX_NAME = 'users'
+TAG_INDEX_NAME = 'tags'
+USER_SEARCH_NGRAM_MAX_GRAM = 3
 ARTICLE_SCORE_INDEX_NAME = 'article_scores'
 TOPIC_INDEX_HASH_KEY = 'topic'
 
+DYNAMODB_BATCH_GET_ITEM_MAX_KEYS = 100
+DYNAMODB_BATCH_GET_ITEM_MAX_RETRY_COUNT = 5
+DYNAMODB_BATCH_GET_ITEM_RETRY_BASE_SECONDS = 0.05
+
+ES_SYNC_PAGE_SIZE = 100
+ES_SYNC_BULK_CHUNK_SIZE = 500
+ES_SYNC_BULK_THREAD_COUNT = 4
+ES_SYNC_CLEAR_FLAG_THREAD_COUNT = 8
+ES_SYNC_MAX_SECONDS = 240
+
+PARALLEL_SCAN_TOTAL_SEGMENTS = 4
+PARALLEL_SCAN_MAX_WORKERS = 8
+PARALLEL_SCAN_QUEUE_SIZE = 8
+PARALLEL_SCAN_QUEUE_TIMEOUT = 0.1
+
+DYNAMODB_THROTTLING_ERROR_CODES = ['ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded']
+DYNAMODB_THROTTLING_MAX_ATTEMPTS = 5
+DYNAMODB_THROTTLING_BASE_BACKOFF_SECONDS = 0.05
+DYNAMODB_THROTTLING_MAX_BACKOFF_SECONDS = 1
+DYNAMODB_THROTTLING_MAX_RATE = 100
+DYNAMODB_THROTTLING_MIN_RATE = 1
+DYNAMODB_THROTTLING_DECREASE_FACTOR = 0.5
+DYNAMODB_THROTTLING_INCREASE_RATE = 1
+DYNAMODB_CIRCUIT_BREAKER_THRESHOLD = 3
+DYNAMODB_CIRCUIT_BREAKER_OPEN_SECONDS = 10
+
+PRIVATE_CHAIN_AWS_REGION = 'ap-northeast-1'
+PRIVATE_CHAIN_CONNECT_TIMEOUT = 3.05
+PRIVATE_CHAIN_READ_TIMEOUT = 20
+PRIVATE_CHAIN_MAX_RETRY_COUNT = 2
+PRIVATE_CHAIN_RETRY_BACKOFF_FACTOR = 0.1
+PRIVATE_CHAIN_POOL_MAXSIZE = 10
+
+WALLET_BALANCE_CACHE_TTL = 10
+WALLET_BALANCE_CACHE_REFRESHING_SECONDS = 5
+WALLET_BALANCE_CACHE_EXPIRES_SECONDS = 86400
+
+PRIVATE_ETH_ADDRESS_CACHE_MAX_SIZE = 10000
+
+VERIFIED_CONTACT_TYPES = ['email', 'phone_number']
+VERIFIED_CONTACT_SEPARATOR = '#'
+# 検証時に Cognito トリガーが呼ばれず、テーブルへの登録がバッチまで遅れる連絡先の種類
+VERIFIED_CONTACT_UNSYNCED_TYPES = ['phone_number']
+VERIFIED_CONTACT_REPAIR_LIST_USERS_RATE = 4
+VERIFIED_CONTACT_REPAIR_LIST_USERS_LIMIT = 60
+VERIFIED_CONTACT_REPAIR_MAX_SECONDS = 240
+VERIFIED_CONTACT_REPAIR_STATE_KEY = 'repair_state'
+
+TIP_SUBMISSION_BATCH_SIZE = 100
+TIP_SUBMISSION_THREAD_COUNT = 10
+TIP_SUBMISSION_CONFIRMATION_SECONDS = 20
+TIP_SUBMISSION_CONFIRMATION_INTERVAL = 2
+TIP_SUBMISSION_MAX_SECONDS = 240
+TRANSACTION_RECEIPT_STATUS_SUCCEEDED = '0x1'
+
+TIP_RECONCILIATION_BATCH_SIZE = 500
+TIP_RECONCILIATION_THREAD_COUNT = 10
+TIP_RECONCILIATION_MAX_SECONDS = 240
+TIP_RECONCILIATION_LATENCY_PERCENTILES = [50, 95, 99]
+
 TAG_DENIED_SYMBOL_PATTERN = '([!-,./:-@[-`{-~]|--| {2})'
 TAG_ALLOWED_SYMBOLS = ['-', ' ']
+TAG_COUNT_UPDATE_RETRY_COUNT = 3
+TAG_AUTOCOMPLETE_MAX_GRAM = 20
+
+TAG_DICTIONARY_MAX_SIZE = 100000
+TAG_DICTIONARY_SCAN_SIZE = 1000
+TAG_DICTIONARY_REFRESH_INTERVAL = 60
+TAG_DICTIONARY_REFRESH_MARGIN = 10
+TAG_DICTIONARY_RELOAD_INTERVAL = 3600
+TAG_DICTIONARY_MAX_STALENESS = 300
+TAG_DICTIONARY_PREFIX_LENGTH = 3
 
 TWITTER_API_REQUEST_TOKEN_URL = 'https://api.twitter.com/oauth/request_token'
 TWITTER_API_AUTHENTICATE_URL = 'https://api.twitter.com/oauth/authenticate'
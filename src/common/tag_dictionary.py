@@ -0,0 +1,175 @@
+import bisect
+import logging
+import time
+
+import settings
+from elasticsearch import helpers
+from es_util import ESUtil
+
+
+class TagDictionary:
+    """
+    ESのtagsインデックスをウォームなコンテナのメモリ上に保持し、タグの前方一致検索をESに問い合わせずに行う
+    読み込みはタグ検索でのみ行い、記事の公開等のリクエストでは全件の読み込みが発生しないようにする
+    一定間隔で更新されたタグのみを差分で読み込み、読み込みに失敗して情報が古くなった場合はESへの問い合わせにフォールバックする
+    """
+    # 小文字化したタグ名をキーとしたタグのdict
+    tags = {}
+    # 前方一致検索用にソートした小文字化したタグ名の配列
+    sorted_names = []
+    # TAG_DICTIONARY_PREFIX_LENGTH 文字以下の前方一致をキーとした、検索結果の順((-count, タグ名))にソートしたキーの配列
+    # 短い文字列ほど一致するタグが多いため、検索のたびにソートせずに済むよう読み込み時にソートしておく
+    prefixes = {}
+    loaded_at = None
+    refreshed_at = None
+    # タグ数が上限を超えていた場合に、再度件数を確認するまでESへの問い合わせを継続する時刻
+    too_large_until = None
+
+    @classmethod
+    def search_tag(cls, elasticsearch, word, limit, page):
+        if not cls.__refresh(elasticsearch):
+            return ESUtil.search_tag(elasticsearch, word, limit, page)
+
+        prefix = word.lower()
+
+        # ESのautocompleteアナライザと同様に max_gram を超える文字列には一致させない
+        if len(prefix) > settings.TAG_AUTOCOMPLETE_MAX_GRAM:
+            return []
+
+        if len(prefix) <= settings.TAG_DICTIONARY_PREFIX_LENGTH:
+            keys = cls.prefixes.get(prefix, [])[limit * (page - 1):limit * page]
+            return [cls.tags[name.lower()] for _, name in keys]
+
+        # 長い文字列は一致するタグが少ないため、一致した範囲のみソートする
+        start = bisect.bisect_left(cls.sorted_names, prefix)
+        end = bisect.bisect_right(cls.sorted_names, prefix + chr(0x10ffff))
+
+        tags = sorted(
+            [cls.tags[name] for name in cls.sorted_names[start:end]],
+            key=cls.__get_sort_key
+        )
+
+        return tags[limit * (page - 1):limit * page]
+
+    @classmethod
+    def clear(cls):
+        cls.tags = {}
+        cls.sorted_names = []
+        cls.prefixes = {}
+        cls.loaded_at = None
+        cls.refreshed_at = None
+        cls.too_large_until = None
+
+    @classmethod
+    def __refresh(cls, elasticsearch):
+        now = time.time()
+
+        # 想定以上にタグが増えていた場合は、一定時間は件数も確認せずにESへの問い合わせを継続する
+        if cls.too_large_until is not None and now < cls.too_large_until:
+            return False
+
+        try:
+            if cls.loaded_at is None or now - cls.loaded_at > settings.TAG_DICTIONARY_RELOAD_INTERVAL:
+                cls.__load_all(elasticsearch, now)
+            elif now - cls.refreshed_at > settings.TAG_DICTIONARY_REFRESH_INTERVAL:
+                cls.__load_updated(elasticsearch, now)
+        except Exception as e:
+            logging.warning(e)
+
+        return cls.refreshed_at is not None and now - cls.refreshed_at <= settings.TAG_DICTIONARY_MAX_STALENESS
+
+    @classmethod
+    def __load_all(cls, elasticsearch, now):
+        # 想定以上にタグが増えた場合はメモリに載せずにESへの問い合わせを継続する
+        if elasticsearch.count(index=settings.TAG_INDEX_NAME)['count'] > settings.TAG_DICTIONARY_MAX_SIZE:
+            cls.clear()
+            cls.too_large_until = now + settings.TAG_DICTIONARY_RELOAD_INTERVAL
+            return
+
+        tags = {}
+
+        for tag in cls.__scan(elasticsearch, {'match_all': {}}):
+            current = tags.get(tag['name'].lower())
+            if cls.__is_preferred(tag, current):
+                tags[tag['name'].lower()] = tag
+
+        prefixes = {}
+
+        for name, tag in tags.items():
+            for prefix in cls.__get_prefixes(name):
+                prefixes.setdefault(prefix, []).append(cls.__get_sort_key(tag))
+
+        for keys in prefixes.values():
+            keys.sort()
+
+        cls.tags = tags
+        cls.sorted_names = sorted(tags)
+        cls.prefixes = prefixes
+        cls.loaded_at = now
+        cls.refreshed_at = now
+        cls.too_large_until = None
+
+    @classmethod
+    def __load_updated(cls, elasticsearch, now):
+        # ESのrefresh間隔を考慮し、前回の読み込み時刻より少し前から更新されたタグを読み込む
+        since = int(cls.refreshed_at) - settings.TAG_DICTIONARY_REFRESH_MARGIN
+
+        query = {
+            'bool': {
+                'should': [
+                    {'range': {'updated_at': {'gte': since}}},
+                    {'range': {'created_at': {'gte': since}}}
+                ]
+            }
+        }
+
+        for tag in cls.__scan(elasticsearch, query):
+            cls.__put(tag)
+
+        cls.refreshed_at = now
+
+    """
+    タグを追加・更新し、前方一致ごとの配列は該当するキーのみを入れ替えてソート順を保つ
+    """
+    @classmethod
+    def __put(cls, tag):
+        name = tag['name'].lower()
+        current = cls.tags.get(name)
+
+        if not cls.__is_preferred(tag, current):
+            return
+
+        if current is None:
+            bisect.insort(cls.sorted_names, name)
+
+        for prefix in cls.__get_prefixes(name):
+            keys = cls.prefixes.setdefault(prefix, [])
+            if current is not None:
+                del keys[bisect.bisect_left(keys, cls.__get_sort_key(current))]
+            bisect.insort(keys, cls.__get_sort_key(tag))
+
+        cls.tags[name] = tag
+
+    @staticmethod
+    def __is_preferred(tag, current):
+        # 大文字小文字違いのタグが複数存在する場合はカウントの大きいものを採用する
+        return current is None or current['name'] == tag['name'] or current['count'] <= tag['count']
+
+    @staticmethod
+    def __get_prefixes(name):
+        return [name[:i] for i in range(1, min(len(name), settings.TAG_DICTIONARY_PREFIX_LENGTH) + 1)]
+
+    @staticmethod
+    def __get_sort_key(tag):
+        return -tag['count'], tag['name']
+
+    @staticmethod
+    def __scan(elasticsearch, query):
+        for item in helpers.scan(
+            elasticsearch,
+            index=settings.TAG_INDEX_NAME,
+            doc_type='tag',
+            query={'query': query},
+            size=settings.TAG_DICTIONARY_SCAN_SIZE
+        ):
+            yield item['_source']
@@ -1,69 +1,96 @@
+import os
 import re
 import time
+import uuid
 
 import settings
+from elasticsearch import helpers
 from jsonschema import ValidationError
 
 
 class TagUtil:
+    """
+    タグの増減を(タグ名, 増減数)のイベントとしてDynamoDBに記録する
+    ESへの反映は TagCountAggregation が一定間隔でまとめて行うため、記事の公開処理ではESへのリクエストは発生しない
+    """
     @classmethod
-    def create_and_count(cls, elasticsearch, before_tag_names, after_tag_names):
-        if before_tag_names is None:
-            before_tag_names = []
+    def put_count_events(cls, dynamodb, before_tag_names, after_tag_names):
+        tag_count_deltas = cls.__get_count_deltas(before_tag_names, after_tag_names)
 
-        if after_tag_names is None:
-            after_tag_names = []
+        if not tag_count_deltas:
+            return
+
+        tag_count_event_table = dynamodb.Table(os.environ['TAG_COUNT_EVENT_TABLE_NAME'])
+        created_at = int(time.time())
+
+        with tag_count_event_table.batch_writer() as batch:
+            for tag_name, num in tag_count_deltas:
+                batch.put_item(Item={
+                    'event_id': uuid.uuid4().hex,
+                    'name': tag_name,
+                    'count': num,
+                    'created_at': created_at
+                })
+
+    """
+    (タグ名, 増減数)の組を大文字小文字を区別せずにタグごとに合算し、1回の検索と1回の _bulk でESに反映する
+    ESに存在しないタグは最初に現れたタグ名で作成し、カウントは0未満にならないようにする
+    一部のタグのみ反映に失敗した場合も例外とはせず、反映に失敗したタグ名(小文字化したもの)の set を返却する
+    """
+    @classmethod
+    def update_counts(cls, elasticsearch, tag_count_deltas):
+        totals = {}
 
-        for tag_name in after_tag_names:
-            if before_tag_names is None or tag_name not in before_tag_names:
+        for tag_name, num in tag_count_deltas:
+            name, total = totals.get(tag_name.lower(), (tag_name, 0))
+            totals[tag_name.lower()] = (name, total + num)
 
-                # 大文字小文字区別せずに存在チェックを行いDB(ES)にすでに存在する値を取得する
-                tag = cls.__get_item_case_insensitive(elasticsearch, tag_name)
+        if not totals:
+            return set()
 
-                if tag:
-                    # タグが追加された場合カウントを+1する
-                    cls.update_count(elasticsearch, tag['name'], 1)
-                # タグがDB(ES)に存在しない場合は新規作成する
-                else:
-                    cls.create_tag(elasticsearch, tag_name)
+        # 大文字小文字区別せずに存在チェックを行いDB(ES)にすでに存在する値を1リクエストでまとめて取得する
+        tags = cls.__get_items_case_insensitive(elasticsearch, [name for name, _ in totals.values()])
 
-        # タグが外された場合カウントを-1する
-        for tag_name in before_tag_names:
-            if tag_name not in after_tag_names:
-                tag = cls.__get_item_case_insensitive(elasticsearch, tag_name)
-                if tag and tag['count'] > 0:
-                    cls.update_count(elasticsearch, tag['name'], -1)
+        keys = []
+        actions = []
+
+        for key, (tag_name, num) in totals.items():
+            tag = tags.get(key)
+
+            if tag:
+                if num > 0 or (num < 0 and tag['count'] > 0):
+                    keys.append(key)
+                    actions.append(cls.__get_update_count_action(tag['name'], num))
+            # タグがDB(ES)に存在しない場合は新規作成する(同時に作成された場合に備えて upsert とする)
+            elif num > 0:
+                keys.append(key)
+                actions.append(cls.__get_update_count_action(tag_name, num, upsert=cls.__get_tag_body(tag_name, num)))
+
+        # カウントの増減とタグの新規作成は _bulk でまとめて1リクエストで反映する
+        # 結果はアクションの順に返却されるため、失敗したアクションのタグを特定できる
+        results = helpers.streaming_bulk(elasticsearch, actions, raise_on_error=False, raise_on_exception=False)
+
+        return {key for key, (ok, _) in zip(keys, results) if not ok}
 
     @classmethod
     def update_count(cls, elasticsearch, tag_name, num):
         update_script = {
-            'script': {
-                'source': 'ctx._source.count += params.count',
-                'lang': 'painless',
-                'params': {
-                    'count': num
-                }
-            }
+            'script': cls.__get_update_count_script(num)
         }
 
-        elasticsearch.update(index='tags', doc_type='tag', id=tag_name, body=update_script)
+        elasticsearch.update(index=settings.TAG_INDEX_NAME, doc_type='tag', id=tag_name, body=update_script)
 
     """
-    ここで作成されたtagが検索対象になるまで(__get_item_case_insensitiveの条件として引っかかってくるまで)1sほどかかる
-    これはESのセグメントマージという仕様によるものでどうしても回避したい場合は `elasticsearch.indices.refresh(index='tags')` をcreate後に行う必要がある
+    ここで作成されたtagが検索対象になるまで(__get_items_case_insensitiveの条件として引っかかってくるまで)1sほどかかる
+    これはESのセグメントマージという仕様によるものでどうしても回避したい場合は `elasticsearch.indices.refresh(index=settings.TAG_INDEX_NAME)` をcreate後に行う必要がある
     しかし、ESのデフォルト挙動を無理やり変えることになり、返ってパフォーマンス低下が起きる可能性もあるので特に何もしていない
     """
     @classmethod
     def create_tag(cls, elasticsearch, tag_name):
-        tag = {
-            'name': tag_name,
-            'name_with_analyzer': tag_name,
-            'count': 1,
-            'created_at': int(time.time())
-        }
+        tag = cls.__get_tag_body(tag_name)
 
         elasticsearch.index(
-            index='tags',
+            index=settings.TAG_INDEX_NAME,
             doc_type='tag',
             id=tag['name'],
             body=tag
@@ -78,10 +105,12 @@ class TagUtil:
         if not tag_names:
             return tag_names
 
+        tags = cls.__get_items_case_insensitive(elasticsearch, tag_names)
+
         results = []
 
         for tag_name in tag_names:
-            tag = cls.__get_item_case_insensitive(elasticsearch, tag_name)
+            tag = tags.get(tag_name.lower())
 
             if tag:
                 results.append(tag['name'])
@@ -104,27 +133,101 @@ class TagUtil:
                 if tag[0] == symbol or tag[-1] == symbol:
                     raise ValidationError("tags don't support {str} with start and end of character".format(str=symbol))
 
+    @staticmethod
+    def __get_count_deltas(before_tag_names, after_tag_names):
+        if before_tag_names is None:
+            before_tag_names = []
+
+        if after_tag_names is None:
+            after_tag_names = []
+
+        # タグが追加された場合カウントを+1、外された場合カウントを-1する
+        return [(tag_name, 1) for tag_name in after_tag_names if tag_name not in before_tag_names] + \
+               [(tag_name, -1) for tag_name in before_tag_names if tag_name not in after_tag_names]
+
+    @classmethod
+    def __get_update_count_action(cls, tag_name, num, upsert=None):
+        action = {
+            '_op_type': 'update',
+            '_index': settings.TAG_INDEX_NAME,
+            '_type': 'tag',
+            '_id': tag_name,
+            '_retry_on_conflict': settings.TAG_COUNT_UPDATE_RETRY_COUNT,
+            'script': cls.__get_update_count_script(num)
+        }
+
+        if upsert:
+            action['upsert'] = upsert
+
+        return action
+
+    @staticmethod
+    def __get_update_count_script(num):
+        return {
+            'source': ('ctx._source.count += params.count; if (ctx._source.count < 0) { ctx._source.count = 0 } '
+                       'ctx._source.updated_at = params.updated_at'),
+            'lang': 'painless',
+            'params': {
+                'count': num,
+                'updated_at': int(time.time())
+            }
+        }
+
+    @staticmethod
+    def __get_tag_body(tag_name, count=1):
+        return {
+            'name': tag_name,
+            'name_with_analyzer': tag_name,
+            'count': count,
+            'created_at': int(time.time()),
+            'updated_at': int(time.time())
+        }
+
+    """
+    与えられた複数のタグ名を1回の検索でまとめてElasticSearchに問い合わせ(大文字小文字区別せず)
+    小文字化したタグ名をキーとしたdictを返却する。大文字小文字違いのタグが複数存在する場合はカウントの大きいものを返却する
+    """
     @classmethod
-    def __get_item_case_insensitive(cls, elasticsearch, tag_name):
+    def __get_items_case_insensitive(cls, elasticsearch, tag_names):
+        # 大文字小文字違いのタグが複数存在すると hits の件数がタグ名の数を超えて切り捨てられるため、
+        # 小文字化して索引している name で集約し、タグ名ごとにカウントの大きいもの1件を取得する
         body = {
             'query': {
                 'bool': {
-                    'must': [
-                        {'term': {'name': tag_name}}
+                    'filter': [
+                        {'terms': {'name': tag_names}}
                     ]
                 }
+            },
+            'size': 0,
+            'aggs': {
+                'names': {
+                    'terms': {
+                        'field': 'name',
+                        'size': len(tag_names)
+                    },
+                    'aggs': {
+                        'tag': {
+                            'top_hits': {
+                                'size': 1,
+                                'sort': [{'count': 'desc'}, {'created_at': 'asc'}]
+                            }
+                        }
+                    }
+                }
             }
         }
 
         res = elasticsearch.search(
-            index='tags',
+            index=settings.TAG_INDEX_NAME,
             doc_type='tag',
             body=body
         )
 
-        tags = [item['_source'] for item in res['hits']['hits']]
+        tags = {}
 
-        if not tags:
-            return None
+        for bucket in res['aggregations']['names']['buckets']:
+            tag = bucket['tag']['hits']['hits'][0]['_source']
+            tags[tag['name'].lower()] = tag
 
-        return tags[0]
+        return tags
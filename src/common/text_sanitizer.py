@@ -1,16 +1,58 @@
 import settings
 import bleach
+import hashlib
 import os
+import re
+import zlib
+from collections import OrderedDict
 from urllib.parse import urlparse
 
 
 class TextSanitizer:
-    @staticmethod
-    def sanitize_text(text):
+    """
+    bleach.clean は呼び出しごとに html5lib のパーサー・フィルターを構築するため、
+    許可するタグ・属性(ポリシー)ごとの bleach.Cleaner をモジュールの読み込み時に1度のみ生成して再利用する
+    Cleaner はスレッドセーフではないため、複数のスレッドから呼び出さないこと
+    """
+    default_cleaner = bleach.Cleaner()
+    text_cleaner = bleach.Cleaner(tags=[])
+    # 記事本文の Cleaner は属性の判定に下記の staticmethod を用いるため、クラス定義の後で生成する
+    article_body_cleaner = None
+
+    # sanitize_text の結果を入力をキーとして保持する OrderedDict(TEXT_SANITIZER_MEMO_MAX_LENGTH 以下の入力のみ)
+    sanitized_texts = OrderedDict()
+    # 記事本文のブロックのハッシュ値をキーとして sanitize 後のブロックを保持する OrderedDict
+    sanitized_article_body_blocks = OrderedDict()
+
+    # 記事本文のコメント・タグに一致する正規表現。タグの場合は (終了タグの '/', タグ名) をグループとする
+    article_body_token_pattern = re.compile(
+        r'<!--.*?(?:-->|\Z)|<[!?][^>]*>|</[^a-zA-Z>][^>]*>|<(/?)([a-zA-Z][^\s/>]*)(?:[^>"\']|"[^"]*"|\'[^\']*\')*>',
+        re.DOTALL
+    )
+    article_body_void_tags = ['br', 'hr', 'img']
+
+    @classmethod
+    def sanitize_text(cls, text):
         if text is None:
             return
 
-        return bleach.clean(text=text, tags=[])
+        if len(text) > settings.TEXT_SANITIZER_MEMO_MAX_LENGTH:
+            return cls.text_cleaner.clean(text)
+
+        sanitized_text = cls.sanitized_texts.get(text)
+        if sanitized_text is None:
+            sanitized_text = cls.text_cleaner.clean(text)
+            cls.sanitized_texts[text] = sanitized_text
+            while len(cls.sanitized_texts) > settings.TEXT_SANITIZER_MEMO_MAX_SIZE:
+                cls.sanitized_texts.popitem(last=False)
+
+        cls.sanitized_texts.move_to_end(text)
+        return sanitized_text
+
+    @classmethod
+    def clear(cls):
+        cls.sanitized_texts = OrderedDict()
+        cls.sanitized_article_body_blocks = OrderedDict()
 
     @staticmethod
     def allow_img_src(tag, name, value):
@@ -36,7 +78,7 @@ class TextSanitizer:
         if name == 'data-alis-iframely-url':
             p = urlparse(value)
             is_url = len(p.scheme) > 0 and len(p.netloc) > 0
-            is_clean = True if bleach.clean(value) == value else False
+            is_clean = True if TextSanitizer.default_cleaner.clean(value) == value else False
             return is_url and is_clean
         if name == 'contenteditable':
             if value == 'false':
@@ -60,19 +102,98 @@ class TextSanitizer:
                 return True
         return False
 
-    @staticmethod
-    def sanitize_article_body(text):
+    @classmethod
+    def sanitize_article_body(cls, text):
+        if text is None:
+            return
+
+        return cls.article_body_cleaner.clean(text)
+
+    """
+    記事本文をトップレベルの要素ごとのブロックに分割し、ブロックごとに sanitize_article_body と同じ処理を行う
+    下書きの自動保存では本文の大半が前回と同じであるため、ブロックのハッシュ値をキーとして sanitize 後のブロックを
+    ウォームなコンテナのメモリ上に保持し、変更されたブロックのみを sanitize する
+    各ブロックの sanitize 結果は閉じタグを含む完結した HTML となるため、連結した結果も sanitize 済みの HTML となる
+    """
+    @classmethod
+    def sanitize_article_body_incremental(cls, text):
         if text is None:
             return
 
-        return bleach.clean(
-            text=text,
-            tags=settings.html_allowed_tags,
-            attributes={
-                'a': ['href'],
-                'img': TextSanitizer.allow_img_src,
-                'div': TextSanitizer.allow_div_attributes,
-                'figure': TextSanitizer.allow_figure_contenteditable,
-                'figcaption': TextSanitizer.allow_figcaption_attributes
-            }
-        )
+        sanitized_blocks = []
+        for block in cls.__group_article_body_blocks(cls.split_article_body(text)):
+            block_hash = hashlib.sha256(block.encode('utf-8')).hexdigest()
+            sanitized_block = cls.sanitized_article_body_blocks.get(block_hash)
+            if sanitized_block is None:
+                sanitized_block = cls.article_body_cleaner.clean(block)
+                cls.sanitized_article_body_blocks[block_hash] = sanitized_block
+                while len(cls.sanitized_article_body_blocks) > settings.ARTICLE_BODY_BLOCK_CACHE_MAX_SIZE:
+                    cls.sanitized_article_body_blocks.popitem(last=False)
+
+            cls.sanitized_article_body_blocks.move_to_end(block_hash)
+            sanitized_blocks.append(sanitized_block)
+
+        return ''.join(sanitized_blocks)
+
+    """
+    記事本文を許可するタグのトップレベルの要素の終了位置で分割したブロックのリストを返却する
+    要素の前のテキストは要素と同じブロックに含める
+    許可しないタグを含む場合・入れ子が正しくない場合は、HTML パーサーによる補正の結果が分割により変わらないよう以降を1つのブロックとする
+    """
+    @classmethod
+    def split_article_body(cls, text):
+        blocks = []
+        start = 0
+        open_tags = []
+
+        for match in cls.article_body_token_pattern.finditer(text):
+            if match.group(2) is None:
+                continue
+
+            tag = match.group(2).lower()
+            if tag not in settings.html_allowed_tags:
+                break
+            if tag in cls.article_body_void_tags:
+                continue
+
+            if not match.group(1):
+                open_tags.append(tag)
+            elif not open_tags or open_tags.pop() != tag:
+                break
+
+            if not open_tags:
+                blocks.append(text[start:match.end()])
+                start = match.end()
+
+        if start < len(text):
+            blocks.append(text[start:])
+        return blocks
+
+    """
+    要素ごとに sanitize すると呼び出しごとのオーバーヘッドにより全体を sanitize するより遅くなるため、
+    連続する要素を平均 ARTICLE_BODY_BLOCK_GROUP_SIZE 個ずつにまとめたブロックを返却する
+    まとめる位置は要素の内容のハッシュ値のみで決めるため、要素の追加・変更により他のブロックの位置はずれない
+    """
+    @staticmethod
+    def __group_article_body_blocks(blocks):
+        group = []
+        for block in blocks:
+            group.append(block)
+            if zlib.crc32(block.encode('utf-8')) % settings.ARTICLE_BODY_BLOCK_GROUP_SIZE == 0:
+                yield ''.join(group)
+                group = []
+
+        if group:
+            yield ''.join(group)
+
+
+TextSanitizer.article_body_cleaner = bleach.Cleaner(
+    tags=settings.html_allowed_tags,
+    attributes={
+        'a': ['href'],
+        'img': TextSanitizer.allow_img_src,
+        'div': TextSanitizer.allow_div_attributes,
+        'figure': TextSanitizer.allow_figure_contenteditable,
+        'figcaption': TextSanitizer.allow_figcaption_attributes
+    }
+)
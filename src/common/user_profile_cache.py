@@ -0,0 +1,72 @@
+import os
+import time
+from collections import OrderedDict
+
+import settings
+from db_util import DBUtil
+
+
+class UserProfileCache:
+    """
+    記事一覧に埋め込むユーザーのプロフィールをウォームなコンテナのメモリ上に一定時間保持する
+    キャッシュに存在しないユーザーのみを BatchGetItem でまとめて取得する
+    """
+    # user_id をキーとした (プロフィール, 取得日時) の OrderedDict。存在しないユーザーはプロフィールを None として保持する
+    profiles = OrderedDict()
+
+    """
+    与えられた user_id のプロフィールを user_id をキーとした dict で返却する
+    存在しないユーザーは含まれない
+    """
+    @classmethod
+    def get_profiles(cls, dynamodb, user_ids):
+        now = time.time()
+        result = {}
+        missing_user_ids = []
+
+        for user_id in set(user_ids):
+            cached = cls.profiles.get(user_id)
+            if cached is not None and now - cached[1] <= settings.USER_PROFILE_CACHE_TTL:
+                cls.profiles.move_to_end(user_id)
+                if cached[0] is not None:
+                    result[user_id] = cached[0]
+            else:
+                missing_user_ids.append(user_id)
+
+        if missing_user_ids:
+            users = DBUtil.batch_get_items(
+                dynamodb,
+                os.environ['USERS_TABLE_NAME'],
+                [{'user_id': user_id} for user_id in missing_user_ids],
+                projection_expression=', '.join(settings.USER_PROFILE_ATTRIBUTES)
+            )
+            fetched = {user['user_id']: user for user in users}
+
+            for user_id in missing_user_ids:
+                cls.__put(user_id, fetched.get(user_id), now)
+                if user_id in fetched:
+                    result[user_id] = fetched[user_id]
+
+        return result
+
+    """
+    記事ごとにユーザー情報を取得しなくて済むよう、articles の各記事に著者のプロフィールを user として埋め込む
+    存在しないユーザーの記事には None を設定する
+    """
+    @classmethod
+    def embed_profiles(cls, dynamodb, articles):
+        profiles = cls.get_profiles(dynamodb, [article['user_id'] for article in articles if article.get('user_id')])
+        for article in articles:
+            article['user'] = profiles.get(article.get('user_id'))
+
+    @classmethod
+    def clear(cls):
+        cls.profiles = OrderedDict()
+
+    @classmethod
+    def __put(cls, user_id, profile, now):
+        cls.profiles[user_id] = (profile, now)
+        cls.profiles.move_to_end(user_id)
+
+        while len(cls.profiles) > settings.USER_PROFILE_CACHE_MAX_SIZE:
+            cls.profiles.popitem(last=False)
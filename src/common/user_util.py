@@ -1,13 +1,12 @@
 import re
 import os
 import json
-import requests
 import settings
 import logging
 import string
 import secrets
-from exceptions import PrivateChainApiError
-from aws_requests_auth.aws_auth import AWSRequestsAuth
+from private_chain_client import PrivateChainClient
+from private_eth_address_cache import PrivateEthAddressCache
 from botocore.exceptions import ClientError
 from record_not_found_error import RecordNotFoundError
 from not_verified_user_error import NotVerifiedUserError
@@ -204,9 +203,9 @@ class UserUtil:
             raise e
 
     @staticmethod
-    def wallet_initialization(cognito, user_pool_id, user_id):
+    def wallet_initialization(cognito, user_pool_id, user_id, dynamodb):
         try:
-            address = UserUtil.__create_new_account_on_private_chain()
+            address = PrivateChainClient.create_account()
             cognito.admin_update_user_attributes(
                 UserPoolId=user_pool_id,
                 Username=user_id,
@@ -217,26 +216,10 @@ class UserUtil:
                     },
                 ]
             )
+            PrivateEthAddressCache.put(dynamodb, user_id, address)
         except ClientError as e:
             raise e
 
-    @staticmethod
-    def __create_new_account_on_private_chain():
-        auth = AWSRequestsAuth(
-            aws_access_key=os.environ['PRIVATE_CHAIN_AWS_ACCESS_KEY'],
-            aws_secret_access_key=os.environ['PRIVATE_CHAIN_AWS_SECRET_ACCESS_KEY'],
-            aws_host=os.environ['PRIVATE_CHAIN_EXECUTE_API_HOST'],
-            aws_region='ap-northeast-1',
-            aws_service='execute-api'
-        )
-        response = requests.post(
-            'https://' + os.environ['PRIVATE_CHAIN_EXECUTE_API_HOST'] + '/production/accounts/new',
-            auth=auth
-        )
-        if response.status_code is not 200:
-            raise PrivateChainApiError(response.text)
-        return json.loads(response.text)['result']
-
     @staticmethod
     def generate_password():
         seeds = string.ascii_letters + string.digits
@@ -0,0 +1,139 @@
+import os
+import time
+
+import settings
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+
+class VerifiedContactUtil:
+    """
+    検証済みのメールアドレス・電話番号(連絡先)と user_id の対応を DynamoDB に保持し、Cognito の list_users を用いずに重複を確認する
+    連絡先は Cognito トリガー(PostConfirmation, PreAuthentication, CustomMessage)でユーザーの属性から sync する
+    トリガーを経由しない検証(電話番号の検証等)との差分は VerifiedContactRepair バッチで Cognito の全ユーザーから修復する
+    バッチで修復されるまでの間に重複して検証されないよう、電話番号はテーブルに存在しない場合に常に Cognito でも確認する
+    バッチの進捗(list_users の PaginationToken 等)は同じテーブルの VERIFIED_CONTACT_REPAIR_STATE_KEY の項目に保持する
+    """
+    # バッチで全ユーザーの突き合わせが一度完了するまでは、テーブルに存在しない連絡先を Cognito に問い合わせる
+    backfilled = False
+
+    @staticmethod
+    def get_contact(contact_type, value):
+        # メールアドレスは大文字小文字を区別せずに重複を確認する
+        if contact_type == 'email':
+            value = value.lower()
+        return contact_type + settings.VERIFIED_CONTACT_SEPARATOR + value
+
+    """
+    連絡先を検証済みのユーザーの user_id を返却する。存在しない場合は None を返却する
+    """
+    @classmethod
+    def get_user_id(cls, dynamodb, contact_type, value):
+        table = dynamodb.Table(os.environ['VERIFIED_CONTACT_TABLE_NAME'])
+        item = table.get_item(Key={'contact': cls.get_contact(contact_type, value)}).get('Item')
+
+        return item['user_id'] if item is not None else None
+
+    """
+    連絡先を検証済みのユーザーの user_id を返却する。存在しない場合は None を返却する
+    テーブルに存在しない連絡先は、バッチによる全ユーザーの突き合わせが完了していない間と、
+    トリガーを経由せずに検証される連絡先(VERIFIED_CONTACT_UNSYNCED_TYPES)の場合に Cognito の list_users で確認する
+    Cognito で検証済みのユーザーが見つかった場合は、以降の確認でテーブルを参照できるよう登録する
+    """
+    @classmethod
+    def find_verified_user_id(cls, dynamodb, cognito, user_pool_id, contact_type, value):
+        user_id = cls.get_user_id(dynamodb, contact_type, value)
+        if user_id is not None:
+            return user_id
+
+        if contact_type not in settings.VERIFIED_CONTACT_UNSYNCED_TYPES and cls.is_backfilled(dynamodb):
+            return None
+
+        response = cognito.list_users(
+            UserPoolId=user_pool_id,
+            Filter='%s = "%s"' % (contact_type, value)
+        )
+        for user in response['Users']:
+            for attribute in user['Attributes']:
+                if attribute['Name'] == contact_type + '_verified' and attribute['Value'] == 'true':
+                    cls.__put_if_not_exists(dynamodb, cls.get_contact(contact_type, value), user['Username'])
+                    return user['Username']
+
+        return None
+
+    """
+    バッチによる全ユーザーの突き合わせが一度でも完了しているかを返却する
+    完了した後に未完了に戻ることはないため、完了している場合のみコンテナ内に保持する
+    """
+    @classmethod
+    def is_backfilled(cls, dynamodb):
+        if not cls.backfilled:
+            cls.backfilled = 'completed_at' in cls.get_repair_state(dynamodb)
+
+        return cls.backfilled
+
+    @staticmethod
+    def get_repair_state(dynamodb):
+        table = dynamodb.Table(os.environ['VERIFIED_CONTACT_TABLE_NAME'])
+        item = table.get_item(Key={'contact': settings.VERIFIED_CONTACT_REPAIR_STATE_KEY}).get('Item')
+
+        return item if item is not None else {}
+
+    @classmethod
+    def clear(cls):
+        cls.backfilled = False
+
+    """
+    Cognito のユーザー属性(属性名をキーとした dict)から検証済みの連絡先を返却する
+    """
+    @classmethod
+    def get_verified_contacts(cls, user_attributes):
+        contacts = set()
+        for contact_type in settings.VERIFIED_CONTACT_TYPES:
+            if user_attributes.get(contact_type) and user_attributes.get(contact_type + '_verified') == 'true':
+                contacts.add(cls.get_contact(contact_type, user_attributes[contact_type]))
+
+        return contacts
+
+    """
+    ユーザーの現在の属性に合わせて連絡先を登録・削除する
+    synced_at はバッチが突き合わせ中に登録された連絡先を削除しないために用いる
+    """
+    @classmethod
+    def sync(cls, dynamodb, user_id, user_attributes):
+        table = dynamodb.Table(os.environ['VERIFIED_CONTACT_TABLE_NAME'])
+        current_contacts = {
+            item['contact'] for item in table.query(
+                IndexName='user_id-index',
+                KeyConditionExpression=Key('user_id').eq(user_id)
+            )['Items']
+        }
+        verified_contacts = cls.get_verified_contacts(user_attributes)
+
+        for contact in verified_contacts - current_contacts:
+            table.put_item(Item={'contact': contact, 'user_id': user_id, 'synced_at': int(time.time())})
+
+        for contact in current_contacts - verified_contacts:
+            try:
+                table.delete_item(
+                    Key={'contact': contact},
+                    ConditionExpression='user_id = :user_id',
+                    ExpressionAttributeValues={':user_id': user_id}
+                )
+            except ClientError as e:
+                # 他のユーザーが検証済みとした連絡先は削除しない
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise e
+
+    @staticmethod
+    def __put_if_not_exists(dynamodb, contact, user_id):
+        table = dynamodb.Table(os.environ['VERIFIED_CONTACT_TABLE_NAME'])
+        try:
+            table.put_item(
+                Item={'contact': contact, 'user_id': user_id, 'synced_at': int(time.time())},
+                ConditionExpression='attribute_not_exists(contact)'
+            )
+        except ClientError as e:
+            # 並行して登録された連絡先は上書きしない
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise e
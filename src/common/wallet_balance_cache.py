@@ -0,0 +1,146 @@
+import logging
+import os
+import time
+
+import settings
+from botocore.exceptions import ClientError
+from private_chain_client import PrivateChainClient
+
+
+class WalletBalanceCache:
+    """
+    プライベートチェーンから取得した残高を eth_address をキーとして DynamoDB に一定時間保持する
+    トークンの送受信時は invalidate で invalidated_at を更新し、次回の参照時にチェーンから再取得させる
+    残高をチェーンから再取得している間に同じアドレスの参照があった場合は、古い残高を pending として返却する
+    キューモードの投げ銭は送信されるまで残高に反映されないため、送信前の投げ銭の合計を reserved として保持する
+    """
+
+    """
+    (残高, pending) を返却する
+    """
+    @classmethod
+    def get_balance(cls, dynamodb, eth_address):
+        table = dynamodb.Table(os.environ['WALLET_BALANCE_CACHE_TABLE_NAME'])
+        now = int(time.time() * 1000)
+
+        cache = table.get_item(Key={'eth_address': eth_address}, ConsistentRead=True).get('Item')
+
+        if cache and 'balance' in cache:
+            if cls.__is_fresh(cache, now):
+                return cache['balance'], False
+            # 他のリクエストが再取得中の場合はチェーンに問い合わせない
+            if not cls.__acquire_refreshing(table, eth_address, now):
+                return cache['balance'], True
+
+        balance = PrivateChainClient.get_balance(eth_address)
+        cls.__put(table, eth_address, balance, now)
+
+        return balance, False
+
+    """
+    送受信の記録後に呼び出すベストエフォートの処理とし、失敗した場合はログを出力して例外を送出しない
+    無効にできなかった残高も WALLET_BALANCE_CACHE_TTL の経過後にチェーンから再取得される
+    """
+    @staticmethod
+    def invalidate(dynamodb, eth_addresses):
+        table = dynamodb.Table(os.environ['WALLET_BALANCE_CACHE_TABLE_NAME'])
+        now = int(time.time() * 1000)
+
+        for eth_address in set(eth_addresses):
+            try:
+                table.update_item(
+                    Key={'eth_address': eth_address},
+                    UpdateExpression='set invalidated_at = :now, expires_at = :expires_at',
+                    ExpressionAttributeValues={
+                        ':now': now,
+                        ':expires_at': now // 1000 + settings.WALLET_BALANCE_CACHE_EXPIRES_SECONDS
+                    }
+                )
+            except ClientError as e:
+                logging.warning('failed to invalidate wallet balance cache %s: %s', eth_address, e)
+
+    """
+    残高から reserved を差し引いた額の範囲で value を予約し、予約できた場合は True を返却する
+    残高が不足する場合は False を返却する
+    """
+    @classmethod
+    def reserve(cls, dynamodb, eth_address, value):
+        table = dynamodb.Table(os.environ['WALLET_BALANCE_CACHE_TABLE_NAME'])
+        balance = int(cls.get_balance(dynamodb, eth_address)[0], 16)
+        if value > balance:
+            return False
+
+        try:
+            table.update_item(
+                Key={'eth_address': eth_address},
+                UpdateExpression='add reserved :value',
+                ConditionExpression='attribute_not_exists(reserved) or reserved <= :max_reserved',
+                ExpressionAttributeValues={
+                    ':value': value,
+                    ':max_reserved': balance - value
+                }
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise e
+
+        return True
+
+    """
+    予約した value を解放する。投げ銭の送信が確定または失敗した後に呼び出す
+    """
+    @staticmethod
+    def release(dynamodb, eth_address, value):
+        table = dynamodb.Table(os.environ['WALLET_BALANCE_CACHE_TABLE_NAME'])
+        table.update_item(
+            Key={'eth_address': eth_address},
+            UpdateExpression='add reserved :value',
+            ExpressionAttributeValues={':value': -value}
+        )
+
+    @staticmethod
+    def __is_fresh(cache, now):
+        if cache.get('invalidated_at') is not None and cache['invalidated_at'] >= cache['cached_at']:
+            return False
+
+        return now - cache['cached_at'] <= settings.WALLET_BALANCE_CACHE_TTL * 1000
+
+    @staticmethod
+    def __acquire_refreshing(table, eth_address, now):
+        try:
+            table.update_item(
+                Key={'eth_address': eth_address},
+                UpdateExpression='set refreshing_until = :refreshing_until',
+                ConditionExpression='attribute_not_exists(refreshing_until) or refreshing_until < :now',
+                ExpressionAttributeValues={
+                    ':refreshing_until': now + settings.WALLET_BALANCE_CACHE_REFRESHING_SECONDS * 1000,
+                    ':now': now
+                }
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise e
+
+        return True
+
+    @staticmethod
+    def __put(table, eth_address, balance, now):
+        # 取得を開始した時刻を cached_at とするため、取得中に送受信された場合は次回の参照時に再取得される
+        try:
+            table.update_item(
+                Key={'eth_address': eth_address},
+                UpdateExpression='set balance = :balance, cached_at = :cached_at, expires_at = :expires_at '
+                                 'remove refreshing_until',
+                ConditionExpression='attribute_not_exists(cached_at) or cached_at < :cached_at',
+                ExpressionAttributeValues={
+                    ':balance': balance,
+                    ':cached_at': now,
+                    ':expires_at': now // 1000 + settings.WALLET_BALANCE_CACHE_EXPIRES_SECONDS
+                }
+            )
+        except ClientError as e:
+            # より新しい残高が保存済みの場合は上書きしない
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise e
@@ -2,12 +2,14 @@
 import os
 import json
 import settings
+from concurrent.futures import ThreadPoolExecutor
 from db_util import DBUtil
 from lambda_base import LambdaBase
 from boto3.dynamodb.conditions import Key
 from jsonschema import validate
 from decimal_encoder import DecimalEncoder
 from parameter_util import ParameterUtil
+from user_profile_cache import UserProfileCache
 
 
 class ArticlesCommentsIndex(LambdaBase):
@@ -18,7 +20,8 @@ class ArticlesCommentsIndex(LambdaBase):
                 'limit': settings.parameters['limit'],
                 'article_id': settings.parameters['article_id'],
                 'comment_id': settings.parameters['comment']['comment_id'],
-                'sort_key': settings.parameters['sort_key']
+                'sort_key': settings.parameters['sort_key'],
+                'include': settings.parameters['comment']['include']
             },
             'required': ['article_id']
         }
@@ -54,7 +57,56 @@ class ArticlesCommentsIndex(LambdaBase):
 
         response = comment_table.query(**query_params)
 
+        # include が指定された場合はコメントごとに取得しなくて済むよう、いいね数と投稿者のプロフィールをまとめて付与する
+        includes = self.params['include'].split(',') if self.params.get('include') else []
+
+        if 'like_count' in includes:
+            self.__set_like_counts(response['Items'])
+
+        if 'user' in includes:
+            profiles = UserProfileCache.get_profiles(self.dynamodb, [comment['user_id'] for comment in response['Items']])
+            for comment in response['Items']:
+                comment['user'] = profiles.get(comment['user_id'])
+
         return {
             'statusCode': 200,
             'body': json.dumps(response, cls=DecimalEncoder)
         }
+
+    """
+    いいね数はコメントに集計された like_count を利用し、集計値を持たない既存のコメントのみ並列に数える
+    """
+    def __set_like_counts(self, comments):
+        uncounted_comments = [comment for comment in comments if 'like_count' not in comment]
+        if not uncounted_comments:
+            return
+
+        # boto3 の resource はスレッドセーフではないため、スレッド間では client を共有する
+        client = self.dynamodb.meta.client
+
+        with ThreadPoolExecutor(max_workers=settings.COMMENT_LIKE_COUNT_THREAD_COUNT) as executor:
+            like_counts = list(executor.map(
+                lambda comment: self.__count_likes(client, comment['comment_id']),
+                uncounted_comments
+            ))
+
+        for comment, like_count in zip(uncounted_comments, like_counts):
+            comment['like_count'] = like_count
+
+    @staticmethod
+    def __count_likes(client, comment_id):
+        query_params = {
+            'TableName': os.environ['COMMENT_LIKED_USER_TABLE_NAME'],
+            'KeyConditionExpression': Key('comment_id').eq(comment_id),
+            'Select': 'COUNT'
+        }
+
+        response = client.query(**query_params)
+        count = response['Count']
+
+        while 'LastEvaluatedKey' in response:
+            query_params.update({'ExclusiveStartKey': response['LastEvaluatedKey']})
+            response = client.query(**query_params)
+            count += response['Count']
+
+        return count
@@ -7,6 +7,7 @@ from lambda_base import LambdaBase
 from jsonschema import validate
 from decimal_encoder import DecimalEncoder
 from parameter_util import ParameterUtil
+from user_profile_cache import UserProfileCache
 
 
 class ArticlesPopular(LambdaBase):
@@ -16,7 +17,8 @@ class ArticlesPopular(LambdaBase):
             'properties': {
                 'limit': settings.parameters['limit'],
                 'page': settings.parameters['page'],
-                'topic': settings.parameters['topic']
+                'topic': settings.parameters['topic'],
+                'include': settings.parameters['include']
             }
         }
 
@@ -34,6 +36,9 @@ class ArticlesPopular(LambdaBase):
 
         articles = ESUtil.search_popular_articles(self.elasticsearch, self.params, limit, page)
 
+        if self.params.get('include') == 'user':
+            UserProfileCache.embed_profiles(self.dynamodb, articles)
+
         response = {
             'Items': articles
         }
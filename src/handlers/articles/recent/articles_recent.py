@@ -7,6 +7,7 @@ from jsonschema import validate
 from decimal_encoder import DecimalEncoder
 from parameter_util import ParameterUtil
 from es_util import ESUtil
+from user_profile_cache import UserProfileCache
 
 
 class ArticlesRecent(LambdaBase):
@@ -16,7 +17,8 @@ class ArticlesRecent(LambdaBase):
             'properties': {
                 'limit': settings.parameters['limit'],
                 'page': settings.parameters['page'],
-                'topic': settings.parameters['topic']
+                'topic': settings.parameters['topic'],
+                'include': settings.parameters['include']
             }
         }
 
@@ -35,6 +37,9 @@ class ArticlesRecent(LambdaBase):
 
         articles = ESUtil.search_recent_articles(self.elasticsearch, self.params, limit, page)
 
+        if self.params.get('include') == 'user':
+            UserProfileCache.embed_profiles(self.dynamodb, articles)
+
         response = {
             'Items': articles
         }
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+import settings
+from boto3.dynamodb.conditions import Attr
+from db_util import DBUtil
+from lambda_base import LambdaBase
+
+
+class CommentLikedUserMigration(LambdaBase):
+    """
+    既存の CommentLikedUser に article_id_user_id-index 用の article_id_user_id を付与する
+    処理しきれなかった場合は返却した last_evaluated_key を exclusive_start_key に指定して再実行する
+    """
+    def get_schema(self):
+        pass
+
+    def validate_params(self):
+        pass
+
+    def exec_main_proc(self):
+        started_at = time.time()
+        comment_liked_user_table = self.dynamodb.Table(os.environ['COMMENT_LIKED_USER_TABLE_NAME'])
+
+        scan_params = {
+            'FilterExpression': Attr('article_id_user_id').not_exists()
+        }
+        if self.event.get('exclusive_start_key'):
+            scan_params.update({'ExclusiveStartKey': self.event['exclusive_start_key']})
+
+        migrated_count = 0
+
+        while True:
+            response = comment_liked_user_table.scan(**scan_params)
+
+            # いいねは作成後に更新されないため、取得した項目に属性を付与してそのまま書き戻す
+            with comment_liked_user_table.batch_writer() as batch:
+                for comment_liked_user in response['Items']:
+                    comment_liked_user['article_id_user_id'] = DBUtil.get_article_id_user_id(
+                        comment_liked_user['article_id'],
+                        comment_liked_user['user_id']
+                    )
+                    batch.put_item(Item=comment_liked_user)
+
+            migrated_count += len(response['Items'])
+
+            if 'LastEvaluatedKey' not in response:
+                return {'migrated_count': migrated_count, 'last_evaluated_key': None}
+
+            scan_params.update({'ExclusiveStartKey': response['LastEvaluatedKey']})
+
+            if time.time() - started_at > settings.COMMENT_LIKED_USER_MIGRATION_MAX_SECONDS:
+                return {'migrated_count': migrated_count, 'last_evaluated_key': response['LastEvaluatedKey']}
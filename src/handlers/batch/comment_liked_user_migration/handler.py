@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+import boto3
+
+from comment_liked_user_migration import CommentLikedUserMigration
+
+dynamodb = boto3.resource('dynamodb')
+
+
+def lambda_handler(event, context):
+    comment_liked_user_migration = CommentLikedUserMigration(event, context, dynamodb=dynamodb)
+    return comment_liked_user_migration.main()
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import settings
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from db_util import DBUtil
+from elasticsearch import helpers
+from lambda_base import LambdaBase
+
+
+class ElasticsearchSync(LambdaBase):
+    def get_schema(self):
+        pass
+
+    def validate_params(self):
+        pass
+
+    def exec_main_proc(self):
+        started_at = time.time()
+
+        metrics = {
+            'articles': self.__sync(
+                os.environ['ARTICLE_INFO_TABLE_NAME'], 'article_id', settings.ARTICLE_INDEX_NAME, 'article',
+                self.__get_article_actions, started_at
+            ),
+            'users': self.__sync(
+                os.environ['USERS_TABLE_NAME'], 'user_id', settings.USER_INDEX_NAME, 'user',
+                self.__get_user_actions, started_at
+            )
+        }
+
+        elapsed = time.time() - started_at
+        synced_count = metrics['articles']['synced'] + metrics['users']['synced']
+        metrics['elapsed_seconds'] = round(elapsed, 3)
+        metrics['docs_per_second'] = round(synced_count / elapsed, 1) if elapsed > 0 else 0.0
+        logging.info('elasticsearch sync metrics: %s', metrics)
+
+        return metrics
+
+    """
+    sync_elasticsearch フラグが付与された項目を GSI からページ単位で取得し、_bulk API で ES に反映する。
+    parallel_bulk の全スレッドにチャンクが行き渡るよう、thread_count * chunk_size 件に達するまでページを読み進めてから反映する。
+    ES への反映に成功した項目のみフラグを削除し、失敗した項目は次回の同期対象として残す。
+    """
+    def __sync(self, table_name, key_name, index, doc_type, get_actions, started_at):
+        table = self.dynamodb.Table(table_name)
+        metrics = {'fetched': 0, 'synced': 0, 'failed': 0, 'conflicted': 0, 'pages': 0}
+        bulk_size = settings.ES_SYNC_BULK_THREAD_COUNT * settings.ES_SYNC_BULK_CHUNK_SIZE
+
+        query_params = {
+            'IndexName': 'sync_elasticsearch-index',
+            'KeyConditionExpression': Key('sync_elasticsearch').eq(1),
+            'Limit': settings.ES_SYNC_PAGE_SIZE
+        }
+
+        while True:
+            items = []
+            while True:
+                response = table.query(**query_params)
+                items += response['Items']
+                metrics['pages'] += 1
+                if 'LastEvaluatedKey' not in response:
+                    break
+                query_params.update({'ExclusiveStartKey': response['LastEvaluatedKey']})
+                if len(items) >= bulk_size or time.time() - started_at > settings.ES_SYNC_MAX_SECONDS:
+                    break
+
+            metrics['fetched'] += len(items)
+
+            if items:
+                failed_ids = self.__bulk(get_actions(items, index, doc_type))
+                synced_items = [item for item in items if item[key_name] not in failed_ids]
+                conflicted_count = self.__clear_sync_flags(table_name, key_name, synced_items)
+
+                metrics['failed'] += len(items) - len(synced_items)
+                metrics['conflicted'] += conflicted_count
+                metrics['synced'] += len(synced_items) - conflicted_count
+
+            if 'LastEvaluatedKey' not in response:
+                break
+            # 残りは次回の実行で同期する
+            if time.time() - started_at > settings.ES_SYNC_MAX_SECONDS:
+                break
+
+        return metrics
+
+    def __get_article_actions(self, article_info_list, index, doc_type):
+        public_article_ids = [
+            article_info['article_id'] for article_info in article_info_list if article_info['status'] == 'public'
+        ]
+        article_contents = DBUtil.batch_get_items(
+            self.dynamodb,
+            os.environ['ARTICLE_CONTENT_TABLE_NAME'],
+            [{'article_id': article_id} for article_id in public_article_ids],
+            projection_expression='article_id, body'
+        )
+        bodies = {article_content['article_id']: article_content.get('body') for article_content in article_contents}
+
+        actions = []
+        for article_info in article_info_list:
+            # 公開中でない記事は検索対象外とするため ES から削除する
+            if article_info['article_id'] not in bodies:
+                actions.append(self.__get_delete_action(index, doc_type, article_info['article_id']))
+                continue
+
+            source = self.__get_source(article_info)
+            source['body'] = bodies[article_info['article_id']]
+            actions.append(self.__get_index_action(index, doc_type, article_info['article_id'], source))
+
+        return actions
+
+    def __get_user_actions(self, users, index, doc_type):
+        return [self.__get_index_action(index, doc_type, user['user_id'], self.__get_source(user)) for user in users]
+
+    @staticmethod
+    def __get_source(item):
+        return {key: value for key, value in item.items() if key != 'sync_elasticsearch'}
+
+    @staticmethod
+    def __get_index_action(index, doc_type, doc_id, source):
+        return {
+            '_op_type': 'index',
+            '_index': index,
+            '_type': doc_type,
+            '_id': doc_id,
+            '_source': source
+        }
+
+    @staticmethod
+    def __get_delete_action(index, doc_type, doc_id):
+        return {
+            '_op_type': 'delete',
+            '_index': index,
+            '_type': doc_type,
+            '_id': doc_id
+        }
+
+    def __bulk(self, actions):
+        failed_ids = set()
+
+        # 件数が少ない場合もスレッド数分のチャンクに分けて並列に反映する
+        chunk_size = min(
+            settings.ES_SYNC_BULK_CHUNK_SIZE,
+            max(1, math.ceil(len(actions) / settings.ES_SYNC_BULK_THREAD_COUNT))
+        )
+
+        results = helpers.parallel_bulk(
+            self.elasticsearch,
+            actions,
+            thread_count=settings.ES_SYNC_BULK_THREAD_COUNT,
+            chunk_size=chunk_size,
+            raise_on_error=False
+        )
+
+        for ok, result in results:
+            op_type, detail = result.popitem()
+            # 未登録ドキュメントの削除は同期済みとして扱う
+            if ok or (op_type == 'delete' and detail.get('status') == 404):
+                continue
+            logging.error('elasticsearch sync failed: %s', detail)
+            failed_ids.add(detail['_id'])
+
+        return failed_ids
+
+    """
+    フラグ削除は項目ごとに並列で実行する。
+    取得後に項目が更新されていた場合は再度同期が必要なため、条件付き更新でフラグを残す。
+    """
+    def __clear_sync_flags(self, table_name, key_name, items):
+        # boto3 の resource はスレッドセーフではないため、スレッド間では client を共有する
+        client = self.dynamodb.meta.client
+
+        with ThreadPoolExecutor(max_workers=settings.ES_SYNC_CLEAR_FLAG_THREAD_COUNT) as executor:
+            results = list(executor.map(
+                lambda item: self.__clear_sync_flag(client, table_name, key_name, item),
+                items
+            ))
+
+        return results.count(False)
+
+    @staticmethod
+    def __clear_sync_flag(client, table_name, key_name, item):
+        expression_attribute_names = {'#sync_elasticsearch': 'sync_elasticsearch'}
+        expression_attribute_values = {':one': 1}
+        conditions = ['#sync_elasticsearch = :one']
+
+        for i, (name, value) in enumerate(sorted(item.items())):
+            if name in [key_name, 'sync_elasticsearch']:
+                continue
+            expression_attribute_names['#attr{0}'.format(i)] = name
+            expression_attribute_values[':value{0}'.format(i)] = value
+            conditions.append('#attr{0} = :value{0}'.format(i))
+
+        try:
+            client.update_item(
+                TableName=table_name,
+                Key={key_name: item[key_name]},
+                UpdateExpression='remove #sync_elasticsearch',
+                ConditionExpression=' and '.join(conditions),
+                ExpressionAttributeNames=expression_attribute_names,
+                ExpressionAttributeValues=expression_attribute_values
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise e
+
+        return True
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+
+from lambda_base import LambdaBase
+from tag_util import TagUtil
+
+
+class TagCountAggregation(LambdaBase):
+    def get_schema(self):
+        pass
+
+    def validate_params(self):
+        pass
+
+    def exec_main_proc(self):
+        tag_count_event_table = self.dynamodb.Table(os.environ['TAG_COUNT_EVENT_TABLE_NAME'])
+        tag_count_events = self.__scan_all_events(tag_count_event_table)
+
+        if not tag_count_events:
+            return True
+
+        # 新規タグは最初に記録されたタグ名で作成されるよう、記録順に集計する
+        tag_count_events.sort(key=lambda event: (event['created_at'], event['event_id']))
+
+        failed_tag_keys = TagUtil.update_counts(
+            self.elasticsearch,
+            [(event['name'], int(event['count'])) for event in tag_count_events]
+        )
+
+        if failed_tag_keys:
+            logging.error('failed to update tag counts: %s', sorted(failed_tag_keys))
+
+        # ESに反映したイベントのみ削除する(反映に失敗したタグと集計中に記録されたイベントは次回の集計対象とする)
+        # 反映に失敗したタグのイベントを削除しないことで、次回の集計で同じイベントが二重に加算されることはない
+        with tag_count_event_table.batch_writer() as batch:
+            for event in tag_count_events:
+                if event['name'].lower() not in failed_tag_keys:
+                    batch.delete_item(Key={'event_id': event['event_id']})
+
+        return True
+
+    @staticmethod
+    def __scan_all_events(tag_count_event_table):
+        scan_params = {
+            'ConsistentRead': True
+        }
+
+        response = tag_count_event_table.scan(**scan_params)
+        items = response['Items']
+
+        while 'LastEvaluatedKey' in response:
+            scan_params.update({'ExclusiveStartKey': response['LastEvaluatedKey']})
+            response = tag_count_event_table.scan(**scan_params)
+            items.extend(response['Items'])
+
+        return items
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+import boto3
+
+from tip_reconciliation import TipReconciliation
+
+dynamodb = boto3.resource('dynamodb')
+
+
+def lambda_handler(event, context):
+    tip_reconciliation = TipReconciliation(event, context, dynamodb=dynamodb)
+    return tip_reconciliation.main()
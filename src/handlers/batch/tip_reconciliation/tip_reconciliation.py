@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import settings
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+from db_util import DBUtil
+from lambda_base import LambdaBase
+from private_chain_client import PrivateChainClient
+from wallet_balance_cache import WalletBalanceCache
+
+
+class TipReconciliation(LambdaBase):
+    """
+    uncompleted が設定された投げ銭を疎なインデックス(uncompleted-index)から取得し、トランザクションのレシートを並列に確認する
+    ブロックに取り込まれた投げ銭は、uncompleted のままであることを条件に確認結果の属性のみを更新する
+    インデックスから取得した項目は射影されたスナップショットのため、項目全体の書き込みは行わない
+    レシートが確認できない投げ銭はそのまま残し、次回の実行で再度確認する
+    旧実装でトランザクションハッシュが "null" と記録された投げ銭は確認できないため、一度だけ失敗として記録しインデックスから除く
+    TipSubmission で送信されたか判断できなかった投げ銭(submission_unknown)はトランザクションハッシュが不明なため、
+    エラーとしてログに出力して残す。チェーン上で確認したトランザクションハッシュを transaction に設定すると次回の実行で確認される
+    送信が確定または失敗した投げ銭は、API で予約した残高を解放する
+    """
+    def get_schema(self):
+        pass
+
+    def validate_params(self):
+        pass
+
+    def exec_main_proc(self):
+        started_at = time.time()
+        tip_table = self.dynamodb.Table(os.environ['TIP_TABLE_NAME'])
+        metrics = {
+            'checked': 0, 'confirmed': 0, 'failed': 0, 'pending': 0, 'unknown': 0, 'invalid': 0, 'skipped': 0, 'errors': 0
+        }
+        latencies = []
+
+        # キューに積まれたまま送信されていない投げ銭はトランザクションが存在しないため対象外とする
+        tips = DBUtil.query_items(
+            tip_table,
+            {
+                'IndexName': 'uncompleted-index',
+                'KeyConditionExpression': Key('uncompleted').eq(1),
+                'FilterExpression': Attr('transaction').exists() | Attr('submission_unknown').exists()
+            },
+            prefetch=True
+        )
+
+        with ThreadPoolExecutor(max_workers=settings.TIP_RECONCILIATION_THREAD_COUNT) as executor:
+            try:
+                self.__reconcile(tip_table, tips, executor, started_at, metrics, latencies)
+            finally:
+                # 実行時間の上限で打ち切った場合も先読みのスレッドを終了させる
+                tips.close()
+
+        metrics['confirmation_latency'] = self.__summarize_latencies(latencies)
+        logging.info('tip reconciliation metrics: %s', metrics)
+
+        return metrics
+
+    def __reconcile(self, tip_table, tips, executor, started_at, metrics, latencies):
+        while time.time() - started_at < settings.TIP_RECONCILIATION_MAX_SECONDS:
+            batch = list(islice(tips, settings.TIP_RECONCILIATION_BATCH_SIZE))
+            if not batch:
+                break
+
+            for tip in [tip for tip in batch if 'transaction' not in tip]:
+                logging.error('tip submission result is unknown: %s %s', tip['user_id'], tip['sort_key'])
+                metrics['unknown'] += 1
+
+            for tip in [tip for tip in batch if tip.get('transaction') == 'null']:
+                logging.error('tip transaction is null: %s %s', tip['user_id'], tip['sort_key'])
+                if self.__complete(tip_table, tip, {'failed': 1, 'error_message': 'transaction is null'}):
+                    metrics['invalid'] += 1
+                else:
+                    metrics['skipped'] += 1
+
+            batch = [tip for tip in batch if tip.get('transaction') not in [None, 'null']]
+
+            receipts = list(executor.map(self.__get_transaction_receipt, batch))
+            completed_at = int(time.time())
+
+            for tip, (receipt, error) in zip(batch, receipts):
+                metrics['checked'] += 1
+                if error:
+                    metrics['errors'] += 1
+                    continue
+                if receipt is None:
+                    metrics['pending'] += 1
+                    continue
+
+                attributes = {'completed_at': completed_at}
+                succeeded = receipt.get('status') == settings.TRANSACTION_RECEIPT_STATUS_SUCCEEDED
+                if not succeeded:
+                    attributes.update({'failed': 1, 'error_message': 'transaction reverted'})
+
+                # 他の処理で既に完了している場合は更新せず、残高の解放も行わない
+                if not self.__complete(tip_table, tip, attributes):
+                    metrics['skipped'] += 1
+                    continue
+
+                if succeeded:
+                    metrics['confirmed'] += 1
+                    latencies.append(completed_at - int(tip.get('submitted_at', tip['created_at'])))
+                else:
+                    metrics['failed'] += 1
+
+    """
+    uncompleted かつトランザクションハッシュが取得時から変わっていない場合のみ、指定した属性を設定して uncompleted を削除する
+    更新した場合は予約した残高を解放し True を返却する
+    """
+    def __complete(self, tip_table, tip, attributes):
+        try:
+            tip_table.update_item(
+                Key={'user_id': tip['user_id'], 'sort_key': tip['sort_key']},
+                UpdateExpression='set {0} remove uncompleted, submission_unknown'.format(
+                    ', '.join(['{0} = :{0}'.format(key) for key in attributes])
+                ),
+                ConditionExpression='attribute_exists(uncompleted) and #transaction = :transaction',
+                ExpressionAttributeNames={'#transaction': 'transaction'},
+                ExpressionAttributeValues=dict(
+                    {':' + key: value for key, value in attributes.items()}, **{':transaction': tip['transaction']}
+                )
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise e
+
+        if tip.get('reserved'):
+            WalletBalanceCache.release(self.dynamodb, tip['from_user_eth_address'], int(tip['tip_value']))
+
+        return True
+
+    @staticmethod
+    def __get_transaction_receipt(tip):
+        try:
+            return PrivateChainClient.get_transaction_receipt(tip['transaction']), None
+        except Exception as e:
+            # 一時的なエラーの場合は次回の実行で再度確認する
+            logging.error('failed to get transaction receipt: %s', e)
+            return None, str(e)
+
+    """
+    送信(キューモード以外は投げ銭の記録)からブロックへの取り込みが確認されるまでの秒数を集計する
+    """
+    @staticmethod
+    def __summarize_latencies(latencies):
+        if not latencies:
+            return None
+
+        latencies = sorted(latencies)
+        summary = {
+            'count': len(latencies),
+            'average': sum(latencies) / len(latencies),
+            'max': latencies[-1]
+        }
+        for percentile in settings.TIP_RECONCILIATION_LATENCY_PERCENTILES:
+            index = max(math.ceil(len(latencies) * percentile / 100) - 1, 0)
+            summary['p' + str(percentile)] = latencies[index]
+
+        return summary
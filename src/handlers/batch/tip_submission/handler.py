@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+import boto3
+
+from tip_submission import TipSubmission
+
+dynamodb = boto3.resource('dynamodb')
+
+
+def lambda_handler(event, context):
+    tip_submission = TipSubmission(event, context, dynamodb=dynamodb)
+    return tip_submission.main()
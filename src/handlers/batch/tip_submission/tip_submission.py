@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import settings
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from exceptions import SendTransactionError
+from lambda_base import LambdaBase
+from private_chain_client import PrivateChainClient
+from wallet_balance_cache import WalletBalanceCache
+
+
+class TipSubmission(LambdaBase):
+    """
+    キューモードで記録された投げ銭を queued-sort_key-index から古い順に取得し、プライベートチェーンに並列に送信する
+    送信前に queued を条件付きで削除して取得済みとすることで、同じ投げ銭を二重に送信しない
+    送信したトランザクションは一定時間レシートを確認し、確定したものは uncompleted を削除する
+    送信の失敗が確実な場合(SendTransactionError)のみ失敗とし、タイムアウト等で送信されたか判断できない場合は
+    submission_unknown を設定して uncompleted のまま残し、TipReconciliation で確認する
+    送信が確定または失敗した投げ銭は、API で予約した残高を解放する
+    """
+    def get_schema(self):
+        pass
+
+    def validate_params(self):
+        pass
+
+    def exec_main_proc(self):
+        started_at = time.time()
+        tip_table = self.dynamodb.Table(os.environ['TIP_TABLE_NAME'])
+        metrics = {'submitted': 0, 'failed': 0, 'unknown': 0, 'confirmed': 0, 'unconfirmed': 0}
+        submitted_tips = []
+
+        with ThreadPoolExecutor(max_workers=settings.TIP_SUBMISSION_THREAD_COUNT) as executor:
+            while time.time() - started_at < settings.TIP_SUBMISSION_MAX_SECONDS:
+                tips = tip_table.query(
+                    IndexName='queued-sort_key-index',
+                    KeyConditionExpression=Key('queued').eq(1),
+                    Limit=settings.TIP_SUBMISSION_BATCH_SIZE
+                )['Items']
+                if not tips:
+                    break
+
+                claimed_tips = [tip for tip in tips if self.__claim(tip_table, tip)]
+
+                for tip, (transaction_hash, error, unknown) in zip(
+                        claimed_tips, executor.map(self.__send_tip, claimed_tips)
+                ):
+                    if unknown:
+                        self.__mark_unknown(tip_table, tip, error)
+                        metrics['unknown'] += 1
+                        continue
+                    if error:
+                        self.__fail(tip_table, tip, error)
+                        metrics['failed'] += 1
+                        continue
+
+                    tip_table.update_item(
+                        Key={'user_id': tip['user_id'], 'sort_key': tip['sort_key']},
+                        UpdateExpression='set #transaction = :transaction',
+                        ExpressionAttributeNames={'#transaction': 'transaction'},
+                        ExpressionAttributeValues={':transaction': transaction_hash}
+                    )
+                    tip['transaction'] = transaction_hash
+                    submitted_tips.append(tip)
+                    metrics['submitted'] += 1
+
+                WalletBalanceCache.invalidate(
+                    self.dynamodb,
+                    [tip['from_user_eth_address'] for tip in claimed_tips] +
+                    [tip['to_user_eth_address'] for tip in claimed_tips]
+                )
+
+            self.__confirm(tip_table, executor, submitted_tips, started_at, metrics)
+
+        logging.info('tip submission metrics: %s', metrics)
+
+        return metrics
+
+    @staticmethod
+    def __claim(tip_table, tip):
+        try:
+            tip_table.update_item(
+                Key={'user_id': tip['user_id'], 'sort_key': tip['sort_key']},
+                UpdateExpression='remove queued set submitted_at = :submitted_at',
+                ConditionExpression='queued = :one',
+                ExpressionAttributeValues={':one': 1, ':submitted_at': int(time.time())}
+            )
+        except ClientError as e:
+            # 他の実行で取得済みの場合は送信しない
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise e
+
+        return True
+
+    """
+    (トランザクションハッシュ, エラー, 送信されたか判断できないか) を返却する
+    """
+    @staticmethod
+    def __send_tip(tip):
+        try:
+            transaction_hash = PrivateChainClient.send_tip(
+                tip['from_user_eth_address'], tip['to_user_eth_address'], int(tip['tip_value'])
+            )
+            return transaction_hash, None, False
+        except SendTransactionError as e:
+            return None, str(e), False
+        except Exception as e:
+            # 送信されたか判断できないため、再送はせずに TipReconciliation での確認の対象とする
+            logging.error('tip submission failed: %s', e)
+            return None, str(e), True
+
+    @staticmethod
+    def __mark_unknown(tip_table, tip, error):
+        tip_table.update_item(
+            Key={'user_id': tip['user_id'], 'sort_key': tip['sort_key']},
+            UpdateExpression='set submission_unknown = :one, error_message = :error_message',
+            ExpressionAttributeValues={':one': 1, ':error_message': error}
+        )
+
+    def __fail(self, tip_table, tip, error):
+        tip_table.update_item(
+            Key={'user_id': tip['user_id'], 'sort_key': tip['sort_key']},
+            UpdateExpression='set failed = :one, error_message = :error_message remove uncompleted',
+            ExpressionAttributeValues={':one': 1, ':error_message': error}
+        )
+        self.__release(tip)
+
+    def __release(self, tip):
+        if tip.get('reserved'):
+            WalletBalanceCache.release(self.dynamodb, tip['from_user_eth_address'], int(tip['tip_value']))
+
+    def __confirm(self, tip_table, executor, tips, started_at, metrics):
+        deadline = min(
+            time.time() + settings.TIP_SUBMISSION_CONFIRMATION_SECONDS,
+            started_at + settings.TIP_SUBMISSION_MAX_SECONDS
+        )
+
+        while tips:
+            time.sleep(settings.TIP_SUBMISSION_CONFIRMATION_INTERVAL)
+
+            receipts = list(executor.map(
+                lambda tip: PrivateChainClient.get_transaction_receipt(tip['transaction']), tips
+            ))
+
+            for tip, receipt in zip(tips, receipts):
+                if receipt is None:
+                    continue
+
+                if receipt.get('status') == settings.TRANSACTION_RECEIPT_STATUS_SUCCEEDED:
+                    tip_table.update_item(
+                        Key={'user_id': tip['user_id'], 'sort_key': tip['sort_key']},
+                        UpdateExpression='set completed_at = :completed_at remove uncompleted',
+                        ExpressionAttributeValues={':completed_at': int(time.time())}
+                    )
+                    self.__release(tip)
+                    metrics['confirmed'] += 1
+                else:
+                    self.__fail(tip_table, tip, 'transaction reverted')
+                    metrics['failed'] += 1
+
+            tips = [tip for tip, receipt in zip(tips, receipts) if receipt is None]
+
+            if time.time() >= deadline:
+                break
+
+        # レシートが確認できなかった投げ銭は uncompleted のまま残す
+        metrics['unconfirmed'] = len(tips)
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+import boto3
+
+from verified_contact_repair import VerifiedContactRepair
+
+cognito = boto3.client('cognito-idp')
+dynamodb = boto3.resource('dynamodb')
+
+
+def lambda_handler(event, context):
+    verified_contact_repair = VerifiedContactRepair(event, context, dynamodb=dynamodb, cognito=cognito)
+    return verified_contact_repair.main()
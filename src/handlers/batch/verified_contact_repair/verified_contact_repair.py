@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import time
+
+import settings
+from botocore.exceptions import ClientError
+from lambda_base import LambdaBase
+from parallel_scan_util import ParallelScanUtil
+from rate_limiter import RateLimiter
+from verified_contact_util import VerifiedContactUtil
+
+
+class VerifiedContactRepair(LambdaBase):
+    """
+    Cognito の全ユーザーの検証済みの連絡先と VERIFIED_CONTACT_TABLE を突き合わせ、差分を修復する
+    list_users はレート制限が低いため、RateLimiter で呼び出し間隔を制御する
+    実行時間の上限までに全ユーザーを取得できなかった場合は PaginationToken を状態の項目に保存し、次回の実行で続きから取得する
+    取得した連絡先には突き合わせの開始時刻(repaired_at)を記録し、全ユーザーを取得し終えた時点で
+    開始時刻以降に確認・登録されていない連絡先を削除する
+    """
+    def get_schema(self):
+        pass
+
+    def validate_params(self):
+        pass
+
+    def exec_main_proc(self):
+        started_at = time.time()
+        state = VerifiedContactUtil.get_repair_state(self.dynamodb)
+        verified_contacts, users_count, completed, pagination_token, repair_started_at = \
+            self.__list_verified_contacts(started_at, state)
+
+        table = self.dynamodb.Table(os.environ['VERIFIED_CONTACT_TABLE_NAME'])
+        metrics = {'users': users_count, 'completed': completed, 'put': 0, 'deleted': 0}
+
+        with table.batch_writer() as batch_writer:
+            for contact, user_id in verified_contacts.items():
+                batch_writer.put_item(Item={'contact': contact, 'user_id': user_id, 'repaired_at': repair_started_at})
+                metrics['put'] += 1
+
+        # 突き合わせの進捗を保存する(completed_at は一度でも全ユーザーの突き合わせが完了した時刻)
+        state_item = {'contact': settings.VERIFIED_CONTACT_REPAIR_STATE_KEY}
+        if completed:
+            metrics['deleted'] = self.__delete_unverified_contacts(table, repair_started_at)
+            state_item['completed_at'] = int(started_at)
+        else:
+            if 'completed_at' in state:
+                state_item['completed_at'] = state['completed_at']
+            if pagination_token is not None:
+                state_item.update({'pagination_token': pagination_token, 'repair_started_at': repair_started_at})
+        table.put_item(Item=state_item)
+
+        logging.info('verified contact repair metrics: %s', metrics)
+
+        return metrics
+
+    """
+    (連絡先をキーとした user_id の dict, 取得したユーザー数, 全ユーザーを取得し終えたか, 次回の PaginationToken, 突き合わせの開始時刻)
+    を返却する
+    """
+    def __list_verified_contacts(self, started_at, state):
+        rate_limiter = RateLimiter(settings.VERIFIED_CONTACT_REPAIR_LIST_USERS_RATE)
+        params = {
+            'UserPoolId': os.environ['COGNITO_USER_POOL_ID'],
+            'Limit': settings.VERIFIED_CONTACT_REPAIR_LIST_USERS_LIMIT
+        }
+        repair_started_at = int(started_at)
+        if 'pagination_token' in state:
+            params['PaginationToken'] = state['pagination_token']
+            repair_started_at = int(state['repair_started_at'])
+
+        verified_contacts = {}
+        users_count = 0
+
+        while time.time() - started_at < settings.VERIFIED_CONTACT_REPAIR_MAX_SECONDS:
+            rate_limiter.acquire()
+            rate_limiter.consume(1)
+            try:
+                response = self.cognito.list_users(**params)
+            except ClientError as e:
+                # 保存した PaginationToken が無効な場合は最初から突き合わせ直す
+                if users_count == 0 and 'PaginationToken' in params and \
+                   e.response['Error']['Code'] == 'InvalidParameterException':
+                    logging.warning('restart verified contact repair: %s', e)
+                    del params['PaginationToken']
+                    repair_started_at = int(started_at)
+                    continue
+                raise e
+
+            for user in response['Users']:
+                user_attributes = {attribute['Name']: attribute['Value'] for attribute in user.get('Attributes', [])}
+                for contact in VerifiedContactUtil.get_verified_contacts(user_attributes):
+                    verified_contacts[contact] = user['Username']
+            users_count += len(response['Users'])
+
+            if 'PaginationToken' not in response:
+                return verified_contacts, users_count, True, None, repair_started_at
+            params['PaginationToken'] = response['PaginationToken']
+
+        return verified_contacts, users_count, False, params.get('PaginationToken'), repair_started_at
+
+    """
+    突き合わせの開始時刻以降にバッチで確認されておらず、トリガーでも登録されていない連絡先を削除する
+    Scan 後に登録された連絡先を削除しないよう、条件付きで削除する
+    """
+    def __delete_unverified_contacts(self, table, repair_started_at):
+        deleted_count = 0
+
+        for item in ParallelScanUtil.scan_items(self.dynamodb, os.environ['VERIFIED_CONTACT_TABLE_NAME']):
+            if item['contact'] == settings.VERIFIED_CONTACT_REPAIR_STATE_KEY or \
+               item.get('repaired_at') == repair_started_at or item.get('synced_at', 0) >= repair_started_at:
+                continue
+
+            try:
+                table.delete_item(
+                    Key={'contact': item['contact']},
+                    ConditionExpression='(attribute_not_exists(repaired_at) or repaired_at <> :repaired_at) and '
+                                        '(attribute_not_exists(synced_at) or synced_at < :repaired_at)',
+                    ExpressionAttributeValues={':repaired_at': repair_started_at}
+                )
+                deleted_count += 1
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise e
+
+        return deleted_count
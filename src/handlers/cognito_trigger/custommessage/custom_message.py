@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
 import os
-import boto3
 import settings
 from jsonschema import validate, ValidationError
 from lambda_base import LambdaBase
 from user_util import UserUtil
+from verified_contact_util import VerifiedContactUtil
 
 
 class CustomMessage(LambdaBase):
@@ -23,17 +23,20 @@ class CustomMessage(LambdaBase):
             raise ValidationError("external provider's user can not execute")
         if params.get('phone_number', '') != '' and params.get('phone_number_verified', '') != 'true':
             validate(params, self.get_schema())
-            client = boto3.client('cognito-idp')
-            response = client.list_users(
-                    UserPoolId=self.event['userPoolId'],
-                    Filter='phone_number = "%s"' % params['phone_number'],
-                )
-            for user in response['Users']:
-                for attribute in user['Attributes']:
-                    if attribute['Name'] == 'phone_number_verified' and attribute['Value'] == 'true':
-                        raise ValidationError('This phone_number is already exists')
+            verified_user_id = VerifiedContactUtil.find_verified_user_id(
+                self.dynamodb,
+                self.cognito,
+                self.event['userPoolId'],
+                'phone_number',
+                params['phone_number']
+            )
+            if verified_user_id is not None and verified_user_id != self.event['userName']:
+                raise ValidationError('This phone_number is already exists')
 
     def exec_main_proc(self):
+        # 電話番号の変更等により検証済みでなくなった連絡先を削除する
+        VerifiedContactUtil.sync(self.dynamodb, self.event['userName'], self.event['request']['userAttributes'])
+
         if self.event['triggerSource'] == 'CustomMessage_ForgotPassword':
             self.event['response']['smsMessage'] = '{user}さんのパスワード再設定コードは {code} です。'.format(
                 user=self.event['userName'], code=self.event['request']['codeParameter'])
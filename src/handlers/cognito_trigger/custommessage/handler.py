@@ -2,9 +2,10 @@
 import boto3
 from custom_message import CustomMessage
 
+cognito = boto3.client('cognito-idp')
 dynamodb = boto3.resource('dynamodb')
 
 
 def lambda_handler(event, context):
-    custommessage = CustomMessage(event=event, context=context, dynamodb=dynamodb)
+    custommessage = CustomMessage(event=event, context=context, dynamodb=dynamodb, cognito=cognito)
     return custommessage.main()
@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
 import os
-import json
-import requests
-from aws_requests_auth.aws_auth import AWSRequestsAuth
 from lambda_base import LambdaBase
+from private_chain_client import PrivateChainClient
+from private_eth_address_cache import PrivateEthAddressCache
+from verified_contact_util import VerifiedContactUtil
 
 
 class PostConfirmation(LambdaBase):
@@ -15,6 +15,7 @@ class PostConfirmation(LambdaBase):
 
     def exec_main_proc(self):
         self.__wallet_initialization()
+        VerifiedContactUtil.sync(self.dynamodb, self.event['userName'], self.event['request']['userAttributes'])
 
         users = self.dynamodb.Table(os.environ['USERS_TABLE_NAME'])
         user = {
@@ -34,27 +35,23 @@ class PostConfirmation(LambdaBase):
 
     def __wallet_initialization(self):
         if 'custom:private_eth_address' in self.event['request']['userAttributes']:
-            return True
-
-        address = self.__create_new_account()
-        self.cognito.admin_update_user_attributes(
-            UserPoolId=self.event['userPoolId'],
-            Username=self.event['userName'],
-            UserAttributes=[
-                {
-                    'Name': 'custom:private_eth_address',
-                    'Value': address
-                },
-            ]
-        )
+            address = self.event['request']['userAttributes']['custom:private_eth_address']
+        else:
+            address = self.__create_new_account()
+            self.cognito.admin_update_user_attributes(
+                UserPoolId=self.event['userPoolId'],
+                Username=self.event['userName'],
+                UserAttributes=[
+                    {
+                        'Name': 'custom:private_eth_address',
+                        'Value': address
+                    },
+                ]
+            )
+
+        # 投げ銭時に Cognito へ問い合わせずにアドレスを取得できるよう保存する
+        PrivateEthAddressCache.put(self.dynamodb, self.event['userName'], address)
 
     @staticmethod
     def __create_new_account():
-        auth = AWSRequestsAuth(aws_access_key=os.environ['PRIVATE_CHAIN_AWS_ACCESS_KEY'],
-                               aws_secret_access_key=os.environ['PRIVATE_CHAIN_AWS_SECRET_ACCESS_KEY'],
-                               aws_host=os.environ['PRIVATE_CHAIN_EXECUTE_API_HOST'],
-                               aws_region='ap-northeast-1',
-                               aws_service='execute-api')
-        response = requests.post('https://' + os.environ['PRIVATE_CHAIN_EXECUTE_API_HOST'] +
-                                 '/production/accounts/new', auth=auth)
-        return json.loads(response.text)['result']
+        return PrivateChainClient.create_account()
@@ -6,6 +6,7 @@ from lambda_base import LambdaBase
 from jsonschema import ValidationError
 from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
+from verified_contact_util import VerifiedContactUtil
 
 
 class PreAuthentication(LambdaBase):
@@ -37,13 +38,22 @@ class PreAuthentication(LambdaBase):
                 }
         # 通常SignInのケース
         if external_provider_user is None:
+            self.__sync_verified_contacts(params)
             return self.event
         # ExternalProviderLoginのケース
         elif self.__is_external_provider_login_validation_data(params):
+            self.__sync_verified_contacts(params)
             return self.event
         else:
             raise ValidationError('Please login with registered external provider')
 
+    def __sync_verified_contacts(self, params):
+        # 検証済みの連絡先はバッチでも修復されるため、失敗した場合もログインは継続させる
+        try:
+            VerifiedContactUtil.sync(self.dynamodb, params['userName'], params['request'].get('userAttributes', {}))
+        except ClientError as e:
+            logging.error(e)
+
     @staticmethod
     def __is_external_provider_login_validation_data(params):
         if (('EXTERNAL_PROVIDER_LOGIN_MARK' in params['request']['validationData']) and
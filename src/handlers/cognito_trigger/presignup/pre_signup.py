@@ -5,6 +5,7 @@ from jsonschema import validate, ValidationError
 from lambda_base import LambdaBase
 from not_authorized_error import NotAuthorizedError
 from user_util import UserUtil
+from verified_contact_util import VerifiedContactUtil
 
 
 class PreSignUp(LambdaBase):
@@ -43,14 +44,14 @@ class PreSignUp(LambdaBase):
                 if UserUtil.check_try_to_register_as_line_user(params['userName']):
                     raise ValidationError('This username is not allowed')
 
-            response = self.__filter_users(self.cognito, params)
-            self.__email_exist_check(response)
+            verified_user_id = self.__filter_users(self.dynamodb, self.cognito, params)
+            self.__email_exist_check(verified_user_id)
         elif params['triggerSource'] == 'PreSignUp_AdminCreateUser':
             if (params['request'].get('validationData') is not None) and \
                    params['request']['validationData'].get('EXTERNAL_PROVIDER_LOGIN_MARK') == \
                    os.environ['EXTERNAL_PROVIDER_LOGIN_MARK']:
-                response = self.__filter_users(self.cognito, params)
-                self.__email_exist_check(response)
+                verified_user_id = self.__filter_users(self.dynamodb, self.cognito, params)
+                self.__email_exist_check(verified_user_id)
             else:
                 raise NotAuthorizedError('Forbidden')
         # 現状CognitoTriggerは'PreSignUp_SignUp','PreSignUp_AdminCreateUser'の２種類のみなので異なるTriggerがリクエストされた場合は例外にする
@@ -73,15 +74,17 @@ class PreSignUp(LambdaBase):
             return self.event
 
     @staticmethod
-    def __email_exist_check(response):
-        for user in response['Users']:
-            for attribute in user['Attributes']:
-                if attribute['Name'] == 'email_verified' and attribute['Value'] == 'true':
-                    raise ValidationError('This email is already exists')
+    def __email_exist_check(verified_user_id):
+        if verified_user_id is not None:
+            raise ValidationError('This email is already exists')
 
     @staticmethod
-    def __filter_users(cognito, params):
-        return cognito.list_users(
-            UserPoolId=params['userPoolId'],
-            Filter='email = "%s"' % params['request']['userAttributes']['email'],
+    def __filter_users(dynamodb, cognito, params):
+        # 同じメールアドレスを検証済みのユーザーを取得する
+        return VerifiedContactUtil.find_verified_user_id(
+            dynamodb,
+            cognito,
+            params['userPoolId'],
+            'email',
+            params['request']['userAttributes']['email']
         )
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import settings
+from boto3.dynamodb.conditions import Key
+from db_util import DBUtil
+from decimal_encoder import DecimalEncoder
+from es_util import ESUtil
+from jsonschema import validate
+from lambda_base import LambdaBase
+from parameter_util import ParameterUtil
+
+
+class HomeIndex(LambdaBase):
+    def get_schema(self):
+        return {
+            'type': 'object',
+            'properties': {
+                'limit': settings.parameters['limit'],
+                'topic': settings.parameters['topic']
+            }
+        }
+
+    def validate_params(self):
+        ParameterUtil.cast_parameter_to_int(self.params, self.get_schema())
+
+        validate(self.params, self.get_schema())
+
+        if self.params.get('topic'):
+            DBUtil.validate_topic(self.dynamodb, self.params['topic'])
+
+    """
+    トップページで利用する最新記事、人気記事、トピック一覧、通知の未読情報を並列に取得してまとめて返却する。
+    topic を指定した場合は最新記事、人気記事をそのトピックの記事に絞り込む。
+    通知の未読情報は認証済み(/me/home)の場合のみ返却する。
+    """
+    def exec_main_proc(self):
+        recent_limit = int(self.params['limit']) if self.params.get('limit') else settings.article_recent_default_limit
+        popular_limit = int(self.params['limit']) if self.params.get('limit') else settings.articles_popular_default_limit
+        user_id = self.__get_user_id()
+
+        # boto3 の resource はスレッドセーフではないため、スレッド間では client を共有する
+        client = self.dynamodb.meta.client
+
+        with ThreadPoolExecutor(max_workers=settings.HOME_INDEX_THREAD_COUNT) as executor:
+            articles_future = executor.submit(
+                ESUtil.search_recent_and_popular_articles, self.elasticsearch, self.params, recent_limit, popular_limit
+            )
+            topics_future = executor.submit(self.__get_topics, client)
+            unread_future = executor.submit(self.__get_unread, client, user_id) if user_id else None
+
+            recent_articles, popular_articles = articles_future.result()
+            response = {
+                'articles': {
+                    'recent': {'Items': recent_articles},
+                    'popular': {'Items': popular_articles}
+                },
+                'topics': topics_future.result()
+            }
+
+            if unread_future:
+                response['unread_notification_manager'] = {'unread': unread_future.result()}
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps(response, cls=DecimalEncoder)
+        }
+
+    def __get_user_id(self):
+        claims = self.event.get('requestContext', {}).get('authorizer', {}).get('claims', {})
+        return claims.get('cognito:username')
+
+    @staticmethod
+    def __get_topics(client):
+        query_params = {
+            'TableName': os.environ['TOPIC_TABLE_NAME'],
+            'IndexName': 'index_hash_key-order-index',
+            'KeyConditionExpression': Key('index_hash_key').eq(settings.TOPIC_INDEX_HASH_KEY)
+        }
+
+        return client.query(**query_params)['Items']
+
+    @staticmethod
+    def __get_unread(client, user_id):
+        manager = client.get_item(
+            TableName=os.environ['UNREAD_NOTIFICATION_MANAGER_TABLE_NAME'],
+            Key={'user_id': user_id}
+        ).get('Item')
+
+        return True if manager and manager['unread'] else False
@@ -49,6 +49,7 @@ class MeArticlesCommentsCreate(LambdaBase):
             'text': TextSanitizer.sanitize_text(self.params['text']),
             'user_id': user_id,
             'sort_key': sort_key,
+            'like_count': 0,
             'created_at': int(time.time())
         }
 
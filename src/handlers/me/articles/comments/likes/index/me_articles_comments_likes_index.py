@@ -28,14 +28,18 @@ class MeArticlesCommentsLikesIndex(LambdaBase):
 
         comment_liked_user_table = self.dynamodb.Table(os.environ['COMMENT_LIKED_USER_TABLE_NAME'])
 
+        # 記事と利用者の組でいいねを引けるインデックスを利用し、利用者自身のいいねのみを取得する
         query_params = {
-            'IndexName': 'article_id-index',
-            'KeyConditionExpression': Key('article_id').eq(self.params['article_id']),
+            'IndexName': 'article_id_user_id-index',
+            'KeyConditionExpression': Key('article_id_user_id').eq(
+                DBUtil.get_article_id_user_id(self.params['article_id'], user_id)
+            )
         }
 
-        result = DBUtil.query_all_items(comment_liked_user_table, query_params)
-
-        comment_ids = [liked_user['comment_id'] for liked_user in result if liked_user['user_id'] == user_id]
+        comment_ids = [
+            liked_user['comment_id']
+            for liked_user in DBUtil.query_items(comment_liked_user_table, query_params, projection_expression='comment_id')
+        ]
 
         return {
             'statusCode': 200,
@@ -67,7 +67,7 @@ class MeArticlesDraftsPublish(LambdaBase):
         )
 
         try:
-            TagUtil.create_and_count(self.elasticsearch, article_info_before.get('tags'), self.params.get('tags'))
+            TagUtil.put_count_events(self.dynamodb, article_info_before.get('tags'), self.params.get('tags'))
         except Exception as e:
             logging.fatal(e)
             traceback.print_exc()
@@ -70,7 +70,7 @@ class MeArticlesDraftsUpdate(LambdaBase):
 
         expression_attribute_values = {
             ':title': TextSanitizer.sanitize_text(self.params.get('title')),
-            ':body': TextSanitizer.sanitize_article_body(self.params.get('body'))
+            ':body': TextSanitizer.sanitize_article_body_incremental(self.params.get('body'))
         }
         DBUtil.items_values_empty_to_none(expression_attribute_values)
 
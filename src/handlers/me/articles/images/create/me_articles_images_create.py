@@ -1,14 +1,11 @@
 # -*- coding: utf-8 -*-
-import os
 import settings
-import uuid
-import base64
 import json
 from db_util import DBUtil
+from image_upload_util import ImageUploadUtil
+from image_util import ImageUtil
 from lambda_base import LambdaBase
-from jsonschema import validate, ValidationError
-from PIL import Image
-from io import BytesIO
+from jsonschema import validate
 from user_util import UserUtil
 
 
@@ -53,18 +50,13 @@ class MeArticlesImagesCreate(LambdaBase):
             }]
         }
 
-    def validate_image_data(self, image_data):
-        try:
-            Image.open(BytesIO(base64.b64decode(image_data)))
-        except Exception:
-            raise ValidationError('Bad Request: No supported image format')
-
     def validate_params(self):
         UserUtil.verified_phone_and_email(self.event)
         # single
         # params
         validate(self.params, self.get_schema())
-        self.validate_image_data(self.params['article_image'])
+        # デコードした画像は exec_main_proc でも用いる
+        self.image_data, self.image = ImageUtil.open(self.params['article_image'])
         # headers
         validate(self.event.get('headers'), self.get_headers_schema())
 
@@ -80,28 +72,11 @@ class MeArticlesImagesCreate(LambdaBase):
             if self.headers.get('content-type') is not None else self.headers.get('Content-Type')
         ext = content_type.split('/')[1]
         user_id = self.event['requestContext']['authorizer']['claims']['cognito:username']
-        key = settings.S3_ARTICLES_IMAGES_PATH + \
-            user_id + '/' + self.params['article_id'] + '/' + str(uuid.uuid4()) + '.' + ext
-        image_data = self.__get_save_image_data(base64.b64decode(self.params['article_image']), ext)
-
-        self.s3.Bucket(os.environ['DIST_S3_BUCKET_NAME']).put_object(
-            Body=image_data,
-            Key=key,
-            ContentType=content_type
+        image = ImageUploadUtil.upload_article_image(
+            self.s3, self.dynamodb, user_id, self.params['article_id'], ext, self.image_data, self.image
         )
 
         return {
             'statusCode': 200,
-            'body': json.dumps({'image_url': 'https://' + os.environ['DOMAIN'] + '/' + key})
+            'body': json.dumps(image)
         }
-
-    def __get_save_image_data(self, image_data, ext):
-        image = Image.open(BytesIO(image_data))
-        w, h = image.size
-        if w <= settings.ARTICLE_IMAGE_MAX_WIDTH and h <= settings.ARTICLE_IMAGE_MAX_HEIGHT:
-            return image_data
-
-        image.thumbnail((settings.ARTICLE_IMAGE_MAX_WIDTH, settings.ARTICLE_IMAGE_MAX_HEIGHT), Image.ANTIALIAS)
-        buf = BytesIO()
-        image.save(buf, format=ext)
-        return buf.getvalue()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import settings
+import uuid
+import json
+from db_util import DBUtil
+from image_upload_util import ImageUploadUtil
+from lambda_base import LambdaBase
+from jsonschema import validate
+from user_util import UserUtil
+
+
+class MeArticlesImagesUploadUrlCreate(LambdaBase):
+    """
+    記事の画像を IMAGE_UPLOAD_S3_BUCKET に直接アップロードするための署名付き URL を返却する
+    アップロードされた画像は ImageUpload で縮小・変換され、image_url に保存される
+    """
+    def get_schema(self):
+        return {
+            'type': 'object',
+            'properties': {
+                'article_id': settings.parameters['article_id'],
+                'content_type': settings.parameters['image_content_type']
+            },
+            'required': ['article_id', 'content_type']
+        }
+
+    def validate_params(self):
+        UserUtil.verified_phone_and_email(self.event)
+        # single
+        validate(self.params, self.get_schema())
+
+        # relation
+        DBUtil.validate_article_existence(
+            self.dynamodb,
+            self.params['article_id'],
+            user_id=self.event['requestContext']['authorizer']['claims']['cognito:username']
+        )
+
+    def exec_main_proc(self):
+        ext = self.params['content_type'].split('/')[1]
+        user_id = self.event['requestContext']['authorizer']['claims']['cognito:username']
+        key = settings.S3_ARTICLES_IMAGES_PATH + \
+            user_id + '/' + self.params['article_id'] + '/' + str(uuid.uuid4()) + '.' + ext
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps(ImageUploadUtil.create_presigned_post(self.s3, key, self.params['content_type']))
+        }
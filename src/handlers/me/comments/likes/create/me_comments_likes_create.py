@@ -38,16 +38,23 @@ class MeCommentsLikesCreate(LambdaBase):
             'comment_id': comment['comment_id'],
             'user_id': user_id,
             'article_id': comment['article_id'],
+            'article_id_user_id': DBUtil.get_article_id_user_id(comment['article_id'], user_id),
             'created_at': int(time.time())
         }
 
         try:
-            comment_liked_user_table.put_item(
-                Item=comment_liked_user,
-                ConditionExpression='attribute_not_exists(comment_id)'
-            )
+            # いいね数はコメント一覧でまとめて返却できるようコメントに集計しておく
+            # いいねの登録と集計値の更新はトランザクションでまとめて行い、片方のみが反映されないようにする
+            if 'like_count' in comment:
+                self.__create_comment_liked_user_with_like_count(comment_liked_user)
+            # 集計値を持たない既存のコメントはコメント一覧でいいねを数えるため、いいねのみ登録する
+            else:
+                comment_liked_user_table.put_item(
+                    Item=comment_liked_user,
+                    ConditionExpression='attribute_not_exists(comment_id)'
+                )
         except ClientError as e:
-            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            if self.__is_already_exists_error(e):
                 return {
                     'statusCode': 400,
                     'body': json.dumps({'message': 'Already exists'})
@@ -56,3 +63,42 @@ class MeCommentsLikesCreate(LambdaBase):
                 raise
 
         return {'statusCode': 200}
+
+    def __create_comment_liked_user_with_like_count(self, comment_liked_user):
+        # resource の client は Python の値を DynamoDB の型に変換するため、値はそのまま渡す
+        self.dynamodb.meta.client.transact_write_items(
+            TransactItems=[
+                {
+                    'Put': {
+                        'TableName': os.environ['COMMENT_LIKED_USER_TABLE_NAME'],
+                        'Item': comment_liked_user,
+                        'ConditionExpression': 'attribute_not_exists(comment_id)'
+                    }
+                },
+                {
+                    'Update': {
+                        'TableName': os.environ['COMMENT_TABLE_NAME'],
+                        'Key': {'comment_id': comment_liked_user['comment_id']},
+                        'UpdateExpression': 'ADD like_count :one',
+                        'ConditionExpression': 'attribute_exists(like_count)',
+                        'ExpressionAttributeValues': {':one': 1}
+                    }
+                }
+            ]
+        )
+
+    """
+    いいねの登録のみが条件に一致せず失敗した場合(すでにいいね済みの場合)に True を返却する
+    """
+    @staticmethod
+    def __is_already_exists_error(e):
+        error_code = e.response['Error']['Code']
+
+        if error_code == 'ConditionalCheckFailedException':
+            return True
+
+        if error_code == 'TransactionCanceledException':
+            reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+            return reasons[:1] == ['ConditionalCheckFailed'] and all(reason == 'None' for reason in reasons[1:])
+
+        return False
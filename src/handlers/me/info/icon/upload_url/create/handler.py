@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+import boto3
+from me_info_icon_upload_url_create import MeInfoIconUploadUrlCreate
+
+s3 = boto3.resource('s3')
+
+
+def lambda_handler(event, context):
+    me_info_icon_upload_url_create = MeInfoIconUploadUrlCreate(event=event, context=context, s3=s3)
+    return me_info_icon_upload_url_create.main()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import settings
+import uuid
+import json
+from image_upload_util import ImageUploadUtil
+from lambda_base import LambdaBase
+from jsonschema import validate
+
+
+class MeInfoIconUploadUrlCreate(LambdaBase):
+    """
+    アイコンの画像を IMAGE_UPLOAD_S3_BUCKET に直接アップロードするための署名付き URL を返却する
+    アップロードされた画像は ImageUpload で縮小・切り抜きされ、ユーザーの icon_image_url が更新される
+    """
+    def get_schema(self):
+        return {
+            'type': 'object',
+            'properties': {
+                'content_type': settings.parameters['image_content_type']
+            },
+            'required': ['content_type']
+        }
+
+    def validate_params(self):
+        # single
+        validate(self.params, self.get_schema())
+
+    def exec_main_proc(self):
+        ext = self.params['content_type'].split('/')[1]
+        user_id = self.event['requestContext']['authorizer']['claims']['cognito:username']
+        key = settings.S3_INFO_ICON_PATH + \
+            user_id + '/icon/' + str(uuid.uuid4()) + '.' + ext
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps(ImageUploadUtil.create_presigned_post(self.s3, key, self.params['content_type']))
+        }
@@ -1,18 +1,17 @@
 # -*- coding: utf-8 -*-
 import os
 import settings
-import json
-import requests
 import time
 from time_util import TimeUtil
 from db_util import DBUtil
-from aws_requests_auth.aws_auth import AWSRequestsAuth
 from jsonschema import validate
 from lambda_base import LambdaBase
 from jsonschema import ValidationError
 from record_not_found_error import RecordNotFoundError
-from exceptions import SendTransactionError
+from private_chain_client import PrivateChainClient
+from private_eth_address_cache import PrivateEthAddressCache
 from user_util import UserUtil
+from wallet_balance_cache import WalletBalanceCache
 
 
 class MeWalletTip(LambdaBase):
@@ -52,14 +51,32 @@ class MeWalletTip(LambdaBase):
         if article_info['user_id'] == self.event['requestContext']['authorizer']['claims']['cognito:username']:
             raise ValidationError('Can not tip to myself')
 
-        # send tip
         from_user_eth_address = self.event['requestContext']['authorizer']['claims']['custom:private_eth_address']
         to_user_eth_address = self.__get_user_private_eth_address(article_info['user_id'])
+
+        # キューモードの場合は残高を予約して投げ銭を記録のみ行い、プライベートチェーンへの送信はバッチで行う
+        if os.environ.get('TIP_QUEUED_MODE_FLAG') == '1':
+            if not WalletBalanceCache.reserve(self.dynamodb, from_user_eth_address, self.params['tip_value']):
+                raise ValidationError('Insufficient balance')
+
+            try:
+                self.__create_queued_tip_info(from_user_eth_address, to_user_eth_address, article_info)
+            except Exception as e:
+                WalletBalanceCache.release(self.dynamodb, from_user_eth_address, self.params['tip_value'])
+                raise e
+
+            return {
+                'statusCode': 200
+            }
+
+        # send tip
         tip_value = self.params['tip_value']
         transaction_hash = self.__send_tip(from_user_eth_address, to_user_eth_address, tip_value)
 
         # create tip info
+        # 送信したトランザクションは必ず記録するため、残高のキャッシュの無効化は記録後に行う
         self.__create_tip_info(transaction_hash, article_info)
+        WalletBalanceCache.invalidate(self.dynamodb, [from_user_eth_address, to_user_eth_address])
 
         return {
             'statusCode': 200
@@ -67,58 +84,57 @@ class MeWalletTip(LambdaBase):
 
     @staticmethod
     def __send_tip(from_user_eth_address, to_user_eth_address, tip_value):
-        headers = {'content-type': 'application/json'}
-        payload = json.dumps(
-            {
-                'from_user_eth_address': from_user_eth_address,
-                'to_user_eth_address': to_user_eth_address[2:],
-                'tip_value': format(tip_value, '064x')
-            }
-        )
-        auth = AWSRequestsAuth(aws_access_key=os.environ['PRIVATE_CHAIN_AWS_ACCESS_KEY'],
-                               aws_secret_access_key=os.environ['PRIVATE_CHAIN_AWS_SECRET_ACCESS_KEY'],
-                               aws_host=os.environ['PRIVATE_CHAIN_EXECUTE_API_HOST'],
-                               aws_region='ap-northeast-1',
-                               aws_service='execute-api')
-        response = requests.post('https://' + os.environ['PRIVATE_CHAIN_EXECUTE_API_HOST'] +
-                                 '/production/wallet/tip', auth=auth, headers=headers, data=payload)
+        return PrivateChainClient.send_tip(from_user_eth_address, to_user_eth_address, tip_value)
 
-        # exists error
-        if json.loads(response.text).get('error'):
-            raise SendTransactionError(json.loads(response.text).get('error'))
+    def __create_tip_info(self, transaction_hash, article_info):
+        tip_info = self.__get_tip_info(article_info)
+        tip_info['transaction'] = transaction_hash
 
-        # return transaction hash
-        return json.dumps(json.loads(response.text).get('result')).replace('"', '')
+        self.__put_tip_info(tip_info)
 
-    def __create_tip_info(self, transaction_hash, article_info):
-        tip_table = self.dynamodb.Table(os.environ['TIP_TABLE_NAME'])
+    def __create_queued_tip_info(self, from_user_eth_address, to_user_eth_address, article_info):
+        tip_info = self.__get_tip_info(article_info)
+        tip_info.update({
+            'from_user_eth_address': from_user_eth_address,
+            'to_user_eth_address': to_user_eth_address,
+            'queued': 1,
+            'reserved': 1
+        })
 
-        sort_key = TimeUtil.generate_sort_key()
-        user_id = self.event['requestContext']['authorizer']['claims']['cognito:username']
+        self.__put_tip_info(tip_info)
 
-        tip_info = {
-            'user_id': user_id,
+    def __get_tip_info(self, article_info):
+        return {
+            'user_id': self.event['requestContext']['authorizer']['claims']['cognito:username'],
             'to_user_id': article_info['user_id'],
             'tip_value': self.params['tip_value'],
             'article_id': self.params['article_id'],
             'article_title': article_info['title'],
-            'transaction': transaction_hash,
             'uncompleted': 1,
-            'sort_key': sort_key,
+            'sort_key': TimeUtil.generate_sort_key(),
             'created_at': int(time.time())
         }
 
+    def __put_tip_info(self, tip_info):
+        tip_table = self.dynamodb.Table(os.environ['TIP_TABLE_NAME'])
+
         tip_table.put_item(
             Item=tip_info,
             ConditionExpression='attribute_not_exists(user_id)'
         )
 
     def __get_user_private_eth_address(self, user_id):
-        # user_id に紐づく private_eth_address を取得
+        private_eth_address = PrivateEthAddressCache.get(self.dynamodb, user_id)
+        if private_eth_address is not None:
+            return private_eth_address
+
+        # キャッシュに存在しない場合は Cognito から user_id に紐づく private_eth_address を取得
         user_info = UserUtil.get_cognito_user_info(self.cognito, user_id)
         private_eth_address = [a for a in user_info['UserAttributes'] if a.get('Name') == 'custom:private_eth_address']
         # private_eth_address が存在しないケースは想定していないため、取得出来ない場合は例外とする
         if len(private_eth_address) != 1:
             raise RecordNotFoundError('Record Not Found: private_eth_address')
 
+        PrivateEthAddressCache.put(self.dynamodb, user_id, private_eth_address[0]['Value'])
+
         return private_eth_address[0]['Value']
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+import boto3
+from image_upload import ImageUpload
+
+dynamodb = boto3.resource('dynamodb')
+s3 = boto3.resource('s3')
+
+
+def lambda_handler(event, context):
+    image_upload = ImageUpload(event=event, context=context, dynamodb=dynamodb, s3=s3)
+    return image_upload.main()
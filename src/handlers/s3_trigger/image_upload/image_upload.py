@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import logging
+from urllib.parse import unquote_plus
+
+import settings
+from botocore.exceptions import ClientError
+from dynamodb_throttling import DynamoDBThrottling
+from image_upload_util import ImageUploadUtil
+from image_util import ImageUtil
+from jsonschema import ValidationError
+
+
+class ImageUpload:
+    """
+    署名付き URL で IMAGE_UPLOAD_S3_BUCKET にアップロードされた画像を S3 の ObjectCreated イベントで処理する
+    画像を検証し、キーのパスに応じて記事の画像・アイコンとして縮小・変換して DIST_S3_BUCKET の同じキーに保存する
+    IMAGE_ASYNC_PROCESSING_FLAG が有効な場合に API で受け取った画像もこの処理で保存される
+    保存後およびサポート外の画像の場合はアップロードされた画像を削除する(それ以外のエラー時はライフサイクルルールで削除される)
+    LambdaBase は全ての例外をレスポンスに変換するため継承しない
+    サポート外の画像以外のエラーは例外を送出し、非同期呼び出しの再試行と DLQ の対象とする
+    """
+    def __init__(self, event, context, dynamodb=None, s3=None):
+        self.event = event
+        self.context = context
+        self.dynamodb = dynamodb
+        self.s3 = s3
+
+        if dynamodb is not None:
+            DynamoDBThrottling.install(dynamodb)
+
+    def main(self):
+        metrics = {'processed': 0, 'rejected': 0, 'skipped': 0}
+
+        for record in self.event['Records']:
+            bucket = record['s3']['bucket']['name']
+            key = unquote_plus(record['s3']['object']['key'])
+
+            try:
+                self.__save_image(bucket, key)
+                metrics['processed'] += 1
+            except ValidationError as e:
+                logging.warning('rejected uploaded image %s: %s', key, e)
+                metrics['rejected'] += 1
+            except ClientError as e:
+                # 再試行時に、前回の実行で処理済みのレコードはアップロードされた画像が削除されているためスキップする
+                if e.response['Error']['Code'] != 'NoSuchKey':
+                    raise e
+                logging.info('uploaded image %s has already been processed', key)
+                metrics['skipped'] += 1
+                continue
+
+            self.s3.meta.client.delete_object(Bucket=bucket, Key=key)
+
+        logging.info('image upload metrics: %s', metrics)
+
+        return metrics
+
+    def __save_image(self, bucket, key):
+        uploaded_object = self.s3.meta.client.get_object(Bucket=bucket, Key=key)
+        content_type = uploaded_object['ContentType']
+        if content_type not in settings.parameters['image_content_type']['enum'] or \
+                uploaded_object['ContentLength'] > settings.IMAGE_UPLOAD_MAX_BYTES:
+            raise ValidationError('Bad Request: No supported image format')
+
+        image_data = uploaded_object['Body'].read()
+        image = ImageUtil.load(image_data)
+        ext = content_type.split('/')[1]
+
+        if key.startswith(settings.S3_ARTICLES_IMAGES_PATH):
+            user_id = key[len(settings.S3_ARTICLES_IMAGES_PATH):].split('/')[0]
+            ImageUploadUtil.save_article_image(
+                self.s3, self.dynamodb, user_id, key[:key.rfind('.')], ext, image_data, image
+            )
+        elif key.startswith(settings.S3_INFO_ICON_PATH):
+            user_id = key[len(settings.S3_INFO_ICON_PATH):].split('/')[0]
+            ImageUploadUtil.save_icon_image(self.s3, self.dynamodb, user_id, key, ext, image_data, image)
+        else:
+            raise ValidationError('Bad Request: Unsupported key')
@@ -4,9 +4,9 @@ from jsonschema import validate
 
 import settings
 from decimal_encoder import DecimalEncoder
-from es_util import ESUtil
 from lambda_base import LambdaBase
 from parameter_util import ParameterUtil
+from tag_dictionary import TagDictionary
 
 
 class SearchTags(LambdaBase):
@@ -30,7 +30,7 @@ class SearchTags(LambdaBase):
         limit = int(self.params.get('limit')) if self.params.get('limit') is not None else settings.TAG_SEARCH_DEFAULT_LIMIT
         page = int(self.params.get('page')) if self.params.get('page') is not None else 1
 
-        result = ESUtil.search_tag(self.elasticsearch, query, limit, page)
+        result = TagDictionary.search_tag(self.elasticsearch, query, limit, page)
         return {
             'statusCode': 200,
             'body': json.dumps(result, cls=DecimalEncoder)
@@ -6,6 +6,7 @@ from db_util import DBUtil
 from jsonschema import ValidationError
 from tests_util import TestsUtil
 from unittest import TestCase
+from unittest.mock import patch, MagicMock
 from record_not_found_error import RecordNotFoundError
 from not_authorized_error import NotAuthorizedError
 
@@ -317,6 +318,166 @@ class TestDBUtil(TestCase):
 
         self.assertEqual(len(response), 4)
 
+    def test_query_all_items_not_update_query_params(self):
+        article_pv_user_table = self.dynamodb.Table(os.environ['ARTICLE_PV_USER_TABLE_NAME'])
+        query_params = {
+            'IndexName': 'target_date-sort_key-index',
+            'KeyConditionExpression': Key('target_date').eq('2018-05-01'),
+            'Limit': 1
+        }
+
+        DBUtil.query_all_items(article_pv_user_table, query_params)
+
+        self.assertIsNone(query_params.get('ExclusiveStartKey'))
+
+    def test_query_items(self):
+        article_pv_user_table = self.dynamodb.Table(os.environ['ARTICLE_PV_USER_TABLE_NAME'])
+        query_params = {
+            'IndexName': 'target_date-sort_key-index',
+            'KeyConditionExpression': Key('target_date').eq('2018-05-01'),
+            'Limit': 1
+        }
+
+        items = DBUtil.query_items(article_pv_user_table, query_params)
+
+        # 1ページ目の項目を返却した時点では次のページを取得しない
+        with patch.object(article_pv_user_table.meta.client, 'query',
+                          wraps=article_pv_user_table.meta.client.query) as mock_query:
+            next(items)
+            self.assertEqual(mock_query.call_count, 1)
+
+            self.assertEqual(len(list(items)), 3)
+            self.assertGreater(mock_query.call_count, 1)
+
+    def test_query_items_with_prefetch(self):
+        article_pv_user_table = self.dynamodb.Table(os.environ['ARTICLE_PV_USER_TABLE_NAME'])
+        query_params = {
+            'IndexName': 'target_date-sort_key-index',
+            'KeyConditionExpression': Key('target_date').eq('2018-05-01'),
+            'Limit': 1
+        }
+
+        expected = DBUtil.query_all_items(article_pv_user_table, query_params)
+        items = list(DBUtil.query_items(article_pv_user_table, query_params, prefetch=True))
+
+        self.assertEqual(items, expected)
+
+    def test_query_items_with_max_items(self):
+        article_pv_user_table = self.dynamodb.Table(os.environ['ARTICLE_PV_USER_TABLE_NAME'])
+        query_params = {
+            'IndexName': 'target_date-sort_key-index',
+            'KeyConditionExpression': Key('target_date').eq('2018-05-01'),
+            'Limit': 2
+        }
+
+        with patch.object(article_pv_user_table.meta.client, 'query',
+                          wraps=article_pv_user_table.meta.client.query) as mock_query:
+            items = list(DBUtil.query_items(article_pv_user_table, query_params, max_items=3))
+
+            self.assertEqual(len(items), 3)
+            # 残り件数のみを Limit に指定して取得する
+            self.assertEqual([c[1]['Limit'] for c in mock_query.call_args_list], [2, 1])
+
+    def test_query_items_with_max_capacity_units(self):
+        dynamodb_table = MagicMock()
+        dynamodb_table.name = 'test_table'
+        dynamodb_table.meta.client.query.side_effect = [
+            {
+                'Items': [{'id': i}],
+                'LastEvaluatedKey': {'id': i},
+                'ConsumedCapacity': {'CapacityUnits': 0.5}
+            }
+            for i in range(5)
+        ]
+
+        items = list(DBUtil.query_items(dynamodb_table, {'KeyConditionExpression': 'id = :id'}, max_capacity_units=1))
+
+        # 上限に達したページまでを返却し、以降のページは取得しない
+        self.assertEqual(items, [{'id': 0}, {'id': 1}])
+        self.assertEqual(dynamodb_table.meta.client.query.call_count, 2)
+        self.assertEqual(
+            dynamodb_table.meta.client.query.call_args[1]['ReturnConsumedCapacity'],
+            'TOTAL'
+        )
+        self.assertEqual(dynamodb_table.meta.client.query.call_args[1]['TableName'], 'test_table')
+
+    def test_query_items_with_projection_expression(self):
+        article_pv_user_table = self.dynamodb.Table(os.environ['ARTICLE_PV_USER_TABLE_NAME'])
+        query_params = {
+            'IndexName': 'target_date-sort_key-index',
+            'KeyConditionExpression': Key('target_date').eq('2018-05-01')
+        }
+
+        items = list(DBUtil.query_items(
+            article_pv_user_table, query_params,
+            projection_expression='#article_id', expression_attribute_names={'#article_id': 'article_id'}
+        ))
+
+        self.assertEqual(len(items), 4)
+        for item in items:
+            self.assertEqual(list(item.keys()), ['article_id'])
+
+    def test_get_article_id_user_id(self):
+        self.assertEqual(DBUtil.get_article_id_user_id('testid000001', 'user-01'), 'testid000001#user-01')
+
+    def test_batch_get_items(self):
+        keys = [{'article_id': 'testid000001'}, {'article_id': 'testid000002'}, {'article_id': 'not_exists'}]
+
+        response = DBUtil.batch_get_items(self.dynamodb, os.environ['ARTICLE_INFO_TABLE_NAME'], keys)
+
+        self.assertEqual(
+            sorted(response, key=lambda item: item['article_id']),
+            self.article_info_table_items
+        )
+
+    def test_batch_get_items_over_max_keys(self):
+        keys = [{'article_id': 'testid{0:06d}'.format(i)} for i in range(1, 251)]
+
+        with patch.object(self.dynamodb, 'batch_get_item', wraps=self.dynamodb.batch_get_item) as mock_batch_get_item:
+            response = DBUtil.batch_get_items(
+                self.dynamodb,
+                os.environ['ARTICLE_INFO_TABLE_NAME'],
+                keys,
+                projection_expression='article_id, #status',
+                expression_attribute_names={'#status': 'status'}
+            )
+
+            self.assertEqual(mock_batch_get_item.call_count, 3)
+
+        self.assertEqual(
+            sorted(response, key=lambda item: item['article_id']),
+            [
+                {'article_id': 'testid000001', 'status': 'public'},
+                {'article_id': 'testid000002', 'status': 'draft'}
+            ]
+        )
+
+    def test_batch_get_items_with_unprocessed_keys(self):
+        table_name = os.environ['ARTICLE_INFO_TABLE_NAME']
+        responses = [
+            {
+                'Responses': {table_name: [self.article_info_table_items[0]]},
+                'UnprocessedKeys': {table_name: {'Keys': [{'article_id': 'testid000002'}]}}
+            },
+            {
+                'Responses': {table_name: [self.article_info_table_items[1]]},
+                'UnprocessedKeys': {}
+            }
+        ]
+        dynamodb = MagicMock()
+        dynamodb.batch_get_item.side_effect = responses
+
+        with patch('db_util.time.sleep'):
+            response = DBUtil.batch_get_items(
+                dynamodb, table_name, [{'article_id': 'testid000001'}, {'article_id': 'testid000002'}]
+            )
+
+        self.assertEqual(response, self.article_info_table_items)
+        self.assertEqual(
+            dynamodb.batch_get_item.call_args_list[1][1],
+            {'RequestItems': {table_name: {'Keys': [{'article_id': 'testid000002'}]}}}
+        )
+
     def test_validate_topic_ok(self):
         self.assertTrue(DBUtil.validate_topic(self.dynamodb, 'crypto'))
 
@@ -0,0 +1,153 @@
+import json
+import os
+from io import BytesIO
+from unittest import TestCase
+from unittest.mock import patch
+
+import settings
+from botocore.awsrequest import AWSResponse
+from botocore.exceptions import ClientError
+from dynamodb_throttling import DynamoDBThrottling
+from service_unavailable_error import ServiceUnavailableError
+from tests_util import TestsUtil
+
+
+class RawResponse(BytesIO):
+    def stream(self, **kwargs):
+        contents = self.read()
+        while contents:
+            yield contents
+            contents = self.read()
+
+
+class TestDynamoDBThrottling(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+        self.users_items = [{'user_id': 'test01', 'user_display_name': 'display_name01'}]
+        TestsUtil.create_table(self.dynamodb, os.environ['USERS_TABLE_NAME'], self.users_items)
+
+        DynamoDBThrottling.install(self.dynamodb)
+        DynamoDBThrottling.clear()
+        self.throttling_count = 0
+
+    def tearDown(self):
+        self.dynamodb.meta.client.meta.events.unregister('before-send.dynamodb', unique_id='test-throttling')
+        TestsUtil.delete_all_tables(self.dynamodb)
+        DynamoDBThrottling.clear()
+
+    def __throttle(self, count):
+        self.throttling_count = count
+
+        # 指定した回数だけ HTTP リクエストを送信せずにスループット超過のレスポンスを返却する
+        def before_send(request, **kwargs):
+            if self.throttling_count <= 0:
+                return None
+            self.throttling_count -= 1
+            body = {
+                '__type': 'com.amazonaws.dynamodb.v20120810#ProvisionedThroughputExceededException',
+                'message': 'The level of configured provisioned throughput for the table was exceeded.'
+            }
+            return AWSResponse(
+                request.url, 400, {'Content-Type': 'application/x-amz-json-1.0'},
+                RawResponse(json.dumps(body).encode())
+            )
+
+        self.dynamodb.meta.client.meta.events.register_first(
+            'before-send.dynamodb', before_send, unique_id='test-throttling'
+        )
+
+    def test_retry_throttling(self):
+        self.__throttle(2)
+        users_table = self.dynamodb.Table(os.environ['USERS_TABLE_NAME'])
+
+        with patch('dynamodb_throttling.random.uniform', return_value=0) as mock_uniform:
+            user = users_table.get_item(Key={'user_id': 'test01'})['Item']
+
+            # 1回目は base、2回目は base * 2 を上限とした jitter で待機する
+            self.assertEqual(mock_uniform.call_args_list[0][0], (0, settings.DYNAMODB_THROTTLING_BASE_BACKOFF_SECONDS))
+            self.assertEqual(mock_uniform.call_args_list[1][0], (0, settings.DYNAMODB_THROTTLING_BASE_BACKOFF_SECONDS * 2))
+
+        self.assertEqual(user['user_display_name'], 'display_name01')
+        self.assertEqual(
+            DynamoDBThrottling.get_metrics()[os.environ['USERS_TABLE_NAME']],
+            {'requests': 1, 'throttles': 2, 'retries': 2, 'failures': 0, 'rejected': 0}
+        )
+
+    def test_retry_throttling_over_max_attempts(self):
+        self.__throttle(100)
+        users_table = self.dynamodb.Table(os.environ['USERS_TABLE_NAME'])
+
+        with patch('dynamodb_throttling.random.uniform', return_value=0):
+            with self.assertRaises(ClientError) as e:
+                users_table.get_item(Key={'user_id': 'test01'})
+
+        self.assertEqual(e.exception.response['Error']['Code'], 'ProvisionedThroughputExceededException')
+        # botocore 標準のリトライは行わない
+        self.assertEqual(100 - self.throttling_count, settings.DYNAMODB_THROTTLING_MAX_ATTEMPTS)
+        self.assertEqual(DynamoDBThrottling.get_metrics()[os.environ['USERS_TABLE_NAME']]['failures'], 1)
+
+    def test_rate_limit_after_throttling(self):
+        self.__throttle(1)
+        users_table = self.dynamodb.Table(os.environ['USERS_TABLE_NAME'])
+
+        with patch('dynamodb_throttling.random.uniform', return_value=0):
+            users_table.get_item(Key={'user_id': 'test01'})
+
+        # スループット超過後はレートを下げ、成功に応じて戻す
+        rate_limiter = DynamoDBThrottling.tables[os.environ['USERS_TABLE_NAME']]['rate_limiter']
+        self.assertEqual(
+            rate_limiter.rate,
+            settings.DYNAMODB_THROTTLING_MAX_RATE * settings.DYNAMODB_THROTTLING_DECREASE_FACTOR +
+            settings.DYNAMODB_THROTTLING_INCREASE_RATE
+        )
+
+        with patch.object(rate_limiter, 'acquire') as mock_acquire:
+            users_table.get_item(Key={'user_id': 'test01'})
+
+            mock_acquire.assert_called_once_with()
+
+    def test_circuit_breaker(self):
+        self.__throttle(100)
+        users_table = self.dynamodb.Table(os.environ['USERS_TABLE_NAME'])
+
+        with patch('dynamodb_throttling.random.uniform', return_value=0), \
+                patch('dynamodb_throttling.time.time', return_value=1520150000):
+            for _ in range(settings.DYNAMODB_CIRCUIT_BREAKER_THRESHOLD):
+                with self.assertRaises(ClientError):
+                    users_table.get_item(Key={'user_id': 'test01'})
+
+            sent_count = 100 - self.throttling_count
+
+            # 一定時間はリクエストせずにエラーとする
+            with self.assertRaises(ServiceUnavailableError) as e:
+                users_table.get_item(Key={'user_id': 'test01'})
+
+            # ClientError を捕捉する箇所でも同様に扱われる
+            self.assertIsInstance(e.exception, ClientError)
+            self.assertEqual(e.exception.response['Error']['Code'], 'ServiceUnavailable')
+            self.assertEqual(e.exception.operation_name, 'GetItem')
+
+            self.assertEqual(100 - self.throttling_count, sent_count)
+
+        self.throttling_count = 0
+
+        # 一定時間経過後はリクエストし、成功した場合は閉じる
+        with patch('dynamodb_throttling.time.time',
+                   return_value=1520150000 + settings.DYNAMODB_CIRCUIT_BREAKER_OPEN_SECONDS), \
+                patch.object(DynamoDBThrottling.tables[os.environ['USERS_TABLE_NAME']]['rate_limiter'], 'acquire'):
+            users_table.get_item(Key={'user_id': 'test01'})
+
+        self.assertIsNone(DynamoDBThrottling.tables[os.environ['USERS_TABLE_NAME']]['opened_at'])
+        self.assertEqual(DynamoDBThrottling.get_metrics()[os.environ['USERS_TABLE_NAME']]['rejected'], 1)
+
+    def test_install_only_once(self):
+        DynamoDBThrottling.install(self.dynamodb)
+        users_table = self.dynamodb.Table(os.environ['USERS_TABLE_NAME'])
+
+        users_table.get_item(Key={'user_id': 'test01'})
+
+        self.assertEqual(DynamoDBThrottling.get_metrics()[os.environ['USERS_TABLE_NAME']]['requests'], 1)
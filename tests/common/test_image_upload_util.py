@@ -0,0 +1,132 @@
+import os
+from io import BytesIO
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import boto3
+from image_upload_util import ImageUploadUtil
+from image_util import ImageUtil
+from PIL import Image
+from tests_util import TestsUtil
+
+
+class TestImageUploadUtil(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+
+    def setUp(self):
+        os.environ['DOMAIN'] = 'example.com'
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.set_all_s3_buckets_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+        TestsUtil.create_table(self.dynamodb, os.environ['PROCESSED_IMAGE_TABLE_NAME'], [])
+        self.s3 = MagicMock()
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+    @staticmethod
+    def open_image(size, image_format, **kwargs):
+        buf = BytesIO()
+        Image.new('RGB', size).save(buf, format=image_format, **kwargs)
+        return buf.getvalue(), ImageUtil.load(buf.getvalue())
+
+    def test_create_presigned_post(self):
+        s3 = boto3.resource('s3', endpoint_url='http://localhost:4572/')
+
+        presigned_post = ImageUploadUtil.create_presigned_post(s3, 'd/api/info_icon/test01/icon/uuid.png', 'image/png')
+
+        self.assertIn(os.environ['IMAGE_UPLOAD_S3_BUCKET_NAME'], presigned_post['upload_url'])
+        self.assertEqual(presigned_post['upload_fields']['key'], 'd/api/info_icon/test01/icon/uuid.png')
+        self.assertEqual(presigned_post['upload_fields']['Content-Type'], 'image/png')
+        self.assertEqual(presigned_post['image_url'], 'https://example.com/d/api/info_icon/test01/icon/uuid.png')
+
+    def test_save_article_image(self):
+        image_data, image = self.open_image((1500, 1000), 'png')
+
+        with patch('image_util.Image.open', wraps=Image.open) as mock_open:
+            result = ImageUploadUtil.save_article_image(
+                self.s3, self.dynamodb, 'test01', 'd/api/articles_images/test01/id/uuid', 'png', image_data, image
+            )
+
+            # 縮小・変換する画像の数によらず、画素のデコードは1度のみ行う
+            self.assertEqual(mock_open.call_count, 1)
+
+        url_prefix = 'https://example.com/d/api/articles_images/test01/id/uuid'
+        self.assertEqual(result, {
+            'image_url': url_prefix + '.png',
+            'srcset': {
+                'image/png': url_prefix + '_640w.png 640w, ' + url_prefix + '_1280w.png 1280w, ' +
+                url_prefix + '.png 1500w',
+                'image/webp': url_prefix + '_640w.webp 640w, ' + url_prefix + '_1280w.webp 1280w, ' +
+                url_prefix + '_1500w.webp 1500w'
+            }
+        })
+        put_objects = {
+            kwargs['Key']: kwargs['ContentType'] for _, kwargs in self.s3.meta.client.put_object.call_args_list
+        }
+        self.assertEqual(put_objects, {
+            'd/api/articles_images/test01/id/uuid.png': 'image/png',
+            'd/api/articles_images/test01/id/uuid_640w.png': 'image/png',
+            'd/api/articles_images/test01/id/uuid_1280w.png': 'image/png',
+            'd/api/articles_images/test01/id/uuid_640w.webp': 'image/webp',
+            'd/api/articles_images/test01/id/uuid_1280w.webp': 'image/webp',
+            'd/api/articles_images/test01/id/uuid_1500w.webp': 'image/webp'
+        })
+        # 元の画像データのハッシュ値と共に記録する
+        self.assertEqual(
+            ImageUploadUtil.get_processed_image(self.dynamodb, 'test01', 'article', ImageUtil.get_hash(image_data), 'png'),
+            result
+        )
+        self.assertIsNone(
+            ImageUploadUtil.get_processed_image(self.dynamodb, 'test02', 'article', ImageUtil.get_hash(image_data), 'png')
+        )
+        self.assertIsNone(
+            ImageUploadUtil.get_processed_image(self.dynamodb, 'test01', 'icon', ImageUtil.get_hash(image_data), 'png')
+        )
+
+    def test_save_article_image_with_mismatched_ext(self):
+        # 透過 PNG を image/jpeg として送信した場合も、縮小・変換した画像を保存する
+        buf = BytesIO()
+        Image.new('RGBA', (1500, 1000), (255, 0, 0, 128)).save(buf, format='png')
+
+        ImageUploadUtil.save_article_image(
+            self.s3, self.dynamodb, 'test01', 'd/api/articles_images/test01/id/uuid', 'jpeg', buf.getvalue(),
+            ImageUtil.load(buf.getvalue())
+        )
+
+        put_objects = {
+            kwargs['Key']: Image.open(BytesIO(kwargs['Body'])) for _, kwargs in self.s3.meta.client.put_object.call_args_list
+        }
+        self.assertEqual(put_objects['d/api/articles_images/test01/id/uuid_640w.jpeg'].format, 'JPEG')
+        self.assertEqual(put_objects['d/api/articles_images/test01/id/uuid_1280w.jpeg'].mode, 'RGB')
+        self.assertEqual(put_objects['d/api/articles_images/test01/id/uuid_1500w.webp'].mode, 'RGBA')
+
+    def test_save_article_image_animated(self):
+        buf = BytesIO()
+        frames = [Image.new('RGB', (1500, 1000), color) for color in ['red', 'blue']]
+        frames[0].save(buf, format='gif', save_all=True, append_images=frames[1:])
+
+        result = ImageUploadUtil.save_article_image(
+            self.s3, self.dynamodb, 'test01', 'd/api/articles_images/test01/id/uuid', 'gif', buf.getvalue(),
+            ImageUtil.load(buf.getvalue())
+        )
+
+        # アニメーション画像は縮小・変換した画像を生成しない
+        image_url = 'https://example.com/d/api/articles_images/test01/id/uuid.gif'
+        self.assertEqual(result, {'image_url': image_url, 'srcset': {'image/gif': image_url + ' 1500w'}})
+        self.assertEqual(self.s3.meta.client.put_object.call_count, 1)
+
+    def test_get_article_image_manifest(self):
+        for size, image_format in [((1500, 1000), 'png'), ((7680, 4320), 'jpeg'), ((100, 100), 'gif')]:
+            image_data, image = self.open_image(size, image_format)
+            key_prefix = 'd/api/articles_images/test01/id/' + ImageUtil.get_hash(image_data)
+
+            manifest = ImageUploadUtil.get_article_image_manifest(key_prefix, image_format, image)
+
+            # 画像を処理せずに save_article_image と同じ dict を返却する
+            self.assertEqual(
+                manifest,
+                ImageUploadUtil.save_article_image(
+                    self.s3, self.dynamodb, 'test01', key_prefix, image_format, image_data, image
+                )
+            )
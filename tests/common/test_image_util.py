@@ -0,0 +1,215 @@
+import base64
+import os
+import time
+from io import BytesIO
+from unittest import TestCase, skipUnless
+
+from image_util import ImageUtil
+from jsonschema import ValidationError
+from PIL import Image
+
+
+class TestImageUtil(TestCase):
+    @staticmethod
+    def create_image(size, image_format, mode='RGB', color='white'):
+        buf = BytesIO()
+        Image.new(mode, size, color).save(buf, format=image_format)
+        return buf.getvalue()
+
+    def test_open(self):
+        for image_format in ['jpeg', 'png', 'gif']:
+            image_data = self.create_image((10, 20), image_format)
+
+            data, image = ImageUtil.open(base64.b64encode(image_data).decode('ascii'))
+
+            self.assertEqual(data, image_data)
+            self.assertEqual(image.size, (10, 20))
+            self.assertEqual(ImageUtil.get_format(data), image_format)
+
+    def test_open_with_not_supported_format(self):
+        for base64_image_data in [
+            '',
+            'a' * 1024,
+            'invalid base64',
+            base64.b64encode(self.create_image((10, 10), 'bmp')).decode('ascii'),
+            # 先頭バイトのみが正しい場合
+            base64.b64encode(b'\x89PNG\r\n\x1a\n' + b'a' * 100).decode('ascii')
+        ]:
+            with self.assertRaises(ValidationError):
+                ImageUtil.open(base64_image_data)
+
+    def test_get_hash(self):
+        image_data = self.create_image((10, 20), 'png')
+
+        self.assertEqual(ImageUtil.get_hash(image_data), ImageUtil.get_hash(self.create_image((10, 20), 'png')))
+        self.assertNotEqual(ImageUtil.get_hash(image_data), ImageUtil.get_hash(self.create_image((10, 21), 'png')))
+        self.assertEqual(len(ImageUtil.get_hash(image_data)), 64)
+
+    def test_get_fit_size(self):
+        for size, expected_size in [
+            ((3840, 2160), (3840, 2160)),
+            ((100, 100), (100, 100)),
+            ((3841, 2160), (3840, 2159)),
+            ((3840, 2161), (3838, 2160)),
+            ((7680, 4320), (3840, 2160)),
+            ((100000, 10), (3840, 1)),
+            ((10, 100000), (1, 2160))
+        ]:
+            self.assertEqual(ImageUtil.get_fit_size(size, 3840, 2160), expected_size)
+
+    def test_resize_to_fit_not_resized(self):
+        image_data = self.create_image((3840, 2160), 'png')
+        data, image = ImageUtil.open(base64.b64encode(image_data))
+
+        # 縮小が不要な場合は再エンコードしない
+        self.assertIs(ImageUtil.resize_to_fit(data, image, 'png', 3840, 2160), data)
+
+    def test_resize_to_fit(self):
+        for size, image_format, expected_size in [
+            ((3841, 2160), 'png', (3840, 2159)),
+            ((3840, 2161), 'gif', (3838, 2160)),
+            ((7680, 4320), 'jpeg', (3840, 2160))
+        ]:
+            data, image = ImageUtil.open(base64.b64encode(self.create_image(size, image_format)))
+
+            resized_data = ImageUtil.resize_to_fit(data, image, image_format, 3840, 2160)
+
+            resized_image = Image.open(BytesIO(resized_data))
+            self.assertEqual(resized_image.size, expected_size)
+            self.assertEqual(resized_image.format.lower(), image_format)
+
+    def test_draft(self):
+        data, image = ImageUtil.open(base64.b64encode(self.create_image((8000, 6000), 'jpeg')))
+
+        ImageUtil._ImageUtil__draft(image, (1920, 1080))
+
+        # JPEG は size 以上となる範囲で縮小してデコードする(1/4)
+        self.assertEqual(image.size, (2000, 1500))
+        image.load()
+        self.assertEqual(image.size, (2000, 1500))
+
+    def test_draft_other_than_jpeg(self):
+        data, image = ImageUtil.open(base64.b64encode(self.create_image((800, 600), 'png')))
+
+        ImageUtil._ImageUtil__draft(image, (100, 100))
+
+        self.assertEqual(image.size, (800, 600))
+
+    def test_resize_and_crop_center(self):
+        for size, image_format, expected_size in [
+            ((240, 240), 'png', (240, 240)),
+            ((2400, 1200), 'jpeg', (240, 240)),
+            ((1200, 2400), 'gif', (240, 240)),
+            ((300, 200), 'png', (240, 200)),
+            ((200, 300), 'png', (200, 240))
+        ]:
+            image_data = self.create_image(size, image_format)
+            data, image = ImageUtil.open(base64.b64encode(image_data))
+
+            resized_data = ImageUtil.resize_and_crop_center(data, image, image_format, 240, 240)
+
+            self.assertEqual(Image.open(BytesIO(resized_data)).size, expected_size)
+
+    def test_decode(self):
+        image = ImageUtil.decode(self.create_image((10, 20), 'jpeg'))
+
+        self.assertEqual(image.size, (10, 20))
+        self.assertIsNotNone(image.im)
+
+    def test_create_variants(self):
+        image = ImageUtil.decode(self.create_image((3840, 2160), 'jpeg'))
+
+        for image_formats, width, expected_size in [
+            (['jpeg'], 640, (640, 360)),
+            (['jpeg', 'webp'], 1920, (1920, 1080)),
+            (['webp'], 3840, (3840, 2160))
+        ]:
+            variants = ImageUtil.create_variants(image, width, image_formats)
+
+            self.assertEqual(len(variants), len(image_formats))
+            for variant, image_format in zip(variants, image_formats):
+                variant_image = Image.open(BytesIO(variant))
+                self.assertEqual(variant_image.size, expected_size)
+                self.assertEqual(variant_image.format.lower(), image_format)
+
+        # 共有する image は変更しない
+        self.assertEqual(image.size, (3840, 2160))
+
+    def test_create_variants_webp_convert_mode(self):
+        for mode, color, expected_mode in [('P', 'white', 'RGB'), ('LA', (255, 0), 'RGBA')]:
+            image = ImageUtil.decode(self.create_image((100, 50), 'png', mode=mode, color=color))
+
+            png_data, webp_data = ImageUtil.create_variants(image, 50, ['png', 'webp'])
+
+            variant_image = Image.open(BytesIO(webp_data))
+            self.assertEqual(variant_image.size, (50, 25))
+            self.assertEqual(variant_image.mode, expected_mode)
+            self.assertEqual(Image.open(BytesIO(png_data)).mode, mode)
+
+    def test_encode_jpeg_convert_mode(self):
+        # Content-Type が image/jpeg で画像データが透過 PNG の場合
+        for mode, color in [('RGBA', (255, 0, 0, 0)), ('P', 'white'), ('LA', (0, 0))]:
+            data, image = ImageUtil.open(base64.b64encode(self.create_image((4000, 100), 'png', mode=mode, color=color)))
+
+            resized_image = Image.open(BytesIO(ImageUtil.resize_to_fit(data, image, 'jpeg', 3840, 2160)))
+            self.assertEqual(resized_image.format.lower(), 'jpeg')
+            self.assertEqual(resized_image.mode, 'RGB')
+
+            jpeg_data, = ImageUtil.create_variants(ImageUtil.decode(data), 640, ['jpeg'])
+            variant_image = Image.open(BytesIO(jpeg_data))
+            self.assertEqual(variant_image.size, (640, 16))
+            self.assertEqual(variant_image.mode, 'RGB')
+
+        # 透過部分は白で塗りつぶす
+        jpeg_data, = ImageUtil.create_variants(
+            ImageUtil.decode(self.create_image((10, 10), 'png', mode='RGBA', color=(0, 0, 0, 0))), 10, ['jpeg']
+        )
+        self.assertEqual(Image.open(BytesIO(jpeg_data)).getpixel((5, 5)), (255, 255, 255))
+
+
+@skipUnless(os.environ.get('BENCHMARK'), 'set BENCHMARK=1 to run benchmarks')
+class TestImageUtilBenchmark(TestCase):
+    """
+    大きな画像での処理時間を、従来の処理(base64 のデコードと Image.open を検証・保存時にそれぞれ行う)と比較する
+    BENCHMARK=1 python exec_test.py tests/common/test_image_util.py
+    """
+    ITERATIONS = 5
+
+    @staticmethod
+    def legacy_resize_to_fit(base64_image_data, ext, max_width, max_height):
+        # validate_image_data
+        Image.open(BytesIO(base64.b64decode(base64_image_data)))
+        # __get_save_image_data
+        image_data = base64.b64decode(base64_image_data)
+        image = Image.open(BytesIO(image_data))
+        w, h = image.size
+        if w <= max_width and h <= max_height:
+            return image_data
+        image.thumbnail((max_width, max_height), Image.LANCZOS)
+        buf = BytesIO()
+        image.save(buf, format=ext)
+        return buf.getvalue()
+
+    @staticmethod
+    def resize_to_fit(base64_image_data, ext, max_width, max_height):
+        image_data, image = ImageUtil.open(base64_image_data)
+        return ImageUtil.resize_to_fit(image_data, image, ext, max_width, max_height)
+
+    def measure(self, function, *args):
+        started_at = time.perf_counter()
+        for _ in range(self.ITERATIONS):
+            function(*args)
+        return (time.perf_counter() - started_at) / self.ITERATIONS
+
+    def test_benchmark_resize_to_fit(self):
+        for size, image_format in [((7680, 4320), 'jpeg'), ((6000, 4000), 'jpeg'), ((7680, 4320), 'png')]:
+            buf = BytesIO()
+            Image.effect_noise(size, 64).convert('RGB').save(buf, format=image_format)
+            base64_image_data = base64.b64encode(buf.getvalue()).decode('ascii')
+
+            legacy = self.measure(self.legacy_resize_to_fit, base64_image_data, image_format, 3840, 2160)
+            current = self.measure(self.resize_to_fit, base64_image_data, image_format, 3840, 2160)
+
+            print('{0} {1}x{2} ({3} bytes): legacy {4:.3f}s, image_util {5:.3f}s'.format(
+                image_format, size[0], size[1], len(buf.getvalue()), legacy, current
+            ))
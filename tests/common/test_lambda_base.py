@@ -1,4 +1,7 @@
 import json
+
+import settings
+from botocore.exceptions import ClientError
 from tests_util import TestsUtil
 from unittest import TestCase
 from unittest.mock import MagicMock
@@ -6,6 +9,7 @@ from jsonschema import ValidationError
 from lambda_base import LambdaBase
 from record_not_found_error import RecordNotFoundError
 from not_authorized_error import NotAuthorizedError
+from service_unavailable_error import ServiceUnavailableError
 
 
 class TestLambdaBase(TestCase):
@@ -42,6 +46,29 @@ class TestLambdaBase(TestCase):
         self.assertEqual(response['statusCode'], 403)
         self.assertEqual(json.loads(response['body'])['message'], 'not authorized')
 
+    def test_catch_service_unavailable_error(self):
+        lambda_impl = self.TestLambdaImpl({}, {}, self.dynamodb)
+        lambda_impl.exec_main_proc = MagicMock(side_effect=ServiceUnavailableError('unavailable'))
+        response = lambda_impl.main()
+        self.assertEqual(response['statusCode'], 503)
+        self.assertEqual(response['headers'], {'Retry-After': str(settings.DYNAMODB_CIRCUIT_BREAKER_OPEN_SECONDS)})
+
+    def test_catch_throttling_error(self):
+        lambda_impl = self.TestLambdaImpl({}, {}, self.dynamodb)
+        lambda_impl.exec_main_proc = MagicMock(side_effect=ClientError(
+            {'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'exceeded'}}, 'Query'
+        ))
+        response = lambda_impl.main()
+        self.assertEqual(response['statusCode'], 503)
+
+    def test_catch_client_error(self):
+        lambda_impl = self.TestLambdaImpl({}, {}, self.dynamodb)
+        lambda_impl.exec_main_proc = MagicMock(side_effect=ClientError(
+            {'Error': {'Code': 'ValidationException', 'Message': 'invalid'}}, 'Query'
+        ))
+        response = lambda_impl.main()
+        self.assertEqual(response['statusCode'], 500)
+
     def test_catch_internal_server_error(self):
         lambda_impl = self.TestLambdaImpl({}, {}, self.dynamodb)
         lambda_impl.exec_main_proc = MagicMock(side_effect=Exception())
@@ -0,0 +1,166 @@
+import json
+import os
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from boto3.dynamodb.conditions import Attr
+from parallel_scan_util import ParallelScanUtil
+from tests_util import TestsUtil
+
+
+class TestParallelScanUtil(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+        self.article_info_items = [
+            {
+                'article_id': 'testid{0:06d}'.format(i),
+                'user_id': 'test01',
+                'status': 'public' if i % 2 == 0 else 'draft',
+                'sort_key': 1520150272000000 + i
+            }
+            for i in range(30)
+        ]
+        TestsUtil.create_table(self.dynamodb, os.environ['ARTICLE_INFO_TABLE_NAME'], self.article_info_items)
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+    def test_scan_items(self):
+        items = list(ParallelScanUtil.scan_items(
+            self.dynamodb, os.environ['ARTICLE_INFO_TABLE_NAME'], scan_params={'Limit': 3}
+        ))
+
+        self.assertEqual(
+            sorted([item['article_id'] for item in items]),
+            [item['article_id'] for item in self.article_info_items]
+        )
+
+    def test_scan_items_with_filter_expression(self):
+        items = list(ParallelScanUtil.scan_items(
+            self.dynamodb,
+            os.environ['ARTICLE_INFO_TABLE_NAME'],
+            scan_params={'FilterExpression': Attr('status').eq('public')}
+        ))
+
+        self.assertEqual(len(items), 15)
+        self.assertTrue(all(item['status'] == 'public' for item in items))
+
+    def test_scan_items_resume_from_checkpoint(self):
+        checkpoint = ParallelScanUtil.create_checkpoint(2)
+        table_name = os.environ['ARTICLE_INFO_TABLE_NAME']
+
+        # 途中で返却を打ち切った場合、checkpoint には返却済みのページまでが反映される
+        scanned_items = []
+        for item in ParallelScanUtil.scan_items(self.dynamodb, table_name, {'Limit': 2}, checkpoint=checkpoint):
+            scanned_items.append(item)
+            if len(scanned_items) == 5:
+                break
+
+        self.assertFalse(ParallelScanUtil.is_completed(checkpoint))
+
+        scanned_items.extend(ParallelScanUtil.scan_items(self.dynamodb, table_name, {'Limit': 2}, checkpoint=checkpoint))
+
+        self.assertTrue(ParallelScanUtil.is_completed(checkpoint))
+        # 反映前のページは再度返却されるため重複を許容する
+        self.assertEqual(
+            sorted(set([item['article_id'] for item in scanned_items])),
+            [item['article_id'] for item in self.article_info_items]
+        )
+        self.assertLessEqual(len(scanned_items), 30 + 2)
+
+    def test_scan_items_resume_from_json_checkpoint_with_number_key(self):
+        article_history_items = [
+            {
+                'article_id': 'testid{0:06d}'.format(i % 3),
+                'created_at': 1520150272 + i,
+                'title': 'title{0}'.format(i)
+            }
+            for i in range(30)
+        ]
+        table_name = os.environ['ARTICLE_HISTORY_TABLE_NAME']
+        TestsUtil.create_table(self.dynamodb, table_name, article_history_items)
+        checkpoint = ParallelScanUtil.create_checkpoint(2)
+
+        scanned_items = []
+        for item in ParallelScanUtil.scan_items(self.dynamodb, table_name, {'Limit': 2}, checkpoint=checkpoint):
+            scanned_items.append(item)
+            if len(scanned_items) == 5:
+                break
+
+        # 数値のソートキーを含む checkpoint を JSON として保存し、復元した checkpoint から再開できる
+        checkpoint = json.loads(json.dumps(checkpoint))
+        self.assertFalse(ParallelScanUtil.is_completed(checkpoint))
+
+        scanned_items.extend(ParallelScanUtil.scan_items(self.dynamodb, table_name, {'Limit': 2}, checkpoint=checkpoint))
+
+        self.assertTrue(ParallelScanUtil.is_completed(checkpoint))
+        self.assertEqual(
+            sorted(set([(item['article_id'], item['created_at']) for item in scanned_items])),
+            sorted([(item['article_id'], item['created_at']) for item in article_history_items])
+        )
+        self.assertLessEqual(len(scanned_items), 30 + 2)
+
+    def test_scan_items_completed_checkpoint(self):
+        checkpoint = ParallelScanUtil.create_checkpoint(2)
+        for segment in checkpoint['segments']:
+            segment['completed'] = True
+
+        items = list(ParallelScanUtil.scan_items(
+            self.dynamodb, os.environ['ARTICLE_INFO_TABLE_NAME'], checkpoint=checkpoint
+        ))
+
+        self.assertEqual(items, [])
+
+    def test_scan_items_with_on_checkpoint(self):
+        on_checkpoint = MagicMock()
+
+        list(ParallelScanUtil.scan_items(
+            self.dynamodb, os.environ['ARTICLE_INFO_TABLE_NAME'], {'Limit': 10}, on_checkpoint=on_checkpoint
+        ))
+
+        self.assertGreater(on_checkpoint.call_count, 0)
+        self.assertTrue(ParallelScanUtil.is_completed(on_checkpoint.call_args[0][0]))
+
+    def test_scan_items_with_max_capacity_units_per_second(self):
+        dynamodb = MagicMock()
+        dynamodb.meta.client.scan.return_value = {
+            'Items': [{'article_id': 'testid000001'}],
+            'ConsumedCapacity': {'CapacityUnits': 0.5}
+        }
+
+        with patch('parallel_scan_util.RateLimiter') as mock_rate_limiter:
+            items = list(ParallelScanUtil.scan_items(
+                dynamodb, 'test_table', checkpoint=ParallelScanUtil.create_checkpoint(2),
+                max_capacity_units_per_second=10
+            ))
+
+        self.assertEqual(len(items), 2)
+        mock_rate_limiter.assert_called_once_with(10)
+        self.assertEqual(mock_rate_limiter.return_value.acquire.call_count, 2)
+        mock_rate_limiter.return_value.consume.assert_called_with(0.5)
+        for args in dynamodb.meta.client.scan.call_args_list:
+            self.assertEqual(args[1]['ReturnConsumedCapacity'], 'TOTAL')
+            self.assertEqual(args[1]['TotalSegments'], 2)
+
+    def test_scan_items_with_max_seconds(self):
+        checkpoint = ParallelScanUtil.create_checkpoint(2)
+
+        items = list(ParallelScanUtil.scan_items(
+            self.dynamodb, os.environ['ARTICLE_INFO_TABLE_NAME'], checkpoint=checkpoint, max_seconds=-1
+        ))
+
+        self.assertEqual(items, [])
+        self.assertFalse(ParallelScanUtil.is_completed(checkpoint))
+
+    def test_scan_items_raise_error(self):
+        dynamodb = MagicMock()
+        dynamodb.meta.client.scan.side_effect = Exception('scan error')
+
+        with self.assertRaises(Exception) as e:
+            list(ParallelScanUtil.scan_items(dynamodb, 'test_table'))
+
+        self.assertEqual(e.exception.args, ('scan error',))
@@ -0,0 +1,120 @@
+import json
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+import settings
+from exceptions import PrivateChainApiError, SendTransactionError
+from private_chain_client import PrivateChainClient
+
+
+class PrivateChainApiFakeResponse:
+    def __init__(self, status_code, text=''):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class TestPrivateChainClient(TestCase):
+    def setUp(self):
+        os.environ['PRIVATE_CHAIN_AWS_ACCESS_KEY'] = 'test'
+        os.environ['PRIVATE_CHAIN_AWS_SECRET_ACCESS_KEY'] = 'test'
+        os.environ['PRIVATE_CHAIN_EXECUTE_API_HOST'] = 'example.com'
+        PrivateChainClient.clear()
+
+    def tearDown(self):
+        PrivateChainClient.clear()
+
+    def test_get_balance(self):
+        with patch('private_chain_client.requests.Session') as mock_session:
+            mock_session.return_value.post.return_value = PrivateChainApiFakeResponse(200, '{"result": "0x10"}')
+
+            result = PrivateChainClient.get_balance('0x5d7743a4a6f21593ff6d3d81595f270123456789')
+
+            self.assertEqual(result, '0x10')
+            args, kwargs = mock_session.return_value.post.call_args
+            self.assertEqual(args[0], 'https://example.com/production/wallet/balance')
+            self.assertEqual(kwargs['json'], {'private_eth_address': '5d7743a4a6f21593ff6d3d81595f270123456789'})
+            self.assertEqual(
+                kwargs['timeout'],
+                (settings.PRIVATE_CHAIN_CONNECT_TIMEOUT, settings.PRIVATE_CHAIN_READ_TIMEOUT)
+            )
+
+    def test_send_tip(self):
+        with patch('private_chain_client.requests.Session') as mock_session:
+            mock_session.return_value.post.return_value = PrivateChainApiFakeResponse(200, '{"result": "0x0123"}')
+
+            result = PrivateChainClient.send_tip('0x0001', '0x0002', 10)
+
+            self.assertEqual(result, '0x0123')
+            args, kwargs = mock_session.return_value.post.call_args
+            self.assertEqual(args[0], 'https://example.com/production/wallet/tip')
+            self.assertEqual(kwargs['json'], {
+                'from_user_eth_address': '0x0001',
+                'to_user_eth_address': '0002',
+                'tip_value': format(10, '064x')
+            })
+
+    def test_send_tip_ng_with_error(self):
+        with patch('private_chain_client.requests.Session') as mock_session:
+            mock_session.return_value.post.return_value = PrivateChainApiFakeResponse(200, '{"error": "failed"}')
+
+            with self.assertRaises(SendTransactionError):
+                PrivateChainClient.send_tip('0x0001', '0x0002', 10)
+
+    def test_get_transaction_receipt(self):
+        with patch('private_chain_client.requests.Session') as mock_session:
+            mock_session.return_value.post.return_value = PrivateChainApiFakeResponse(
+                200, '{"result": {"status": "0x1"}}'
+            )
+
+            self.assertEqual(PrivateChainClient.get_transaction_receipt('0x0123'), {'status': '0x1'})
+            args, kwargs = mock_session.return_value.post.call_args
+            self.assertEqual(args[0], 'https://example.com/production/transaction/receipt')
+            self.assertEqual(kwargs['json'], {'transaction_hash': '0x0123'})
+
+    def test_get_transaction_receipt_pending(self):
+        with patch('private_chain_client.requests.Session') as mock_session:
+            mock_session.return_value.post.return_value = PrivateChainApiFakeResponse(200, '{"result": null}')
+
+            self.assertIsNone(PrivateChainClient.get_transaction_receipt('0x0123'))
+
+    def test_create_account(self):
+        with patch('private_chain_client.requests.Session') as mock_session:
+            mock_session.return_value.post.return_value = PrivateChainApiFakeResponse(200, '{"result": "my_address"}')
+
+            self.assertEqual(PrivateChainClient.create_account(), 'my_address')
+            self.assertIsNone(mock_session.return_value.post.call_args[1]['json'])
+
+    def test_create_account_ng_with_status_code(self):
+        with patch('private_chain_client.requests.Session') as mock_session:
+            mock_session.return_value.post.return_value = PrivateChainApiFakeResponse(500, 'error')
+
+            with self.assertRaises(PrivateChainApiError):
+                PrivateChainClient.create_account()
+
+    def test_reuse_session(self):
+        with patch('private_chain_client.requests.Session') as mock_session, \
+                patch('private_chain_client.AWSRequestsAuth') as mock_auth:
+            mock_session.return_value.post.return_value = PrivateChainApiFakeResponse(200, '{"result": "0x10"}')
+
+            PrivateChainClient.get_balance('0x0001')
+            PrivateChainClient.get_balance('0x0001')
+
+            # セッションと署名情報は呼び出しごとに生成しない
+            self.assertEqual(mock_session.call_count, 1)
+            self.assertEqual(mock_auth.call_count, 1)
+            self.assertEqual(mock_session.return_value.post.call_count, 2)
+            self.assertEqual(mock_session.return_value.post.call_args[1]['auth'], mock_auth.return_value)
+
+    def test_retry_only_connect_error(self):
+        with patch('private_chain_client.requests.Session') as mock_session:
+            mock_session.return_value.post.return_value = PrivateChainApiFakeResponse(200, '{"result": "0x10"}')
+            PrivateChainClient.get_balance('0x0001')
+
+            adapter = mock_session.return_value.mount.call_args[0][1]
+            self.assertEqual(adapter.max_retries.connect, settings.PRIVATE_CHAIN_MAX_RETRY_COUNT)
+            self.assertEqual(adapter.max_retries.read, 0)
+            self.assertEqual(adapter.max_retries.status, 0)
@@ -0,0 +1,61 @@
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from private_eth_address_cache import PrivateEthAddressCache
+from tests_util import TestsUtil
+
+
+class TestPrivateEthAddressCache(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+        PrivateEthAddressCache.clear()
+
+        user_private_eth_address_items = [
+            {'user_id': 'test01', 'private_eth_address': '0x0000000000000000000000000000000000000001'},
+            {'user_id': 'test02', 'private_eth_address': '0x0000000000000000000000000000000000000002'},
+            {'user_id': 'test03', 'private_eth_address': '0x0000000000000000000000000000000000000003'}
+        ]
+        TestsUtil.create_table(
+            self.dynamodb, os.environ['USER_PRIVATE_ETH_ADDRESS_TABLE_NAME'], user_private_eth_address_items
+        )
+        self.table = self.dynamodb.Table(os.environ['USER_PRIVATE_ETH_ADDRESS_TABLE_NAME'])
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+        PrivateEthAddressCache.clear()
+
+    def test_get(self):
+        self.assertEqual(
+            PrivateEthAddressCache.get(self.dynamodb, 'test01'), '0x0000000000000000000000000000000000000001'
+        )
+
+        # 2回目はメモリ上のキャッシュから取得する
+        self.table.delete_item(Key={'user_id': 'test01'})
+        self.assertEqual(
+            PrivateEthAddressCache.get(self.dynamodb, 'test01'), '0x0000000000000000000000000000000000000001'
+        )
+
+    def test_get_not_exists(self):
+        self.assertIsNone(PrivateEthAddressCache.get(self.dynamodb, 'test99'))
+
+    def test_put(self):
+        PrivateEthAddressCache.put(self.dynamodb, 'test04', '0x0000000000000000000000000000000000000004')
+
+        self.assertEqual(
+            self.table.get_item(Key={'user_id': 'test04'})['Item']['private_eth_address'],
+            '0x0000000000000000000000000000000000000004'
+        )
+        self.assertEqual(PrivateEthAddressCache.addresses['test04'], '0x0000000000000000000000000000000000000004')
+
+    @patch('private_eth_address_cache.settings.PRIVATE_ETH_ADDRESS_CACHE_MAX_SIZE', 2)
+    def test_get_evicts_least_recently_used(self):
+        PrivateEthAddressCache.get(self.dynamodb, 'test01')
+        PrivateEthAddressCache.get(self.dynamodb, 'test02')
+        PrivateEthAddressCache.get(self.dynamodb, 'test01')
+        PrivateEthAddressCache.get(self.dynamodb, 'test03')
+
+        self.assertEqual(list(PrivateEthAddressCache.addresses.keys()), ['test01', 'test03'])
@@ -0,0 +1,41 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from rate_limiter import RateLimiter
+
+
+class TestRateLimiter(TestCase):
+    def test_acquire_with_tokens(self):
+        rate_limiter = RateLimiter(10)
+
+        with patch('rate_limiter.time.sleep') as mock_sleep:
+            rate_limiter.acquire()
+
+            mock_sleep.assert_not_called()
+
+    def test_acquire_wait_until_refilled(self):
+        with patch('rate_limiter.time.time', return_value=1520150000):
+            rate_limiter = RateLimiter(10)
+            rate_limiter.consume(15)
+
+        now = [1520150000]
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        with patch('rate_limiter.time.time', side_effect=lambda: now[0]), \
+                patch('rate_limiter.time.sleep', side_effect=sleep) as mock_sleep:
+            rate_limiter.acquire()
+
+            # 不足分(5)を秒間10で補充するため0.5秒待機する
+            mock_sleep.assert_called_once_with(0.5)
+
+    def test_refill_up_to_burst(self):
+        with patch('rate_limiter.time.time', return_value=1520150000):
+            rate_limiter = RateLimiter(10, burst=20)
+            rate_limiter.consume(20)
+
+        with patch('rate_limiter.time.time', return_value=1520150000 + 100):
+            rate_limiter.consume(0)
+
+        self.assertEqual(rate_limiter.tokens, 20)
@@ -0,0 +1,140 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from elasticsearch import Elasticsearch
+from tests_es_util import TestsEsUtil
+
+import settings
+from tag_dictionary import TagDictionary
+from tag_util import TagUtil
+
+
+class TestTagDictionary(TestCase):
+    elasticsearch = Elasticsearch(
+        hosts=[{'host': 'localhost'}]
+    )
+
+    def setUp(self):
+        TestsEsUtil.create_tag_index(self.elasticsearch)
+        TestsEsUtil.create_tag_with_count(self.elasticsearch, 'ALIS', 1)
+        TestsEsUtil.create_tag_with_count(self.elasticsearch, 'alis alis', 2)
+        TestsEsUtil.create_tag_with_count(self.elasticsearch, 'alismedia', 3)
+        TestsEsUtil.create_tag_with_count(self.elasticsearch, 'hoge', 4)
+        TagDictionary.clear()
+
+    def tearDown(self):
+        self.elasticsearch.indices.delete(index=settings.TAG_INDEX_NAME, ignore=[404])
+        TagDictionary.clear()
+
+    def test_search_tag(self):
+        result = TagDictionary.search_tag(self.elasticsearch, 'ALI', 100, 1)
+        self.assertEqual([tag['name'] for tag in result], ['alismedia', 'alis alis', 'ALIS'])
+
+        result = TagDictionary.search_tag(self.elasticsearch, 'alis ', 100, 1)
+        self.assertEqual([tag['name'] for tag in result], ['alis alis'])
+
+        result = TagDictionary.search_tag(self.elasticsearch, 'fuga', 100, 1)
+        self.assertEqual(result, [])
+
+    def test_search_tag_with_limit_and_page(self):
+        result = TagDictionary.search_tag(self.elasticsearch, 'ali', 1, 2)
+        self.assertEqual([tag['name'] for tag in result], ['alis alis'])
+
+        result = TagDictionary.search_tag(self.elasticsearch, 'ali', 2, 2)
+        self.assertEqual([tag['name'] for tag in result], ['ALIS'])
+
+    def test_search_tag_over_max_gram(self):
+        TestsEsUtil.create_tag_with_count(self.elasticsearch, 'A' * 25, 1)
+
+        result = TagDictionary.search_tag(self.elasticsearch, 'a' * settings.TAG_AUTOCOMPLETE_MAX_GRAM, 100, 1)
+        self.assertEqual([tag['name'] for tag in result], ['A' * 25])
+
+        result = TagDictionary.search_tag(self.elasticsearch, 'a' * (settings.TAG_AUTOCOMPLETE_MAX_GRAM + 1), 100, 1)
+        self.assertEqual(result, [])
+
+    def test_search_tag_does_not_request_es_when_loaded(self):
+        TagDictionary.search_tag(self.elasticsearch, 'ali', 100, 1)
+
+        with patch.object(self.elasticsearch, 'search', wraps=self.elasticsearch.search) as mock_search:
+            result = TagDictionary.search_tag(self.elasticsearch, 'hoge', 100, 1)
+
+            self.assertEqual([tag['name'] for tag in result], ['hoge'])
+            self.assertFalse(mock_search.called)
+
+    def test_search_tag_with_incremental_refresh(self):
+        TagDictionary.search_tag(self.elasticsearch, 'ali', 100, 1)
+
+        TagUtil.create_tag(self.elasticsearch, 'Alice')
+        TagUtil.update_count(self.elasticsearch, 'ALIS', 10)
+        self.elasticsearch.indices.refresh(index=settings.TAG_INDEX_NAME)
+
+        # 更新間隔内はメモリ上の情報を返却する
+        result = TagDictionary.search_tag(self.elasticsearch, 'ali', 100, 1)
+        self.assertEqual([tag['name'] for tag in result], ['alismedia', 'alis alis', 'ALIS'])
+
+        TagDictionary.refreshed_at -= settings.TAG_DICTIONARY_REFRESH_INTERVAL + 1
+
+        result = TagDictionary.search_tag(self.elasticsearch, 'ali', 100, 1)
+        self.assertEqual([tag['name'] for tag in result], ['ALIS', 'alismedia', 'alis alis', 'Alice'])
+
+    def test_search_tag_fallback_to_es_when_load_failed(self):
+        mock_es_util = MagicMock()
+        mock_es_util.search_tag.return_value = [{'name': 'ALIS'}]
+
+        with patch.object(self.elasticsearch, 'count', MagicMock(side_effect=Exception())), \
+                patch('tag_dictionary.ESUtil', mock_es_util):
+            result = TagDictionary.search_tag(self.elasticsearch, 'ali', 100, 1)
+
+            self.assertEqual(result, [{'name': 'ALIS'}])
+            args, _ = mock_es_util.search_tag.call_args
+            self.assertEqual(args[1:], ('ali', 100, 1))
+
+    def test_search_tag_fallback_to_es_when_stale(self):
+        TagDictionary.search_tag(self.elasticsearch, 'ali', 100, 1)
+        TagDictionary.refreshed_at -= settings.TAG_DICTIONARY_MAX_STALENESS + 1
+
+        mock_es_util = MagicMock()
+        mock_es_util.search_tag.return_value = []
+
+        with patch.object(self.elasticsearch, 'search', MagicMock(side_effect=Exception())), \
+                patch('tag_dictionary.ESUtil', mock_es_util):
+            TagDictionary.search_tag(self.elasticsearch, 'ali', 100, 1)
+
+            self.assertTrue(mock_es_util.search_tag.called)
+
+    def test_search_tag_with_incremental_refresh_keeps_prefix_order(self):
+        TagDictionary.search_tag(self.elasticsearch, 'ali', 100, 1)
+
+        # 大文字小文字違いのタグはカウントの大きいものに置き換わる
+        TestsEsUtil.create_tag_with_count(self.elasticsearch, 'alis', 5)
+        TagUtil.update_count(self.elasticsearch, 'alismedia', -3)
+        self.elasticsearch.indices.refresh(index=settings.TAG_INDEX_NAME)
+        TagDictionary.refreshed_at -= settings.TAG_DICTIONARY_REFRESH_INTERVAL + 1
+
+        for word in ['a', 'al', 'ali', 'alis']:
+            result = TagDictionary.search_tag(self.elasticsearch, word, 100, 1)
+            self.assertEqual([tag['name'] for tag in result], ['alis', 'alis alis', 'alismedia'])
+
+        self.assertEqual(
+            TagDictionary.prefixes['ali'],
+            sorted(TagDictionary.prefixes['ali'])
+        )
+
+    def test_search_tag_fallback_to_es_when_too_many_tags(self):
+        mock_es_util = MagicMock()
+        mock_es_util.search_tag.return_value = []
+
+        with patch('settings.TAG_DICTIONARY_MAX_SIZE', 3), patch('tag_dictionary.ESUtil', mock_es_util), \
+                patch.object(self.elasticsearch, 'count', wraps=self.elasticsearch.count) as mock_count:
+            TagDictionary.search_tag(self.elasticsearch, 'ali', 100, 1)
+            TagDictionary.search_tag(self.elasticsearch, 'ali', 100, 1)
+
+            self.assertEqual(mock_es_util.search_tag.call_count, 2)
+            self.assertEqual(TagDictionary.tags, {})
+            # 上限を超えていた判定は一定時間保持し、リクエストごとに件数を確認しない
+            self.assertEqual(mock_count.call_count, 1)
+
+            TagDictionary.too_large_until -= settings.TAG_DICTIONARY_RELOAD_INTERVAL + 1
+            TagDictionary.search_tag(self.elasticsearch, 'ali', 100, 1)
+
+            self.assertEqual(mock_count.call_count, 2)
@@ -1,10 +1,13 @@
+import os
 from decimal import Decimal
 from unittest import TestCase
+from unittest.mock import patch
 
 from elasticsearch import Elasticsearch
 from jsonschema import ValidationError
 from tests_es_util import TestsEsUtil
 
+import settings
 from tag_util import TagUtil
 from tests_util import TestsUtil
 
@@ -24,7 +27,7 @@ class TestTagUtil(TestCase):
         TestsUtil.delete_all_tables(self.dynamodb)
         self.elasticsearch.indices.delete(index="tags", ignore=[404])
 
-    def test_create_and_count_ok(self):
+    def test_update_counts_ok(self):
         TagUtil.create_tag(self.elasticsearch, 'A')
         TagUtil.update_count(self.elasticsearch, 'A', 1)
         TagUtil.create_tag(self.elasticsearch, 'B')
@@ -34,10 +37,11 @@ class TestTagUtil(TestCase):
         TagUtil.update_count(self.elasticsearch, 'F', -1)
         self.elasticsearch.indices.refresh(index="tags")
 
-        before_tag_names = ['A', 'B', 'C', 'F']
-        after_tag_names = ['A', 'D', 'E']
+        tag_count_deltas = [('D', 1), ('E', 1), ('B', -1), ('C', -1), ('F', -1)]
 
-        TagUtil.create_and_count(self.elasticsearch, before_tag_names, after_tag_names)
+        failed_tag_keys = TagUtil.update_counts(self.elasticsearch, tag_count_deltas)
+
+        self.assertEqual(failed_tag_keys, set())
 
         self.elasticsearch.indices.refresh(index="tags")
 
@@ -73,92 +77,86 @@ class TestTagUtil(TestCase):
 
         for tag in tags:
             del tag['created_at']
+            del tag['updated_at']
 
         tags = sorted(tags, key=lambda t: t['name'])
 
         self.assertEqual(tags, expected)
 
-    def test_create_and_count_with_null_before_tag_names(self):
+    def test_update_counts_with_constant_es_requests(self):
         TagUtil.create_tag(self.elasticsearch, 'A')
         TagUtil.create_tag(self.elasticsearch, 'B')
+        TagUtil.create_tag(self.elasticsearch, 'C')
         self.elasticsearch.indices.refresh(index="tags")
 
-        before_tag_names = None
-        after_tag_names = ['a', 'D', 'E']
+        tag_count_deltas = [('d', 1), ('E', 1), ('F', 1), ('G', 1), ('H', 1), ('A', -1), ('B', -1), ('C', -1)]
 
-        TagUtil.create_and_count(self.elasticsearch, before_tag_names, after_tag_names)
-        self.elasticsearch.indices.refresh(index="tags")
+        with patch.object(self.elasticsearch, 'search', wraps=self.elasticsearch.search) as mock_search, \
+                patch.object(self.elasticsearch, 'bulk', wraps=self.elasticsearch.bulk) as mock_bulk:
+            TagUtil.update_counts(self.elasticsearch, tag_count_deltas)
 
-        tags = TestsEsUtil.get_all_tags(self.elasticsearch)
-
-        expected = [
-            {
-                'name': 'A',
-                'name_with_analyzer': 'A',
-                'count': Decimal('2'),
-            },
-            {
-                'name': 'B',
-                'name_with_analyzer': 'B',
-                'count': Decimal('1'),
-            },
-            {
-                'name': 'D',
-                'name_with_analyzer': 'D',
-                'count': Decimal('1'),
-            },
-            {
-                'name': 'E',
-                'name_with_analyzer': 'E',
-                'count': Decimal('1'),
-            },
-        ]
+            self.assertEqual(mock_search.call_count, 1)
+            self.assertEqual(mock_bulk.call_count, 1)
 
-        for tag in tags:
-            del tag['created_at']
+        self.elasticsearch.indices.refresh(index="tags")
 
-        tags = sorted(tags, key=lambda t: t['name'])
+        tags = TestsEsUtil.get_all_tags(self.elasticsearch)
+        counts = {tag['name']: tag['count'] for tag in tags}
 
-        self.assertEqual(tags, expected)
+        self.assertEqual(counts, {'A': 0, 'B': 0, 'C': 0, 'd': 1, 'E': 1, 'F': 1, 'G': 1, 'H': 1})
 
-    def test_create_and_count_with_null_after_tag_names(self):
+    def test_update_counts_with_failed_actions(self):
         TagUtil.create_tag(self.elasticsearch, 'A')
         TagUtil.create_tag(self.elasticsearch, 'B')
-        TagUtil.create_tag(self.elasticsearch, 'E')
         self.elasticsearch.indices.refresh(index="tags")
 
-        before_tag_names = ['A', 'b', 'C']
-        after_tag_names = None
+        tag_count_deltas = [('a', 1), ('B', 1), ('c', 1), ('D', -1)]
 
-        TagUtil.create_and_count(self.elasticsearch, before_tag_names, after_tag_names)
-        self.elasticsearch.indices.refresh(index="tags")
+        # B の更新のみ失敗した場合
+        with patch('tag_util.helpers.streaming_bulk') as mock_streaming_bulk:
+            mock_streaming_bulk.return_value = iter([
+                (True, {'update': {'_id': 'A', 'status': 200}}),
+                (False, {'update': {'_id': 'B', 'status': 429}}),
+                (True, {'update': {'_id': 'c', 'status': 201}})
+            ])
 
-        tags = TestsEsUtil.get_all_tags(self.elasticsearch)
+            failed_tag_keys = TagUtil.update_counts(self.elasticsearch, tag_count_deltas)
 
-        expected = [
-            {
-                'name': 'A',
-                'name_with_analyzer': 'A',
-                'count': Decimal('0'),
-            },
-            {
-                'name': 'B',
-                'name_with_analyzer': 'B',
-                'count': Decimal('0'),
-            },
-            {
-                'name': 'E',
-                'name_with_analyzer': 'E',
-                'count': Decimal('1'),
-            },
-        ]
+        self.assertEqual(failed_tag_keys, {'b'})
+        self.assertEqual(mock_streaming_bulk.call_args[1], {'raise_on_error': False, 'raise_on_exception': False})
 
-        for tag in tags:
-            del tag['created_at']
+    def test_update_counts_with_no_deltas(self):
+        with patch('tag_util.helpers.streaming_bulk') as mock_streaming_bulk:
+            self.assertEqual(TagUtil.update_counts(self.elasticsearch, []), set())
 
-        tags = sorted(tags, key=lambda t: t['name'])
+        self.assertEqual(mock_streaming_bulk.call_count, 0)
 
-        self.assertEqual(tags, expected)
+    def test_put_count_events(self):
+        TestsUtil.create_table(self.dynamodb, os.environ['TAG_COUNT_EVENT_TABLE_NAME'], [])
+
+        before_tag_names = ['A', 'B', 'C']
+        after_tag_names = ['A', 'd', 'E']
+
+        TagUtil.put_count_events(self.dynamodb, before_tag_names, after_tag_names)
+
+        tag_count_events = self.dynamodb.Table(os.environ['TAG_COUNT_EVENT_TABLE_NAME']).scan()['Items']
+
+        self.assertEqual(
+            sorted([(event['name'], event['count']) for event in tag_count_events]),
+            [('B', -1), ('C', -1), ('E', 1), ('d', 1)]
+        )
+        # タグのカウントはイベントの記録時点ではESに反映されない
+        self.assertEqual(TestsEsUtil.get_all_tags(self.elasticsearch), [])
+
+    def test_put_count_events_with_no_changes(self):
+        TestsUtil.create_table(self.dynamodb, os.environ['TAG_COUNT_EVENT_TABLE_NAME'], [])
+
+        TagUtil.put_count_events(self.dynamodb, ['A', 'B'], ['A', 'B'])
+        TagUtil.put_count_events(self.dynamodb, None, None)
+
+        tag_count_events = self.dynamodb.Table(os.environ['TAG_COUNT_EVENT_TABLE_NAME']).scan()['Items']
+
+        self.assertEqual(tag_count_events, [])
 
     def test_validate_format(self):
         def expected_raise_error(args):
@@ -202,6 +200,20 @@ class TestTagUtil(TestCase):
 
         self.assertEquals(result, ['aaa', 'BbB', 'CCC', 'DDD'])
 
+    def test_get_tags_with_name_collation_with_case_variants(self):
+        # 大文字小文字違いのタグが複数存在する場合も、他のタグが切り捨てられない
+        TestsEsUtil.create_tag_with_count(self.elasticsearch, 'AWS', 1)
+        TestsEsUtil.create_tag_with_count(self.elasticsearch, 'aws', 3)
+        TestsEsUtil.create_tag_with_count(self.elasticsearch, 'Aws', 2)
+        TestsEsUtil.create_tag_with_count(self.elasticsearch, 'BbB', 1)
+
+        self.elasticsearch.indices.refresh(index=settings.TAG_INDEX_NAME)
+
+        result = TagUtil.get_tags_with_name_collation(self.elasticsearch, ['AWS', 'bbb'])
+
+        # カウントの大きいタグ名に揃える
+        self.assertEqual(result, ['aws', 'BbB'])
+
     def test_get_tags_with_name_collation_with_none(self):
         TagUtil.create_tag(self.elasticsearch, "aaa")
         TagUtil.create_tag(self.elasticsearch, "BbB")
@@ -1,6 +1,10 @@
-from unittest import TestCase
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
 from text_sanitizer import TextSanitizer
+import bleach
 import os
+import settings
+import time
 
 
 class TestTextSanitizer(TestCase):
@@ -8,6 +12,9 @@ class TestTextSanitizer(TestCase):
     def setUpClass(cls):
         os.environ['DOMAIN'] = 'example.com'
 
+    def setUp(self):
+        TextSanitizer.clear()
+
     def test_sanitize_text(self):
         target_html = '''
         Sample text
@@ -33,6 +40,33 @@ class TestTextSanitizer(TestCase):
 
         self.assertEqual(result, expected_html)
 
+    def test_sanitize_text_memo(self):
+        result = TextSanitizer.sanitize_text('<b>bold</b>')
+
+        self.assertEqual(result, '&lt;b&gt;bold&lt;/b&gt;')
+        self.assertEqual(TextSanitizer.sanitized_texts, {'<b>bold</b>': result})
+        with patch.object(TextSanitizer.text_cleaner, 'clean') as mock_clean:
+            self.assertEqual(TextSanitizer.sanitize_text('<b>bold</b>'), result)
+            mock_clean.assert_not_called()
+
+    def test_sanitize_text_memo_with_long_text(self):
+        text = '<b>' + 'a' * settings.TEXT_SANITIZER_MEMO_MAX_LENGTH + '</b>'
+
+        result = TextSanitizer.sanitize_text(text)
+
+        self.assertEqual(result, '&lt;b&gt;' + 'a' * settings.TEXT_SANITIZER_MEMO_MAX_LENGTH + '&lt;/b&gt;')
+        self.assertEqual(len(TextSanitizer.sanitized_texts), 0)
+
+    @patch('text_sanitizer.settings.TEXT_SANITIZER_MEMO_MAX_SIZE', 2)
+    def test_sanitize_text_memo_max_size(self):
+        TextSanitizer.sanitize_text('a')
+        TextSanitizer.sanitize_text('b')
+        TextSanitizer.sanitize_text('a')
+        TextSanitizer.sanitize_text('c')
+
+        # 最も長く参照されていない入力から削除する
+        self.assertEqual(list(TextSanitizer.sanitized_texts.keys()), ['a', 'c'])
+
     def test_sanitize_text_with_none_text(self):
         result = TextSanitizer.sanitize_text(None)
 
@@ -85,6 +119,9 @@ class TestTextSanitizer(TestCase):
         result = TextSanitizer.sanitize_article_body(target_html)
 
         self.assertEqual(result, target_html)
+        # Cleaner を再利用しても同じ結果となる
+        self.assertEqual(TextSanitizer.sanitize_article_body(target_html), target_html)
+        self.assertEqual(TextSanitizer.sanitize_article_body_incremental(target_html), target_html)
 
     def test_sanitize_article_body_with_none_text(self):
         result = TextSanitizer.sanitize_text(None)
@@ -213,6 +250,76 @@ class TestTextSanitizer(TestCase):
 
         self.assertEqual(result, expected_html)
 
+    def test_sanitize_article_body_incremental(self):
+        target_html = '''
+        <h2>sample h2</h2>
+        <p>sentence<br><b>bold</b></p>
+        <script>document.alert('evil')</script>
+        <img src="http://hoge.com/hoge.png" onerror='document.alert('evil')'>
+        <div class='hoge'><figure contenteditable='true'></figure></div>
+        '''
+
+        result = TextSanitizer.sanitize_article_body_incremental(target_html)
+
+        self.assertEqual(result, TextSanitizer.sanitize_article_body(target_html))
+
+    @patch('text_sanitizer.settings.ARTICLE_BODY_BLOCK_GROUP_SIZE', 1)
+    def test_sanitize_article_body_incremental_with_changed_block(self):
+        TextSanitizer.sanitize_article_body_incremental('<h2>title</h2>\n<p>sentence</p>\n<p>hoge</p>')
+
+        with patch.object(
+                TextSanitizer.article_body_cleaner, 'clean', wraps=TextSanitizer.article_body_cleaner.clean
+        ) as mock_clean:
+            result = TextSanitizer.sanitize_article_body_incremental(
+                '<h2>title</h2>\n<p>sentence<a href="x" onclick="evil">link</a></p>\n<p>hoge</p>'
+            )
+
+        # 変更されたブロックのみを sanitize する
+        self.assertEqual(result, '<h2>title</h2>\n<p>sentence<a href="x">link</a></p>\n<p>hoge</p>')
+        mock_clean.assert_called_once_with('\n<p>sentence<a href="x" onclick="evil">link</a></p>')
+
+    def test_sanitize_article_body_incremental_with_grouped_blocks(self):
+        blocks = ['<p>sentence{0}</p>\n'.format(i) for i in range(100)]
+        TextSanitizer.sanitize_article_body_incremental(''.join(blocks))
+        cached_count = len(TextSanitizer.sanitized_article_body_blocks)
+        blocks[50] = '<p>changed<a href="x" onclick="evil">link</a></p>\n'
+
+        with patch.object(
+                TextSanitizer.article_body_cleaner, 'clean', wraps=TextSanitizer.article_body_cleaner.clean
+        ) as mock_clean:
+            result = TextSanitizer.sanitize_article_body_incremental(''.join(blocks))
+
+        # 複数の要素をまとめて sanitize し、変更された要素を含むブロックのみを sanitize する
+        self.assertLess(cached_count, 100)
+        self.assertEqual(result, TextSanitizer.sanitize_article_body(''.join(blocks)))
+        mock_clean.assert_called_once()
+        self.assertIn(blocks[50], mock_clean.call_args[0][0])
+
+    @patch('text_sanitizer.settings.ARTICLE_BODY_BLOCK_GROUP_SIZE', 1)
+    @patch('text_sanitizer.settings.ARTICLE_BODY_BLOCK_CACHE_MAX_SIZE', 2)
+    def test_sanitize_article_body_incremental_cache_max_size(self):
+        TextSanitizer.sanitize_article_body_incremental('<p>a</p><p>b</p><p>c</p>')
+
+        self.assertEqual(list(TextSanitizer.sanitized_article_body_blocks.values()), ['<p>b</p>', '<p>c</p>'])
+
+    def test_sanitize_article_body_incremental_with_none_text(self):
+        self.assertIsNone(TextSanitizer.sanitize_article_body_incremental(None))
+
+    def test_split_article_body(self):
+        for text, expected_blocks in [
+            ('', []),
+            ('text', ['text']),
+            ('<p>a</p>\n<p>b<br>c</p>\ntext', ['<p>a</p>', '\n<p>b<br>c</p>', '\ntext']),
+            ('<hr><div><figure><img src="/a"></figure></div>', ['<hr><div><figure><img src="/a"></figure></div>']),
+            ('<div data-x="a>b">a</div><p>b</p>', ['<div data-x="a>b">a</div>', '<p>b</p>']),
+            ('<p>a<!-- </p> -->b</p><p>c</p>', ['<p>a<!-- </p> -->b</p>', '<p>c</p>']),
+            # 許可しないタグを含む場合・入れ子が正しくない場合は以降を1つのブロックとする
+            ('<p>a</p><script><p>b</p></script><p>c</p>', ['<p>a</p>', '<script><p>b</p></script><p>c</p>']),
+            ('<p>a</p><b><i></b></i><p>c</p>', ['<p>a</p>', '<b><i></b></i><p>c</p>']),
+            ('<p>a<div>b</div></p><p>c</p>', ['<p>a<div>b</div></p>', '<p>c</p>'])
+        ]:
+            self.assertEqual(TextSanitizer.split_article_body(text), expected_blocks)
+
     def test_sanitize_article_body_with_div(self):
         target_html = '''
         <h2>sample h2</h2>
@@ -227,3 +334,89 @@ class TestTextSanitizer(TestCase):
         result = TextSanitizer.sanitize_article_body(target_html)
 
         self.assertEqual(result, expected_html)
+
+
+@skipUnless(os.environ.get('BENCHMARK'), 'set BENCHMARK=1 to run benchmarks')
+class TestTextSanitizerBenchmark(TestCase):
+    """
+    記事本文の上限(65,535 文字)の本文での処理時間を、従来の処理(呼び出しごとに bleach.clean を行う)と比較する
+    BENCHMARK=1 python exec_test.py tests/common/test_text_sanitizer.py
+    """
+    ITERATIONS = 20
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ['DOMAIN'] = 'example.com'
+
+    @staticmethod
+    def legacy_sanitize_article_body(text):
+        return bleach.clean(
+            text=text,
+            tags=settings.html_allowed_tags,
+            attributes={
+                'a': ['href'],
+                'img': TextSanitizer.allow_img_src,
+                'div': TextSanitizer.allow_div_attributes,
+                'figure': TextSanitizer.allow_figure_contenteditable,
+                'figcaption': TextSanitizer.allow_figcaption_attributes
+            }
+        )
+
+    @staticmethod
+    def legacy_sanitize_text(text):
+        return bleach.clean(text=text, tags=[])
+
+    @staticmethod
+    def create_article_body(length):
+        block = '''<h2>見出し</h2><p>本文の段落です。<b>太字</b>と<a href="https://example.com">リンク</a></p>
+<div class="medium-insert-images"><figure contenteditable="false"><img src="https://example.com/d/api/hoge.png">
+<figcaption class="" contenteditable="true">キャプション</figcaption></figure></div>
+<div data-alis-iframely-url="https://twitter.com/hoge">hoge</div><p onclick="document.alert('evil')">段落</p>
+'''
+        return (block * (length // len(block) + 1))[:length]
+
+    def measure(self, function, *args):
+        started_at = time.perf_counter()
+        for _ in range(self.ITERATIONS):
+            function(*args)
+        return (time.perf_counter() - started_at) / self.ITERATIONS
+
+    def test_benchmark_sanitize_article_body(self):
+        body = self.create_article_body(65535)
+        self.assertEqual(TextSanitizer.sanitize_article_body(body), self.legacy_sanitize_article_body(body))
+
+        legacy = self.measure(self.legacy_sanitize_article_body, body)
+        current = self.measure(TextSanitizer.sanitize_article_body, body)
+
+        print('sanitize_article_body {0} chars: legacy {1:.4f}s, text_sanitizer {2:.4f}s'.format(
+            len(body), legacy, current
+        ))
+
+    def test_benchmark_sanitize_article_body_incremental(self):
+        # 下書きの自動保存ごとに本文の末尾の段落のみが変更される場合
+        body = self.create_article_body(65500)
+        TextSanitizer.clear()
+        TextSanitizer.sanitize_article_body_incremental(body)
+        changed_bodies = iter([body + '<p>追記{0}</p>'.format(i) for i in range(self.ITERATIONS * 2)])
+        self.assertEqual(
+            TextSanitizer.sanitize_article_body_incremental(body + '<p>追記</p>'),
+            self.legacy_sanitize_article_body(body + '<p>追記</p>')
+        )
+
+        legacy = self.measure(lambda: self.legacy_sanitize_article_body(next(changed_bodies)))
+        current = self.measure(lambda: TextSanitizer.sanitize_article_body_incremental(next(changed_bodies)))
+
+        print('sanitize_article_body_incremental {0} chars: legacy {1:.4f}s, text_sanitizer {2:.4f}s'.format(
+            len(body), legacy, current
+        ))
+
+    def test_benchmark_sanitize_text(self):
+        # 下書きの更新ごとにタイトル(2回)・概要を sanitize_text で処理する
+        texts = ['記事のタイトル', '記事のタイトル', '記事の概要です。' * 10]
+
+        legacy = self.measure(lambda: [self.legacy_sanitize_text(text) for text in texts])
+        current = self.measure(lambda: [TextSanitizer.sanitize_text(text) for text in texts])
+
+        print('sanitize_text {0} texts: legacy {1:.6f}s, text_sanitizer {2:.6f}s'.format(
+            len(texts), legacy, current
+        ))
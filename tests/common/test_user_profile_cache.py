@@ -0,0 +1,98 @@
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from db_util import DBUtil
+from tests_util import TestsUtil
+from user_profile_cache import UserProfileCache
+
+
+class TestUserProfileCache(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+        self.users_items = [
+            {
+                'user_id': 'test01',
+                'user_display_name': 'display_name01',
+                'self_introduction': 'self_introduction01',
+                'icon_image_url': 'http://example.com/icon01.png',
+                'sync_elasticsearch': 1
+            },
+            {
+                'user_id': 'test02',
+                'user_display_name': 'display_name02',
+                'self_introduction': 'self_introduction02'
+            }
+        ]
+        TestsUtil.create_table(self.dynamodb, os.environ['USERS_TABLE_NAME'], self.users_items)
+        UserProfileCache.clear()
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+        UserProfileCache.clear()
+
+    def test_get_profiles(self):
+        profiles = UserProfileCache.get_profiles(self.dynamodb, ['test01', 'test02', 'test01', 'not_exists'])
+
+        expected = {
+            'test01': {
+                'user_id': 'test01',
+                'user_display_name': 'display_name01',
+                'self_introduction': 'self_introduction01',
+                'icon_image_url': 'http://example.com/icon01.png'
+            },
+            'test02': {
+                'user_id': 'test02',
+                'user_display_name': 'display_name02',
+                'self_introduction': 'self_introduction02'
+            }
+        }
+
+        self.assertEqual(profiles, expected)
+
+    def test_get_profiles_with_cache(self):
+        UserProfileCache.get_profiles(self.dynamodb, ['test01', 'not_exists'])
+
+        with patch('user_profile_cache.DBUtil.batch_get_items', wraps=DBUtil.batch_get_items) as mock_batch_get_items:
+            profiles = UserProfileCache.get_profiles(self.dynamodb, ['test01', 'test02', 'not_exists'])
+
+            # キャッシュ済みのユーザー(存在しないユーザーを含む)は取得しない
+            self.assertEqual(mock_batch_get_items.call_count, 1)
+            self.assertEqual(mock_batch_get_items.call_args[0][2], [{'user_id': 'test02'}])
+
+        self.assertEqual(sorted(profiles.keys()), ['test01', 'test02'])
+
+    def test_get_profiles_expired(self):
+        with patch('user_profile_cache.time.time', return_value=1520150000):
+            UserProfileCache.get_profiles(self.dynamodb, ['test01'])
+
+        with patch('user_profile_cache.time.time', return_value=1520150000 + 61), \
+                patch('user_profile_cache.DBUtil.batch_get_items', wraps=DBUtil.batch_get_items) as mock_batch_get_items:
+            UserProfileCache.get_profiles(self.dynamodb, ['test01'])
+
+            self.assertEqual(mock_batch_get_items.call_count, 1)
+
+    def test_get_profiles_over_max_size(self):
+        with patch('user_profile_cache.settings.USER_PROFILE_CACHE_MAX_SIZE', 1):
+            UserProfileCache.get_profiles(self.dynamodb, ['test01'])
+            UserProfileCache.get_profiles(self.dynamodb, ['test02'])
+
+            # 最も古く参照されたユーザーから破棄される
+            self.assertEqual(list(UserProfileCache.profiles.keys()), ['test02'])
+
+    def test_embed_profiles(self):
+        articles = [
+            {'article_id': 'article01', 'user_id': 'test01'},
+            {'article_id': 'article02', 'user_id': 'not_exists'},
+            {'article_id': 'article03', 'user_id': 'test01'}
+        ]
+
+        UserProfileCache.embed_profiles(self.dynamodb, articles)
+
+        self.assertEqual(articles[0]['user']['user_display_name'], 'display_name01')
+        self.assertEqual(articles[2]['user'], articles[0]['user'])
+        self.assertIsNone(articles[1]['user'])
@@ -27,6 +27,7 @@ class TestUserUtil(TestCase):
             self.external_provider_users_table_items
         )
         TestsUtil.create_table(self.dynamodb, os.environ['USERS_TABLE_NAME'], [])
+        TestsUtil.create_table(self.dynamodb, os.environ['USER_PRIVATE_ETH_ADDRESS_TABLE_NAME'], [])
 
     def test_verified_phone_and_email_ok(self):
         event = {
@@ -340,18 +341,15 @@ class TestUserUtil(TestCase):
         os.environ['PRIVATE_CHAIN_AWS_ACCESS_KEY'] = 'test'
         os.environ['PRIVATE_CHAIN_AWS_SECRET_ACCESS_KEY'] = 'test'
         os.environ['PRIVATE_CHAIN_EXECUTE_API_HOST'] = 'test'
-        with patch('user_util.requests.post') as requests_mock, patch('user_util.AWSRequestsAuth') as aws_auth_mock:
-            requests_mock.return_value = PrivateChainApiFakeResponse(
-                status_code=200,
-                text='{"result":"my_address"}'
-            )
-            aws_auth_mock.return_value = True
+        with patch('user_util.PrivateChainClient.create_account') as create_account_mock:
+            create_account_mock.return_value = 'my_address'
             self.cognito.admin_update_user_attributes = MagicMock(
                 return_value=True)
             UserUtil.wallet_initialization(
                 self.cognito,
                 'user_pool_id',
-                'user_id'
+                'user_id',
+                self.dynamodb
             )
             self.cognito.admin_update_user_attributes.assert_called_once_with(
                 UserAttributes=[
@@ -364,6 +362,12 @@ class TestUserUtil(TestCase):
                 Username='user_id'
             )
 
+            table = self.dynamodb.Table(os.environ['USER_PRIVATE_ETH_ADDRESS_TABLE_NAME'])
+            self.assertEqual(
+                table.get_item(Key={'user_id': 'user_id'})['Item'],
+                {'user_id': 'user_id', 'private_eth_address': 'my_address'}
+            )
+
     def test_add_user_profile_ok(self):
         self.dynamodb.Table = MagicMock()
         self.dynamodb.Table.return_value.put_item.return_value = True
@@ -387,17 +391,3 @@ class TestUserUtil(TestCase):
                 'user_id',
                 'display_name'
             )
-
-
-class PrivateChainApiFakeResponse:
-    def __init__(self, status_code, text=''):
-        self._status_code = status_code
-        self._text = text
-
-    def get_status_code(self):
-        return self._status_code
-
-    def get_text(self):
-        return self._text
-    status_code = property(get_status_code)
-    text = property(get_text)
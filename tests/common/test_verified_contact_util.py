@@ -0,0 +1,165 @@
+import os
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from tests_util import TestsUtil
+from verified_contact_util import VerifiedContactUtil
+
+
+class TestVerifiedContactUtil(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+        verified_contact_items = [
+            {'contact': 'email#test01@example.com', 'user_id': 'test01'},
+            {'contact': 'phone_number#+818011112222', 'user_id': 'test01'},
+            {'contact': 'email#test02@example.com', 'user_id': 'test02'}
+        ]
+        TestsUtil.create_table(self.dynamodb, os.environ['VERIFIED_CONTACT_TABLE_NAME'], verified_contact_items)
+        self.table = self.dynamodb.Table(os.environ['VERIFIED_CONTACT_TABLE_NAME'])
+
+        VerifiedContactUtil.clear()
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+    def get_contacts(self):
+        return sorted((item['contact'], item['user_id']) for item in self.table.scan()['Items'])
+
+    def test_get_user_id(self):
+        self.assertEqual(VerifiedContactUtil.get_user_id(self.dynamodb, 'email', 'test01@example.com'), 'test01')
+        # メールアドレスは大文字小文字を区別しない
+        self.assertEqual(VerifiedContactUtil.get_user_id(self.dynamodb, 'email', 'Test01@Example.com'), 'test01')
+        self.assertEqual(VerifiedContactUtil.get_user_id(self.dynamodb, 'phone_number', '+818011112222'), 'test01')
+        self.assertIsNone(VerifiedContactUtil.get_user_id(self.dynamodb, 'phone_number', '+818099999999'))
+
+    def test_find_verified_user_id(self):
+        cognito = MagicMock()
+        cognito.list_users.return_value = {
+            'Users': [
+                {
+                    'Username': 'test03',
+                    'Attributes': [{'Name': 'phone_number_verified', 'Value': 'false'}]
+                },
+                {
+                    'Username': 'test04',
+                    'Attributes': [{'Name': 'phone_number_verified', 'Value': 'true'}]
+                }
+            ]
+        }
+
+        # テーブルに存在する場合は Cognito に問い合わせない
+        self.assertEqual(
+            VerifiedContactUtil.find_verified_user_id(self.dynamodb, cognito, 'pool', 'email', 'test01@example.com'),
+            'test01'
+        )
+        self.assertEqual(cognito.list_users.call_count, 0)
+
+        # 突き合わせが完了していない場合は Cognito に問い合わせ、見つかった連絡先はテーブルに登録する
+        self.assertEqual(
+            VerifiedContactUtil.find_verified_user_id(self.dynamodb, cognito, 'pool', 'email', 'test04@example.com'),
+            None
+        )
+        self.assertEqual(cognito.list_users.call_args[1], {
+            'UserPoolId': 'pool',
+            'Filter': 'email = "test04@example.com"'
+        })
+        self.assertEqual(
+            VerifiedContactUtil.find_verified_user_id(self.dynamodb, cognito, 'pool', 'phone_number', '+818044445555'),
+            'test04'
+        )
+        self.assertEqual(cognito.list_users.call_args[1], {
+            'UserPoolId': 'pool',
+            'Filter': 'phone_number = "+818044445555"'
+        })
+        self.assertEqual(VerifiedContactUtil.get_user_id(self.dynamodb, 'phone_number', '+818044445555'), 'test04')
+
+        # 突き合わせが完了した後は、メールアドレスはテーブルのみを参照する
+        self.table.put_item(Item={'contact': 'repair_state', 'completed_at': 1520150000})
+        cognito.reset_mock()
+        self.assertIsNone(
+            VerifiedContactUtil.find_verified_user_id(self.dynamodb, cognito, 'pool', 'email', 'test05@example.com')
+        )
+        self.assertEqual(cognito.list_users.call_count, 0)
+        self.assertTrue(VerifiedContactUtil.backfilled)
+
+    def test_find_verified_user_id_phone_number_after_backfilled(self):
+        self.table.put_item(Item={'contact': 'repair_state', 'completed_at': 1520150000})
+        cognito = MagicMock()
+        cognito.list_users.return_value = {
+            'Users': [
+                {
+                    'Username': 'test04',
+                    'Attributes': [{'Name': 'phone_number_verified', 'Value': 'true'}]
+                }
+            ]
+        }
+
+        # 電話番号の検証はトリガーを経由せずテーブルへの登録が遅れるため、突き合わせの完了後も Cognito に問い合わせる
+        self.assertEqual(
+            VerifiedContactUtil.find_verified_user_id(self.dynamodb, cognito, 'pool', 'phone_number', '+818044445555'),
+            'test04'
+        )
+        self.assertEqual(cognito.list_users.call_count, 1)
+
+        # 登録した連絡先は以降テーブルから参照する
+        self.assertEqual(
+            VerifiedContactUtil.find_verified_user_id(self.dynamodb, cognito, 'pool', 'phone_number', '+818044445555'),
+            'test04'
+        )
+        self.assertEqual(cognito.list_users.call_count, 1)
+
+        # テーブルに存在する連絡先は上書きしない
+        self.table.put_item(Item={'contact': 'phone_number#+818066667777', 'user_id': 'test05'})
+        VerifiedContactUtil._VerifiedContactUtil__put_if_not_exists(
+            self.dynamodb, 'phone_number#+818066667777', 'test04'
+        )
+        self.assertEqual(VerifiedContactUtil.get_user_id(self.dynamodb, 'phone_number', '+818066667777'), 'test05')
+
+    def test_get_verified_contacts(self):
+        user_attributes = {
+            'email': 'test03@example.com',
+            'email_verified': 'true',
+            'phone_number': '+818033334444',
+            'phone_number_verified': 'false'
+        }
+
+        self.assertEqual(VerifiedContactUtil.get_verified_contacts(user_attributes), {'email#test03@example.com'})
+
+    def test_sync(self):
+        # 電話番号を変更し、新しい電話番号が未検証の場合
+        VerifiedContactUtil.sync(self.dynamodb, 'test01', {
+            'email': 'test01@example.com',
+            'email_verified': 'true',
+            'phone_number': '+818055556666',
+            'phone_number_verified': 'false'
+        })
+        # 新規に検証された場合
+        VerifiedContactUtil.sync(self.dynamodb, 'test03', {
+            'email': 'test03@example.com',
+            'email_verified': 'true'
+        })
+
+        self.assertEqual(self.get_contacts(), [
+            ('email#test01@example.com', 'test01'),
+            ('email#test02@example.com', 'test02'),
+            ('email#test03@example.com', 'test03')
+        ])
+        # バッチが突き合わせ中に登録された連絡先を削除しないよう、登録時刻を記録する
+        self.assertIn('synced_at', self.table.get_item(Key={'contact': 'email#test03@example.com'})['Item'])
+
+    def test_sync_with_contact_verified_by_other_user(self):
+        # test02 のメールアドレスを他のユーザーが検証した後に、test02 の属性を sync する
+        self.table.put_item(Item={'contact': 'email#test02@example.com', 'user_id': 'test03'})
+        self.table.put_item(Item={'contact': 'email#test02-old@example.com', 'user_id': 'test02'})
+
+        VerifiedContactUtil.sync(self.dynamodb, 'test02', {'email': 'test02@example.com', 'email_verified': 'false'})
+
+        self.assertEqual(self.get_contacts(), [
+            ('email#test01@example.com', 'test01'),
+            ('email#test02@example.com', 'test03'),
+            ('phone_number#+818011112222', 'test01')
+        ])
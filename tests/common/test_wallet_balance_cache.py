@@ -0,0 +1,167 @@
+import os
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import settings
+from botocore.exceptions import ClientError
+from tests_util import TestsUtil
+from wallet_balance_cache import WalletBalanceCache
+
+
+class TestWalletBalanceCache(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+        self.wallet_balance_cache_items = [
+            {
+                'eth_address': '0x0000000000000000000000000000000000000001',
+                'balance': '0x10',
+                'cached_at': 1520150000000
+            },
+            {
+                'eth_address': '0x0000000000000000000000000000000000000002',
+                'balance': '0x20',
+                'cached_at': 1520150000000,
+                'invalidated_at': 1520150001000
+            }
+        ]
+        TestsUtil.create_table(
+            self.dynamodb, os.environ['WALLET_BALANCE_CACHE_TABLE_NAME'], self.wallet_balance_cache_items
+        )
+        self.table = self.dynamodb.Table(os.environ['WALLET_BALANCE_CACHE_TABLE_NAME'])
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+    def test_get_balance_not_cached(self):
+        with patch('wallet_balance_cache.PrivateChainClient.get_balance', return_value='0x30') as mock_get_balance, \
+                patch('wallet_balance_cache.time.time', return_value=1520150002):
+            result = WalletBalanceCache.get_balance(self.dynamodb, '0x0000000000000000000000000000000000000003')
+
+            self.assertEqual(result, ('0x30', False))
+            mock_get_balance.assert_called_once_with('0x0000000000000000000000000000000000000003')
+
+        cache = self.table.get_item(Key={'eth_address': '0x0000000000000000000000000000000000000003'})['Item']
+        self.assertEqual(cache['balance'], '0x30')
+        self.assertEqual(cache['cached_at'], 1520150002000)
+        self.assertEqual(cache['expires_at'], 1520150002 + settings.WALLET_BALANCE_CACHE_EXPIRES_SECONDS)
+
+    def test_get_balance_cached(self):
+        with patch('wallet_balance_cache.PrivateChainClient.get_balance') as mock_get_balance, \
+                patch('wallet_balance_cache.time.time', return_value=1520150000 + settings.WALLET_BALANCE_CACHE_TTL):
+            result = WalletBalanceCache.get_balance(self.dynamodb, '0x0000000000000000000000000000000000000001')
+
+            self.assertEqual(result, ('0x10', False))
+            mock_get_balance.assert_not_called()
+
+    def test_get_balance_expired(self):
+        with patch('wallet_balance_cache.PrivateChainClient.get_balance', return_value='0x11') as mock_get_balance, \
+                patch('wallet_balance_cache.time.time', return_value=1520150001 + settings.WALLET_BALANCE_CACHE_TTL):
+            result = WalletBalanceCache.get_balance(self.dynamodb, '0x0000000000000000000000000000000000000001')
+
+            self.assertEqual(result, ('0x11', False))
+            self.assertEqual(mock_get_balance.call_count, 1)
+
+        cache = self.table.get_item(Key={'eth_address': '0x0000000000000000000000000000000000000001'})['Item']
+        self.assertEqual(cache['balance'], '0x11')
+        self.assertIsNone(cache.get('refreshing_until'))
+
+    def test_get_balance_invalidated(self):
+        with patch('wallet_balance_cache.PrivateChainClient.get_balance', return_value='0x21') as mock_get_balance, \
+                patch('wallet_balance_cache.time.time', return_value=1520150002):
+            result = WalletBalanceCache.get_balance(self.dynamodb, '0x0000000000000000000000000000000000000002')
+
+            self.assertEqual(result, ('0x21', False))
+            self.assertEqual(mock_get_balance.call_count, 1)
+
+    def test_get_balance_pending_while_refreshing(self):
+        self.table.update_item(
+            Key={'eth_address': '0x0000000000000000000000000000000000000002'},
+            UpdateExpression='set refreshing_until = :refreshing_until',
+            ExpressionAttributeValues={':refreshing_until': 1520150005000}
+        )
+
+        # 他のリクエストが再取得中の場合は古い残高を pending として返却する
+        with patch('wallet_balance_cache.PrivateChainClient.get_balance') as mock_get_balance, \
+                patch('wallet_balance_cache.time.time', return_value=1520150002):
+            result = WalletBalanceCache.get_balance(self.dynamodb, '0x0000000000000000000000000000000000000002')
+
+            self.assertEqual(result, ('0x20', True))
+            mock_get_balance.assert_not_called()
+
+        # 再取得中のまま一定時間経過した場合は再度取得する
+        with patch('wallet_balance_cache.PrivateChainClient.get_balance', return_value='0x21') as mock_get_balance, \
+                patch('wallet_balance_cache.time.time', return_value=1520150006):
+            result = WalletBalanceCache.get_balance(self.dynamodb, '0x0000000000000000000000000000000000000002')
+
+            self.assertEqual(result, ('0x21', False))
+            self.assertEqual(mock_get_balance.call_count, 1)
+
+    def test_get_balance_invalidated_while_refreshing(self):
+        def get_balance(eth_address):
+            WalletBalanceCache.invalidate(self.dynamodb, [eth_address])
+            return '0x11'
+
+        with patch('wallet_balance_cache.PrivateChainClient.get_balance', side_effect=get_balance), \
+                patch('wallet_balance_cache.time.time', return_value=1520150100):
+            WalletBalanceCache.get_balance(self.dynamodb, '0x0000000000000000000000000000000000000001')
+
+        # 取得中に送受信された場合は次回の参照時に再取得する
+        with patch('wallet_balance_cache.PrivateChainClient.get_balance', return_value='0x12') as mock_get_balance, \
+                patch('wallet_balance_cache.time.time', return_value=1520150101):
+            result = WalletBalanceCache.get_balance(self.dynamodb, '0x0000000000000000000000000000000000000001')
+
+            self.assertEqual(result, ('0x12', False))
+            self.assertEqual(mock_get_balance.call_count, 1)
+
+    def test_invalidate(self):
+        with patch('wallet_balance_cache.time.time', return_value=1520150002):
+            WalletBalanceCache.invalidate(
+                self.dynamodb,
+                ['0x0000000000000000000000000000000000000001', '0x0000000000000000000000000000000000000003']
+            )
+
+        cache = self.table.get_item(Key={'eth_address': '0x0000000000000000000000000000000000000001'})['Item']
+        self.assertEqual(cache['invalidated_at'], 1520150002000)
+        self.assertEqual(cache['balance'], '0x10')
+
+        cache = self.table.get_item(Key={'eth_address': '0x0000000000000000000000000000000000000003'})['Item']
+        self.assertEqual(cache['invalidated_at'], 1520150002000)
+        self.assertIsNone(cache.get('balance'))
+
+    def test_invalidate_with_client_error(self):
+        dynamodb = MagicMock()
+        dynamodb.Table.return_value.update_item.side_effect = [
+            ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException'}}, 'UpdateItem'),
+            None
+        ]
+
+        # 無効化に失敗しても例外を送出せず、残りのアドレスを無効にする
+        WalletBalanceCache.invalidate(
+            dynamodb, ['0x0000000000000000000000000000000000000001', '0x0000000000000000000000000000000000000003']
+        )
+
+        self.assertEqual(dynamodb.Table.return_value.update_item.call_count, 2)
+
+    def test_reserve(self):
+        # 残高(0x10)から予約済みの額を差し引いた範囲で予約する
+        with patch('wallet_balance_cache.time.time', return_value=1520150002):
+            self.assertTrue(WalletBalanceCache.reserve(self.dynamodb, '0x0000000000000000000000000000000000000001', 10))
+            self.assertTrue(WalletBalanceCache.reserve(self.dynamodb, '0x0000000000000000000000000000000000000001', 6))
+            self.assertFalse(WalletBalanceCache.reserve(self.dynamodb, '0x0000000000000000000000000000000000000001', 1))
+            self.assertFalse(WalletBalanceCache.reserve(self.dynamodb, '0x0000000000000000000000000000000000000001', 17))
+
+        cache = self.table.get_item(Key={'eth_address': '0x0000000000000000000000000000000000000001'})['Item']
+        self.assertEqual(cache['reserved'], 16)
+
+        WalletBalanceCache.release(self.dynamodb, '0x0000000000000000000000000000000000000001', 10)
+
+        with patch('wallet_balance_cache.time.time', return_value=1520150002):
+            self.assertTrue(WalletBalanceCache.reserve(self.dynamodb, '0x0000000000000000000000000000000000000001', 10))
+
+        cache = self.table.get_item(Key={'eth_address': '0x0000000000000000000000000000000000000001'})['Item']
+        self.assertEqual(cache['reserved'], 16)
+        self.assertEqual(cache['balance'], '0x10')
@@ -5,6 +5,7 @@ from unittest.mock import MagicMock, patch
 
 from articles_comments_index import ArticlesCommentsIndex
 from tests_util import TestsUtil
+from user_profile_cache import UserProfileCache
 
 
 class TestArticlesCommentsIndex(TestCase):
@@ -48,7 +49,8 @@ class TestArticlesCommentsIndex(TestCase):
                 'user_id': 'test_user_02',
                 'sort_key': 1520150272000002,
                 'created_at': 1520150272,
-                'text': 'コメントの内容1'
+                'text': 'コメントの内容1',
+                'like_count': 5
             },
             {
                 'comment_id': 'comment00004',
@@ -62,6 +64,22 @@ class TestArticlesCommentsIndex(TestCase):
 
         TestsUtil.create_table(cls.dynamodb, os.environ['COMMENT_TABLE_NAME'], cls.comment_items)
 
+        # like_count を持たない既存のコメントのいいね
+        comment_liked_user_items = [
+            {'comment_id': 'comment00001', 'user_id': 'like_user_01', 'article_id': 'publicId0001', 'created_at': 1520150272},
+            {'comment_id': 'comment00001', 'user_id': 'like_user_02', 'article_id': 'publicId0001', 'created_at': 1520150272}
+        ]
+        TestsUtil.create_table(cls.dynamodb, os.environ['COMMENT_LIKED_USER_TABLE_NAME'], comment_liked_user_items)
+
+        users_items = [
+            {
+                'user_id': 'test_user_01',
+                'user_display_name': 'display_name01',
+                'self_introduction': 'self_introduction01'
+            }
+        ]
+        TestsUtil.create_table(cls.dynamodb, os.environ['USERS_TABLE_NAME'], users_items)
+
     @classmethod
     def tearDownClass(self):
         TestsUtil.delete_all_tables(self.dynamodb)
@@ -159,6 +177,54 @@ class TestArticlesCommentsIndex(TestCase):
         self.assertEqual(response['statusCode'], 200)
         self.assertEqual(len(json.loads(response['body'])['Items']), 10)
 
+    def test_main_ok_with_include(self):
+        UserProfileCache.clear()
+        params = {
+            'queryStringParameters': {
+                'include': 'user,like_count'
+            },
+            'pathParameters': {
+                'article_id': 'publicId0001'
+            }
+        }
+
+        response = ArticlesCommentsIndex(params, {}, self.dynamodb).main()
+
+        user = {
+            'user_id': 'test_user_01',
+            'user_display_name': 'display_name01',
+            'self_introduction': 'self_introduction01'
+        }
+        expected_items = [
+            dict(self.comment_items[2], like_count=5, user=None),
+            dict(self.comment_items[1], like_count=0, user=user),
+            dict(self.comment_items[0], like_count=2, user=user)
+        ]
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body'])['Items'], expected_items)
+
+    def test_main_ok_with_include_like_count(self):
+        params = {
+            'queryStringParameters': {
+                'include': 'like_count'
+            },
+            'pathParameters': {
+                'article_id': 'publicId0001'
+            }
+        }
+
+        with patch('articles_comments_index.UserProfileCache') as mock_user_profile_cache:
+            response = ArticlesCommentsIndex(params, {}, self.dynamodb).main()
+
+            self.assertFalse(mock_user_profile_cache.get_profiles.called)
+
+        items = json.loads(response['body'])['Items']
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual([item['like_count'] for item in items], [5, 0, 2])
+        self.assertFalse(any('user' in item for item in items))
+
     def test_call_validate_article_existence(self):
         params = {
             'pathParameters': {
@@ -195,6 +261,18 @@ class TestArticlesCommentsIndex(TestCase):
 
         self.assert_bad_request(params)
 
+    def test_validation_include(self):
+        params = {
+            'queryStringParameters': {
+                'include': 'user,text'
+            },
+            'pathParameters': {
+                'article_id': 'publicId0001'
+            }
+        }
+
+        self.assert_bad_request(params)
+
     def test_validation_limit_type(self):
         params = {
             'queryStringParameters': {
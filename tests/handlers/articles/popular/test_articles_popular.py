@@ -4,11 +4,13 @@ from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
 import settings
+from db_util import DBUtil
 from elasticsearch import Elasticsearch
 from tests_es_util import TestsEsUtil
 
 from articles_popular import ArticlesPopular
 from tests_util import TestsUtil
+from user_profile_cache import UserProfileCache
 import json
 
 
@@ -80,6 +82,18 @@ class TestArticlesPopular(TestCase):
         ]
         TestsUtil.create_table(self.dynamodb, os.environ['TOPIC_TABLE_NAME'], topic_items)
 
+        users_items = [
+            {
+                'user_id': 'matsumatsu20',
+                'user_display_name': 'display_name',
+                'self_introduction': 'self_introduction',
+                'icon_image_url': 'http://example.com/icon.png',
+                'sync_elasticsearch': 1
+            }
+        ]
+        TestsUtil.create_table(self.dynamodb, os.environ['USERS_TABLE_NAME'], users_items)
+        UserProfileCache.clear()
+
     def tearDown(self):
         TestsUtil.delete_all_tables(self.dynamodb)
 
@@ -126,6 +140,47 @@ class TestArticlesPopular(TestCase):
         self.assertEqual(response['statusCode'], 200)
         self.assertEqual(json.loads(response['body'])['Items'], expected_items)
 
+    def test_main_ok_with_include_user(self):
+        params = {
+            'queryStringParameters': {
+                'limit': '2',
+                'include': 'user'
+            }
+        }
+
+        response = ArticlesPopular(params, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        expected_user = {
+            'user_id': 'matsumatsu20',
+            'user_display_name': 'display_name',
+            'self_introduction': 'self_introduction',
+            'icon_image_url': 'http://example.com/icon.png'
+        }
+
+        self.assertEqual(response['statusCode'], 200)
+        items = json.loads(response['body'])['Items']
+        self.assertEqual([item['article_id'] for item in items], ['testid000002', 'testid000001'])
+        self.assertEqual([item['user'] for item in items], [expected_user, expected_user])
+
+    def test_main_ok_with_include_user_cached(self):
+        params = {
+            'queryStringParameters': {
+                'include': 'user'
+            }
+        }
+
+        with patch('user_profile_cache.DBUtil.batch_get_items', wraps=DBUtil.batch_get_items) as mock_batch_get_items:
+            ArticlesPopular(params, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+            response = ArticlesPopular(params, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+            # 著者が重複していても1回の BatchGetItem で取得し、2回目以降はキャッシュを利用する
+            self.assertEqual(mock_batch_get_items.call_count, 1)
+            self.assertEqual(mock_batch_get_items.call_args[0][2], [{'user_id': 'matsumatsu20'}])
+
+        self.assertEqual(response['statusCode'], 200)
+        for item in json.loads(response['body'])['Items']:
+            self.assertEqual(item['user']['user_display_name'], 'display_name')
+
     def test_main_ok_with_no_limit(self):
         for i in range(21):
             self.elasticsearch.index(
@@ -275,6 +330,14 @@ class TestArticlesPopular(TestCase):
 
         self.assert_bad_request(params)
 
+    def test_validation_include(self):
+        params = {
+            'queryStringParameters': {
+                'include': 'article'
+            }
+        }
+        self.assert_bad_request(params)
+
     def test_validation_topic_max(self):
         params = {
             'queryStringParameters': {
@@ -4,6 +4,7 @@ from unittest.mock import MagicMock, patch
 import settings
 from articles_recent import ArticlesRecent
 from tests_util import TestsUtil
+from user_profile_cache import UserProfileCache
 import os
 import json
 from elasticsearch import Elasticsearch
@@ -69,6 +70,15 @@ class TestArticlesRecent(TestCase):
         ]
         TestsUtil.create_table(cls.dynamodb, os.environ['TOPIC_TABLE_NAME'], topic_items)
 
+        users_items = [
+            {
+                'user_id': 'test01',
+                'user_display_name': 'display_name01',
+                'self_introduction': 'self_introduction01'
+            }
+        ]
+        TestsUtil.create_table(cls.dynamodb, os.environ['USERS_TABLE_NAME'], users_items)
+
     @classmethod
     def tearDownClass(cls):
         TestsUtil.delete_all_tables(cls.dynamodb)
@@ -176,6 +186,41 @@ class TestArticlesRecent(TestCase):
         self.assertEqual(response['statusCode'], 200)
         self.assertEqual(len(json.loads(response['body'])['Items']), 0)
 
+    def test_main_ok_with_include_user(self):
+        UserProfileCache.clear()
+        params = {
+            'queryStringParameters': {
+                'include': 'user'
+            }
+        }
+        articles = [
+            {'article_id': 'testid000001', 'user_id': 'test01'},
+            {'article_id': 'testid000002', 'user_id': 'not_exists'}
+        ]
+
+        with patch('articles_recent.ESUtil.search_recent_articles', return_value=articles):
+            response = ArticlesRecent(params, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        expected_items = [
+            {
+                'article_id': 'testid000001',
+                'user_id': 'test01',
+                'user': {
+                    'user_id': 'test01',
+                    'user_display_name': 'display_name01',
+                    'self_introduction': 'self_introduction01'
+                }
+            },
+            {
+                'article_id': 'testid000002',
+                'user_id': 'not_exists',
+                'user': None
+            }
+        ]
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body'])['Items'], expected_items)
+
     def test_call_validate_topic(self):
         params = {
             'queryStringParameters': {
@@ -0,0 +1,93 @@
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from comment_liked_user_migration import CommentLikedUserMigration
+from tests_util import TestsUtil
+
+
+class TestCommentLikedUserMigration(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+        comment_liked_user_items = [
+            {
+                'comment_id': 'comment00001',
+                'user_id': 'like_user_01',
+                'article_id': 'publicId0001',
+                'created_at': 1520150272
+            },
+            {
+                'comment_id': 'comment00002',
+                'user_id': 'like_user_01',
+                'article_id': 'publicId0001',
+                'created_at': 1520150273
+            },
+            {
+                'comment_id': 'comment00003',
+                'user_id': 'like_user_02',
+                'article_id': 'publicId0002',
+                'article_id_user_id': 'publicId0002#like_user_02',
+                'created_at': 1520150274
+            }
+        ]
+        TestsUtil.create_table(self.dynamodb, os.environ['COMMENT_LIKED_USER_TABLE_NAME'], comment_liked_user_items)
+        self.comment_liked_user_table = self.dynamodb.Table(os.environ['COMMENT_LIKED_USER_TABLE_NAME'])
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+    def test_main_ok(self):
+        response = CommentLikedUserMigration({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response, {'migrated_count': 2, 'last_evaluated_key': None})
+
+        comment_liked_users = sorted(self.comment_liked_user_table.scan()['Items'], key=lambda item: item['comment_id'])
+        expected = [
+            {
+                'comment_id': 'comment00001',
+                'user_id': 'like_user_01',
+                'article_id': 'publicId0001',
+                'article_id_user_id': 'publicId0001#like_user_01',
+                'created_at': 1520150272
+            },
+            {
+                'comment_id': 'comment00002',
+                'user_id': 'like_user_01',
+                'article_id': 'publicId0001',
+                'article_id_user_id': 'publicId0001#like_user_01',
+                'created_at': 1520150273
+            },
+            {
+                'comment_id': 'comment00003',
+                'user_id': 'like_user_02',
+                'article_id': 'publicId0002',
+                'article_id_user_id': 'publicId0002#like_user_02',
+                'created_at': 1520150274
+            }
+        ]
+        self.assertEqual(comment_liked_users, expected)
+
+    def test_main_ok_resume(self):
+        scan = self.comment_liked_user_table.scan
+
+        # 1件ずつ取得させ、1回目の取得後に時間切れとする
+        with patch('comment_liked_user_migration.settings.COMMENT_LIKED_USER_MIGRATION_MAX_SECONDS', -1), \
+                patch.object(self.dynamodb, 'Table') as mock_table:
+            mock_table.return_value.scan.side_effect = lambda **kwargs: scan(Limit=1, **kwargs)
+            mock_table.return_value.batch_writer = self.comment_liked_user_table.batch_writer
+            response = CommentLikedUserMigration({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertIsNotNone(response['last_evaluated_key'])
+
+        event = {'exclusive_start_key': response['last_evaluated_key']}
+        CommentLikedUserMigration(event, {}, dynamodb=self.dynamodb).main()
+
+        for comment_liked_user in self.comment_liked_user_table.scan()['Items']:
+            self.assertEqual(
+                comment_liked_user['article_id_user_id'],
+                comment_liked_user['article_id'] + '#' + comment_liked_user['user_id']
+            )
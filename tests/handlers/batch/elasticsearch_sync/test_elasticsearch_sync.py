@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from db_util import DBUtil
+from elasticsearch import Elasticsearch
+
+from elasticsearch_sync import ElasticsearchSync
+from tests_util import TestsUtil
+
+
+class TestElasticsearchSync(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+    elasticsearch = Elasticsearch(
+        hosts=[{'host': 'localhost'}]
+    )
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+        self.article_info_items = [
+            {
+                'article_id': 'publicId0001',
+                'user_id': 'test01',
+                'status': 'public',
+                'title': 'title1',
+                'sort_key': 1520150272000000,
+                'sync_elasticsearch': 1
+            },
+            {
+                'article_id': 'draftId00001',
+                'user_id': 'test01',
+                'status': 'draft',
+                'title': 'title2',
+                'sort_key': 1520150272000001,
+                'sync_elasticsearch': 1
+            },
+            {
+                'article_id': 'publicId0002',
+                'user_id': 'test02',
+                'status': 'public',
+                'title': 'title3',
+                'sort_key': 1520150272000002
+            }
+        ]
+        TestsUtil.create_table(self.dynamodb, os.environ['ARTICLE_INFO_TABLE_NAME'], self.article_info_items)
+
+        article_content_items = [
+            {'article_id': 'publicId0001', 'title': 'title1', 'body': 'body1'},
+            {'article_id': 'draftId00001', 'title': 'title2', 'body': 'body2'},
+            {'article_id': 'publicId0002', 'title': 'title3', 'body': 'body3'}
+        ]
+        TestsUtil.create_table(self.dynamodb, os.environ['ARTICLE_CONTENT_TABLE_NAME'], article_content_items)
+
+        users_items = [
+            {
+                'user_id': 'test01',
+                'user_display_name': 'display_name1',
+                'self_introduction': 'introduction1',
+                'sync_elasticsearch': 1
+            },
+            {
+                'user_id': 'test02',
+                'user_display_name': 'display_name2',
+                'self_introduction': 'introduction2'
+            }
+        ]
+        TestsUtil.create_table(self.dynamodb, os.environ['USERS_TABLE_NAME'], users_items)
+
+        self.elasticsearch.index(
+            index='articles',
+            doc_type='article',
+            id='draftId00001',
+            body={'article_id': 'draftId00001', 'title': 'title2', 'body': 'body2'}
+        )
+        self.elasticsearch.indices.refresh(index='articles')
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+        self.elasticsearch.indices.delete(index='articles', ignore=[404])
+        self.elasticsearch.indices.delete(index='users', ignore=[404])
+
+    def test_main_ok(self):
+        response = ElasticsearchSync({}, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        self.assertEqual(response['articles']['synced'], 2)
+        self.assertEqual(response['users']['synced'], 1)
+
+        self.elasticsearch.indices.refresh(index='articles')
+        self.elasticsearch.indices.refresh(index='users')
+
+        article = self.elasticsearch.get(index='articles', doc_type='article', id='publicId0001')['_source']
+        self.assertEqual(article, {
+            'article_id': 'publicId0001',
+            'user_id': 'test01',
+            'status': 'public',
+            'title': 'title1',
+            'sort_key': 1520150272000000,
+            'body': 'body1'
+        })
+        self.assertFalse(self.elasticsearch.exists(index='articles', doc_type='article', id='draftId00001'))
+        self.assertFalse(self.elasticsearch.exists(index='articles', doc_type='article', id='publicId0002'))
+
+        user = self.elasticsearch.get(index='users', doc_type='user', id='test01')['_source']
+        self.assertEqual(user, {
+            'user_id': 'test01',
+            'user_display_name': 'display_name1',
+            'self_introduction': 'introduction1'
+        })
+        self.assertFalse(self.elasticsearch.exists(index='users', doc_type='user', id='test02'))
+
+        article_info_table = self.dynamodb.Table(os.environ['ARTICLE_INFO_TABLE_NAME'])
+        users_table = self.dynamodb.Table(os.environ['USERS_TABLE_NAME'])
+        for article_info in article_info_table.scan()['Items']:
+            self.assertIsNone(article_info.get('sync_elasticsearch'))
+        for user in users_table.scan()['Items']:
+            self.assertIsNone(user.get('sync_elasticsearch'))
+
+    def test_main_ok_with_updated_while_sync(self):
+        article_info_table = self.dynamodb.Table(os.environ['ARTICLE_INFO_TABLE_NAME'])
+
+        def batch_get_items(*args, **kwargs):
+            # 同期中に記事が更新された場合を想定
+            article_info_table.update_item(
+                Key={'article_id': 'publicId0001'},
+                UpdateExpression='set title = :title, sync_elasticsearch = :one',
+                ExpressionAttributeValues={':title': 'updated', ':one': 1}
+            )
+            return batch_get_items_org(*args, **kwargs)
+
+        batch_get_items_org = DBUtil.batch_get_items
+        with patch('elasticsearch_sync.DBUtil.batch_get_items', side_effect=batch_get_items):
+            response = ElasticsearchSync({}, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        self.assertEqual(response['articles']['synced'], 1)
+        self.assertEqual(response['articles']['conflicted'], 1)
+
+        # 更新された記事は次回の同期対象として残る
+        article_info = article_info_table.get_item(Key={'article_id': 'publicId0001'})['Item']
+        self.assertEqual(article_info['sync_elasticsearch'], 1)
+        draft_article_info = article_info_table.get_item(Key={'article_id': 'draftId00001'})['Item']
+        self.assertIsNone(draft_article_info.get('sync_elasticsearch'))
+
+    def test_main_ok_with_bulk_error(self):
+        def parallel_bulk(client, actions, **kwargs):
+            for action in actions:
+                yield False, {action['_op_type']: {'_id': action['_id'], 'status': 500, 'error': 'error'}}
+
+        with patch('elasticsearch_sync.helpers.parallel_bulk', side_effect=parallel_bulk):
+            response = ElasticsearchSync({}, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        self.assertEqual(response['articles']['failed'], 2)
+        self.assertEqual(response['users']['failed'], 1)
+
+        # ES への反映に失敗した項目はフラグを残す
+        article_info_table = self.dynamodb.Table(os.environ['ARTICLE_INFO_TABLE_NAME'])
+        users_table = self.dynamodb.Table(os.environ['USERS_TABLE_NAME'])
+        self.assertEqual(article_info_table.get_item(Key={'article_id': 'publicId0001'})['Item']['sync_elasticsearch'], 1)
+        self.assertEqual(article_info_table.get_item(Key={'article_id': 'draftId00001'})['Item']['sync_elasticsearch'], 1)
+        self.assertEqual(users_table.get_item(Key={'user_id': 'test01'})['Item']['sync_elasticsearch'], 1)
+
+    @patch('elasticsearch_sync.settings.ES_SYNC_PAGE_SIZE', 2)
+    @patch('elasticsearch_sync.settings.ES_SYNC_BULK_CHUNK_SIZE', 3)
+    @patch('elasticsearch_sync.settings.ES_SYNC_BULK_THREAD_COUNT', 4)
+    def test_main_ok_with_parallel_chunks(self):
+        users_table = self.dynamodb.Table(os.environ['USERS_TABLE_NAME'])
+        for i in range(3, 15):
+            users_table.put_item(Item={'user_id': 'test{0:02d}'.format(i), 'sync_elasticsearch': 1})
+
+        lock = threading.Lock()
+        in_flight = {'current': 0, 'max': 0}
+        bulk_org = self.elasticsearch.bulk
+
+        def bulk(*args, **kwargs):
+            with lock:
+                in_flight['current'] += 1
+                in_flight['max'] = max(in_flight['max'], in_flight['current'])
+            # 他のチャンクの送信が始まるまで待つ
+            time.sleep(0.2)
+            try:
+                return bulk_org(*args, **kwargs)
+            finally:
+                with lock:
+                    in_flight['current'] -= 1
+
+        with patch.object(self.elasticsearch, 'bulk', side_effect=bulk) as mock_bulk:
+            response = ElasticsearchSync({}, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        # ページ(2件)ごとではなく thread_count * chunk_size 件(12件)までまとめて、複数のチャンクを並列に送信する
+        self.assertEqual(response['users']['synced'], 13)
+        self.assertEqual(response['users']['pages'], 7)
+        # articles: 2件を1件ずつの2チャンク、users: 12件を3件ずつの4チャンクと残り1件
+        self.assertEqual(mock_bulk.call_count, 7)
+        self.assertGreater(in_flight['max'], 1)
@@ -0,0 +1,94 @@
+import os
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import patch
+
+from elasticsearch import Elasticsearch
+from tests_es_util import TestsEsUtil
+
+from tag_count_aggregation import TagCountAggregation
+from tag_util import TagUtil
+from tests_util import TestsUtil
+
+
+class TestTagCountAggregation(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+    elasticsearch = Elasticsearch(
+        hosts=[{'host': 'localhost'}]
+    )
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+        tag_count_event_items = [
+            {'event_id': 'event00001', 'name': 'A', 'count': 1, 'created_at': 1520150000},
+            {'event_id': 'event00002', 'name': 'a', 'count': 1, 'created_at': 1520150001},
+            {'event_id': 'event00003', 'name': 'B', 'count': -1, 'created_at': 1520150002},
+            {'event_id': 'event00004', 'name': 'C', 'count': -1, 'created_at': 1520150003},
+            {'event_id': 'event00005', 'name': 'd', 'count': 1, 'created_at': 1520150004},
+            {'event_id': 'event00006', 'name': 'D', 'count': 1, 'created_at': 1520150005},
+            {'event_id': 'event00007', 'name': 'E', 'count': 1, 'created_at': 1520150006},
+            {'event_id': 'event00008', 'name': 'E', 'count': -1, 'created_at': 1520150007},
+            {'event_id': 'event00009', 'name': 'F', 'count': -1, 'created_at': 1520150008}
+        ]
+        TestsUtil.create_table(self.dynamodb, os.environ['TAG_COUNT_EVENT_TABLE_NAME'], tag_count_event_items)
+
+        TestsEsUtil.create_tag_index(self.elasticsearch)
+        TagUtil.create_tag(self.elasticsearch, 'A')
+        TagUtil.create_tag(self.elasticsearch, 'B')
+        TestsEsUtil.create_tag_with_count(self.elasticsearch, 'C', 0)
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+        self.elasticsearch.indices.delete(index='tags', ignore=[404])
+
+    def test_main_ok(self):
+        response = TagCountAggregation({}, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        self.assertTrue(response)
+
+        self.elasticsearch.indices.refresh(index='tags')
+        tags = TestsEsUtil.get_all_tags(self.elasticsearch)
+
+        for tag in tags:
+            del tag['created_at']
+            del tag['updated_at']
+
+        tags = sorted(tags, key=lambda t: t['name'])
+
+        expected = [
+            {'name': 'A', 'name_with_analyzer': 'A', 'count': Decimal('3')},
+            {'name': 'B', 'name_with_analyzer': 'B', 'count': Decimal('0')},
+            {'name': 'C', 'name_with_analyzer': 'C', 'count': Decimal('0')},
+            {'name': 'd', 'name_with_analyzer': 'd', 'count': Decimal('2')}
+        ]
+
+        self.assertEqual(tags, expected)
+
+        tag_count_events = self.dynamodb.Table(os.environ['TAG_COUNT_EVENT_TABLE_NAME']).scan()['Items']
+        self.assertEqual(len(tag_count_events), 0)
+
+    def test_main_ok_with_no_events(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+        TestsUtil.create_table(self.dynamodb, os.environ['TAG_COUNT_EVENT_TABLE_NAME'], [])
+
+        response = TagCountAggregation({}, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        self.assertTrue(response)
+
+        self.elasticsearch.indices.refresh(index='tags')
+        tags = TestsEsUtil.get_all_tags(self.elasticsearch)
+
+        self.assertEqual(sorted([(tag['name'], tag['count']) for tag in tags]), [('A', 1), ('B', 1), ('C', 0)])
+
+    def test_main_ok_with_failed_tags(self):
+        # A(a) の反映のみ失敗した場合、A(a) のイベントは削除せず次回の集計対象とする
+        with patch('tag_count_aggregation.TagUtil.update_counts', return_value={'a'}) as mock_update_counts:
+            response = TagCountAggregation({}, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        self.assertTrue(response)
+        self.assertEqual(mock_update_counts.call_count, 1)
+
+        tag_count_events = self.dynamodb.Table(os.environ['TAG_COUNT_EVENT_TABLE_NAME']).scan()['Items']
+        self.assertEqual(sorted([event['event_id'] for event in tag_count_events]), ['event00001', 'event00002'])
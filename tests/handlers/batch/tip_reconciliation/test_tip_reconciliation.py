@@ -0,0 +1,264 @@
+import os
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import patch
+
+from exceptions import PrivateChainApiError
+from fake_private_chain import FakePrivateChain
+from private_chain_client import PrivateChainClient
+from tests_util import TestsUtil
+from tip_reconciliation import TipReconciliation
+
+
+class TestTipReconciliation(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+        os.environ['PRIVATE_CHAIN_AWS_ACCESS_KEY'] = 'test'
+        os.environ['PRIVATE_CHAIN_AWS_SECRET_ACCESS_KEY'] = 'test'
+        os.environ['PRIVATE_CHAIN_EXECUTE_API_HOST'] = 'example.com'
+        PrivateChainClient.clear()
+        self.chain = FakePrivateChain()
+        self.chain.mount(PrivateChainClient._PrivateChainClient__get_session())
+        self.chain.set_balance('0x0000000000000000000000000000000000000001', 100)
+
+        # 送信済みの投げ銭を5件作成し、最後の1件以外をブロックに取り込む
+        self.transactions = []
+        for i in range(5):
+            if i == 4:
+                self.chain.mine()
+            self.transactions.append(PrivateChainClient.send_tip(
+                '0x0000000000000000000000000000000000000001', '0x0000000000000000000000000000000000000002', 1
+            ))
+
+        tip_items = [
+            {
+                'user_id': 'tip_user01',
+                'sort_key': 1520150552000000 + i,
+                'to_user_id': 'article_user01',
+                'tip_value': 1,
+                'article_id': 'publicId0001',
+                'article_title': 'title',
+                'transaction': transaction,
+                'uncompleted': 1,
+                'created_at': 1520150550 + i
+            } for i, transaction in enumerate(self.transactions)
+        ]
+        tip_items.extend([
+            {
+                'user_id': 'tip_user02',
+                'sort_key': 1520150552000010,
+                'to_user_id': 'article_user01',
+                'tip_value': 1,
+                'article_id': 'publicId0001',
+                'article_title': 'title',
+                'from_user_eth_address': '0x0000000000000000000000000000000000000001',
+                'to_user_eth_address': '0x0000000000000000000000000000000000000002',
+                'queued': 1,
+                'uncompleted': 1,
+                'created_at': 1520150552
+            },
+            {
+                'user_id': 'tip_user02',
+                'sort_key': 1520150552000011,
+                'to_user_id': 'article_user01',
+                'tip_value': 1,
+                'article_id': 'publicId0001',
+                'article_title': 'title',
+                'transaction': '0x0123',
+                'completed_at': 1520150552,
+                'created_at': 1520150552
+            }
+        ])
+        TestsUtil.create_table(self.dynamodb, os.environ['TIP_TABLE_NAME'], tip_items)
+        self.tip_table = self.dynamodb.Table(os.environ['TIP_TABLE_NAME'])
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+        PrivateChainClient.clear()
+
+    def get_tip(self, user_id, sort_key):
+        return self.tip_table.get_item(Key={'user_id': user_id, 'sort_key': sort_key})['Item']
+
+    @patch('tip_reconciliation.settings.TIP_RECONCILIATION_BATCH_SIZE', 2)
+    @patch('tip_reconciliation.time.time', return_value=1520150560)
+    def test_main_ok(self, _):
+        response = TipReconciliation({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response, {
+            'checked': 5,
+            'confirmed': 4,
+            'failed': 0,
+            'pending': 1,
+            'unknown': 0,
+            'invalid': 0,
+            'skipped': 0,
+            'errors': 0,
+            'confirmation_latency': {'count': 4, 'average': 8.5, 'max': 10, 'p50': 8, 'p95': 10, 'p99': 10}
+        })
+
+        for i in range(4):
+            tip = self.get_tip('tip_user01', 1520150552000000 + i)
+            self.assertIsNone(tip.get('uncompleted'))
+            self.assertEqual(tip['completed_at'], Decimal(1520150560))
+            self.assertEqual(tip['transaction'], self.transactions[i])
+            self.assertEqual(tip['article_title'], 'title')
+
+        # レシートが確認できない投げ銭と送信前の投げ銭は uncompleted のまま残す
+        self.assertEqual(self.get_tip('tip_user01', 1520150552000004)['uncompleted'], Decimal(1))
+        self.assertEqual(self.get_tip('tip_user02', 1520150552000010)['uncompleted'], Decimal(1))
+
+        # 確定した投げ銭はインデックスから除かれるため、再実行時は未確定のもののみ確認する
+        self.chain.requests = []
+        response = TipReconciliation({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response['checked'], 1)
+        self.assertEqual(self.chain.requests, [
+            ('/production/transaction/receipt', {'transaction_hash': self.transactions[4]})
+        ])
+
+    def test_main_ok_with_reverted_transaction(self):
+        self.chain.mine(status='0x0')
+
+        response = TipReconciliation({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response['failed'], 1)
+        self.assertEqual(response['confirmed'], 4)
+
+        tip = self.get_tip('tip_user01', 1520150552000004)
+        self.assertEqual(tip['failed'], Decimal(1))
+        self.assertEqual(tip['error_message'], 'transaction reverted')
+        self.assertIsNone(tip.get('uncompleted'))
+
+    def test_main_ok_with_api_error(self):
+        with patch('tip_reconciliation.PrivateChainClient.get_transaction_receipt',
+                   side_effect=PrivateChainApiError('error')):
+            response = TipReconciliation({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response, {
+            'checked': 5,
+            'confirmed': 0,
+            'failed': 0,
+            'pending': 0,
+            'unknown': 0,
+            'invalid': 0,
+            'skipped': 0,
+            'errors': 5,
+            'confirmation_latency': None
+        })
+        self.assertEqual(self.get_tip('tip_user01', 1520150552000000)['uncompleted'], Decimal(1))
+
+    @patch('tip_reconciliation.settings.TIP_RECONCILIATION_BATCH_SIZE', 2)
+    @patch('tip_reconciliation.settings.TIP_RECONCILIATION_MAX_SECONDS', 0)
+    def test_main_ok_with_time_limit(self):
+        response = TipReconciliation({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response['checked'], 0)
+
+    def test_main_ok_with_unknown_submission(self):
+        TestsUtil.create_table(self.dynamodb, os.environ['WALLET_BALANCE_CACHE_TABLE_NAME'], [
+            {'eth_address': '0x0000000000000000000000000000000000000001', 'reserved': 2}
+        ])
+        unknown_tip = {
+            'user_id': 'tip_user03',
+            'sort_key': 1520150552000020,
+            'to_user_id': 'article_user01',
+            'tip_value': 1,
+            'article_id': 'publicId0001',
+            'article_title': 'title',
+            'from_user_eth_address': '0x0000000000000000000000000000000000000001',
+            'to_user_eth_address': '0x0000000000000000000000000000000000000002',
+            'reserved': 1,
+            'submission_unknown': 1,
+            'error_message': 'timeout',
+            'uncompleted': 1,
+            'created_at': 1520150552
+        }
+        self.tip_table.put_item(Item=unknown_tip)
+        self.tip_table.put_item(Item=dict(
+            unknown_tip, sort_key=1520150552000021, transaction=self.transactions[0]
+        ))
+
+        response = TipReconciliation({}, {}, dynamodb=self.dynamodb).main()
+
+        # トランザクションハッシュが不明な投げ銭は確認せずに残す
+        self.assertEqual(response['unknown'], 1)
+        self.assertEqual(response['checked'], 6)
+        tip = self.get_tip('tip_user03', 1520150552000020)
+        self.assertEqual(tip['submission_unknown'], Decimal(1))
+        self.assertEqual(tip['uncompleted'], Decimal(1))
+
+        # トランザクションハッシュが設定された投げ銭は確認し、予約した残高を解放する
+        tip = self.get_tip('tip_user03', 1520150552000021)
+        self.assertIsNone(tip.get('submission_unknown'))
+        self.assertIsNone(tip.get('uncompleted'))
+        cache = self.dynamodb.Table(os.environ['WALLET_BALANCE_CACHE_TABLE_NAME']).get_item(
+            Key={'eth_address': '0x0000000000000000000000000000000000000001'}
+        )['Item']
+        self.assertEqual(cache['reserved'], Decimal(1))
+
+    def test_main_ok_does_not_overwrite_concurrent_updates(self):
+        get_transaction_receipt = PrivateChainClient.get_transaction_receipt
+
+        def update_during_reconciliation(transaction):
+            # レシートの確認中に他の処理で項目が更新された場合
+            if transaction == self.transactions[0]:
+                self.tip_table.update_item(
+                    Key={'user_id': 'tip_user01', 'sort_key': 1520150552000000},
+                    UpdateExpression='set article_title = :title',
+                    ExpressionAttributeValues={':title': 'updated'}
+                )
+            if transaction == self.transactions[1]:
+                self.tip_table.update_item(
+                    Key={'user_id': 'tip_user01', 'sort_key': 1520150552000001},
+                    UpdateExpression='set completed_at = :completed_at remove uncompleted',
+                    ExpressionAttributeValues={':completed_at': 1}
+                )
+            return get_transaction_receipt(transaction)
+
+        with patch('tip_reconciliation.PrivateChainClient.get_transaction_receipt',
+                   side_effect=update_during_reconciliation):
+            response = TipReconciliation({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response['confirmed'], 3)
+        self.assertEqual(response['skipped'], 1)
+
+        tip = self.get_tip('tip_user01', 1520150552000000)
+        self.assertEqual(tip['article_title'], 'updated')
+        self.assertIsNone(tip.get('uncompleted'))
+
+        # 既に完了している投げ銭は更新しない
+        self.assertEqual(self.get_tip('tip_user01', 1520150552000001)['completed_at'], Decimal(1))
+
+    def test_main_ok_with_null_transaction(self):
+        self.tip_table.put_item(Item={
+            'user_id': 'tip_user04',
+            'sort_key': 1520150552000030,
+            'to_user_id': 'article_user01',
+            'tip_value': 1,
+            'article_id': 'publicId0001',
+            'article_title': 'title',
+            'transaction': 'null',
+            'uncompleted': 1,
+            'created_at': 1520150552
+        })
+        self.chain.requests = []
+
+        response = TipReconciliation({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response['invalid'], 1)
+        self.assertEqual(response['checked'], 5)
+        self.assertNotIn(('/production/transaction/receipt', {'transaction_hash': 'null'}), self.chain.requests)
+
+        tip = self.get_tip('tip_user04', 1520150552000030)
+        self.assertEqual(tip['failed'], Decimal(1))
+        self.assertEqual(tip['error_message'], 'transaction is null')
+        self.assertIsNone(tip.get('uncompleted'))
+
+        # インデックスから除かれるため、再実行時は対象とならない
+        response = TipReconciliation({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response['invalid'], 0)
@@ -0,0 +1,186 @@
+import os
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import patch
+
+from exceptions import PrivateChainApiError
+from fake_private_chain import FakePrivateChain
+from private_chain_client import PrivateChainClient
+from tests_util import TestsUtil
+from tip_submission import TipSubmission
+
+
+class TestTipSubmission(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+        os.environ['PRIVATE_CHAIN_AWS_ACCESS_KEY'] = 'test'
+        os.environ['PRIVATE_CHAIN_AWS_SECRET_ACCESS_KEY'] = 'test'
+        os.environ['PRIVATE_CHAIN_EXECUTE_API_HOST'] = 'example.com'
+        PrivateChainClient.clear()
+        self.chain = FakePrivateChain()
+        self.chain.mount(PrivateChainClient._PrivateChainClient__get_session())
+        self.chain.set_balance('0x0000000000000000000000000000000000000001', 100)
+
+        tip_items = [
+            {
+                'user_id': 'tip_user01',
+                'sort_key': 1520150552000001,
+                'to_user_id': 'article_user01',
+                'tip_value': 10,
+                'article_id': 'publicId0001',
+                'article_title': 'title',
+                'from_user_eth_address': '0x0000000000000000000000000000000000000001',
+                'to_user_eth_address': '0x0000000000000000000000000000000000000002',
+                'queued': 1,
+                'reserved': 1,
+                'uncompleted': 1,
+                'created_at': 1520150552
+            },
+            {
+                'user_id': 'tip_user01',
+                'sort_key': 1520150552000002,
+                'to_user_id': 'article_user02',
+                'tip_value': 20,
+                'article_id': 'publicId0002',
+                'article_title': 'title',
+                'from_user_eth_address': '0x0000000000000000000000000000000000000001',
+                'to_user_eth_address': '0x0000000000000000000000000000000000000003',
+                'queued': 1,
+                'reserved': 1,
+                'uncompleted': 1,
+                'created_at': 1520150552
+            },
+            {
+                'user_id': 'tip_user02',
+                'sort_key': 1520150552000003,
+                'to_user_id': 'article_user01',
+                'tip_value': 10,
+                'article_id': 'publicId0001',
+                'article_title': 'title',
+                'transaction': '0x0123',
+                'uncompleted': 1,
+                'created_at': 1520150552
+            }
+        ]
+        TestsUtil.create_table(self.dynamodb, os.environ['TIP_TABLE_NAME'], tip_items)
+        TestsUtil.create_table(self.dynamodb, os.environ['WALLET_BALANCE_CACHE_TABLE_NAME'], [
+            {'eth_address': '0x0000000000000000000000000000000000000001', 'reserved': 30}
+        ])
+        self.tip_table = self.dynamodb.Table(os.environ['TIP_TABLE_NAME'])
+        self.wallet_balance_cache_table = self.dynamodb.Table(os.environ['WALLET_BALANCE_CACHE_TABLE_NAME'])
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+        PrivateChainClient.clear()
+
+    def get_tip(self, user_id, sort_key):
+        return self.tip_table.get_item(Key={'user_id': user_id, 'sort_key': sort_key})['Item']
+
+    def get_reserved(self):
+        return self.wallet_balance_cache_table.get_item(
+            Key={'eth_address': '0x0000000000000000000000000000000000000001'}
+        )['Item']['reserved']
+
+    @patch('tip_submission.time.sleep')
+    def test_main_ok(self, _):
+        self.chain.auto_mine = True
+
+        response = TipSubmission({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response, {'submitted': 2, 'failed': 0, 'unknown': 0, 'confirmed': 2, 'unconfirmed': 0})
+        self.assertEqual(self.chain.get_balance('0x0000000000000000000000000000000000000001'), 70)
+        self.assertEqual(self.chain.get_balance('0x0000000000000000000000000000000000000002'), 10)
+        self.assertEqual(self.chain.get_balance('0x0000000000000000000000000000000000000003'), 20)
+
+        for sort_key in [1520150552000001, 1520150552000002]:
+            tip = self.get_tip('tip_user01', sort_key)
+            self.assertIn(tip['transaction'], self.chain.transactions)
+            self.assertIsNone(tip.get('queued'))
+            self.assertIsNone(tip.get('uncompleted'))
+            self.assertIsNotNone(tip['submitted_at'])
+            self.assertIsNotNone(tip['completed_at'])
+
+        # キューに積まれていない投げ銭は対象外
+        self.assertEqual(self.get_tip('tip_user02', 1520150552000003)['uncompleted'], Decimal(1))
+
+        # 送受信したアドレスの残高のキャッシュを無効にし、予約した残高を解放する
+        self.assertEqual(len(self.wallet_balance_cache_table.scan()['Items']), 3)
+        self.assertEqual(self.get_reserved(), 0)
+
+    @patch('tip_submission.time.sleep')
+    @patch('tip_submission.settings.TIP_SUBMISSION_CONFIRMATION_SECONDS', 0)
+    def test_main_ok_unconfirmed(self, _):
+        response = TipSubmission({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response, {'submitted': 2, 'failed': 0, 'unknown': 0, 'confirmed': 0, 'unconfirmed': 2})
+
+        # レシートが確認できない投げ銭は uncompleted のまま残す
+        tip = self.get_tip('tip_user01', 1520150552000001)
+        self.assertIn(tip['transaction'], self.chain.transactions)
+        self.assertIsNone(tip.get('queued'))
+        self.assertEqual(tip['uncompleted'], Decimal(1))
+
+        # 再実行しても送信済みの投げ銭は再送しない
+        response = TipSubmission({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response, {'submitted': 0, 'failed': 0, 'unknown': 0, 'confirmed': 0, 'unconfirmed': 0})
+        self.assertEqual(len(self.chain.transactions), 2)
+
+    @patch('tip_submission.time.sleep')
+    def test_main_ok_with_send_error(self, _):
+        self.chain.auto_mine = True
+        self.chain.set_balance('0x0000000000000000000000000000000000000001', 15)
+
+        response = TipSubmission({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response, {'submitted': 1, 'failed': 1, 'unknown': 0, 'confirmed': 1, 'unconfirmed': 0})
+
+        tip = self.get_tip('tip_user01', 1520150552000002)
+        self.assertEqual(tip['failed'], Decimal(1))
+        self.assertEqual(tip['error_message'], 'insufficient funds')
+        self.assertIsNone(tip.get('transaction'))
+        self.assertIsNone(tip.get('uncompleted'))
+        # 送信が確定した投げ銭と失敗した投げ銭の予約を解放する
+        self.assertEqual(self.get_reserved(), 0)
+
+    @patch('tip_submission.time.sleep')
+    def test_main_ok_with_unknown_send_result(self, _):
+        self.chain.auto_mine = True
+
+        with patch('tip_submission.PrivateChainClient.send_tip', side_effect=PrivateChainApiError('timeout')):
+            response = TipSubmission({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response, {'submitted': 0, 'failed': 0, 'unknown': 2, 'confirmed': 0, 'unconfirmed': 0})
+
+        # 送信されたか判断できない場合は失敗とせず、uncompleted と予約した残高を残す
+        tip = self.get_tip('tip_user01', 1520150552000001)
+        self.assertEqual(tip['submission_unknown'], Decimal(1))
+        self.assertEqual(tip['error_message'], 'timeout')
+        self.assertEqual(tip['uncompleted'], Decimal(1))
+        self.assertIsNone(tip.get('failed'))
+        self.assertIsNone(tip.get('queued'))
+        self.assertEqual(self.get_reserved(), 30)
+
+    @patch('tip_submission.time.sleep')
+    def test_main_ok_with_reverted_transaction(self, sleep_mock):
+        sleep_mock.side_effect = lambda _: self.chain.mine(status='0x0')
+
+        response = TipSubmission({}, {}, dynamodb=self.dynamodb).main()
+
+        self.assertEqual(response, {'submitted': 2, 'failed': 2, 'unknown': 0, 'confirmed': 0, 'unconfirmed': 0})
+
+        tip = self.get_tip('tip_user01', 1520150552000001)
+        self.assertEqual(tip['failed'], Decimal(1))
+        self.assertEqual(tip['error_message'], 'transaction reverted')
+        self.assertIsNone(tip.get('uncompleted'))
+
+    def test_claim_ng_claimed_by_other(self):
+        tip = self.get_tip('tip_user01', 1520150552000001)
+
+        # 他の実行が先に取得した場合は送信対象としない
+        self.assertTrue(TipSubmission._TipSubmission__claim(self.tip_table, tip))
+        self.assertFalse(TipSubmission._TipSubmission__claim(self.tip_table, tip))
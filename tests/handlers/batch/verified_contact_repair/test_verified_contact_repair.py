@@ -0,0 +1,145 @@
+import os
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+
+from tests_util import TestsUtil
+from verified_contact_repair import VerifiedContactRepair
+
+
+class TestVerifiedContactRepair(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+        os.environ['COGNITO_USER_POOL_ID'] = 'cognito_user_pool'
+
+        verified_contact_items = [
+            {'contact': 'email#test01@example.com', 'user_id': 'test01'},
+            {'contact': 'phone_number#+818011112222', 'user_id': 'test01'},
+            {'contact': 'email#test02@example.com', 'user_id': 'test99'}
+        ]
+        TestsUtil.create_table(self.dynamodb, os.environ['VERIFIED_CONTACT_TABLE_NAME'], verified_contact_items)
+        self.table = self.dynamodb.Table(os.environ['VERIFIED_CONTACT_TABLE_NAME'])
+
+        self.list_users_responses = [
+            {
+                'Users': [
+                    {
+                        'Username': 'test01',
+                        'Attributes': [
+                            {'Name': 'email', 'Value': 'test01@example.com'},
+                            {'Name': 'email_verified', 'Value': 'true'},
+                            {'Name': 'phone_number', 'Value': '+818011112222'},
+                            {'Name': 'phone_number_verified', 'Value': 'false'}
+                        ]
+                    }
+                ],
+                'PaginationToken': 'token'
+            },
+            {
+                'Users': [
+                    {
+                        'Username': 'test02',
+                        'Attributes': [
+                            {'Name': 'email', 'Value': 'test02@example.com'},
+                            {'Name': 'email_verified', 'Value': 'true'},
+                            {'Name': 'phone_number', 'Value': '+818033334444'},
+                            {'Name': 'phone_number_verified', 'Value': 'true'}
+                        ]
+                    }
+                ]
+            }
+        ]
+        self.cognito = MagicMock()
+        self.cognito.list_users.side_effect = self.list_users_responses
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+    def get_contacts(self):
+        return sorted(
+            (item['contact'], item['user_id']) for item in self.table.scan()['Items'] if item['contact'] != 'repair_state'
+        )
+
+    def get_state(self):
+        return self.table.get_item(Key={'contact': 'repair_state'})['Item']
+
+    @patch('verified_contact_repair.time')
+    def test_main_ok(self, mock_time):
+        mock_time.time.return_value = 1520150000
+
+        response = VerifiedContactRepair({}, {}, dynamodb=self.dynamodb, cognito=self.cognito).main()
+
+        self.assertEqual(response, {'users': 2, 'completed': True, 'put': 3, 'deleted': 1})
+        self.assertEqual(self.get_contacts(), [
+            ('email#test01@example.com', 'test01'),
+            ('email#test02@example.com', 'test02'),
+            ('phone_number#+818033334444', 'test02')
+        ])
+        self.assertEqual(self.cognito.list_users.call_args_list[1][1]['PaginationToken'], 'token')
+        self.assertEqual(self.get_state(), {'contact': 'repair_state', 'completed_at': 1520150000})
+
+    @patch('verified_contact_repair.time')
+    def test_main_ok_not_completed(self, mock_time):
+        # 1ページ目を取得した時点で実行時間の上限を超えた場合
+        mock_time.time.side_effect = [1520150000, 1520150000, 1520150000 + 3600]
+
+        response = VerifiedContactRepair({}, {}, dynamodb=self.dynamodb, cognito=self.cognito).main()
+
+        # 全ユーザーを取得できなかった場合は削除せず、次回の実行のために PaginationToken を保存する
+        self.assertEqual(response, {'users': 1, 'completed': False, 'put': 1, 'deleted': 0})
+        self.assertEqual(len(self.get_contacts()), 3)
+        self.assertEqual(self.get_state(), {
+            'contact': 'repair_state',
+            'pagination_token': 'token',
+            'repair_started_at': 1520150000
+        })
+
+    @patch('verified_contact_repair.time')
+    def test_main_ok_resume(self, mock_time):
+        mock_time.time.return_value = 1520153600
+        self.table.put_item(Item={
+            'contact': 'repair_state',
+            'completed_at': 1520140000,
+            'pagination_token': 'token',
+            'repair_started_at': 1520150000
+        })
+        # 前回の実行で確認済みの連絡先
+        self.table.put_item(Item={'contact': 'email#test01@example.com', 'user_id': 'test01', 'repaired_at': 1520150000})
+        # 突き合わせ中にトリガーで登録された連絡先
+        self.table.put_item(Item={'contact': 'email#test03@example.com', 'user_id': 'test03', 'synced_at': 1520151000})
+        self.cognito.list_users.side_effect = self.list_users_responses[1:]
+
+        response = VerifiedContactRepair({}, {}, dynamodb=self.dynamodb, cognito=self.cognito).main()
+
+        self.assertEqual(response, {'users': 1, 'completed': True, 'put': 2, 'deleted': 1})
+        self.assertEqual(self.cognito.list_users.call_args[1]['PaginationToken'], 'token')
+        self.assertEqual(self.get_contacts(), [
+            ('email#test01@example.com', 'test01'),
+            ('email#test02@example.com', 'test02'),
+            ('email#test03@example.com', 'test03'),
+            ('phone_number#+818033334444', 'test02')
+        ])
+        self.assertEqual(self.get_state(), {'contact': 'repair_state', 'completed_at': 1520153600})
+
+    @patch('verified_contact_repair.time')
+    def test_main_ok_with_invalid_pagination_token(self, mock_time):
+        mock_time.time.return_value = 1520153600
+        self.table.put_item(Item={
+            'contact': 'repair_state',
+            'pagination_token': 'expired',
+            'repair_started_at': 1520150000
+        })
+        self.cognito.list_users.side_effect = [
+            ClientError({'Error': {'Code': 'InvalidParameterException'}}, 'ListUsers')
+        ] + self.list_users_responses
+
+        response = VerifiedContactRepair({}, {}, dynamodb=self.dynamodb, cognito=self.cognito).main()
+
+        # 最初から突き合わせ直す
+        self.assertEqual(response, {'users': 2, 'completed': True, 'put': 3, 'deleted': 1})
+        self.assertNotIn('PaginationToken', self.cognito.list_users.call_args_list[1][1])
+        self.assertEqual(self.get_state(), {'contact': 'repair_state', 'completed_at': 1520153600})
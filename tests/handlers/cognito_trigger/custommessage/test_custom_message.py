@@ -1,8 +1,10 @@
 import os
 import json
 from unittest import TestCase
+from unittest.mock import MagicMock
 from custom_message import CustomMessage
 from tests_util import TestsUtil
+from verified_contact_util import VerifiedContactUtil
 from jsonschema import validate
 
 
@@ -13,11 +15,21 @@ class TestCustomMessage(TestCase):
 
     @classmethod
     def setUpClass(cls):
-        pass
+        verified_contact_items = [
+            {'contact': 'phone_number#+818011112222', 'user_id': 'hoge9'},
+            {'contact': 'phone_number#+818033334444', 'user_id': 'hoge2'},
+            {'contact': 'repair_state', 'completed_at': 1520150000}
+        ]
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(dynamodb)
+        TestsUtil.create_table(dynamodb, os.environ['VERIFIED_CONTACT_TABLE_NAME'], verified_contact_items)
 
     @classmethod
     def tearDownClass(cls):
-        pass
+        TestsUtil.delete_all_tables(dynamodb)
+
+    def setUp(self):
+        VerifiedContactUtil.clear()
 
     def test_email_verify(self):
         os.environ['DOMAIN'] = "alis.example.com"
@@ -106,6 +118,89 @@ class TestCustomMessage(TestCase):
         response = custommessage.main()
         self.assertEqual(response['statusCode'],  400)
 
+    def test_already_verified_phone_number(self):
+        os.environ['DOMAIN'] = "alis.example.com"
+        event = {
+                    'version': '1',
+                    'region': 'us-east-1',
+                    'userPoolId': 'us-east-1_xxxxxxxxx',
+                    'userName': 'hoge2',
+                    'triggerSource': 'CustomMessage_VerifyUserAttribute',
+                    'request': {
+                        'userAttributes': {
+                            'email_verified': 'true',
+                            'phone_number_verified': 'false',
+                            'phone_number': '+818011112222',
+                            'email': 'hoge3@example.net'
+                        },
+                        'codeParameter': '{####}',
+                        'usernameParameter': None
+                    },
+                    'response': {
+                        'smsMessage': None,
+                        'emailMessage': None,
+                        'emailSubject': None
+                    }
+                }
+        # 他のユーザーが検証済みの電話番号
+        custommessage = CustomMessage(event=event, context="", dynamodb=dynamodb)
+        response = custommessage.main()
+        self.assertEqual(response['statusCode'],  400)
+
+        # 自身が以前に検証済みの電話番号
+        event['request']['userAttributes']['phone_number'] = '+818033334444'
+        custommessage = CustomMessage(event=event, context="", dynamodb=dynamodb)
+        response = custommessage.main()
+        self.assertEqual(response['response']['smsMessage'], 'hoge2さんの検証コードは {####} です。')
+
+        # 未検証となった電話番号は削除され、検証済みのメールアドレスは登録される
+        table = dynamodb.Table(os.environ['VERIFIED_CONTACT_TABLE_NAME'])
+        self.assertIsNone(table.get_item(Key={'contact': 'phone_number#+818033334444'}).get('Item'))
+        self.assertEqual(table.get_item(Key={'contact': 'email#hoge3@example.net'})['Item']['user_id'], 'hoge2')
+
+    def test_already_verified_phone_number_not_synced(self):
+        os.environ['DOMAIN'] = "alis.example.com"
+        event = {
+                    'version': '1',
+                    'region': 'us-east-1',
+                    'userPoolId': 'us-east-1_xxxxxxxxx',
+                    'userName': 'hoge2',
+                    'triggerSource': 'CustomMessage_VerifyUserAttribute',
+                    'request': {
+                        'userAttributes': {
+                            'email_verified': 'true',
+                            'phone_number_verified': 'false',
+                            'phone_number': '+818055556666',
+                            'email': 'hoge3@example.net'
+                        },
+                        'codeParameter': '{####}',
+                        'usernameParameter': None
+                    },
+                    'response': {
+                        'smsMessage': None,
+                        'emailMessage': None,
+                        'emailSubject': None
+                    }
+                }
+        cognito = MagicMock()
+        cognito.list_users.return_value = {
+            'Users': [
+                {
+                    'Username': 'hoge5',
+                    'Attributes': [{'Name': 'phone_number_verified', 'Value': 'true'}]
+                }
+            ]
+        }
+
+        # 突き合わせの完了後も、テーブルに登録される前に他のユーザーが検証した電話番号は Cognito で確認する
+        custommessage = CustomMessage(event=event, context="", dynamodb=dynamodb, cognito=cognito)
+        response = custommessage.main()
+        self.assertEqual(response['statusCode'],  400)
+        self.assertEqual(cognito.list_users.call_args[1], {
+            'UserPoolId': 'us-east-1_xxxxxxxxx',
+            'Filter': 'phone_number = "+818055556666"'
+        })
+
     def test_correct_phone_number(self):
         custommessage = CustomMessage(event={}, context="", dynamodb=dynamodb)
         result = validate({'phone_number': '+818012345678'}, custommessage.get_schema())
@@ -22,6 +22,8 @@ class TestPostConfirmation(TestCase):
         TestsUtil.delete_all_tables(dynamodb)
         TestsUtil.create_table(dynamodb, os.environ['USERS_TABLE_NAME'], user_tables_items)
         TestsUtil.create_table(dynamodb, os.environ['BETA_USERS_TABLE_NAME'], beta_tables)
+        TestsUtil.create_table(dynamodb, os.environ['USER_PRIVATE_ETH_ADDRESS_TABLE_NAME'], [])
+        TestsUtil.create_table(dynamodb, os.environ['VERIFIED_CONTACT_TABLE_NAME'], [])
 
     @classmethod
     def tearDownClass(cls):
@@ -36,7 +38,8 @@ class TestPostConfirmation(TestCase):
                 'request': {
                     'userAttributes': {
                         'phone_number': '',
-                        'email': 'already@example.com'
+                        'email': 'already@example.com',
+                        'email_verified': 'true'
                     }
                 }
         }
@@ -47,6 +50,11 @@ class TestPostConfirmation(TestCase):
         self.assertEqual(items['Item']['user_id'], items['Item']['user_display_name'])
         self.assertEqual(items['Item']['sync_elasticsearch'], 1)
 
+        # 検証済みのメールアドレスを登録する
+        table = dynamodb.Table(os.environ['VERIFIED_CONTACT_TABLE_NAME'])
+        items = table.get_item(Key={"contact": "email#already@example.com"})
+        self.assertEqual(items['Item']['user_id'], "hogehoge")
+
     @patch("post_confirmation.PostConfirmation._PostConfirmation__wallet_initialization",
            MagicMock(return_value=True))
     def test_create_userid_already_exists(self):
@@ -110,6 +118,11 @@ class TestPostConfirmation(TestCase):
         items = table.get_item(Key={"user_id": "foobar"})
         self.assertEqual(items['Item']['user_id'], items['Item']['user_display_name'])
 
+        # 既存のアドレスを投げ銭時に参照できるよう保存すること
+        table = dynamodb.Table(os.environ['USER_PRIVATE_ETH_ADDRESS_TABLE_NAME'])
+        items = table.get_item(Key={"user_id": "foobar"})
+        self.assertEqual(items['Item']['private_eth_address'], "0x5d7743a4a6f21593ff6d3d81595f270123456789")
+
     # BUGFIX: ALIS-893
     @patch("post_confirmation.PostConfirmation._PostConfirmation__create_new_account",
            MagicMock(side_effect=Exception()))
@@ -1,6 +1,8 @@
 import os
 from unittest import TestCase
+from unittest.mock import patch
 from pre_authentication import PreAuthentication
+from service_unavailable_error import ServiceUnavailableError
 from tests_util import TestsUtil
 
 
@@ -18,6 +20,7 @@ class TestPreAuthentication(TestCase):
         TestsUtil.set_all_tables_name_to_env()
         TestsUtil.delete_all_tables(dynamodb)
         TestsUtil.create_table(dynamodb, os.environ['EXTERNAL_PROVIDER_USERS_TABLE_NAME'], external_provider_user_items)
+        TestsUtil.create_table(dynamodb, os.environ['VERIFIED_CONTACT_TABLE_NAME'], [])
 
     @classmethod
     def tearDownClass(cls):
@@ -92,7 +95,10 @@ class TestPreAuthentication(TestCase):
             'triggerSource': 'PreAuthentication_Authentication',
             'request': {
                 'userAttributes': {
-                    'email': 'test@example.com'
+                    'email': 'test@example.com',
+                    'email_verified': 'true',
+                    'phone_number': '+818011112222',
+                    'phone_number_verified': 'true'
                 }
             },
             'response': {
@@ -105,6 +111,44 @@ class TestPreAuthentication(TestCase):
         response = pre_authentication.main()
         self.assertEqual(event, response)
 
+        # ログイン時に検証済みの連絡先を登録する
+        table = dynamodb.Table(os.environ['VERIFIED_CONTACT_TABLE_NAME'])
+        self.assertEqual(table.get_item(Key={'contact': 'email#test@example.com'})['Item']['user_id'], 'normal_user')
+        self.assertEqual(
+            table.get_item(Key={'contact': 'phone_number#+818011112222'})['Item']['user_id'], 'normal_user'
+        )
+
+    def test_normal_user_ok_login_with_service_unavailable(self):
+        event = {
+            'version': '1',
+            'region': 'us-east-1',
+            'userPoolId': 'us-east-xxxxxxxx',
+            'userName': 'normal_user',
+            'callerContext': {
+                'awsSdkVersion': 'aws-sdk-js-2.6.4',
+                'clientId': 'xxxxx'
+            },
+            'triggerSource': 'PreAuthentication_Authentication',
+            'request': {
+                'userAttributes': {
+                    'email': 'test@example.com',
+                    'email_verified': 'true'
+                }
+            },
+            'response': {
+                'autoConfirmUser': False,
+                'autoVerifyEmail': False,
+                'autoVerifyPhone': False
+            }
+        }
+        # サーキットブレーカーにより連絡先を登録できない場合もログインは継続させる
+        with patch('pre_authentication.VerifiedContactUtil.sync',
+                   side_effect=ServiceUnavailableError('VerifiedContact is temporarily unavailable')):
+            pre_authentication = PreAuthentication(event=event, context="", dynamodb=dynamodb)
+            response = pre_authentication.main()
+
+        self.assertEqual(event, response)
+
     def test_has_user_id_login_ok(self):
         event = {
             'version': '1',
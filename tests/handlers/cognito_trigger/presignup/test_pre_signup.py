@@ -4,6 +4,7 @@ from unittest import TestCase
 from unittest.mock import MagicMock, patch
 from pre_signup import PreSignUp
 from tests_util import TestsUtil
+from verified_contact_util import VerifiedContactUtil
 
 dynamodb = TestsUtil.get_dynamodb_client()
 
@@ -19,11 +20,19 @@ class TestPreSignUp(TestCase):
         TestsUtil.set_all_tables_name_to_env()
         TestsUtil.delete_all_tables(dynamodb)
         TestsUtil.create_table(dynamodb, os.environ['BETA_USERS_TABLE_NAME'], items)
+        verified_contact_items = [
+            {'contact': 'email#verified@example.com', 'user_id': 'verified'},
+            {'contact': 'repair_state', 'completed_at': 1520150000}
+        ]
+        TestsUtil.create_table(dynamodb, os.environ['VERIFIED_CONTACT_TABLE_NAME'], verified_contact_items)
 
     @classmethod
     def tearDownClass(cls):
         TestsUtil.delete_all_tables(dynamodb)
 
+    def setUp(self):
+        VerifiedContactUtil.clear()
+
     def test_validate_ng_too_short(self):
         event = {
             'version': '1',
@@ -279,3 +288,80 @@ class TestPreSignUp(TestCase):
         presignup = PreSignUp(event=event, context="", dynamodb=dynamodb)
         response = presignup.main()
         self.assertEqual(response['statusCode'], 500)
+
+    def test_already_verified_email(self):
+        os.environ['BETA_MODE_FLAG'] = "0"
+        os.environ['EXTERNAL_PROVIDER_LOGIN_MARK'] = 'test_marker'
+        event = {
+            'userName': 'yamasita3',
+            'userPoolId': 'us-east-xxxxxxxx',
+            'triggerSource': 'PreSignUp_SignUp',
+            'request': {
+                'userAttributes': {
+                    'phone_number': '',
+                    'email': 'Verified@example.com'
+                },
+                'validationData': None
+            }
+        }
+        presignup = PreSignUp(event=event, context="", dynamodb=dynamodb)
+        response = presignup.main()
+        self.assertEqual(response['statusCode'], 400)
+
+        event['request']['userAttributes']['email'] = 'not_verified@example.com'
+        presignup = PreSignUp(event=event, context="", dynamodb=dynamodb)
+        response = presignup.main()
+        self.assertEqual(response['userName'], 'yamasita3')
+
+    def test_already_verified_email_before_backfilled(self):
+        os.environ['BETA_MODE_FLAG'] = "0"
+        os.environ['EXTERNAL_PROVIDER_LOGIN_MARK'] = 'test_marker'
+        event = {
+            'userName': 'yamasita3',
+            'userPoolId': 'us-east-xxxxxxxx',
+            'triggerSource': 'PreSignUp_SignUp',
+            'request': {
+                'userAttributes': {
+                    'phone_number': '',
+                    'email': 'cognito_verified@example.com'
+                },
+                'validationData': None
+            }
+        }
+        cognito = MagicMock()
+        cognito.list_users.return_value = {
+            'Users': [
+                {
+                    'Username': 'cognito_verified',
+                    'Attributes': [{'Name': 'email_verified', 'Value': 'true'}]
+                }
+            ]
+        }
+        table = dynamodb.Table(os.environ['VERIFIED_CONTACT_TABLE_NAME'])
+        table.delete_item(Key={'contact': 'repair_state'})
+
+        try:
+            # バッチによる突き合わせが完了するまではテーブルに存在しない連絡先を Cognito に問い合わせる
+            presignup = PreSignUp(event=event, context="", dynamodb=dynamodb, cognito=cognito)
+            response = presignup.main()
+            self.assertEqual(response['statusCode'], 400)
+            self.assertEqual(cognito.list_users.call_args[1], {
+                'UserPoolId': 'us-east-xxxxxxxx',
+                'Filter': 'email = "cognito_verified@example.com"'
+            })
+            # Cognito で見つかった連絡先はテーブルに登録する
+            self.assertEqual(
+                table.get_item(Key={'contact': 'email#cognito_verified@example.com'})['Item']['user_id'],
+                'cognito_verified'
+            )
+            table.delete_item(Key={'contact': 'email#cognito_verified@example.com'})
+
+            # 突き合わせが完了した後は Cognito に問い合わせない
+            table.put_item(Item={'contact': 'repair_state', 'completed_at': 1520150000})
+            cognito.reset_mock()
+            presignup = PreSignUp(event=event, context="", dynamodb=dynamodb, cognito=cognito)
+            response = presignup.main()
+            self.assertEqual(response['userName'], 'yamasita3')
+            self.assertEqual(cognito.list_users.call_count, 0)
+        finally:
+            table.put_item(Item={'contact': 'repair_state', 'completed_at': 1520150000})
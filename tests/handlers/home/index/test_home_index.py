@@ -0,0 +1,199 @@
+import json
+import os
+import uuid
+from unittest import TestCase
+from unittest.mock import patch
+
+import settings
+from elasticsearch import Elasticsearch
+from tests_es_util import TestsEsUtil
+
+from home_index import HomeIndex
+from tests_util import TestsUtil
+
+
+class TestHomeIndex(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+    elasticsearch = Elasticsearch(
+        hosts=[{'host': 'localhost'}]
+    )
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+        self.topic_items = [
+            {'name': 'crypto', 'order': 1, 'index_hash_key': settings.TOPIC_INDEX_HASH_KEY},
+            {'name': 'fashion', 'order': 2, 'index_hash_key': settings.TOPIC_INDEX_HASH_KEY}
+        ]
+        TestsUtil.create_table(self.dynamodb, os.environ['TOPIC_TABLE_NAME'], self.topic_items)
+
+        unread_notification_manager_items = [
+            {'user_id': 'test01', 'unread': True}
+        ]
+        TestsUtil.create_table(
+            self.dynamodb, os.environ['UNREAD_NOTIFICATION_MANAGER_TABLE_NAME'], unread_notification_manager_items
+        )
+
+        TestsEsUtil.create_articles_index(self.elasticsearch)
+        self.article_topics = {1: 'crypto', 2: 'fashion', 3: 'crypto'}
+        for i in range(1, 4):
+            self.elasticsearch.index(
+                index='articles',
+                doc_type='article',
+                id='testid00000{0}'.format(i),
+                body={
+                    'article_id': 'testid00000{0}'.format(i),
+                    'user_id': 'test01',
+                    'title': 'title{0}'.format(i),
+                    'status': 'public',
+                    'topic': self.article_topics[i],
+                    'sort_key': 1520150272000000 + i
+                }
+            )
+        self.elasticsearch.indices.refresh(index='articles')
+
+        TestsEsUtil.delete_alias(self.elasticsearch, settings.ARTICLE_SCORE_INDEX_NAME)
+        index_name = settings.ARTICLE_SCORE_INDEX_NAME + str(uuid.uuid4())
+        self.elasticsearch.indices.create(index=index_name)
+        self.elasticsearch.indices.put_alias(index_name, settings.ARTICLE_SCORE_INDEX_NAME)
+        for i, article_score in enumerate([12, 18, 6], 1):
+            self.elasticsearch.index(
+                index=settings.ARTICLE_SCORE_INDEX_NAME,
+                doc_type='article_score',
+                id='testid00000{0}'.format(i),
+                body={
+                    'article_id': 'testid00000{0}'.format(i),
+                    'topic': self.article_topics[i],
+                    'article_score': article_score
+                }
+            )
+        self.elasticsearch.indices.refresh(settings.ARTICLE_SCORE_INDEX_NAME)
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+        TestsEsUtil.remove_articles_index(self.elasticsearch)
+        TestsEsUtil.delete_alias(self.elasticsearch, settings.ARTICLE_SCORE_INDEX_NAME)
+
+    def test_main_ok(self):
+        params = {
+            'queryStringParameters': {
+                'limit': '2'
+            }
+        }
+
+        with patch.object(self.elasticsearch, 'msearch', wraps=self.elasticsearch.msearch) as mock_msearch, \
+                patch.object(self.elasticsearch, 'search', wraps=self.elasticsearch.search) as mock_search:
+            response = HomeIndex(params, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+            # 最新記事と人気記事は1回の msearch で取得する
+            self.assertEqual(mock_msearch.call_count, 1)
+            self.assertEqual(mock_search.call_count, 0)
+
+        self.assertEqual(response['statusCode'], 200)
+
+        body = json.loads(response['body'])
+        self.assertEqual(
+            [article['article_id'] for article in body['articles']['recent']['Items']],
+            ['testid000003', 'testid000002']
+        )
+        self.assertEqual(
+            [article['article_id'] for article in body['articles']['popular']['Items']],
+            ['testid000002', 'testid000001']
+        )
+        self.assertEqual([topic['name'] for topic in body['topics']], ['crypto', 'fashion'])
+        self.assertIsNone(body.get('unread_notification_manager'))
+
+    def test_main_ok_with_topic(self):
+        # トピックごとに最新記事、人気記事が絞り込まれる
+        for topic, expected_recent, expected_popular in [
+            ('crypto', ['testid000003', 'testid000001'], ['testid000001', 'testid000003']),
+            ('fashion', ['testid000002'], ['testid000002'])
+        ]:
+            params = {
+                'queryStringParameters': {
+                    'topic': topic
+                }
+            }
+
+            response = HomeIndex(params, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+            self.assertEqual(response['statusCode'], 200)
+
+            body = json.loads(response['body'])
+            self.assertEqual([article['article_id'] for article in body['articles']['recent']['Items']], expected_recent)
+            self.assertEqual(
+                [article['article_id'] for article in body['articles']['popular']['Items']],
+                expected_popular
+            )
+            # トピック一覧は絞り込まない
+            self.assertEqual([topic['name'] for topic in body['topics']], ['crypto', 'fashion'])
+
+    def test_main_ok_with_login(self):
+        params = {
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': 'test01'
+                    }
+                }
+            }
+        }
+
+        response = HomeIndex(params, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        self.assertEqual(response['statusCode'], 200)
+
+        body = json.loads(response['body'])
+        self.assertEqual(len(body['articles']['recent']['Items']), 3)
+        self.assertEqual(len(body['articles']['popular']['Items']), 3)
+        self.assertEqual(body['unread_notification_manager'], {'unread': True})
+
+    def test_main_ok_with_login_not_exists_unread_notification_manager(self):
+        params = {
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': 'test02'
+                    }
+                }
+            }
+        }
+
+        response = HomeIndex(params, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body'])['unread_notification_manager'], {'unread': False})
+
+    def test_main_ok_not_exists_article_scores_index(self):
+        TestsEsUtil.delete_alias(self.elasticsearch, settings.ARTICLE_SCORE_INDEX_NAME)
+
+        response = HomeIndex({}, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        self.assertEqual(response['statusCode'], 200)
+
+        body = json.loads(response['body'])
+        self.assertEqual(len(body['articles']['recent']['Items']), 3)
+        self.assertEqual(body['articles']['popular']['Items'], [])
+
+    def test_validation_limit_min(self):
+        params = {
+            'queryStringParameters': {
+                'limit': '0'
+            }
+        }
+
+        response = HomeIndex(params, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        self.assertEqual(response['statusCode'], 400)
+
+    def test_validation_invalid_topic(self):
+        params = {
+            'queryStringParameters': {
+                'topic': 'AAAAAA'
+            }
+        }
+
+        response = HomeIndex(params, {}, dynamodb=self.dynamodb, elasticsearch=self.elasticsearch).main()
+
+        self.assertEqual(response['statusCode'], 400)
@@ -115,7 +115,8 @@ class TestMeArticlesCommentsCreate(TestCase):
             'article_id': 'publicId0001',
             'user_id': 'test_user_id01',
             'created_at': 1520150552,
-            'sort_key': 1520150552000003
+            'sort_key': 1520150552000003,
+            'like_count': 0
         }
 
         expected_notification = {
@@ -72,30 +72,35 @@ class TestMeArticlesCommentsLikesIndex(TestCase):
                 'comment_id': 'comment00001',
                 'user_id': 'like_user_01',
                 'article_id': 'publicId0001',
+                'article_id_user_id': 'publicId0001#like_user_01',
                 'created_at': 1520150272
             },
             {
                 'comment_id': 'comment00001',
                 'user_id': 'like_user_02',
                 'article_id': 'publicId0001',
+                'article_id_user_id': 'publicId0001#like_user_02',
                 'created_at': 1520150272
             },
             {
                 'comment_id': 'comment00002',
                 'user_id': 'like_user_02',
                 'article_id': 'publicId0001',
+                'article_id_user_id': 'publicId0001#like_user_02',
                 'created_at': 1520150272
             },
             {
                 'comment_id': 'comment00003',
                 'user_id': 'like_user_01',
                 'article_id': 'publicId0001',
+                'article_id_user_id': 'publicId0001#like_user_01',
                 'created_at': 1520150272
             },
             {
                 'comment_id': 'comment00004',
                 'user_id': 'like_user_01',
                 'article_id': 'publicId0002',
+                'article_id_user_id': 'publicId0002#like_user_01',
                 'created_at': 1520150272
             }
         ]
@@ -106,6 +106,7 @@ class TestMeArticlesDraftsPublish(TestCase):
             {'name': 'food', 'order': 3, 'index_hash_key': settings.TOPIC_INDEX_HASH_KEY}
         ]
         TestsUtil.create_table(self.dynamodb, os.environ['TOPIC_TABLE_NAME'], topic_items)
+        TestsUtil.create_table(self.dynamodb, os.environ['TAG_COUNT_EVENT_TABLE_NAME'], [])
 
         TestsEsUtil.create_tag_index(self.elasticsearch)
         self.elasticsearch.indices.refresh(index="tags")
@@ -180,6 +181,12 @@ class TestMeArticlesDraftsPublish(TestCase):
         self.assertEqual(len(article_history_after) - len(article_history_before), 1)
         self.assertEqual(len(article_content_edit_after) - len(article_content_edit_before), 0)
 
+        tag_count_events = self.dynamodb.Table(os.environ['TAG_COUNT_EVENT_TABLE_NAME']).scan()['Items']
+        self.assertEqual(
+            sorted([(event['name'], event['count']) for event in tag_count_events]),
+            [('A', 1), ('B', 1), ('C', 1), ('D', 1), ('E' * 25, 1), ('a', -1), ('b', -1), ('c', -1)]
+        )
+
     def test_main_ok_with_article_content_edit(self):
         params = {
             'pathParameters': {
@@ -276,8 +283,8 @@ class TestMeArticlesDraftsPublish(TestCase):
         self.assertEqual(len(article_history_after) - len(article_history_before), 1)
         self.assertEqual(len(article_content_edit_after) - len(article_content_edit_before), 0)
 
-    @patch("me_articles_drafts_publish.TagUtil.create_and_count", MagicMock(side_effect=Exception()))
-    def test_create_and_count_raise_exception(self):
+    @patch("me_articles_drafts_publish.TagUtil.put_count_events", MagicMock(side_effect=Exception()))
+    def test_put_count_events_raise_exception(self):
         params = {
             'pathParameters': {
                 'article_id': 'draftId00001'
@@ -336,8 +343,8 @@ class TestMeArticlesDraftsPublish(TestCase):
             args, _ = mock_lib.get_tags_with_name_collation.call_args
             self.assertEqual(args[1], ['A'])
 
-            self.assertTrue(mock_lib.create_and_count.called)
-            args, _ = mock_lib.create_and_count.call_args
+            self.assertTrue(mock_lib.put_count_events.called)
+            args, _ = mock_lib.put_count_events.call_args
 
             self.assertTrue(args[0])
             self.assertEqual(args[1], ['a', 'b', 'c'])
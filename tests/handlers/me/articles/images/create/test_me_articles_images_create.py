@@ -1,6 +1,7 @@
 import os
 import boto3
 import base64
+import hashlib
 import json
 import settings
 from tests_util import TestsUtil
@@ -39,9 +40,16 @@ class TestMeArticlesImagesCreate(TestCase):
                 'status': 'draft',
                 'user_id': 'test0001',
                 'sort_key': 1520150272000001
+            },
+            {
+                'article_id': 'testid000002',
+                'status': 'draft',
+                'user_id': 'test0000',
+                'sort_key': 1520150272000002
             }
         ]
         TestsUtil.create_table(cls.dynamodb, os.environ['ARTICLE_INFO_TABLE_NAME'], cls.article_info_table_items)
+        TestsUtil.create_table(cls.dynamodb, os.environ['PROCESSED_IMAGE_TABLE_NAME'], [])
 
     @classmethod
     def tearDownClass(cls):
@@ -64,7 +72,16 @@ class TestMeArticlesImagesCreate(TestCase):
                 return True
         return False
 
-    @patch('uuid.uuid4', MagicMock(return_value='uuid'))
+    def get_srcset(self, key_prefix, image_format, widths, width):
+        url_prefix = 'https://' + os.environ['DOMAIN'] + '/' + key_prefix
+        return {
+            'image/' + image_format: ', '.join(
+                [url_prefix + '_{0}w.{1} {0}w'.format(w, image_format) for w in widths] +
+                [url_prefix + '.{0} {1}w'.format(image_format, width)]
+            ),
+            'image/webp': ', '.join(url_prefix + '_{0}w.webp {0}w'.format(w) for w in widths + [width])
+        }
+
     def test_main_ok_status_public(self):
         image_data = Image.new('RGB', (1, 1))
         buf = BytesIO()
@@ -96,15 +113,15 @@ class TestMeArticlesImagesCreate(TestCase):
         self.assertEqual(response['statusCode'], 200)
 
         image_url_path = target_article_info['user_id'] + '/' + target_article_info['article_id'] + '/'
-        image_file_name = 'uuid.' + image_format
-        key = settings.S3_ARTICLES_IMAGES_PATH + image_url_path + image_file_name
+        key_prefix = settings.S3_ARTICLES_IMAGES_PATH + image_url_path + hashlib.sha256(buf.getvalue()).hexdigest()
+        key = key_prefix + '.' + image_format
         expected_item = {
-            'image_url': 'https://' + os.environ['DOMAIN'] + '/' + key
+            'image_url': 'https://' + os.environ['DOMAIN'] + '/' + key,
+            'srcset': self.get_srcset(key_prefix, image_format, [], 1)
         }
         self.assertEqual(json.loads(response['body']), expected_item)
         self.assertTrue(self.equal_size_to_s3_image(key, image_data.size))
 
-    @patch('uuid.uuid4', MagicMock(return_value='uuid'))
     def test_main_ok_status_draft_and_content_type_is_upper_case(self):
         image_data = Image.new('RGB', (1, 1))
         buf = BytesIO()
@@ -136,15 +153,15 @@ class TestMeArticlesImagesCreate(TestCase):
         self.assertEqual(response['statusCode'], 200)
 
         image_url_path = target_article_info['user_id'] + '/' + target_article_info['article_id'] + '/'
-        image_file_name = 'uuid.' + image_format
-        key = settings.S3_ARTICLES_IMAGES_PATH + image_url_path + image_file_name
+        key_prefix = settings.S3_ARTICLES_IMAGES_PATH + image_url_path + hashlib.sha256(buf.getvalue()).hexdigest()
+        key = key_prefix + '.' + image_format
         expected_item = {
-            'image_url': 'https://' + os.environ['DOMAIN'] + '/' + key
+            'image_url': 'https://' + os.environ['DOMAIN'] + '/' + key,
+            'srcset': self.get_srcset(key_prefix, image_format, [], 1)
         }
         self.assertEqual(json.loads(response['body']), expected_item)
         self.assertTrue(self.equal_size_to_s3_image(key, image_data.size))
 
-    @patch('uuid.uuid4', MagicMock(return_value='uuid'))
     def test_main_ok_width_over_png(self):
         image_data = Image.new('RGB', (settings.ARTICLE_IMAGE_MAX_WIDTH + 1, settings.ARTICLE_IMAGE_MAX_HEIGHT))
         buf = BytesIO()
@@ -176,15 +193,15 @@ class TestMeArticlesImagesCreate(TestCase):
         self.assertEqual(response['statusCode'], 200)
 
         image_url_path = target_article_info['user_id'] + '/' + target_article_info['article_id'] + '/'
-        image_file_name = 'uuid.' + image_format
-        key = settings.S3_ARTICLES_IMAGES_PATH + image_url_path + image_file_name
+        key_prefix = settings.S3_ARTICLES_IMAGES_PATH + image_url_path + hashlib.sha256(buf.getvalue()).hexdigest()
+        key = key_prefix + '.' + image_format
         expected_item = {
-            'image_url': 'https://' + os.environ['DOMAIN'] + '/' + key
+            'image_url': 'https://' + os.environ['DOMAIN'] + '/' + key,
+            'srcset': self.get_srcset(key_prefix, image_format, [640, 1280, 1920], 3840)
         }
         self.assertEqual(json.loads(response['body']), expected_item)
         self.assertTrue(self.equal_size_to_s3_image(key, (3840, 2159)))
 
-    @patch('uuid.uuid4', MagicMock(return_value='uuid'))
     def test_main_ok_height_over_gif(self):
         image_data = Image.new('RGB', (settings.ARTICLE_IMAGE_MAX_WIDTH, settings.ARTICLE_IMAGE_MAX_HEIGHT + 1))
         buf = BytesIO()
@@ -216,15 +233,15 @@ class TestMeArticlesImagesCreate(TestCase):
         self.assertEqual(response['statusCode'], 200)
 
         image_url_path = target_article_info['user_id'] + '/' + target_article_info['article_id'] + '/'
-        image_file_name = 'uuid.' + image_format
-        key = settings.S3_ARTICLES_IMAGES_PATH + image_url_path + image_file_name
+        key_prefix = settings.S3_ARTICLES_IMAGES_PATH + image_url_path + hashlib.sha256(buf.getvalue()).hexdigest()
+        key = key_prefix + '.' + image_format
         expected_item = {
-            'image_url':  'https://' + os.environ['DOMAIN'] + '/' + key
+            'image_url': 'https://' + os.environ['DOMAIN'] + '/' + key,
+            'srcset': self.get_srcset(key_prefix, image_format, [640, 1280, 1920], 3838)
         }
         self.assertEqual(json.loads(response['body']), expected_item)
         self.assertTrue(self.equal_size_to_s3_image(key, (3838, 2160)))
 
-    @patch('uuid.uuid4', MagicMock(return_value='uuid'))
     def test_main_ok_max_size_jepg(self):
         image_data = Image.new('RGB', (settings.ARTICLE_IMAGE_MAX_WIDTH, settings.ARTICLE_IMAGE_MAX_HEIGHT))
         buf = BytesIO()
@@ -256,13 +273,127 @@ class TestMeArticlesImagesCreate(TestCase):
         self.assertEqual(response['statusCode'], 200)
 
         image_url_path = target_article_info['user_id'] + '/' + target_article_info['article_id'] + '/'
-        image_file_name = 'uuid.' + image_format
-        key = settings.S3_ARTICLES_IMAGES_PATH + image_url_path + image_file_name
+        key_prefix = settings.S3_ARTICLES_IMAGES_PATH + image_url_path + hashlib.sha256(buf.getvalue()).hexdigest()
+        key = key_prefix + '.' + image_format
         expected_item = {
-            'image_url': 'https://' + os.environ['DOMAIN'] + '/' + key
+            'image_url': 'https://' + os.environ['DOMAIN'] + '/' + key,
+            'srcset': self.get_srcset(key_prefix, image_format, [640, 1280, 1920], 3840)
         }
         self.assertEqual(json.loads(response['body']), expected_item)
         self.assertTrue(self.equal_size_to_s3_image(key, image_data.size))
+        self.assertTrue(self.equal_size_to_s3_image(key_prefix + '_640w.jpeg', (640, 360)))
+        self.assertTrue(self.equal_size_to_s3_image(key_prefix + '_1920w.webp', (1920, 1080)))
+        self.assertTrue(self.equal_size_to_s3_image(key_prefix + '_3840w.webp', image_data.size))
+
+    def test_main_ok_animated_gif(self):
+        frames = [Image.new('RGB', (1280, 720), color) for color in ['red', 'blue']]
+        buf = BytesIO()
+        image_format = 'gif'
+        frames[0].save(buf, format=image_format, save_all=True, append_images=frames[1:])
+
+        target_article_info = self.article_info_table_items[0]
+        params = {
+            'headers': {
+                'content-type': 'image/' + image_format
+            },
+            'pathParameters': {
+                'article_id': target_article_info['article_id']
+            },
+            'body': json.dumps({'article_image': base64.b64encode(buf.getvalue()).decode('ascii')}),
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': target_article_info['user_id'],
+                        'phone_number_verified': 'true',
+                        'email_verified': 'true'
+                    }
+                }
+            }
+        }
+
+        response = MeArticlesImagesCreate(params, {}, dynamodb=self.dynamodb, s3=self.s3).main()
+
+        self.assertEqual(response['statusCode'], 200)
+
+        # アニメーション画像は縮小・変換した画像を生成しない
+        image_url_path = target_article_info['user_id'] + '/' + target_article_info['article_id'] + '/'
+        image_url = 'https://' + os.environ['DOMAIN'] + '/' + settings.S3_ARTICLES_IMAGES_PATH + image_url_path + \
+            hashlib.sha256(buf.getvalue()).hexdigest() + '.gif'
+        expected_item = {
+            'image_url': image_url,
+            'srcset': {'image/gif': image_url + ' 1280w'}
+        }
+        self.assertEqual(json.loads(response['body']), expected_item)
+
+    def get_params(self, article_info, image_format, image_data):
+        return {
+            'headers': {
+                'content-type': 'image/' + image_format
+            },
+            'pathParameters': {
+                'article_id': article_info['article_id']
+            },
+            'body': json.dumps({'article_image': base64.b64encode(image_data).decode('ascii')}),
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': article_info['user_id'],
+                        'phone_number_verified': 'true',
+                        'email_verified': 'true'
+                    }
+                }
+            }
+        }
+
+    def test_main_ok_same_image(self):
+        image_data = Image.new('RGB', (10, 20), 'red')
+        buf = BytesIO()
+        image_format = 'png'
+        image_data.save(buf, format=image_format)
+
+        response = MeArticlesImagesCreate(
+            self.get_params(self.article_info_table_items[0], image_format, buf.getvalue()), {},
+            dynamodb=self.dynamodb, s3=self.s3
+        ).main()
+        # 同じユーザーが同じ画像を別の記事にアップロードした場合は、保存済みの画像を返却する
+        with patch('image_upload_util.ImageUploadUtil.save_article_image') as mock_save_article_image:
+            same_image_response = MeArticlesImagesCreate(
+                self.get_params(self.article_info_table_items[2], image_format, buf.getvalue()), {},
+                dynamodb=self.dynamodb, s3=self.s3
+            ).main()
+
+        self.assertEqual(same_image_response['statusCode'], 200)
+        self.assertEqual(json.loads(same_image_response['body']), json.loads(response['body']))
+        self.assertIn('/testid000000/', json.loads(same_image_response['body'])['image_url'])
+        mock_save_article_image.assert_not_called()
+
+    def test_main_ok_async_processing(self):
+        image_data = Image.new('RGB', (settings.ARTICLE_IMAGE_MAX_WIDTH * 2, settings.ARTICLE_IMAGE_MAX_HEIGHT), 'blue')
+        buf = BytesIO()
+        image_format = 'jpeg'
+        image_data.save(buf, format=image_format)
+
+        target_article_info = self.article_info_table_items[0]
+        with patch.dict(os.environ, {'IMAGE_ASYNC_PROCESSING_FLAG': '1'}):
+            response = MeArticlesImagesCreate(
+                self.get_params(target_article_info, image_format, buf.getvalue()), {},
+                dynamodb=self.dynamodb, s3=self.s3
+            ).main()
+
+        self.assertEqual(response['statusCode'], 200)
+
+        image_url_path = target_article_info['user_id'] + '/' + target_article_info['article_id'] + '/'
+        key_prefix = settings.S3_ARTICLES_IMAGES_PATH + image_url_path + hashlib.sha256(buf.getvalue()).hexdigest()
+        key = key_prefix + '.' + image_format
+        # 縮小・変換は S3 のイベントで行うため、縮小後のサイズの srcset を返却し、元の画像を IMAGE_UPLOAD_S3_BUCKET に保存する
+        expected_item = {
+            'image_url': 'https://' + os.environ['DOMAIN'] + '/' + key,
+            'srcset': self.get_srcset(key_prefix, image_format, [640, 1280, 1920], 3840)
+        }
+        self.assertEqual(json.loads(response['body']), expected_item)
+        uploaded_object = self.s3.Object(os.environ['IMAGE_UPLOAD_S3_BUCKET_NAME'], key).get()
+        self.assertEqual(uploaded_object['ContentType'], 'image/jpeg')
+        self.assertEqual(uploaded_object['Body'].read(), buf.getvalue())
 
     def test_validation_with_no_params(self):
         params = {
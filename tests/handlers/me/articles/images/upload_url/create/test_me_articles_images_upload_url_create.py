@@ -0,0 +1,101 @@
+import os
+import boto3
+import json
+import settings
+from tests_util import TestsUtil
+from unittest import TestCase
+from me_articles_images_upload_url_create import MeArticlesImagesUploadUrlCreate
+from unittest.mock import patch, MagicMock
+
+
+class TestMeArticlesImagesUploadUrlCreate(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+    s3 = boto3.resource('s3', endpoint_url='http://localhost:4572/')
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ['DOMAIN'] = 'example.com'
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.set_all_s3_buckets_name_to_env()
+        TestsUtil.delete_all_tables(cls.dynamodb)
+
+        # create article_info_table
+        cls.article_info_table_items = [
+            {
+                'article_id': 'testid000000',
+                'status': 'public',
+                'user_id': 'test0000',
+                'sort_key': 1520150272000000
+            }
+        ]
+        TestsUtil.create_table(cls.dynamodb, os.environ['ARTICLE_INFO_TABLE_NAME'], cls.article_info_table_items)
+
+    @classmethod
+    def tearDownClass(cls):
+        TestsUtil.delete_all_tables(cls.dynamodb)
+
+    def assert_bad_request(self, params):
+        response = MeArticlesImagesUploadUrlCreate(params, {}, dynamodb=self.dynamodb, s3=self.s3).main()
+
+        self.assertEqual(response['statusCode'], 400)
+
+    def get_params(self, article_id='testid000000', content_type='image/jpeg', user_id='test0000'):
+        return {
+            'pathParameters': {
+                'article_id': article_id
+            },
+            'body': json.dumps({'content_type': content_type}),
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': user_id,
+                        'phone_number_verified': 'true',
+                        'email_verified': 'true'
+                    }
+                }
+            }
+        }
+
+    @patch('uuid.uuid4', MagicMock(return_value='uuid'))
+    def test_main_ok(self):
+        response = MeArticlesImagesUploadUrlCreate(
+            self.get_params(content_type='image/png'), {}, dynamodb=self.dynamodb, s3=self.s3
+        ).main()
+
+        self.assertEqual(response['statusCode'], 200)
+
+        key = settings.S3_ARTICLES_IMAGES_PATH + 'test0000/testid000000/uuid.png'
+        body = json.loads(response['body'])
+        self.assertEqual(body['image_url'], 'https://' + os.environ['DOMAIN'] + '/' + key)
+        self.assertIn(os.environ['IMAGE_UPLOAD_S3_BUCKET_NAME'], body['upload_url'])
+        self.assertEqual(body['upload_fields']['key'], key)
+        self.assertEqual(body['upload_fields']['Content-Type'], 'image/png')
+        self.assertIn('policy', body['upload_fields'])
+
+    def test_call_validate_article_existence(self):
+        mock_lib = MagicMock()
+        with patch('me_articles_images_upload_url_create.DBUtil', mock_lib):
+            MeArticlesImagesUploadUrlCreate(self.get_params(), {}, self.dynamodb, self.s3).main()
+            args, kwargs = mock_lib.validate_article_existence.call_args
+
+            self.assertTrue(mock_lib.validate_article_existence.called)
+            self.assertEqual(args[1], 'testid000000')
+            self.assertEqual(kwargs['user_id'], 'test0000')
+
+    def test_validation_with_other_users_article(self):
+        response = MeArticlesImagesUploadUrlCreate(
+            self.get_params(user_id='test0001'), {}, dynamodb=self.dynamodb, s3=self.s3
+        ).main()
+
+        self.assertEqual(response['statusCode'], 403)
+
+    def test_validation_with_no_content_type(self):
+        params = self.get_params()
+        params['body'] = json.dumps({})
+        self.assert_bad_request(params)
+
+    def test_validation_with_no_supported_content_type(self):
+        self.assert_bad_request(self.get_params(content_type='image/svg+xml'))
+
+    def test_validation_article_id_max(self):
+        self.assert_bad_request(self.get_params(article_id='A' * 13))
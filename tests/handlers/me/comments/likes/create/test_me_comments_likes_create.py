@@ -4,6 +4,7 @@ from unittest import TestCase
 from me_comments_likes_create import MeCommentsLikesCreate
 from unittest.mock import patch, MagicMock
 from tests_util import TestsUtil
+from botocore.exceptions import ClientError
 
 
 class TestMeArticlesCommentsCreate(TestCase):
@@ -96,6 +97,127 @@ class TestMeArticlesCommentsCreate(TestCase):
         self.assertEqual(len(comment_after) - len(comment_before), 1)
         self.assertIsNotNone(liked_user)
         self.assertEqual(liked_user['article_id'], self.article_info_items[0]['article_id'])
+        self.assertEqual(liked_user['article_id_user_id'], 'publicId0001#like_user_01')
+
+    def test_main_ok_with_like_count(self):
+        comment_table = self.dynamodb.Table(os.environ['COMMENT_TABLE_NAME'])
+        comment_table.update_item(
+            Key={'comment_id': 'comment00002'},
+            UpdateExpression='set like_count = :like_count',
+            ExpressionAttributeValues={':like_count': 1}
+        )
+
+        params = {
+            'pathParameters': {
+                'comment_id': 'comment00002'
+            },
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': 'like_user_02',
+                        'phone_number_verified': 'true',
+                        'email_verified': 'true'
+                    }
+                }
+            }
+        }
+
+        response = MeCommentsLikesCreate(params, {}, self.dynamodb).main()
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(comment_table.get_item(Key={'comment_id': 'comment00002'})['Item']['like_count'], 2)
+
+    def test_main_ok_without_like_count(self):
+        params = {
+            'pathParameters': {
+                'comment_id': 'comment00001'
+            },
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': 'like_user_01',
+                        'phone_number_verified': 'true',
+                        'email_verified': 'true'
+                    }
+                }
+            }
+        }
+
+        response = MeCommentsLikesCreate(params, {}, self.dynamodb).main()
+
+        # いいね数を集計していない既存のコメントには集計値を付与しない
+        comment_table = self.dynamodb.Table(os.environ['COMMENT_TABLE_NAME'])
+        self.assertEqual(response['statusCode'], 200)
+        self.assertIsNone(comment_table.get_item(Key={'comment_id': 'comment00001'})['Item'].get('like_count'))
+
+    def test_main_ng_already_liked_with_like_count(self):
+        comment_table = self.dynamodb.Table(os.environ['COMMENT_TABLE_NAME'])
+        comment_table.update_item(
+            Key={'comment_id': 'comment00002'},
+            UpdateExpression='set like_count = :like_count',
+            ExpressionAttributeValues={':like_count': 1}
+        )
+
+        params = {
+            'pathParameters': {
+                'comment_id': 'comment00002'
+            },
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': 'like_user_01',
+                        'phone_number_verified': 'true',
+                        'email_verified': 'true'
+                    }
+                }
+            }
+        }
+
+        response = MeCommentsLikesCreate(params, {}, self.dynamodb).main()
+
+        # いいね済みの場合は集計値も更新しない
+        self.assertEqual(response['statusCode'], 400)
+        self.assertEqual(json.loads(response['body'])['message'], 'Already exists')
+        self.assertEqual(comment_table.get_item(Key={'comment_id': 'comment00002'})['Item']['like_count'], 1)
+
+    def test_main_ng_with_like_count_update_error(self):
+        comment_table = self.dynamodb.Table(os.environ['COMMENT_TABLE_NAME'])
+        comment_table.update_item(
+            Key={'comment_id': 'comment00002'},
+            UpdateExpression='set like_count = :like_count',
+            ExpressionAttributeValues={':like_count': 1}
+        )
+
+        params = {
+            'pathParameters': {
+                'comment_id': 'comment00002'
+            },
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': 'like_user_02',
+                        'phone_number_verified': 'true',
+                        'email_verified': 'true'
+                    }
+                }
+            }
+        }
+
+        # 集計値の更新に失敗した場合はいいねも登録せず、エラーとする
+        error = ClientError(
+            {
+                'Error': {'Code': 'TransactionCanceledException'},
+                'CancellationReasons': [{'Code': 'None'}, {'Code': 'ThrottlingError'}]
+            },
+            'TransactWriteItems'
+        )
+        with patch.object(self.dynamodb.meta.client, 'transact_write_items', side_effect=error):
+            response = MeCommentsLikesCreate(params, {}, self.dynamodb).main()
+
+        self.assertEqual(response['statusCode'], 500)
+        self.assertIsNone(self.comment_liked_user_table.get_item(
+            Key={'comment_id': 'comment00002', 'user_id': 'like_user_02'}
+        ).get('Item'))
 
     def test_main_ok_already_liked_by_other_user(self):
         params = {
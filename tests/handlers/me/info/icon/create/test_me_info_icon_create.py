@@ -1,14 +1,15 @@
 import os
 import boto3
 import base64
+import hashlib
 import json
 import settings
 from tests_util import TestsUtil
 from unittest import TestCase
 from me_info_icon_create import MeInfoIconCreate
-from unittest.mock import patch, MagicMock
 from PIL import Image
 from io import BytesIO
+from unittest.mock import patch
 import tempfile
 
 
@@ -36,6 +37,7 @@ class TestMeInfoIconCreate(TestCase):
             }
         ]
         TestsUtil.create_table(cls.dynamodb, os.environ['USERS_TABLE_NAME'], cls.users_table_items)
+        TestsUtil.create_table(cls.dynamodb, os.environ['PROCESSED_IMAGE_TABLE_NAME'], [])
 
     @classmethod
     def tearDownClass(cls):
@@ -58,7 +60,6 @@ class TestMeInfoIconCreate(TestCase):
                 return True
         return False
 
-    @patch('uuid.uuid4', MagicMock(return_value='uuid'))
     def test_main_ok(self):
         image_data = Image.new('RGB', (1, 1))
         buf = BytesIO()
@@ -87,7 +88,7 @@ class TestMeInfoIconCreate(TestCase):
 
         # response
         image_url_path = target_user['user_id'] + '/icon/'
-        image_file_name = 'uuid.' + image_format
+        image_file_name = hashlib.sha256(buf.getvalue()).hexdigest() + '.' + image_format
         key = settings.S3_INFO_ICON_PATH + image_url_path + image_file_name
         icon_image_url = 'https://' + os.environ['DOMAIN'] + '/' + key
         expected_item = {
@@ -106,7 +107,6 @@ class TestMeInfoIconCreate(TestCase):
         # s3
         self.assertTrue(self.equal_size_to_s3_image(key, image_data.size))
 
-    @patch('uuid.uuid4', MagicMock(return_value='uuid'))
     def test_main_ok_exists_icon_image_url_png_and_content_type_is_upper_case(self):
         image_data = Image.new('RGB', (150, 120))
         buf = BytesIO()
@@ -135,7 +135,7 @@ class TestMeInfoIconCreate(TestCase):
 
         # response
         image_url_path = target_user['user_id'] + '/icon/'
-        image_file_name = 'uuid.' + image_format
+        image_file_name = hashlib.sha256(buf.getvalue()).hexdigest() + '.' + image_format
         key = settings.S3_INFO_ICON_PATH + image_url_path + image_file_name
         icon_image_url = 'https://' + os.environ['DOMAIN'] + '/' + key
         expected_item = {
@@ -154,7 +154,6 @@ class TestMeInfoIconCreate(TestCase):
         # s3
         self.assertTrue(self.equal_size_to_s3_image(key, image_data.size))
 
-    @patch('uuid.uuid4', MagicMock(return_value='uuid'))
     def test_main_ok_over_size_and_width_gt_height_jpeg(self):
         image_data = Image.new('RGB', (settings.USER_ICON_WIDTH + 100, settings.USER_ICON_HEIGHT + 50))
         buf = BytesIO()
@@ -183,7 +182,7 @@ class TestMeInfoIconCreate(TestCase):
 
         # response
         image_url_path = target_user['user_id'] + '/icon/'
-        image_file_name = 'uuid.' + image_format
+        image_file_name = hashlib.sha256(buf.getvalue()).hexdigest() + '.' + image_format
         key = settings.S3_INFO_ICON_PATH + image_url_path + image_file_name
         icon_image_url = 'https://' + os.environ['DOMAIN'] + '/' + key
         expected_item = {
@@ -203,7 +202,6 @@ class TestMeInfoIconCreate(TestCase):
         expected_size = (settings.USER_ICON_WIDTH, settings.USER_ICON_HEIGHT)
         self.assertTrue(self.equal_size_to_s3_image(key, expected_size))
 
-    @patch('uuid.uuid4', MagicMock(return_value='uuid'))
     def test_main_ok_over_size_and_height_gt_width_gif(self):
         image_data = Image.new('RGB', (settings.USER_ICON_WIDTH + 50, settings.USER_ICON_HEIGHT + 100))
         buf = BytesIO()
@@ -232,7 +230,7 @@ class TestMeInfoIconCreate(TestCase):
 
         # response
         image_url_path = target_user['user_id'] + '/icon/'
-        image_file_name = 'uuid.' + image_format
+        image_file_name = hashlib.sha256(buf.getvalue()).hexdigest() + '.' + image_format
         key = settings.S3_INFO_ICON_PATH + image_url_path + image_file_name
         icon_image_url = 'https://' + os.environ['DOMAIN'] + '/' + key
         expected_item = {
@@ -252,7 +250,6 @@ class TestMeInfoIconCreate(TestCase):
         expected_size = (settings.USER_ICON_WIDTH, settings.USER_ICON_HEIGHT)
         self.assertTrue(self.equal_size_to_s3_image(key, expected_size))
 
-    @patch('uuid.uuid4', MagicMock(return_value='uuid'))
     def test_main_ok_over_size_only_width(self):
         image_data = Image.new('RGB', (settings.USER_ICON_WIDTH + 100, settings.USER_ICON_HEIGHT - 100))
         buf = BytesIO()
@@ -281,7 +278,7 @@ class TestMeInfoIconCreate(TestCase):
 
         # response
         image_url_path = target_user['user_id'] + '/icon/'
-        image_file_name = 'uuid.' + image_format
+        image_file_name = hashlib.sha256(buf.getvalue()).hexdigest() + '.' + image_format
         key = settings.S3_INFO_ICON_PATH + image_url_path + image_file_name
         icon_image_url = 'https://' + os.environ['DOMAIN'] + '/' + key
         expected_item = {
@@ -301,7 +298,6 @@ class TestMeInfoIconCreate(TestCase):
         expected_size = (settings.USER_ICON_WIDTH, settings.USER_ICON_HEIGHT - 100)
         self.assertTrue(self.equal_size_to_s3_image(key, expected_size))
 
-    @patch('uuid.uuid4', MagicMock(return_value='uuid'))
     def test_main_ok_over_size_only_height(self):
         image_data = Image.new('RGB', (settings.USER_ICON_WIDTH - 100, settings.USER_ICON_HEIGHT + 100))
         buf = BytesIO()
@@ -330,7 +326,7 @@ class TestMeInfoIconCreate(TestCase):
 
         # response
         image_url_path = target_user['user_id'] + '/icon/'
-        image_file_name = 'uuid.' + image_format
+        image_file_name = hashlib.sha256(buf.getvalue()).hexdigest() + '.' + image_format
         key = settings.S3_INFO_ICON_PATH + image_url_path + image_file_name
         icon_image_url = 'https://' + os.environ['DOMAIN'] + '/' + key
         expected_item = {
@@ -350,6 +346,75 @@ class TestMeInfoIconCreate(TestCase):
         expected_size = (settings.USER_ICON_WIDTH - 100, settings.USER_ICON_HEIGHT)
         self.assertTrue(self.equal_size_to_s3_image(key, expected_size))
 
+    def get_params(self, user_id, image_format, image_data):
+        return {
+            'headers': {
+                'content-type': 'image/' + image_format
+            },
+            'body': json.dumps({'icon_image': base64.b64encode(image_data).decode('ascii')}),
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': user_id
+                    }
+                }
+            }
+        }
+
+    def test_main_ok_same_image(self):
+        image_data = Image.new('RGB', (300, 300), 'red')
+        buf = BytesIO()
+        image_format = 'png'
+        image_data.save(buf, format=image_format)
+        target_user = self.users_table_items[0]
+        users_table = self.dynamodb.Table(os.environ['USERS_TABLE_NAME'])
+
+        response = MeInfoIconCreate(
+            self.get_params(target_user['user_id'], image_format, buf.getvalue()), {}, dynamodb=self.dynamodb, s3=self.s3
+        ).main()
+        users_table.update_item(
+            Key={'user_id': target_user['user_id']},
+            UpdateExpression='set icon_image_url=:icon_image_url',
+            ExpressionAttributeValues={':icon_image_url': 'test_url'}
+        )
+        # 同じ画像を再度アップロードした場合は、保存済みの画像で icon_image_url を更新する
+        with patch('image_upload_util.ImageUploadUtil.save_icon_image') as mock_save_icon_image:
+            same_image_response = MeInfoIconCreate(
+                self.get_params(target_user['user_id'], image_format, buf.getvalue()), {},
+                dynamodb=self.dynamodb, s3=self.s3
+            ).main()
+
+        self.assertEqual(same_image_response['statusCode'], 200)
+        self.assertEqual(json.loads(same_image_response['body']), json.loads(response['body']))
+        user_item = users_table.get_item(Key={'user_id': target_user['user_id']}).get('Item')
+        self.assertEqual(user_item['icon_image_url'], json.loads(response['body'])['icon_image_url'])
+        mock_save_icon_image.assert_not_called()
+
+    def test_main_ok_async_processing(self):
+        image_data = Image.new('RGB', (400, 300), 'blue')
+        buf = BytesIO()
+        image_format = 'jpeg'
+        image_data.save(buf, format=image_format)
+        target_user = self.users_table_items[1]
+
+        with patch.dict(os.environ, {'IMAGE_ASYNC_PROCESSING_FLAG': '1'}):
+            response = MeInfoIconCreate(
+                self.get_params(target_user['user_id'], image_format, buf.getvalue()), {},
+                dynamodb=self.dynamodb, s3=self.s3
+            ).main()
+
+        key = settings.S3_INFO_ICON_PATH + target_user['user_id'] + '/icon/' + \
+            hashlib.sha256(buf.getvalue()).hexdigest() + '.' + image_format
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body']), {'icon_image_url': 'https://' + os.environ['DOMAIN'] + '/' + key})
+        # 縮小・切り抜きと icon_image_url の更新は S3 のイベントで行う
+        uploaded_object = self.s3.Object(os.environ['IMAGE_UPLOAD_S3_BUCKET_NAME'], key).get()
+        self.assertEqual(uploaded_object['Body'].read(), buf.getvalue())
+        user_item = self.dynamodb.Table(os.environ['USERS_TABLE_NAME']).get_item(
+            Key={'user_id': target_user['user_id']}
+        ).get('Item')
+        self.assertNotEqual(user_item.get('icon_image_url'), json.loads(response['body'])['icon_image_url'])
+
     def test_validation_with_no_params(self):
         params = {
         }
@@ -0,0 +1,54 @@
+import os
+import boto3
+import json
+import settings
+from tests_util import TestsUtil
+from unittest import TestCase
+from me_info_icon_upload_url_create import MeInfoIconUploadUrlCreate
+from unittest.mock import patch, MagicMock
+
+
+class TestMeInfoIconUploadUrlCreate(TestCase):
+    s3 = boto3.resource('s3', endpoint_url='http://localhost:4572/')
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ['DOMAIN'] = 'example.com'
+        TestsUtil.set_all_s3_buckets_name_to_env()
+
+    def assert_bad_request(self, params):
+        response = MeInfoIconUploadUrlCreate(params, {}, s3=self.s3).main()
+
+        self.assertEqual(response['statusCode'], 400)
+
+    def get_params(self, body):
+        return {
+            'body': json.dumps(body),
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': 'test0000'
+                    }
+                }
+            }
+        }
+
+    @patch('uuid.uuid4', MagicMock(return_value='uuid'))
+    def test_main_ok(self):
+        response = MeInfoIconUploadUrlCreate(self.get_params({'content_type': 'image/gif'}), {}, s3=self.s3).main()
+
+        self.assertEqual(response['statusCode'], 200)
+
+        key = settings.S3_INFO_ICON_PATH + 'test0000/icon/uuid.gif'
+        body = json.loads(response['body'])
+        self.assertEqual(body['image_url'], 'https://' + os.environ['DOMAIN'] + '/' + key)
+        self.assertIn(os.environ['IMAGE_UPLOAD_S3_BUCKET_NAME'], body['upload_url'])
+        self.assertEqual(body['upload_fields']['key'], key)
+        self.assertEqual(body['upload_fields']['Content-Type'], 'image/gif')
+        self.assertIn('policy', body['upload_fields'])
+
+    def test_validation_with_no_params(self):
+        self.assert_bad_request({'requestContext': {'authorizer': {'claims': {'cognito:username': 'test0000'}}}})
+
+    def test_validation_with_no_supported_content_type(self):
+        self.assert_bad_request(self.get_params({'content_type': 'image/bmp'}))
@@ -0,0 +1,46 @@
+import json
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from me_wallet_balance import MeWalletBalance
+from tests_util import TestsUtil
+
+
+class TestMeWalletBalance(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+
+    def setUp(self):
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+        TestsUtil.create_table(self.dynamodb, os.environ['WALLET_BALANCE_CACHE_TABLE_NAME'], [])
+
+        self.event = {
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': 'test01',
+                        'custom:private_eth_address': '0x5d7743a4a6f21593ff6d3d81595f270123456789'
+                    }
+                }
+            }
+        }
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+    def test_main_ok(self):
+        with patch('wallet_balance_cache.PrivateChainClient.get_balance', return_value='0x10') as mock_get_balance:
+            response = MeWalletBalance(self.event, {}, self.dynamodb).main()
+
+            self.assertEqual(response['statusCode'], 200)
+            self.assertEqual(json.loads(response['body']), {'result': '0x10', 'pending': False})
+            mock_get_balance.assert_called_once_with('0x5d7743a4a6f21593ff6d3d81595f270123456789')
+
+    def test_main_ok_with_cache(self):
+        with patch('wallet_balance_cache.PrivateChainClient.get_balance', return_value='0x10') as mock_get_balance:
+            MeWalletBalance(self.event, {}, self.dynamodb).main()
+            response = MeWalletBalance(self.event, {}, self.dynamodb).main()
+
+            self.assertEqual(json.loads(response['body']), {'result': '0x10', 'pending': False})
+            self.assertEqual(mock_get_balance.call_count, 1)
@@ -5,6 +5,7 @@ import settings
 from decimal import Decimal
 from unittest import TestCase
 from me_wallet_tip import MeWalletTip
+from private_eth_address_cache import PrivateEthAddressCache
 from unittest.mock import patch, MagicMock
 from tests_util import TestsUtil
 
@@ -34,6 +35,9 @@ class TestMeArticlesCommentsCreate(TestCase):
         ]
         TestsUtil.create_table(self.dynamodb, os.environ['ARTICLE_INFO_TABLE_NAME'], self.article_info_table_items)
         TestsUtil.create_table(self.dynamodb, os.environ['TIP_TABLE_NAME'], {})
+        TestsUtil.create_table(self.dynamodb, os.environ['WALLET_BALANCE_CACHE_TABLE_NAME'], {})
+        TestsUtil.create_table(self.dynamodb, os.environ['USER_PRIVATE_ETH_ADDRESS_TABLE_NAME'], {})
+        PrivateEthAddressCache.clear()
 
     def tearDown(self):
         TestsUtil.delete_all_tables(self.dynamodb)
@@ -98,6 +102,24 @@ class TestMeArticlesCommentsCreate(TestCase):
 
             self.assertEqual(expected_tip, tips[0])
 
+            # 送受信したアドレスの残高のキャッシュを無効にする
+            wallet_balance_cache_table = self.dynamodb.Table(os.environ['WALLET_BALANCE_CACHE_TABLE_NAME'])
+            caches = sorted(wallet_balance_cache_table.scan()['Items'], key=lambda cache: cache['eth_address'])
+            self.assertEqual(
+                [(cache['eth_address'], cache['invalidated_at']) for cache in caches],
+                [
+                    ('0x1111111111111111111111111111111111111111', Decimal(1520150552000)),
+                    ('0x5d7743a4a6f21593ff6d3d81595f270123456789', Decimal(1520150552000))
+                ]
+            )
+
+            # Cognito から取得したアドレスを保存する
+            user_private_eth_address_table = self.dynamodb.Table(os.environ['USER_PRIVATE_ETH_ADDRESS_TABLE_NAME'])
+            self.assertEqual(
+                user_private_eth_address_table.get_item(Key={'user_id': 'article_user01'})['Item']['private_eth_address'],
+                '0x1111111111111111111111111111111111111111'
+            )
+
     @patch('me_wallet_tip.MeWalletTip._MeWalletTip__send_tip',
            MagicMock(return_value='0x0000000000000000000000000000000000000000'))
     @patch('time_util.TimeUtil.generate_sort_key', MagicMock(return_value=1520150552000003))
@@ -152,6 +174,187 @@ class TestMeArticlesCommentsCreate(TestCase):
 
             self.assertEqual(expected_tip, tips[0])
 
+    @patch('me_wallet_tip.MeWalletTip._MeWalletTip__send_tip',
+           MagicMock(return_value='0x0000000000000000000000000000000000000000'))
+    def test_main_ok_with_cached_private_eth_address(self):
+        user_private_eth_address_table = self.dynamodb.Table(os.environ['USER_PRIVATE_ETH_ADDRESS_TABLE_NAME'])
+        user_private_eth_address_table.put_item(Item={
+            'user_id': 'article_user01',
+            'private_eth_address': '0x1111111111111111111111111111111111111111'
+        })
+
+        with patch('me_wallet_tip.UserUtil') as user_util_mock:
+            event = {
+                'body': json.dumps({
+                    'article_id': self.article_info_table_items[0]['article_id'],
+                    'tip_value': str(settings.parameters['tip_value']['minimum'])
+                }),
+                'requestContext': {
+                    'authorizer': {
+                        'claims': {
+                            'cognito:username': 'act_user_01',
+                            'custom:private_eth_address': '0x5d7743a4a6f21593ff6d3d81595f270123456789',
+                            'phone_number_verified': 'true',
+                            'email_verified': 'true'
+                        }
+                    }
+                }
+            }
+
+            response = MeWalletTip(event, {}, self.dynamodb, cognito=None).main()
+            self.assertEqual(response['statusCode'], 200)
+
+            # 保存済みのアドレスを利用し、Cognito には問い合わせない
+            user_util_mock.get_cognito_user_info.assert_not_called()
+            MeWalletTip._MeWalletTip__send_tip.assert_called_once_with(
+                '0x5d7743a4a6f21593ff6d3d81595f270123456789',
+                '0x1111111111111111111111111111111111111111',
+                settings.parameters['tip_value']['minimum']
+            )
+
+            # 2回目以降はメモリ上のキャッシュを利用し、DynamoDB にも問い合わせない
+            user_private_eth_address_table.delete_item(Key={'user_id': 'article_user01'})
+            response = MeWalletTip(event, {}, self.dynamodb, cognito=None).main()
+            self.assertEqual(response['statusCode'], 200)
+            user_util_mock.get_cognito_user_info.assert_not_called()
+
+    @patch('me_wallet_tip.MeWalletTip._MeWalletTip__send_tip',
+           MagicMock(return_value='0x0000000000000000000000000000000000000000'))
+    @patch('me_wallet_tip.WalletBalanceCache.invalidate', MagicMock(side_effect=Exception()))
+    def test_main_tip_recorded_before_invalidating_cache(self):
+        user_private_eth_address_table = self.dynamodb.Table(os.environ['USER_PRIVATE_ETH_ADDRESS_TABLE_NAME'])
+        user_private_eth_address_table.put_item(Item={
+            'user_id': 'article_user01',
+            'private_eth_address': '0x1111111111111111111111111111111111111111'
+        })
+        event = {
+            'body': json.dumps({
+                'article_id': self.article_info_table_items[0]['article_id'],
+                'tip_value': str(settings.parameters['tip_value']['minimum'])
+            }),
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': 'act_user_01',
+                        'custom:private_eth_address': '0x5d7743a4a6f21593ff6d3d81595f270123456789',
+                        'phone_number_verified': 'true',
+                        'email_verified': 'true'
+                    }
+                }
+            }
+        }
+
+        MeWalletTip(event, {}, self.dynamodb, cognito=None).main()
+
+        # 送信したトランザクションはキャッシュの無効化より前に記録する
+        tips = self.dynamodb.Table(os.environ['TIP_TABLE_NAME']).scan()['Items']
+        self.assertEqual(len(tips), 1)
+        self.assertEqual(tips[0]['transaction'], '0x0000000000000000000000000000000000000000')
+
+    @patch('me_wallet_tip.MeWalletTip._MeWalletTip__send_tip')
+    @patch('wallet_balance_cache.PrivateChainClient.get_balance', MagicMock(return_value=hex(10 ** 18)))
+    @patch('time_util.TimeUtil.generate_sort_key', MagicMock(return_value=1520150552000003))
+    @patch('time.time', MagicMock(return_value=1520150552.000003))
+    def test_main_ok_queued_mode(self, send_tip_mock):
+        os.environ['TIP_QUEUED_MODE_FLAG'] = '1'
+        self.addCleanup(os.environ.pop, 'TIP_QUEUED_MODE_FLAG')
+
+        with patch('me_wallet_tip.UserUtil') as user_util_mock:
+            user_util_mock.get_cognito_user_info.return_value = {
+                'UserAttributes': [{
+                    'Name': 'custom:private_eth_address',
+                    'Value': '0x1111111111111111111111111111111111111111'
+                }]
+            }
+
+            target_article_id = self.article_info_table_items[0]['article_id']
+            target_tip_value = str(settings.parameters['tip_value']['minimum'])
+
+            event = {
+                'body': {
+                    'article_id': target_article_id,
+                    'tip_value': target_tip_value
+                },
+                'requestContext': {
+                    'authorizer': {
+                        'claims': {
+                            'cognito:username': 'act_user_01',
+                            'custom:private_eth_address': '0x5d7743a4a6f21593ff6d3d81595f270123456789',
+                            'phone_number_verified': 'true',
+                            'email_verified': 'true'
+                        }
+                    }
+                }
+            }
+            event['body'] = json.dumps(event['body'])
+
+            response = MeWalletTip(event, {}, self.dynamodb, cognito=None).main()
+            self.assertEqual(response['statusCode'], 200)
+
+            # キューモードではプライベートチェーンへの送信を行わない
+            send_tip_mock.assert_not_called()
+
+            tip_table = self.dynamodb.Table(os.environ['TIP_TABLE_NAME'])
+            tips = tip_table.scan()['Items']
+
+            expected_tip = {
+                'user_id': event['requestContext']['authorizer']['claims']['cognito:username'],
+                'to_user_id': self.article_info_table_items[0]['user_id'],
+                'tip_value': Decimal(target_tip_value),
+                'article_id': target_article_id,
+                'article_title': self.article_info_table_items[0]['title'],
+                'from_user_eth_address': '0x5d7743a4a6f21593ff6d3d81595f270123456789',
+                'to_user_eth_address': '0x1111111111111111111111111111111111111111',
+                'queued': Decimal(1),
+                'reserved': Decimal(1),
+                'uncompleted': Decimal(1),
+                'sort_key': Decimal(1520150552000003),
+                'created_at': Decimal(int(1520150552.000003))
+            }
+
+            self.assertEqual([expected_tip], tips)
+
+            # 送信前の投げ銭の額を残高から予約する
+            wallet_balance_cache_table = self.dynamodb.Table(os.environ['WALLET_BALANCE_CACHE_TABLE_NAME'])
+            cache = wallet_balance_cache_table.get_item(
+                Key={'eth_address': '0x5d7743a4a6f21593ff6d3d81595f270123456789'}
+            )['Item']
+            self.assertEqual(cache['reserved'], Decimal(target_tip_value))
+
+    @patch('me_wallet_tip.MeWalletTip._MeWalletTip__send_tip')
+    @patch('wallet_balance_cache.PrivateChainClient.get_balance', MagicMock(return_value=hex(10 ** 18)))
+    def test_main_ng_queued_mode_insufficient_balance(self, send_tip_mock):
+        os.environ['TIP_QUEUED_MODE_FLAG'] = '1'
+        self.addCleanup(os.environ.pop, 'TIP_QUEUED_MODE_FLAG')
+        PrivateEthAddressCache.put(self.dynamodb, 'article_user01', '0x1111111111111111111111111111111111111111')
+        event = {
+            'body': json.dumps({
+                'article_id': self.article_info_table_items[0]['article_id'],
+                'tip_value': str(6 * 10 ** 17)
+            }),
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'cognito:username': 'act_user_01',
+                        'custom:private_eth_address': '0x5d7743a4a6f21593ff6d3d81595f270123456789',
+                        'phone_number_verified': 'true',
+                        'email_verified': 'true'
+                    }
+                }
+            }
+        }
+
+        response = MeWalletTip(event, {}, self.dynamodb, cognito=None).main()
+        self.assertEqual(response['statusCode'], 200)
+
+        # 送信前の投げ銭を含めて残高が不足する場合は記録しない
+        response = MeWalletTip(event, {}, self.dynamodb, cognito=None).main()
+        self.assertEqual(response['statusCode'], 400)
+        self.assertEqual(json.loads(response['body'])['message'], 'Invalid parameter: Insufficient balance')
+
+        self.assertEqual(len(self.dynamodb.Table(os.environ['TIP_TABLE_NAME']).scan()['Items']), 1)
+        send_tip_mock.assert_not_called()
+
     @patch('me_wallet_tip.MeWalletTip._MeWalletTip__send_tip',
            MagicMock(return_value='0x0000000000000000000000000000000000000000'))
     def test_main_ng_same_user(self):
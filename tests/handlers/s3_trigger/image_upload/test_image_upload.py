@@ -0,0 +1,175 @@
+import os
+from io import BytesIO
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import settings
+from botocore.exceptions import ClientError
+from image_upload import ImageUpload
+from PIL import Image
+from tests_util import TestsUtil
+
+
+class TestImageUpload(TestCase):
+    dynamodb = TestsUtil.get_dynamodb_client()
+
+    def setUp(self):
+        os.environ['DOMAIN'] = 'example.com'
+        TestsUtil.set_all_tables_name_to_env()
+        TestsUtil.set_all_s3_buckets_name_to_env()
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+        users_table_items = [
+            {
+                'user_id': 'test01',
+                'user_display_name': 'test_display_name01'
+            }
+        ]
+        TestsUtil.create_table(self.dynamodb, os.environ['USERS_TABLE_NAME'], users_table_items)
+        TestsUtil.create_table(self.dynamodb, os.environ['PROCESSED_IMAGE_TABLE_NAME'], [])
+
+        self.s3 = MagicMock()
+        self.uploaded_objects = {}
+        self.s3.meta.client.get_object.side_effect = lambda Bucket, Key: self.uploaded_objects[Key]
+
+    def tearDown(self):
+        TestsUtil.delete_all_tables(self.dynamodb)
+
+    def upload(self, key, size, image_format, content_type=None):
+        buf = BytesIO()
+        Image.new('RGB', size).save(buf, format=image_format)
+        self.uploaded_objects[key] = {
+            'ContentType': content_type or 'image/' + image_format,
+            'ContentLength': len(buf.getvalue()),
+            'Body': BytesIO(buf.getvalue())
+        }
+
+    @staticmethod
+    def get_event(keys):
+        return {
+            'Records': [
+                {'s3': {'bucket': {'name': 'image-upload'}, 'object': {'key': key}}} for key in keys
+            ]
+        }
+
+    def get_put_objects(self):
+        return {
+            kwargs['Key']: Image.open(BytesIO(kwargs['Body'])).size
+            for _, kwargs in self.s3.meta.client.put_object.call_args_list
+        }
+
+    def test_main_ok_article_image(self):
+        key = settings.S3_ARTICLES_IMAGES_PATH + 'test01/testid000000/uuid.jpeg'
+        self.upload(key, (4000, 2000), 'jpeg')
+
+        response = ImageUpload(self.get_event([key]), {}, dynamodb=self.dynamodb, s3=self.s3).main()
+
+        self.assertEqual(response, {'processed': 1, 'rejected': 0, 'skipped': 0})
+        key_prefix = settings.S3_ARTICLES_IMAGES_PATH + 'test01/testid000000/uuid'
+        self.assertEqual(self.get_put_objects(), {
+            key: (3840, 1920),
+            key_prefix + '_640w.jpeg': (640, 320),
+            key_prefix + '_1280w.jpeg': (1280, 640),
+            key_prefix + '_1920w.jpeg': (1920, 960),
+            key_prefix + '_640w.webp': (640, 320),
+            key_prefix + '_1280w.webp': (1280, 640),
+            key_prefix + '_1920w.webp': (1920, 960),
+            key_prefix + '_3840w.webp': (3840, 1920)
+        })
+        for _, kwargs in self.s3.meta.client.put_object.call_args_list:
+            self.assertEqual(kwargs['Bucket'], os.environ['DIST_S3_BUCKET_NAME'])
+        self.s3.meta.client.delete_object.assert_called_once_with(Bucket='image-upload', Key=key)
+        processed_images = self.dynamodb.Table(os.environ['PROCESSED_IMAGE_TABLE_NAME']).scan()['Items']
+        self.assertEqual(len(processed_images), 1)
+        self.assertEqual(processed_images[0]['user_id'], 'test01')
+        self.assertEqual(processed_images[0]['image_url'], 'https://' + os.environ['DOMAIN'] + '/' + key)
+
+    def test_main_ok_icon_image(self):
+        key = settings.S3_INFO_ICON_PATH + 'test01/icon/uuid.png'
+        self.upload(key, (480, 360), 'png')
+
+        response = ImageUpload(self.get_event([key]), {}, dynamodb=self.dynamodb, s3=self.s3).main()
+
+        self.assertEqual(response, {'processed': 1, 'rejected': 0, 'skipped': 0})
+        self.assertEqual(self.get_put_objects(), {key: (240, 240)})
+
+        user = self.dynamodb.Table(os.environ['USERS_TABLE_NAME']).get_item(Key={'user_id': 'test01'})['Item']
+        self.assertEqual(user['icon_image_url'], 'https://' + os.environ['DOMAIN'] + '/' + key)
+        self.s3.meta.client.delete_object.assert_called_once_with(Bucket='image-upload', Key=key)
+
+    def test_main_ok_with_url_encoded_key(self):
+        key = settings.S3_INFO_ICON_PATH + 'test01/icon/uuid.png'
+        self.upload(key, (10, 10), 'png')
+
+        ImageUpload(
+            self.get_event([key.replace('/', '%2F')]), {}, dynamodb=self.dynamodb, s3=self.s3
+        ).main()
+
+        self.assertEqual(self.get_put_objects(), {key: (10, 10)})
+
+    def test_main_rejected(self):
+        not_image_key = settings.S3_INFO_ICON_PATH + 'test01/icon/not_image.png'
+        self.uploaded_objects[not_image_key] = {
+            'ContentType': 'image/png',
+            'ContentLength': 4,
+            'Body': BytesIO(b'test')
+        }
+        not_supported_content_type_key = settings.S3_INFO_ICON_PATH + 'test01/icon/svg.svg'
+        self.upload(not_supported_content_type_key, (10, 10), 'png', content_type='image/svg+xml')
+        other_path_key = 'd/api/other/test01/uuid.png'
+        self.upload(other_path_key, (10, 10), 'png')
+        keys = [not_image_key, not_supported_content_type_key, other_path_key]
+
+        response = ImageUpload(self.get_event(keys), {}, dynamodb=self.dynamodb, s3=self.s3).main()
+
+        self.assertEqual(response, {'processed': 0, 'rejected': 3, 'skipped': 0})
+        self.s3.meta.client.put_object.assert_not_called()
+        # サポート外の画像は削除する
+        self.assertEqual(
+            [kwargs['Key'] for _, kwargs in self.s3.meta.client.delete_object.call_args_list], keys
+        )
+
+    @patch('image_upload.settings.IMAGE_UPLOAD_MAX_BYTES', 10)
+    def test_main_rejected_over_size(self):
+        key = settings.S3_INFO_ICON_PATH + 'test01/icon/uuid.png'
+        self.upload(key, (10, 10), 'png')
+
+        response = ImageUpload(self.get_event([key]), {}, dynamodb=self.dynamodb, s3=self.s3).main()
+
+        self.assertEqual(response, {'processed': 0, 'rejected': 1, 'skipped': 0})
+        self.s3.meta.client.put_object.assert_not_called()
+
+    def test_main_keep_uploaded_object_with_error(self):
+        key = settings.S3_INFO_ICON_PATH + 'test01/icon/uuid.png'
+        self.upload(key, (10, 10), 'png')
+        self.s3.meta.client.put_object.side_effect = Exception()
+
+        # 非同期呼び出しの再試行の対象とするため、例外を送出する
+        with self.assertRaises(Exception):
+            ImageUpload(self.get_event([key]), {}, dynamodb=self.dynamodb, s3=self.s3).main()
+
+        self.s3.meta.client.delete_object.assert_not_called()
+
+    def test_main_skip_already_processed(self):
+        processed_key = settings.S3_INFO_ICON_PATH + 'test01/icon/processed.png'
+        key = settings.S3_INFO_ICON_PATH + 'test01/icon/uuid.png'
+        self.upload(key, (10, 10), 'png')
+
+        def get_object(Bucket, Key):
+            if Key == processed_key:
+                raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+            return self.uploaded_objects[Key]
+        self.s3.meta.client.get_object.side_effect = get_object
+
+        # 再試行時に、前回の実行で処理済みの画像はスキップする
+        response = ImageUpload(self.get_event([processed_key, key]), {}, dynamodb=self.dynamodb, s3=self.s3).main()
+
+        self.assertEqual(response, {'processed': 1, 'rejected': 0, 'skipped': 1})
+        self.assertEqual([kwargs['Key'] for _, kwargs in self.s3.meta.client.delete_object.call_args_list], [key])
+
+    def test_main_raise_client_error(self):
+        key = settings.S3_INFO_ICON_PATH + 'test01/icon/uuid.png'
+        self.s3.meta.client.get_object.side_effect = ClientError({'Error': {'Code': 'AccessDenied'}}, 'GetObject')
+
+        with self.assertRaises(ClientError):
+            ImageUpload(self.get_event([key]), {}, dynamodb=self.dynamodb, s3=self.s3).main()
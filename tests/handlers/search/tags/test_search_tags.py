@@ -5,6 +5,7 @@ from tests_es_util import TestsEsUtil
 
 from search_tags import SearchTags
 from elasticsearch import Elasticsearch
+from tag_dictionary import TagDictionary
 
 
 class TestSearchTags(TestCase):
@@ -14,6 +15,7 @@ class TestSearchTags(TestCase):
 
     def setUp(self):
         TestsEsUtil.create_tag_index(self.elasticsearch)
+        TagDictionary.clear()
         TestsEsUtil.create_tag_with_count(self.elasticsearch, 'ALIS', 1)
         TestsEsUtil.create_tag_with_count(self.elasticsearch, 'alis alis', 2)
         TestsEsUtil.create_tag_with_count(self.elasticsearch, 'alismedia', 3)
@@ -21,6 +21,30 @@ class TestSearchUsers(TestCase):
                             "analyzer": {
                                 "default": {
                                     "tokenizer": "keyword"
+                                },
+                                "ngram": {
+                                    "type": "custom",
+                                    "tokenizer": "ngram_tokenizer",
+                                    "filter": ["lowercase"]
+                                },
+                                "trigram": {
+                                    "type": "custom",
+                                    "tokenizer": "trigram_tokenizer",
+                                    "filter": ["lowercase"]
+                                }
+                            },
+                            "tokenizer": {
+                                "ngram_tokenizer": {
+                                    "type": "ngram",
+                                    "min_gram": 1,
+                                    "max_gram": 3,
+                                    "token_chars": []
+                                },
+                                "trigram_tokenizer": {
+                                    "type": "ngram",
+                                    "min_gram": 3,
+                                    "max_gram": 3,
+                                    "token_chars": []
                                 }
                             },
                             "normalizer": {
@@ -37,15 +61,23 @@ class TestSearchUsers(TestCase):
                             "properties": {
                                 "user_id": {
                                     "type": "keyword",
-                                    "copy_to": "search_name"
+                                    "copy_to": ["search_name", "search_name_ngram", "search_name_trigram"]
                                 },
                                 "user_display_name": {
                                     "type": "keyword",
-                                    "copy_to": "search_name"
+                                    "copy_to": ["search_name", "search_name_ngram", "search_name_trigram"]
                                 },
                                 "search_name": {
                                     "type": "keyword",
                                     "normalizer": "lowcase"
+                                },
+                                "search_name_ngram": {
+                                    "type": "text",
+                                    "analyzer": "ngram"
+                                },
+                                "search_name_trigram": {
+                                    "type": "text",
+                                    "analyzer": "trigram"
                                 }
                             }
                         }
@@ -187,3 +219,85 @@ class TestSearchUsers(TestCase):
         response = SearchUsers(params, {}, elasticsearch=self.elasticsearch).main()
         result = json.loads(response['body'])
         self.assertEqual(len(result), 1)
+
+    def test_search_short_query(self):
+        # 3文字未満でも部分一致で検索できる
+        self.elasticsearch.index(
+                index="users",
+                doc_type="user",
+                id="AbCdEfG",
+                body={
+                    'user_id': "AbCdEfG",
+                    'user_display_name': "HiJkLmN",
+                    'updated_at': 1530112761,
+                }
+        )
+        self.elasticsearch.indices.refresh(index="users")
+        params = {
+                'queryStringParameters': {
+                    'query': 'Cd'
+                }
+        }
+        response = SearchUsers(params, {}, elasticsearch=self.elasticsearch).main()
+        result = json.loads(response['body'])
+        self.assertEqual([user['user_id'] for user in result], ['AbCdEfG'])
+
+    def test_search_not_substring(self):
+        # 3-gram がすべて含まれていても、連続した部分文字列でない場合は一致しない
+        for user_id, user_display_name in [('abcbcd', 'display'), ('zzabc', 'bcdzz')]:
+            self.elasticsearch.index(
+                    index="users",
+                    doc_type="user",
+                    id=user_id,
+                    body={
+                        'user_id': user_id,
+                        'user_display_name': user_display_name,
+                        'updated_at': 1530112761,
+                    }
+            )
+        self.elasticsearch.indices.refresh(index="users")
+        # 文字列中に離れて出現する場合と、user_id と user_display_name にまたがる場合
+        params = {
+                'queryStringParameters': {
+                    'query': 'abcd'
+                }
+        }
+        response = SearchUsers(params, {}, elasticsearch=self.elasticsearch).main()
+        result = json.loads(response['body'])
+        self.assertEqual(result, [])
+        # 部分文字列の場合は一致する
+        params = {
+                'queryStringParameters': {
+                    'query': 'bcbcd'
+                }
+        }
+        response = SearchUsers(params, {}, elasticsearch=self.elasticsearch).main()
+        result = json.loads(response['body'])
+        self.assertEqual([user['user_id'] for user in result], ['abcbcd'])
+
+    def test_search_order(self):
+        # 完全一致、前方一致、部分一致の順に並び、同順位はuser_idの昇順となる
+        for user_id in ['xtestuser1', 'testuser1x']:
+            self.elasticsearch.index(
+                    index="users",
+                    doc_type="user",
+                    id=user_id,
+                    body={
+                        'user_id': user_id,
+                        'user_display_name': 'display',
+                        'updated_at': 1530112761,
+                    }
+            )
+        self.elasticsearch.indices.refresh(index="users")
+        params = {
+                'queryStringParameters': {
+                    'query': 'TestUser1'
+                }
+        }
+        response = SearchUsers(params, {}, elasticsearch=self.elasticsearch).main()
+        result = json.loads(response['body'])
+        user_ids = [user['user_id'] for user in result]
+        self.assertEqual(user_ids[0], 'testuser1')
+        self.assertEqual(user_ids[-1], 'xtestuser1')
+        self.assertEqual(user_ids[1:-1], sorted(user_ids[1:-1]))
+        self.assertEqual(len(user_ids), 13)
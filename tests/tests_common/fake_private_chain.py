@@ -0,0 +1,89 @@
+import json
+import uuid
+from urllib.parse import urlparse
+
+from requests import Response
+from requests.adapters import BaseAdapter
+
+
+class FakePrivateChain(BaseAdapter):
+    """
+    プライベートチェーンの API をメモリ上で再現するテスト用のアダプタ
+    PrivateChainClient のセッションにマウントすることで、HTTP 通信を行わずに送金・残高・レシートの API を呼び出せる
+    送金したトランザクションは mine を呼び出すまでブロックに取り込まれず、レシートは None となる
+    """
+    def __init__(self, auto_mine=False):
+        super().__init__()
+        self.auto_mine = auto_mine
+        self.balances = {}
+        self.transactions = {}
+        self.requests = []
+
+    def mount(self, session):
+        session.mount('https://', self)
+
+    def set_balance(self, eth_address, value):
+        self.balances[self.__normalize(eth_address)] = value
+
+    def get_balance(self, eth_address):
+        return self.balances.get(self.__normalize(eth_address), 0)
+
+    def mine(self, status='0x1'):
+        for transaction in self.transactions.values():
+            if transaction['receipt'] is None:
+                transaction['receipt'] = {'transactionHash': transaction['hash'], 'status': status}
+
+    def send(self, request, **kwargs):
+        path = urlparse(request.url).path
+        payload = json.loads(request.body.decode('utf-8')) if request.body else {}
+        self.requests.append((path, payload))
+
+        if path == '/production/wallet/tip':
+            body = self.__tip(payload)
+        elif path == '/production/wallet/balance':
+            body = {'result': format(self.get_balance(payload['private_eth_address']), '#x')}
+        elif path == '/production/accounts/new':
+            body = {'result': '0x' + uuid.uuid4().hex + uuid.uuid4().hex[:8]}
+        elif path == '/production/transaction/receipt':
+            transaction = self.transactions.get(payload['transaction_hash'])
+            body = {'result': transaction['receipt'] if transaction else None}
+        else:
+            return self.__build_response(request, 404, {'message': 'Not Found'})
+
+        return self.__build_response(request, 200, body)
+
+    def close(self):
+        pass
+
+    def __tip(self, payload):
+        from_user_eth_address = self.__normalize(payload['from_user_eth_address'])
+        to_user_eth_address = self.__normalize(payload['to_user_eth_address'])
+        tip_value = int(payload['tip_value'], 16)
+
+        if self.balances.get(from_user_eth_address, 0) < tip_value:
+            return {'error': 'insufficient funds'}
+
+        self.balances[from_user_eth_address] -= tip_value
+        self.balances[to_user_eth_address] = self.balances.get(to_user_eth_address, 0) + tip_value
+
+        transaction_hash = '0x' + uuid.uuid4().hex + uuid.uuid4().hex
+        self.transactions[transaction_hash] = {'hash': transaction_hash, 'receipt': None}
+        if self.auto_mine:
+            self.mine()
+
+        return {'result': transaction_hash}
+
+    @staticmethod
+    def __normalize(eth_address):
+        eth_address = eth_address.lower()
+        return eth_address if eth_address.startswith('0x') else '0x' + eth_address
+
+    @staticmethod
+    def __build_response(request, status_code, body):
+        response = Response()
+        response.status_code = status_code
+        response._content = json.dumps(body).encode('utf-8')
+        response.headers['Content-Type'] = 'application/json'
+        response.url = request.url
+        response.request = request
+        return response
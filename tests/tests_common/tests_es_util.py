@@ -96,6 +96,9 @@ class TestsEsUtil:
                         },
                         'created_at': {
                             'type': 'integer'
+                        },
+                        'updated_at': {
+                            'type': 'integer'
                         }
                     }
                 }
@@ -110,7 +113,8 @@ class TestsEsUtil:
             'name': tag_name,
             'name_with_analyzer': tag_name,
             'count': count,
-            'created_at': int(time.time())
+            'created_at': int(time.time()),
+            'updated_at': int(time.time())
         }
 
         elasticsearch.index(
@@ -51,7 +51,8 @@ class TestsUtil:
     @classmethod
     def get_all_s3_buckets(cls):
         return [
-            {'env_name': 'DIST_S3_BUCKET_NAME', 'bucket_name': 'dist'}
+            {'env_name': 'DIST_S3_BUCKET_NAME', 'bucket_name': 'dist'},
+            {'env_name': 'IMAGE_UPLOAD_S3_BUCKET_NAME', 'bucket_name': 'image-upload'}
         ]
 
     @classmethod
@@ -87,7 +88,12 @@ class TestsUtil:
             {'env_name': 'TOPIC_TABLE_NAME', 'table_name': 'Topic'},
             {'env_name': 'TAG_TABLE_NAME', 'table_name': 'Tag'},
             {'env_name': 'TIP_TABLE_NAME', 'table_name': 'Tip'},
-            {'env_name': 'EXTERNAL_PROVIDER_USERS_TABLE_NAME', 'table_name': 'ExternalProviderUsers'}
+            {'env_name': 'EXTERNAL_PROVIDER_USERS_TABLE_NAME', 'table_name': 'ExternalProviderUsers'},
+            {'env_name': 'TAG_COUNT_EVENT_TABLE_NAME', 'table_name': 'TagCountEvent'},
+            {'env_name': 'WALLET_BALANCE_CACHE_TABLE_NAME', 'table_name': 'WalletBalanceCache'},
+            {'env_name': 'USER_PRIVATE_ETH_ADDRESS_TABLE_NAME', 'table_name': 'UserPrivateEthAddress'},
+            {'env_name': 'VERIFIED_CONTACT_TABLE_NAME', 'table_name': 'VerifiedContact'},
+            {'env_name': 'PROCESSED_IMAGE_TABLE_NAME', 'table_name': 'ProcessedImage'}
         ]
         if os.environ.get('IS_DYNAMODB_ENDPOINT_OF_AWS') is not None:
             for table in cls.all_tables: